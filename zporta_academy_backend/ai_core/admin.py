@@ -2,11 +2,13 @@
 AI Core Admin Interface
 """
 
+import math
+
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from django.urls import reverse
-from django.db.models import Sum, Count, Avg
+from django.urls import path, reverse
+from django.core.exceptions import PermissionDenied
 from django.utils import timezone
 from datetime import timedelta
 
@@ -15,8 +17,12 @@ from .models import (
     AiMemory,
     AiTrainingData,
     AiUsageLog,
+    AiUsageRollup,
     AiModelTrainingRun
 )
+from . import cache as ai_cache
+from .export import training_data_response
+from .usage import usage_breakdown, usage_totals
 
 
 @admin.register(AiProviderConfig)
@@ -74,6 +80,31 @@ class AiMemoryAdmin(admin.ModelAdmin):
     ]
     actions = ['mark_as_verified', 'mark_for_training', 'unmark_verified']
     
+    def get_urls(self):
+        custom = [
+            path(
+                'export-training-data/',
+                self.admin_site.admin_view(self.export_training_data_view),
+                name='ai_core_aimemory_export_training_data',
+            ),
+        ]
+        return custom + super().get_urls()
+    
+    def export_training_data_view(self, request):
+        """Download training data as gzip'd JSONL (?rated=1&min_rating=4.5), streamed row by row"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        try:
+            min_rating = float(request.GET.get('min_rating', 4.0))
+        except (TypeError, ValueError):
+            min_rating = 4.0
+        if not math.isfinite(min_rating):
+            min_rating = 4.0
+        return training_data_response(
+            verified_only=request.GET.get('rated') != '1',
+            min_rating=min_rating,
+        )
+    
     fieldsets = (
         ('Request Info', {
             'fields': ('request_type', 'prompt_hash', 'prompt_text', 'prompt_options')
@@ -132,7 +163,11 @@ class AiMemoryAdmin(admin.ModelAdmin):
     mark_for_training.short_description = "🎓 Mark for Training"
     
     def unmark_verified(self, request, queryset):
+        hashes = list(queryset.values_list('prompt_hash', flat=True))
         count = queryset.update(is_verified_good=False)
+        # update() sends no post_save: drop the front-cache entries here
+        for prompt_hash in hashes:
+            ai_cache.invalidate_response(prompt_hash)
         self.message_user(request, f"Unmarked {count} items")
     unmark_verified.short_description = "✗ Unmark Verified"
 
@@ -194,7 +229,7 @@ class AiUsageLogAdmin(admin.ModelAdmin):
         'selection_mode', 'success'
     ]
     list_filter = [
-        'request_type', 'provider', 'cache_hit',
+        'request_type', 'provider', 'cache_hit', 'cache_tier',
         'selection_mode', 'success', 'timestamp'
     ]
     search_fields = ['endpoint', 'user__username', 'error_message']
@@ -209,7 +244,7 @@ class AiUsageLogAdmin(admin.ModelAdmin):
             'fields': ('provider', 'model', 'tokens_used')
         }),
         ('Performance', {
-            'fields': ('latency_ms', 'cost_estimate', 'cache_hit', 'memory_item')
+            'fields': ('latency_ms', 'cost_estimate', 'cache_hit', 'cache_tier', 'memory_item')
         }),
         ('Status', {
             'fields': ('success', 'error_message', 'timestamp')
@@ -237,6 +272,22 @@ class AiUsageLogAdmin(admin.ModelAdmin):
     cost_display.short_description = "Cost"
 
 
+@admin.register(AiUsageRollup)
+class AiUsageRollupAdmin(admin.ModelAdmin):
+    list_display = [
+        'period', 'period_start', 'provider', 'model', 'request_type',
+        'cache_hit', 'cache_tier', 'requests', 'failures', 'tokens_used', 'cost_estimate'
+    ]
+    list_filter = ['period', 'provider', 'request_type', 'cache_hit', 'cache_tier']
+    date_hierarchy = 'period_start'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(AiModelTrainingRun)
 class AiModelTrainingRunAdmin(admin.ModelAdmin):
     list_display = [
@@ -305,37 +356,22 @@ class AiDashboardAdmin(admin.ModelAdmin):
     change_list_template = 'admin/ai_core/dashboard.html'
     
     def changelist_view(self, request, extra_context=None):
-        # Calculate stats
+        # Calculate stats (from hourly/daily rollups, see ai_core/usage.py)
         thirty_days_ago = timezone.now() - timedelta(days=30)
         seven_days_ago = timezone.now() - timedelta(days=7)
         
         # Last 30 days
-        stats_30d = AiUsageLog.objects.filter(timestamp__gte=thirty_days_ago).aggregate(
-            total_requests=Count('id'),
-            total_cost=Sum('cost_estimate'),
-            total_tokens=Sum('tokens_used'),
-            cache_hits=Count('id', filter=models.Q(cache_hit=True)),
-            avg_latency=Avg('latency_ms')
-        )
+        stats_30d = usage_totals(thirty_days_ago)
         
         # Last 7 days
-        stats_7d = AiUsageLog.objects.filter(timestamp__gte=seven_days_ago).aggregate(
-            total_requests=Count('id'),
-            total_cost=Sum('cost_estimate'),
-            cache_hits=Count('id', filter=models.Q(cache_hit=True))
-        )
+        stats_7d = usage_totals(seven_days_ago)
         
         # Cache hit rate
         cache_hit_rate_30d = (stats_30d['cache_hits'] / stats_30d['total_requests'] * 100) if stats_30d['total_requests'] else 0
         cache_hit_rate_7d = (stats_7d['cache_hits'] / stats_7d['total_requests'] * 100) if stats_7d['total_requests'] else 0
         
         # Top expensive providers
-        top_providers = AiUsageLog.objects.filter(
-            timestamp__gte=thirty_days_ago
-        ).values('provider', 'model').annotate(
-            cost=Sum('cost_estimate'),
-            requests=Count('id')
-        ).order_by('-cost')[:10]
+        top_providers = usage_breakdown(thirty_days_ago, 'provider', 'model').order_by('-cost')[:10]
         
         # Training data readiness
         training_ready = AiMemory.objects.filter(
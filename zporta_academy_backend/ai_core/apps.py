@@ -10,4 +10,5 @@ class AiCoreConfig(AppConfig):
         """Initialize AI system on startup"""
         import logging
         logger = logging.getLogger(__name__)
+        from . import signals  # noqa: F401  (front-cache invalidation)
         logger.info("✅ AI Core System loaded")
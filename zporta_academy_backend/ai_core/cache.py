@@ -0,0 +1,153 @@
+"""
+AI Core Cache - Redis front cache and in-flight coalescing for generate_text()
+
+Tier 1 is the Django cache (Redis in production), keyed by
+AiMemory.compute_prompt_hash(). Tier 2 is AiMemory in the database. A hit in
+tier 2 is copied into tier 1, so repeated prompts stop costing an ORM query.
+
+Eviction:
+- every entry has a TTL (AI_RESPONSE_CACHE_TIMEOUT)
+- with django-redis, an access-ordered index (sorted set) caps the number of
+  entries at AI_RESPONSE_CACHE_MAX_ENTRIES, evicting the least recently used
+- other backends rely on their own culling (locmem MAX_ENTRIES)
+
+Coalescing:
+N simultaneous calls for the same prompt take a short lock with cache.add()
+(SET NX on Redis). The winner calls the provider and publishes the result;
+the others poll for it instead of calling the provider themselves. If the
+winner fails or the wait runs out, a waiter falls back to its own call.
+"""
+
+import logging
+import time
+import uuid
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from zporta.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_KEY = "ai_core:response:{}"
+INFLIGHT_LOCK_KEY = "ai_core:inflight:{}"
+INFLIGHT_RESULT_KEY = "ai_core:inflight_result:{}"
+LRU_INDEX_KEY = "ai_core:response_lru"
+
+DEFAULT_TIMEOUT = 60 * 60 * 24
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_LOCK_SECONDS = 60
+DEFAULT_WAIT_SECONDS = 30
+POLL_INTERVAL = 0.1
+RESULT_SECONDS = 2  # waiters poll every POLL_INTERVAL
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _touch(prompt_hash: str, evict: bool = False):
+    """Record an access in the LRU index; after a write, trim it to the cap."""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        index = cache.make_key(LRU_INDEX_KEY)
+        client.zadd(index, {prompt_hash: time.time()})
+        if not evict:
+            return
+        excess = client.zcard(index) - _setting('AI_RESPONSE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+        if excess > 0:
+            evicted = [member.decode() for member, _ in client.zpopmin(index, excess)]
+            cache.delete_many([RESPONSE_KEY.format(h) for h in evicted])
+    except Exception as e:
+        logger.warning(f"AI cache LRU index update failed: {e}")
+
+
+# ============================================
+# TIER 1: RESPONSE CACHE
+# ============================================
+
+def get_response(prompt_hash: str) -> Optional[Dict]:
+    """Cached response dict (text, provider, model, tokens_used, cost_estimate, memory_id) or None."""
+    try:
+        cached = cache.get(RESPONSE_KEY.format(prompt_hash))
+    except Exception as e:
+        logger.warning(f"AI cache read failed: {e}")
+        return None
+    if cached is not None:
+        _touch(prompt_hash)
+    return cached
+
+
+def set_response(prompt_hash: str, response: Dict):
+    try:
+        cache.set(
+            RESPONSE_KEY.format(prompt_hash),
+            response,
+            timeout=_setting('AI_RESPONSE_CACHE_TIMEOUT', DEFAULT_TIMEOUT),
+        )
+    except Exception as e:
+        logger.warning(f"AI cache write failed: {e}")
+        return
+    _touch(prompt_hash, evict=True)
+
+
+def invalidate_response(prompt_hash: str):
+    """Drop a cached response (e.g. when its AiMemory item is un-verified)."""
+    cache.delete(RESPONSE_KEY.format(prompt_hash))
+
+
+# ============================================
+# IN-FLIGHT COALESCING
+# ============================================
+
+class InFlight:
+    """
+    Coalesce identical concurrent requests.
+
+    with InFlight(prompt_hash) as flight:
+        if flight.result is not None:
+            ...  # another worker produced it while we waited
+        else:
+            ...  # call the provider, then flight.publish(response)
+    """
+
+    def __init__(self, prompt_hash: str):
+        self.prompt_hash = prompt_hash
+        self.lock_key = INFLIGHT_LOCK_KEY.format(prompt_hash)
+        self.result_key = INFLIGHT_RESULT_KEY.format(prompt_hash)
+        self.token = uuid.uuid4().hex
+        self.is_leader = False
+        self.result = None
+
+    def __enter__(self):
+        lock_seconds = _setting('AI_INFLIGHT_LOCK_SECONDS', DEFAULT_LOCK_SECONDS)
+        deadline = time.monotonic() + _setting('AI_INFLIGHT_WAIT_SECONDS', DEFAULT_WAIT_SECONDS)
+        try:
+            while True:
+                # Result first: the leader publishes before releasing the lock
+                self.result = cache.get(self.result_key)
+                if self.result is not None:
+                    return self
+                if cache.add(self.lock_key, self.token, timeout=lock_seconds):
+                    self.is_leader = True
+                    return self
+                if time.monotonic() >= deadline:
+                    logger.warning(f"AI in-flight wait timed out for {self.prompt_hash[:12]}, calling provider")
+                    return self
+                time.sleep(POLL_INTERVAL)
+        except Exception as e:
+            logger.warning(f"AI in-flight coalescing unavailable: {e}")
+            return self
+
+    def publish(self, response: Dict):
+        """Hand the result to waiters; kept only long enough for their next poll."""
+        if self.is_leader:
+            cache.set(self.result_key, response, timeout=RESULT_SECONDS)
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.is_leader and cache.get(self.lock_key) == self.token:
+            cache.delete(self.lock_key)
+        return False
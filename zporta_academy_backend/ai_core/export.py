@@ -0,0 +1,196 @@
+"""
+AI Core Export - streaming JSONL export of AiMemory training data
+
+Rows are read with values() projections in primary-key pages of
+`chunk_size`, and written one JSON line at a time, so memory use is the same
+for ten rows or ten million:
+
+- export_to_directory(): gzip'd JSONL shards (a new shard every
+  `shard_bytes` of uncompressed JSON), resumable from a state file
+- stream_jsonl_gz(): gzip'd bytes for a StreamingHttpResponse
+  (training_data_response() builds one)
+
+Deduplication is by prompt hash: AiMemory.prompt_hash is unique, and the
+exporter only ever moves forward by id, so a resumed export never emits a
+row twice. A shard is written as `<name>.part` and renamed when closed; the
+state file (last exported id, next shard number) is only advanced after the
+rename, so an interrupted run restarts from the last complete shard.
+restart=True deletes the state file and every existing shard first.
+
+Usage:
+    python manage.py export_training_data --out exports/training
+"""
+
+import gzip
+import json
+import os
+import re
+import zlib
+
+from django.http import StreamingHttpResponse
+
+from .models import AiMemory
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_SHARD_BYTES = 256 * 1024 * 1024
+EXPORT_FIELDS = ('id', 'prompt_hash', 'prompt_text', 'generated_text', 'request_type', 'training_tags', 'prompt_options')
+
+
+def training_queryset(min_rating=4.0, verified_only=True):
+    """AiMemory rows eligible for training, same rules as before."""
+    query = AiMemory.objects.filter(use_for_training=True)
+    if verified_only:
+        query = query.filter(is_verified_good=True)
+    else:
+        query = query.filter(user_rating__gte=min_rating)
+    return query
+
+
+def iter_training_rows(min_rating=4.0, verified_only=True, after_id=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield (id, training dict) in id order, starting after `after_id`.
+
+    Reads keyset pages (id > last id, LIMIT chunk_size): MySQL drivers buffer
+    a whole result set even under .iterator(), so one unbounded query would
+    not keep memory flat there.
+    """
+    query = training_queryset(min_rating, verified_only).order_by('id').values(*EXPORT_FIELDS)
+    while True:
+        last_id = None
+        for row in query.filter(id__gt=after_id)[:chunk_size].iterator(chunk_size=chunk_size):
+            last_id = row['id']
+            yield row['id'], {
+                'prompt': row['prompt_text'],
+                'completion': row['generated_text'],
+                'request_type': row['request_type'],
+                'tags': row['training_tags'],
+                'options': row['prompt_options'],
+                'prompt_hash': row['prompt_hash'],
+            }
+        if last_id is None:
+            return
+        after_id = last_id
+
+
+def _jsonl(record) -> bytes:
+    return (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+# ============================================
+# HTTP STREAMING
+# ============================================
+
+def stream_jsonl_gz(records):
+    """Gzip-compress JSON lines on the fly; yields compressed byte chunks."""
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for record in records:
+        data = compressor.compress(_jsonl(record))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def training_data_response(filename='training_data.jsonl.gz', **filters):
+    records = (record for _, record in iter_training_rows(**filters))
+    response = StreamingHttpResponse(stream_jsonl_gz(records), content_type='application/gzip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# ============================================
+# SHARDED FILE EXPORT
+# ============================================
+
+class ExportState:
+    """Checkpoint for a resumable export: last id written and next shard number."""
+
+    def __init__(self, path):
+        self.path = path
+        self.last_id = 0
+        self.next_shard = 0
+        self.rows = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.last_id = data['last_id']
+            self.next_shard = data['next_shard']
+            self.rows = data.get('rows', 0)
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'last_id': self.last_id, 'next_shard': self.next_shard, 'rows': self.rows}, f)
+        os.replace(tmp, self.path)
+
+
+def export_to_directory(
+    directory,
+    prefix='training',
+    shard_bytes=DEFAULT_SHARD_BYTES,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    restart=False,
+    **filters,
+):
+    """
+    Write eligible rows to `directory/<prefix>-NNNNN.jsonl.gz` shards.
+    Returns (rows written this run, shard paths written this run).
+    """
+    os.makedirs(directory, exist_ok=True)
+    state_path = os.path.join(directory, f"{prefix}.state.json")
+    if restart and os.path.exists(state_path):
+        os.remove(state_path)
+    state = ExportState(state_path)
+
+    # Leftovers of an interrupted run are re-exported from the checkpoint; on
+    # restart the old complete shards go too, or shard 0 onwards would be
+    # overwritten while higher-numbered stale shards stayed behind
+    shard_name = re.compile(rf"{re.escape(prefix)}-\d{{5,}}\.jsonl\.gz(\.part)?$")
+    for name in os.listdir(directory):
+        match = shard_name.match(name)
+        if match and (restart or match.group(1)):
+            os.remove(os.path.join(directory, name))
+
+    written, shards = 0, []
+    shard = None
+    try:
+        for row_id, record in iter_training_rows(after_id=state.last_id, chunk_size=chunk_size, **filters):
+            if shard is None:
+                shard = _Shard(directory, prefix, state.next_shard)
+            shard.write(_jsonl(record))
+            shard.last_id = row_id
+            written += 1
+            if shard.size >= shard_bytes:
+                shards.append(_close_shard(shard, state))
+                shard = None
+    except BaseException:
+        if shard is not None:
+            shard.file.close()  # stays .part; the next run removes it
+        raise
+    if shard is not None:
+        shards.append(_close_shard(shard, state))
+    return written, shards
+
+
+class _Shard:
+    def __init__(self, directory, prefix, number):
+        self.path = os.path.join(directory, f"{prefix}-{number:05d}.jsonl.gz")
+        self.number = number
+        self.file = gzip.open(f"{self.path}.part", 'wb')
+        self.size = 0
+        self.rows = 0
+        self.last_id = None
+
+    def write(self, line: bytes):
+        self.file.write(line)
+        self.size += len(line)
+        self.rows += 1
+
+
+def _close_shard(shard, state):
+    shard.file.close()
+    os.replace(f"{shard.path}.part", shard.path)
+    state.last_id = shard.last_id
+    state.next_shard = shard.number + 1
+    state.rows += shard.rows
+    state.save()
+    return shard.path
@@ -0,0 +1,41 @@
+"""
+Management command to export AiMemory training data as gzip'd JSONL shards.
+
+Usage:
+    python manage.py export_training_data --out exports/training
+    python manage.py export_training_data --out exports/training --min-rating 4.5 --rated
+    python manage.py export_training_data --out exports/training --restart
+
+Re-running with the same --out/--prefix resumes after the last complete shard.
+"""
+
+from django.core.management.base import BaseCommand
+
+from ai_core.export import DEFAULT_CHUNK_SIZE, export_to_directory
+
+
+class Command(BaseCommand):
+    help = "Stream training data to gzip'd JSONL shards (constant memory, resumable)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--out', required=True, help='Output directory')
+        parser.add_argument('--prefix', default='training', help='Shard file prefix')
+        parser.add_argument('--shard-mb', type=int, default=256, help='Uncompressed MB per shard')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows per database page')
+        parser.add_argument('--rated', action='store_true', help='Export rated items (>= --min-rating) instead of verified ones')
+        parser.add_argument('--min-rating', type=float, default=4.0)
+        parser.add_argument('--restart', action='store_true', help='Delete existing shards and the saved offset, then start over')
+
+    def handle(self, *args, **options):
+        written, shards = export_to_directory(
+            options['out'],
+            prefix=options['prefix'],
+            shard_bytes=options['shard_mb'] * 1024 * 1024,
+            chunk_size=options['chunk_size'],
+            restart=options['restart'],
+            min_rating=options['min_rating'],
+            verified_only=not options['rated'],
+        )
+        for path in shards:
+            self.stdout.write(f'  {path}')
+        self.stdout.write(self.style.SUCCESS(f'Exported {written} rows in {len(shards)} shards'))
@@ -0,0 +1,28 @@
+"""
+Management command to recompute AiUsageRollup from the raw AiUsageLog.
+
+Usage:
+    python manage.py rebuild_ai_usage_rollups            # everything
+    python manage.py rebuild_ai_usage_rollups --days 30  # last 30 days
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ai_core.usage import flush_usage, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute hourly/daily AI usage rollups from AiUsageLog (backfill or repair)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Only rebuild the last N days')
+
+    def handle(self, *args, **options):
+        # Buffered events would otherwise be counted on top of the rebuilt totals
+        flushed = flush_usage()
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+        rows = rebuild_rollups(since)
+        self.stdout.write(self.style.SUCCESS(f'Flushed {flushed} buffered events, wrote {rows} rollup rows'))
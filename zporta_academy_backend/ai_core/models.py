@@ -6,6 +6,7 @@ This module provides:
 2. AiProviderConfig - Central configuration for all AI providers
 3. AiTrainingData - Verified examples for fine-tuning our own model
 4. AiUsageLog - Track costs and performance per request
+5. AiUsageRollup - Hourly/daily usage totals for dashboards
 """
 
 import hashlib
@@ -336,6 +337,19 @@ class AiUsageLog(models.Model):
         db_index=True,
         help_text="Was this served from AiMemory cache?"
     )
+    cache_tier = models.CharField(
+        max_length=20,
+        choices=[
+            ('', 'Provider Call'),
+            ('redis', 'Redis Front Cache'),
+            ('memory', 'AiMemory'),
+            ('coalesced', 'Coalesced In-Flight'),
+        ],
+        default='',
+        blank=True,
+        db_index=True,
+        help_text="Where a cache hit came from (empty for provider calls)"
+    )
     memory_item = models.ForeignKey(
         AiMemory, 
         on_delete=models.SET_NULL, 
@@ -358,7 +372,8 @@ class AiUsageLog(models.Model):
         default='auto'
     )
     
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Set when the request happened, not when the buffered row is flushed
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     
     class Meta:
         verbose_name = "AI Usage Log"
@@ -376,6 +391,46 @@ class AiUsageLog(models.Model):
         return f"{cache} | {self.provider}/{self.model} | {self.endpoint} | {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
 
 
+class AiUsageRollup(models.Model):
+    """
+    Hourly and daily AiUsageLog totals per provider/model/request type/cache tier.
+    Maintained by ai_core.usage.flush_usage(); dashboards and get_cost_summary()
+    read these instead of scanning the raw log.
+    """
+    PERIOD_HOUR = 'hour'
+    PERIOD_DAY = 'day'
+    PERIOD_CHOICES = [
+        (PERIOD_HOUR, 'Hour'),
+        (PERIOD_DAY, 'Day'),
+    ]
+    
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateTimeField(db_index=True)
+    provider = models.CharField(max_length=50)
+    model = models.CharField(max_length=100)
+    request_type = models.CharField(max_length=50)
+    cache_hit = models.BooleanField(default=False)
+    cache_tier = models.CharField(max_length=20, blank=True, default='')
+    
+    requests = models.PositiveIntegerField(default=0)
+    failures = models.PositiveIntegerField(default=0)
+    tokens_used = models.BigIntegerField(default=0)
+    cost_estimate = models.DecimalField(max_digits=14, decimal_places=6, default=0)
+    latency_ms_total = models.BigIntegerField(default=0, help_text="Sum of latency_ms; divide by requests for the average")
+    
+    class Meta:
+        verbose_name = "AI Usage Rollup"
+        verbose_name_plural = "AI Usage Rollups"
+        ordering = ['-period_start']
+        unique_together = ('period', 'period_start', 'provider', 'model', 'request_type', 'cache_hit', 'cache_tier')
+        indexes = [
+            models.Index(fields=['period', '-period_start']),
+        ]
+    
+    def __str__(self):
+        return f"{self.period} {self.period_start:%Y-%m-%d %H:%M} | {self.provider}/{self.model} | {self.request_type} | {self.requests}"
+
+
 class AiModelTrainingRun(models.Model):
     """
     Track each training run for our fine-tuned model.
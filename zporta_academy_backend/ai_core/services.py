@@ -4,7 +4,8 @@ AI Core Services - Central Router for All AI Requests
 This module provides:
 1. generate_text() - ONE entry point for all text generation
 2. generate_audio() - ONE entry point for all audio/TTS
-3. Smart caching before external API calls
+3. Smart caching before external API calls (Redis front cache + AiMemory,
+   with identical in-flight requests coalesced; see ai_core/cache.py)
 4. Auto vs Manual model selection
 5. Cost tracking and optimization
 
@@ -36,7 +37,10 @@ from django.conf import settings
 from django.core.files.base import ContentFile
 from django.utils import timezone
 
-from .models import AiMemory, AiProviderConfig, AiUsageLog
+from . import cache as ai_cache
+from .cache import InFlight
+from .models import AiMemory, AiProviderConfig
+from .usage import record_usage, usage_breakdown, usage_totals
 
 logger = logging.getLogger(__name__)
 
@@ -75,38 +79,47 @@ def generate_text(
     """
     options = options or {}
     start_time = time.time()
+    prompt_hash = AiMemory.compute_prompt_hash(request_type, prompt, options)
     
-    # Step 1: Check cache (unless force_refresh)
-    if not force_refresh:
-        prompt_hash = AiMemory.compute_prompt_hash(request_type, prompt, options)
-        cached = _check_memory_cache(request_type, prompt_hash)
-        
-        if cached:
-            latency_ms = int((time.time() - start_time) * 1000)
-            _log_usage(
-                request_type=request_type,
-                endpoint=endpoint,
-                user=user,
-                provider=cached['provider'],
-                model=cached['model'],
-                tokens_used=cached['tokens_used'],
-                cost_estimate=cached['cost_estimate'],
-                latency_ms=latency_ms,
-                cache_hit=True,
-                memory_item=cached['memory_item'],
-                selection_mode=selection_mode
-            )
-            logger.info(f"✅ [AI_CACHE_HIT] {request_type} | {prompt_hash[:12]} | {cached['provider']}/{cached['model']}")
-            return cached['text'], cached['provider']
+    if force_refresh:
+        return _generate_and_store(
+            request_type, prompt, options, prompt_hash, provider, model,
+            selection_mode, user, endpoint, start_time
+        )
     
-    # Step 2: Select AI provider/model
+    # Step 1: Check cache (Redis front cache, then AiMemory)
+    cached, cache_tier = _check_response_cache(request_type, prompt_hash)
+    if cached:
+        _log_cached_usage(request_type, endpoint, user, cached, cache_tier, selection_mode, start_time)
+        logger.info(f"✅ [AI_CACHE_HIT] {request_type} | {prompt_hash[:12]} | {cache_tier} | {cached['provider']}/{cached['model']}")
+        return cached['text'], cached['provider']
+    
+    # Step 2: Coalesce identical in-flight requests into one provider call
+    with InFlight(prompt_hash) as flight:
+        if flight.result is not None:
+            _log_cached_usage(request_type, endpoint, user, flight.result, 'coalesced', selection_mode, start_time)
+            logger.info(f"✅ [AI_COALESCED] {request_type} | {prompt_hash[:12]} | {flight.result['provider']}/{flight.result['model']}")
+            return flight.result['text'], flight.result['provider']
+        
+        return _generate_and_store(
+            request_type, prompt, options, prompt_hash, provider, model,
+            selection_mode, user, endpoint, start_time, flight=flight
+        )
+
+
+def _generate_and_store(
+    request_type, prompt, options, prompt_hash, provider, model,
+    selection_mode, user, endpoint, start_time, flight=None
+) -> Tuple[str, str]:
+    """Select a model, call the provider, then cache, publish and log the result."""
+    # Select AI provider/model
     if selection_mode == 'auto' or not (provider and model):
         provider, model = _auto_select_model(request_type, options)
         logger.info(f"🤖 [AI_AUTO_SELECT] {request_type} → {provider}/{model}")
     else:
         logger.info(f"👤 [AI_MANUAL_SELECT] {request_type} → {provider}/{model}")
     
-    # Step 3: Call external AI
+    # Call external AI
     try:
         generated_text, tokens_used, cost_estimate = _call_text_provider(
             provider=provider,
@@ -117,8 +130,7 @@ def generate_text(
         
         latency_ms = int((time.time() - start_time) * 1000)
         
-        # Step 4: Save to memory cache
-        prompt_hash = AiMemory.compute_prompt_hash(request_type, prompt, options)
+        # Save to memory cache
         memory_item = _save_to_memory(
             request_type=request_type,
             prompt_hash=prompt_hash,
@@ -132,7 +144,15 @@ def generate_text(
             latency_ms=latency_ms
         )
         
-        # Step 5: Log usage
+        response = _cache_entry(memory_item)
+        if _is_reusable(memory_item):
+            ai_cache.set_response(prompt_hash, response)
+        else:
+            ai_cache.invalidate_response(prompt_hash)
+        if flight is not None:
+            flight.publish(response)
+        
+        # Log usage
         _log_usage(
             request_type=request_type,
             endpoint=endpoint,
@@ -297,24 +317,53 @@ def generate_audio(
 # INTERNAL HELPER FUNCTIONS
 # ============================================
 
+def _is_reusable(memory: AiMemory) -> bool:
+    """Verified or well-rated items are always served; unrated ones only if AI_CACHE_REUSE_UNRATED."""
+    if memory.is_verified_good:
+        return True
+    if memory.user_rating is None:
+        return getattr(settings, 'AI_CACHE_REUSE_UNRATED', False)
+    return memory.user_rating >= getattr(settings, 'AI_CACHE_MIN_RATING', 4.0)
+
+
+def _cache_entry(memory: AiMemory) -> Dict:
+    """What the Redis front cache and coalesced waiters get for an AiMemory item."""
+    return {
+        'text': memory.generated_text,
+        'provider': memory.provider,
+        'model': memory.model,
+        'tokens_used': memory.tokens_used,
+        'cost_estimate': memory.cost_estimate,
+        'memory_id': memory.pk,
+    }
+
+
+def _check_response_cache(request_type: str, prompt_hash: str) -> Tuple[Optional[Dict], str]:
+    """Return (cached response, tier) with tier 'redis' or 'memory', or (None, '')."""
+    cached = ai_cache.get_response(prompt_hash)
+    if cached:
+        # usage_count / last_used_at follow from the buffered usage event
+        # (ai_core.usage.write_events), not a row update per hit
+        return cached, 'redis'
+    
+    cached = _check_memory_cache(request_type, prompt_hash)
+    if cached:
+        ai_cache.set_response(prompt_hash, cached)
+        return cached, 'memory'
+    return None, ''
+
+
 def _check_memory_cache(request_type: str, prompt_hash: str) -> Optional[Dict]:
     """Check if we have cached response in AiMemory"""
     try:
         memory = AiMemory.objects.filter(
             request_type=request_type,
             prompt_hash=prompt_hash
-        ).order_by('-user_rating', '-created_at').first()
+        ).first()
         
-        if memory and (memory.is_verified_good or (memory.user_rating or 0) >= 4.0):
+        if memory and _is_reusable(memory):
             memory.mark_as_used()
-            return {
-                'text': memory.generated_text,
-                'provider': memory.provider,
-                'model': memory.model,
-                'tokens_used': memory.tokens_used,
-                'cost_estimate': memory.cost_estimate,
-                'memory_item': memory
-            }
+            return _cache_entry(memory)
     except Exception as e:
         logger.warning(f"Cache check failed: {e}")
     return None
@@ -537,6 +586,23 @@ def _save_audio_to_memory(
     return memory
 
 
+def _log_cached_usage(request_type, endpoint, user, cached, cache_tier, selection_mode, start_time):
+    _log_usage(
+        request_type=request_type,
+        endpoint=endpoint,
+        user=user,
+        provider=cached['provider'],
+        model=cached['model'],
+        tokens_used=cached['tokens_used'],
+        cost_estimate=cached['cost_estimate'],
+        latency_ms=int((time.time() - start_time) * 1000),
+        cache_hit=True,
+        cache_tier=cache_tier,
+        memory_item_id=cached['memory_id'],
+        selection_mode=selection_mode
+    )
+
+
 def _log_usage(
     request_type: str,
     endpoint: str,
@@ -550,21 +616,28 @@ def _log_usage(
     memory_item=None,
     selection_mode: str = 'auto',
     success: bool = True,
-    error_message: str = ''
+    error_message: str = '',
+    memory_item_id=None,
+    cache_tier: str = ''
 ):
-    """Log AI usage to AiUsageLog"""
+    """Queue an AiUsageLog row (written in bulk by ai_core.usage.flush_usage)"""
+    if memory_item is not None:
+        memory_item_id = memory_item.pk
+    if cache_hit and not cache_tier:
+        cache_tier = 'memory'
     try:
-        AiUsageLog.objects.create(
+        record_usage(
             request_type=request_type,
             endpoint=endpoint,
-            user=user,
+            user_id=getattr(user, 'pk', None),
             provider=provider,
             model=model,
             tokens_used=tokens_used,
             cost_estimate=cost_estimate,
             latency_ms=latency_ms,
             cache_hit=cache_hit,
-            memory_item=memory_item,
+            cache_tier=cache_tier,
+            memory_item_id=memory_item_id,
             selection_mode=selection_mode,
             success=success,
             error_message=error_message
@@ -578,53 +651,32 @@ def _log_usage(
 # ============================================
 
 def get_cost_summary(days=30):
-    """Get AI cost summary for last N days"""
+    """Get AI cost summary for last N days (from AiUsageRollup, see ai_core/usage.py)"""
     from datetime import timedelta
-    from django.db.models import Sum, Count, Avg
-    
-    cutoff = timezone.now() - timedelta(days=days)
     
-    logs = AiUsageLog.objects.filter(timestamp__gte=cutoff)
-    
-    summary = logs.aggregate(
-        total_requests=Count('id'),
-        total_cost=Sum('cost_estimate'),
-        total_tokens=Sum('tokens_used'),
-        cache_hits=Count('id', filter=models.Q(cache_hit=True)),
-        avg_latency=Avg('latency_ms')
-    )
+    since = timezone.now() - timedelta(days=days)
+    summary = usage_totals(since)
     
     # Per-provider breakdown
-    by_provider = logs.values('provider', 'model').annotate(
-        requests=Count('id'),
-        cost=Sum('cost_estimate'),
-        tokens=Sum('tokens_used')
-    ).order_by('-cost')
+    by_provider = usage_breakdown(since, 'provider', 'model').order_by('-cost')
+    
+    # Hits by cache tier ('' = provider call)
+    by_cache_tier = usage_breakdown(since, 'cache_tier').order_by('cache_tier')
     
     return {
         'summary': summary,
         'by_provider': list(by_provider),
+        'by_cache_tier': list(by_cache_tier),
         'cache_hit_rate': (summary['cache_hits'] / summary['total_requests'] * 100) if summary['total_requests'] > 0 else 0
     }
 
 
 def export_training_data(min_rating=4.0, verified_only=True):
-    """Export high-quality data for fine-tuning"""
-    query = AiMemory.objects.filter(use_for_training=True)
+    """
+    Iterate high-quality data for fine-tuning, one dict at a time.
+    For files or downloads use ai_core.export (gzip'd JSONL, sharded, resumable).
+    """
+    from .export import iter_training_rows
     
-    if verified_only:
-        query = query.filter(is_verified_good=True)
-    else:
-        query = query.filter(user_rating__gte=min_rating)
-    
-    data = []
-    for item in query:
-        data.append({
-            'prompt': item.prompt_text,
-            'completion': item.generated_text,
-            'request_type': item.request_type,
-            'tags': item.training_tags,
-            'options': item.prompt_options
-        })
-    
-    return data
+    for _, record in iter_training_rows(min_rating=min_rating, verified_only=verified_only):
+        yield record
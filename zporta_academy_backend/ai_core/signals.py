@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache as ai_cache
+from .models import AiMemory
+
+# Saves that only count a cache hit (AiMemory.mark_as_used) keep the cached response
+USAGE_FIELDS = frozenset({"usage_count", "last_used_at"})
+
+
+@receiver(post_save, sender=AiMemory, dispatch_uid="ai_core_memory_saved")
+def invalidate_saved_memory(sender, instance, update_fields=None, **kwargs):
+    if update_fields and USAGE_FIELDS.issuperset(update_fields):
+        return
+    ai_cache.invalidate_response(instance.prompt_hash)
+
+
+@receiver(post_delete, sender=AiMemory, dispatch_uid="ai_core_memory_deleted")
+def invalidate_deleted_memory(sender, instance, **kwargs):
+    ai_cache.invalidate_response(instance.prompt_hash)
@@ -0,0 +1,12 @@
+from celery import shared_task
+
+
+@shared_task(name="ai_core.flush_usage_logs")
+def flush_usage_logs():
+    """
+    Write buffered AI usage events to AiUsageLog and the hourly/daily
+    rollups (ai_core.usage). Scheduled every minute via CELERY_BEAT_SCHEDULE.
+    """
+    from ai_core.usage import flush_usage
+
+    return {'events_flushed': flush_usage()}
@@ -0,0 +1,148 @@
+"""
+Tests for the ai_core front cache, usage buffer and training-data export.
+
+ai_core is not in INSTALLED_APPS by default; these run when it is.
+"""
+
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+@skipUnless(apps.is_installed('ai_core'), 'ai_core is not installed')
+@override_settings(AI_USAGE_LOG_ASYNC=True, AI_USAGE_BUFFER_MAX=1000)
+class AiCoreCacheTestCase(TestCase):
+    def setUp(self):
+        from ai_core import usage
+        from ai_core.models import AiMemory
+
+        cache.clear()
+        usage._memory_buffer.clear()
+        self.addCleanup(usage._memory_buffer.clear)
+        self.prompt_hash = AiMemory.compute_prompt_hash('quiz_generation', 'Explain ELO', {})
+        self.memory = AiMemory.objects.create(
+            request_type='quiz_generation', prompt_hash=self.prompt_hash, prompt_text='Explain ELO',
+            generated_text='ELO is a rating system.', provider='openai', model='gpt-4o-mini',
+            is_verified_good=True,
+        )
+
+    def _cache(self):
+        from ai_core import cache as ai_cache
+        from ai_core.services import _cache_entry
+
+        ai_cache.set_response(self.prompt_hash, _cache_entry(self.memory))
+
+    def test_front_cache_follows_memory_rows(self):
+        from ai_core import cache as ai_cache
+
+        self._cache()
+        self.memory.mark_as_used()  # usage counters keep the entry
+        self.assertIsNotNone(ai_cache.get_response(self.prompt_hash))
+
+        self.memory.mark_verified(False)
+        self.assertIsNone(ai_cache.get_response(self.prompt_hash))
+
+        self._cache()
+        self.memory.delete()
+        self.assertIsNone(ai_cache.get_response(self.prompt_hash))
+
+    def test_front_cache_hits_are_counted_on_flush(self):
+        from ai_core.services import generate_text
+        from ai_core.usage import flush_usage
+
+        self._cache()
+        with patch('ai_core.services._call_text_provider') as provider, self.assertNumQueries(0):
+            for _ in range(3):
+                self.assertEqual(
+                    generate_text('quiz_generation', 'Explain ELO', {}),
+                    ('ELO is a rating system.', 'openai'),
+                )
+        provider.assert_not_called()
+
+        self.assertEqual(flush_usage(), 3)
+        self.memory.refresh_from_db()
+        self.assertEqual(self.memory.usage_count, 3)
+        self.assertIsNotNone(self.memory.last_used_at)
+
+    @override_settings(AI_CACHE_REUSE_UNRATED=True)
+    def test_usage_buffer_is_flushed_by_the_beat_task(self):
+        from django.utils import timezone
+
+        from ai_core.models import AiUsageLog, AiUsageRollup
+        from ai_core.services import generate_text
+        from ai_core.tasks import flush_usage_logs
+        from ai_core.usage import usage_totals
+
+        with patch('ai_core.services._call_text_provider', return_value=('Fresh text', 120, 0.002)) as provider:
+            for _ in range(2):
+                generate_text(
+                    'quiz_generation', 'Something new', {},
+                    provider='openai', model='gpt-4o-mini', selection_mode='manual',
+                )
+        provider.assert_called_once()
+        self.assertFalse(AiUsageLog.objects.exists())
+
+        self.assertEqual(flush_usage_logs.apply().get(), {'events_flushed': 2})
+        self.assertEqual(
+            sorted(AiUsageLog.objects.values_list('cache_tier', flat=True)), ['', 'redis'],
+        )
+        self.assertEqual(AiUsageRollup.objects.filter(period=AiUsageRollup.PERIOD_HOUR).count(), 2)
+        totals = usage_totals(timezone.now().replace(minute=0, second=0, microsecond=0))
+        self.assertEqual((totals['total_requests'], totals['cache_hits'], totals['total_tokens']), (2, 1, 240))
+
+        self.assertEqual(flush_usage_logs.apply().get(), {'events_flushed': 0})
+
+
+@skipUnless(apps.is_installed('ai_core'), 'ai_core is not installed')
+class AiCoreExportTestCase(TestCase):
+    def setUp(self):
+        from ai_core.models import AiMemory
+
+        for n, rating in enumerate([5, 3, 4.5]):
+            AiMemory.objects.create(
+                request_type='quiz_generation', prompt_hash=f"hash-{n}", prompt_text=f"Prompt {n}",
+                generated_text=f"Answer {n}", provider='openai', model='gpt-4o-mini',
+                user_rating=rating, use_for_training=True,
+            )
+        self.out = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.out)
+
+    def _shards(self):
+        return sorted(name for name in os.listdir(self.out) if name.endswith('.jsonl.gz'))
+
+    def _export(self, *args):
+        call_command('export_training_data', '--out', self.out, '--rated', *args, stdout=io.StringIO())
+
+    def test_restart_replaces_the_previous_shards(self):
+        # 1-byte shards: one row per shard
+        self._export('--shard-mb', '0', '--min-rating', '0')
+        self.assertEqual(len(self._shards()), 3)
+
+        self._export('--restart', '--min-rating', '4.5')
+        self.assertEqual(self._shards(), ['training-00000.jsonl.gz'])
+        with gzip.open(os.path.join(self.out, 'training-00000.jsonl.gz'), 'rt') as f:
+            prompts = [json.loads(line)['prompt'] for line in f]
+        self.assertEqual(prompts, ['Prompt 0', 'Prompt 2'])
+
+    def test_admin_export_ignores_a_bad_min_rating(self):
+        admin_user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin_user)
+        url = reverse('admin:ai_core_aimemory_export_training_data')
+
+        for value, expected in (('4.5', 2), ('abc', 2), ('nan', 2), ('', 2), ('0', 3)):
+            response = self.client.get(url, {'rated': '1', 'min_rating': value})
+            self.assertEqual(response.status_code, 200, value)
+            lines = gzip.decompress(b''.join(response.streaming_content)).splitlines()
+            self.assertEqual(len(lines), expected, value)
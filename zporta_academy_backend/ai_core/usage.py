@@ -0,0 +1,303 @@
+"""
+AI Core Usage - buffered AiUsageLog writes and hourly/daily rollups
+
+generate_text() / generate_audio() no longer insert an AiUsageLog row on the
+request path. record_usage() appends the event to a buffer:
+- a Redis list when the default cache is django-redis (shared by all workers)
+- otherwise a per-process list, flushed inline once AI_USAGE_BUFFER_MAX
+  events are waiting (local development, tests)
+
+flush_usage() (Celery beat, ai_core.flush_usage_logs) drains the buffer in
+batches: one bulk_create for the raw rows, plus one F() update per
+AiUsageRollup bucket (hour and day, per provider/model/request type/cache
+tier). Dashboards and get_cost_summary() read the rollups, so their cost
+does not grow with the log. Redis front-cache hits (cache_tier 'redis') also
+bump their AiMemory item's usage_count / last_used_at there, one F() update
+per item per batch, instead of a row update on every hit.
+
+Rollup buckets are UTC hours/days. Events still in the buffer (at most one
+flush interval) are not in the rollups yet.
+Set AI_USAGE_LOG_ASYNC = False to write each event immediately instead.
+
+`manage.py rebuild_ai_usage_rollups` recomputes rollups from the raw log.
+"""
+
+import json
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from zporta.redis_client import get_redis, take
+
+from .models import AiMemory, AiUsageLog, AiUsageRollup
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = "ai_core:usage_buffer"
+DEFAULT_BUFFER_MAX = 1000
+DEFAULT_FLUSH_BATCH = 5000
+HOURLY_RANGE_DAYS = 7  # longer ranges read daily rollups
+
+ROLLUP_DIMENSIONS = ('provider', 'model', 'request_type', 'cache_hit', 'cache_tier')
+
+_memory_buffer = []
+_memory_lock = threading.Lock()
+
+
+# ============================================
+# BUFFER
+# ============================================
+
+def record_usage(**fields):
+    """Queue one AiUsageLog event (same fields as the model, FKs as *_id)."""
+    event = dict(fields)
+    event['timestamp'] = timezone.now().isoformat()
+    if event.get('cost_estimate') is not None:
+        event['cost_estimate'] = str(event['cost_estimate'])
+
+    if not getattr(settings, 'AI_USAGE_LOG_ASYNC', True):
+        write_events([event])
+        return
+
+    client = get_redis()
+    if client is not None:
+        client.rpush(BUFFER_KEY, json.dumps(event))
+        return
+
+    with _memory_lock:
+        _memory_buffer.append(event)
+        full = len(_memory_buffer) >= getattr(settings, 'AI_USAGE_BUFFER_MAX', DEFAULT_BUFFER_MAX)
+    if full:
+        flush_usage()
+
+
+def _take(limit):
+    client = get_redis()
+    if client is not None:
+        return take(client, BUFFER_KEY, limit)
+    with _memory_lock:
+        events = _memory_buffer[:limit]
+        del _memory_buffer[:limit]
+        return events
+
+
+def _put_back(events):
+    client = get_redis()
+    if client is not None:
+        client.lpush(BUFFER_KEY, *[json.dumps(e) for e in reversed(events)])
+        return
+    with _memory_lock:
+        _memory_buffer[:0] = events
+
+
+def flush_usage(batch_size=None) -> int:
+    """Drain the buffer into AiUsageLog and the rollups. Returns events written."""
+    batch_size = batch_size or getattr(settings, 'AI_USAGE_FLUSH_BATCH', DEFAULT_FLUSH_BATCH)
+    written = 0
+    while True:
+        events = _take(batch_size)
+        if not events:
+            return written
+        try:
+            write_events(events)
+        except Exception:
+            logger.exception(f"AI usage flush failed for {len(events)} events, retrying one by one")
+            written += _write_one_by_one(events)
+            continue
+        written += len(events)
+
+
+def _write_one_by_one(events) -> int:
+    """Drop events that cannot be written; if none can (database down), keep them all."""
+    failed = []
+    for event in events:
+        try:
+            write_events([event])
+        except Exception:
+            failed.append(event)
+    if len(failed) == len(events):
+        _put_back(events)
+        raise RuntimeError("AI usage flush failed; events returned to the buffer")
+    for event in failed:
+        logger.error(f"Dropping unwritable AI usage event: {event}")
+    return len(events) - len(failed)
+
+
+# ============================================
+# WRITES
+# ============================================
+
+def write_events(events):
+    """Insert raw rows and bump rollups for a batch of events, in one transaction."""
+    rows = [_to_log(event) for event in events]
+
+    # The buffered user / memory item may have been deleted before the flush
+    memory_ids = {row.memory_item_id for row in rows if row.memory_item_id}
+    user_ids = {row.user_id for row in rows if row.user_id}
+    if memory_ids:
+        memory_ids = set(AiMemory.objects.filter(pk__in=memory_ids).values_list('pk', flat=True))
+    if user_ids:
+        user_ids = set(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+    for row in rows:
+        if row.memory_item_id not in memory_ids:
+            row.memory_item_id = None
+        if row.user_id not in user_ids:
+            row.user_id = None
+
+    with transaction.atomic():
+        AiUsageLog.objects.bulk_create(rows, batch_size=1000)
+        for key, totals in _rollup_deltas(rows).items():
+            _bump(key, totals)
+        for memory_id, (hits, last_used_at) in _memory_hits(rows).items():
+            AiMemory.objects.filter(pk=memory_id).update(
+                usage_count=F('usage_count') + hits, last_used_at=last_used_at
+            )
+
+
+def _to_log(event) -> AiUsageLog:
+    event = dict(event)
+    event['timestamp'] = parse_datetime(event['timestamp'])
+    event['provider'] = event.get('provider') or ''
+    event['model'] = event.get('model') or ''
+    if event.get('cost_estimate') is not None:
+        event['cost_estimate'] = Decimal(event['cost_estimate'])
+    return AiUsageLog(**event)
+
+
+def _period_starts(ts):
+    hour = ts.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return {
+        AiUsageRollup.PERIOD_HOUR: hour,
+        AiUsageRollup.PERIOD_DAY: hour.replace(hour=0),
+    }
+
+
+def _rollup_deltas(rows):
+    deltas = defaultdict(lambda: {
+        'requests': 0, 'failures': 0, 'tokens_used': 0,
+        'cost_estimate': Decimal('0'), 'latency_ms_total': 0,
+    })
+    for row in rows:
+        dims = (row.provider or '', row.model or '', row.request_type or '', bool(row.cache_hit), row.cache_tier or '')
+        for period, start in _period_starts(row.timestamp).items():
+            totals = deltas[(period, start) + dims]
+            totals['requests'] += 1
+            totals['failures'] += 0 if row.success else 1
+            totals['tokens_used'] += row.tokens_used or 0
+            totals['cost_estimate'] += row.cost_estimate or 0
+            totals['latency_ms_total'] += row.latency_ms or 0
+    return deltas
+
+
+def _memory_hits(rows):
+    """{memory item id: (front-cache hits, latest hit)}; AiMemory hits count themselves."""
+    hits = {}
+    for row in rows:
+        if row.cache_tier != 'redis' or not row.memory_item_id:
+            continue
+        count, latest = hits.get(row.memory_item_id, (0, row.timestamp))
+        hits[row.memory_item_id] = (count + 1, max(latest, row.timestamp))
+    return hits
+
+
+def _bump(key, totals):
+    lookup = dict(zip(('period', 'period_start') + ROLLUP_DIMENSIONS, key))
+    updates = {field: F(field) + value for field, value in totals.items()}
+    if AiUsageRollup.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            AiUsageRollup.objects.create(**lookup, **totals)
+    except IntegrityError:
+        AiUsageRollup.objects.filter(**lookup).update(**updates)
+
+
+def rebuild_rollups(since=None) -> int:
+    """
+    Recompute rollups from AiUsageLog (from the start of `since`'s UTC day, or
+    everything). Returns the number of rollup rows written.
+    """
+    rollups = AiUsageRollup.objects.all()
+    logs = AiUsageLog.objects.all()
+    if since is not None:
+        since = _period_starts(since)[AiUsageRollup.PERIOD_DAY]
+        rollups = rollups.filter(period_start__gte=since)
+        logs = logs.filter(timestamp__gte=since)
+
+    rows = []
+    for period, trunc in ((AiUsageRollup.PERIOD_HOUR, TruncHour), (AiUsageRollup.PERIOD_DAY, TruncDay)):
+        grouped = logs.annotate(
+            period_start=trunc('timestamp', tzinfo=dt_timezone.utc)
+        ).values('period_start', *ROLLUP_DIMENSIONS).annotate(
+            requests=Count('id'),
+            failures=Count('id', filter=Q(success=False)),
+            tokens_used=Sum('tokens_used'),
+            cost_estimate=Sum('cost_estimate'),
+            latency_ms_total=Sum('latency_ms'),
+        ).order_by()
+        for group in grouped:
+            rows.append(AiUsageRollup(
+                period=period,
+                period_start=group['period_start'],
+                **{name: group[name] for name in ROLLUP_DIMENSIONS},
+                requests=group['requests'],
+                failures=group['failures'],
+                tokens_used=group['tokens_used'] or 0,
+                cost_estimate=group['cost_estimate'] or 0,
+                latency_ms_total=group['latency_ms_total'] or 0,
+            ))
+
+    with transaction.atomic():
+        rollups.delete()
+        AiUsageRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+# ============================================
+# READS
+# ============================================
+
+def rollups_since(since):
+    """Rollup rows covering `since`..now: hourly for short ranges, daily otherwise."""
+    starts = _period_starts(since)
+    if timezone.now() - since <= timedelta(days=HOURLY_RANGE_DAYS):
+        period = AiUsageRollup.PERIOD_HOUR
+    else:
+        period = AiUsageRollup.PERIOD_DAY
+    return AiUsageRollup.objects.filter(period=period, period_start__gte=starts[period])
+
+
+def usage_totals(since) -> dict:
+    """Totals in the shape the dashboards used to aggregate from AiUsageLog."""
+    totals = rollups_since(since).aggregate(
+        total_requests=Sum('requests'),
+        total_cost=Sum('cost_estimate'),
+        total_tokens=Sum('tokens_used'),
+        cache_hits=Sum('requests', filter=Q(cache_hit=True)),
+        coalesced=Sum('requests', filter=Q(cache_tier='coalesced')),
+        latency_ms_total=Sum('latency_ms_total'),
+    )
+    for name in ('total_requests', 'total_tokens', 'cache_hits', 'coalesced'):
+        totals[name] = totals[name] or 0
+    latency = totals.pop('latency_ms_total') or 0
+    totals['avg_latency'] = latency / totals['total_requests'] if totals['total_requests'] else None
+    return totals
+
+
+def usage_breakdown(since, *fields):
+    """requests / cost / tokens grouped by `fields` (e.g. 'provider', 'model')."""
+    return rollups_since(since).values(*fields).annotate(
+        requests=Sum('requests'),
+        cost=Sum('cost_estimate'),
+        tokens=Sum('tokens_used'),
+    )
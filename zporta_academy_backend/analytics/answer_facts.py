@@ -0,0 +1,86 @@
+# analytics/answer_facts.py
+"""
+QuizAnswerFact helpers.
+
+Answer events keep everything interesting in ActivityEvent.metadata (JSON),
+which MySQL cannot index. Each 'quiz_answer_submitted' event also gets a typed
+QuizAnswerFact row; hot readers query that table instead when
+settings.ANALYTICS_USE_ANSWER_FACTS is enabled (after running
+`manage.py backfill_quiz_answer_facts`).
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+
+from .models import QuizAnswerFact
+
+logger = logging.getLogger(__name__)
+
+ANSWER_EVENT = 'quiz_answer_submitted'
+
+
+def answer_facts_enabled():
+    return getattr(settings, 'ANALYTICS_USE_ANSWER_FACTS', False)
+
+
+def _as_int(value):
+    try:
+        return int(value) if value is not None and value != '' else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1')
+    return bool(value)
+
+
+def build_answer_fact(event_id, user_id, metadata, timestamp, session_id=None,
+                      question_id=None):
+    """
+    Build (unsaved) the QuizAnswerFact for one answer event, or None when the
+    event has no usable quiz_id / is_correct.
+
+    question_id: fallback when the metadata has none (the event's object_id
+    when its content type is Question).
+    """
+    if not user_id or not isinstance(metadata, dict):
+        return None
+    quiz_id = _as_int(metadata.get('quiz_id'))
+    if not quiz_id or metadata.get('is_correct') is None:
+        return None
+    time_spent_ms = _as_int(metadata.get('time_spent_ms'))
+    quality_of_recall = _as_int(metadata.get('quality_of_recall_used'))
+    attempt_index = _as_int(metadata.get('attempt_index'))
+    return QuizAnswerFact(
+        event_id=event_id,
+        user_id=user_id,
+        quiz_id=quiz_id,
+        question_id=_as_int(metadata.get('question_id')) or question_id,
+        session_id=session_id,
+        is_correct=_as_bool(metadata.get('is_correct')),
+        time_spent_ms=time_spent_ms if time_spent_ms is not None and time_spent_ms >= 0 else None,
+        quality_of_recall=quality_of_recall if quality_of_recall is not None and quality_of_recall >= 0 else None,
+        attempt_index=attempt_index if attempt_index is not None and attempt_index >= 0 else None,
+        timestamp=timestamp,
+    )
+
+
+def record_answer_fact(event):
+    """Write the fact row for a freshly created answer event."""
+    if event.event_type != ANSWER_EVENT:
+        return None
+    question_id = None
+    if event.content_type_id:
+        from quizzes.models import Question
+        if event.content_type_id == ContentType.objects.get_for_model(Question).id:
+            question_id = event.object_id
+    fact = build_answer_fact(
+        event.id, event.user_id, event.metadata, event.timestamp,
+        session_id=event.session_id, question_id=question_id,
+    )
+    if fact is not None:
+        fact.save()
+    return fact
@@ -0,0 +1,40 @@
+"""
+Dashboard Views: request profiles sampled by zporta.middleware.SlowRequestLoggingMiddleware.
+Admin-only access.
+"""
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.shortcuts import render
+from django.views.decorators.http import require_http_methods
+
+from zporta.profiling import worst_endpoints
+
+
+def is_staff(user):
+    """Check if user is staff."""
+    return user.is_staff
+
+
+@login_required
+@user_passes_test(is_staff)
+@require_http_methods(["GET"])
+def request_profiles_dashboard(request):
+    """
+    Worst endpoints from the sampled request profile ring buffer: duration,
+    query counts, SQL / serializer time, cache hit rate and the most repeated
+    statement (N+1 suspect) of each endpoint.
+    """
+    try:
+        limit = min(max(int(request.GET.get("limit", 50)), 1), 500)
+    except (TypeError, ValueError):
+        limit = 50
+    endpoints = worst_endpoints(limit=limit)
+    for row in endpoints:
+        lookups = row["cache_hits"] + row["cache_misses"]
+        row["cache_hit_rate"] = round(100 * row["cache_hits"] / lookups) if lookups else None
+
+    context = {
+        "title": "Request Profiles",
+        "endpoints": endpoints,
+        "sample_count": sum(row["samples"] for row in endpoints),
+    }
+    return render(request, "analytics/request_profiles.html", context)
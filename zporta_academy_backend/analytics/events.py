@@ -0,0 +1,137 @@
+# analytics/events.py
+"""
+Post-commit domain event bus.
+
+Producers call publish() inside their transaction. Nothing is delivered until
+it commits (rolled-back savepoints drop their events), so consumers never see
+an ActivityEvent that does not exist.
+
+Delivery:
+- async (settings.EVENT_BUS_ASYNC, default: a Celery broker is configured):
+  on commit the event is appended to a Redis list and a debounced
+  `analytics.drain_domain_events` task is queued; beat drains the list every
+  minute as a safety net
+- sync: on commit, the consumers run in the same thread. Async delivery
+  falls back to this when the cache is not django-redis: a per-process buffer
+  would be invisible to the worker that drains it
+
+Consumers subscribe per event name and receive batches for one user:
+
+    @subscribe(ANSWER_SUBMITTED)
+    def handle(user_id, events):
+        ...
+
+`events` are the published payload dicts, oldest first. Each call runs in
+its own transaction: a consumer that raises is logged, its writes for that
+batch roll back, and the other consumers still run. Consumers must be
+idempotent (the drain is at-least-once when a worker dies mid-batch).
+
+Answer latency does not depend on how many consumers subscribe: the request
+only pays for one RPUSH after commit.
+"""
+import json
+import logging
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from zporta.redis_client import get_redis, take
+
+logger = logging.getLogger(__name__)
+
+ANSWER_SUBMITTED = 'quiz_answer_submitted'
+
+BUFFER_KEY = 'analytics:domain_events'
+KICK_KEY = 'analytics:domain_events_kick'
+DEFAULT_DRAIN_DELAY = 2  # seconds: answers in a burst share one drain
+DEFAULT_DRAIN_BATCH = 1000
+
+_subscribers = defaultdict(list)
+
+
+def _async_enabled():
+    return getattr(
+        settings,
+        'EVENT_BUS_ASYNC',
+        bool(getattr(settings, 'CELERY_BROKER_URL', None)),
+    )
+
+
+def subscribe(name):
+    """Register handler(user_id, events) for events called `name`."""
+    def decorator(handler):
+        key = f"{handler.__module__}.{handler.__qualname__}"
+        if all(f"{h.__module__}.{h.__qualname__}" != key for h in _subscribers[name]):
+            _subscribers[name].append(handler)
+        return handler
+    return decorator
+
+
+def publish(name, user_id, payload):
+    """Queue an event for delivery once the current transaction commits."""
+    if not user_id or not _subscribers.get(name):
+        return
+    event = {'name': name, 'user_id': user_id, 'payload': payload}
+    transaction.on_commit(lambda: _deliver(event))
+
+
+# ── Delivery ─────────────────────────────────────────────────────────────
+def _deliver(event):
+    try:
+        client = get_redis() if _async_enabled() else None
+        if client is None:
+            dispatch([event])
+            return
+        client.rpush(BUFFER_KEY, json.dumps(event))
+        _kick()
+    except Exception as e:
+        logger.error(f"Event bus: could not deliver {event['name']} for user {event['user_id']}: {e}", exc_info=True)
+
+
+def _kick():
+    """One drain task per burst; the task clears the flag before it drains."""
+    delay = getattr(settings, 'EVENT_BUS_DRAIN_DELAY', DEFAULT_DRAIN_DELAY)
+    if not cache.add(KICK_KEY, 1, timeout=delay * 5 + 30):
+        return
+    try:
+        from .tasks import drain_domain_events
+        drain_domain_events.apply_async(countdown=delay)
+    except Exception as e:
+        logger.warning(f"Event bus: could not enqueue drain, leaving it to beat: {e}")
+        cache.delete(KICK_KEY)
+
+
+def drain(batch_size=None):
+    """Dispatch everything buffered. Returns the number of events handled."""
+    cache.delete(KICK_KEY)
+    client = get_redis()
+    if client is None:
+        return 0
+    batch_size = batch_size or getattr(settings, 'EVENT_BUS_DRAIN_BATCH', DEFAULT_DRAIN_BATCH)
+    handled = 0
+    while True:
+        events = take(client, BUFFER_KEY, batch_size)
+        if not events:
+            return handled
+        dispatch(events)
+        handled += len(events)
+
+
+def dispatch(events):
+    """Run every subscriber once per (event name, user) group, in publish order."""
+    groups = OrderedDict()
+    for event in events:
+        groups.setdefault((event['name'], event['user_id']), []).append(event['payload'])
+    for (name, user_id), payloads in groups.items():
+        for handler in _subscribers.get(name, ()):
+            try:
+                with transaction.atomic():
+                    handler(user_id, payloads)
+            except Exception as e:
+                logger.error(
+                    f"Event bus: {handler.__module__}.{handler.__name__} failed for user {user_id} "
+                    f"({len(payloads)} {name} events): {e}",
+                    exc_info=True,
+                )
@@ -0,0 +1,76 @@
+"""
+Management command to backfill QuizAnswerFact rows for existing answer events.
+
+New 'quiz_answer_submitted' events get their fact row in log_event(); this
+command fills in the history so readers can switch to the fact table.
+
+Usage:
+    python manage.py backfill_quiz_answer_facts
+    python manage.py backfill_quiz_answer_facts --batch-size 5000
+
+Safe to re-run: events that already have a fact are skipped. Once it has
+completed, enable settings.ANALYTICS_USE_ANSWER_FACTS.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+
+from analytics.answer_facts import ANSWER_EVENT, build_answer_fact
+from analytics.models import ActivityEvent, QuizAnswerFact
+from quizzes.models import Question
+
+
+class Command(BaseCommand):
+    help = 'Backfill QuizAnswerFact rows from quiz_answer_submitted events'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Events read and facts written per batch (default: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        question_ct_id = ContentType.objects.get_for_model(Question).id
+
+        events = ActivityEvent.objects.filter(
+            event_type=ANSWER_EVENT, answer_fact__isnull=True
+        ).order_by('id')
+
+        # bulk_create(ignore_conflicts=True) does not say which rows it skipped
+        # (a fact written concurrently by log_event), so count the table instead
+        facts_before = QuizAnswerFact.objects.count()
+        last_id = 0
+        scanned = attempted = skipped = 0
+        while True:
+            rows = list(
+                events.filter(id__gt=last_id).values_list(
+                    'id', 'user_id', 'metadata', 'timestamp', 'session_id', 'content_type_id', 'object_id'
+                )[:batch_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            scanned += len(rows)
+
+            facts = []
+            for event_id, user_id, metadata, timestamp, session_id, ct_id, object_id in rows:
+                fact = build_answer_fact(
+                    event_id, user_id, metadata, timestamp, session_id=session_id,
+                    question_id=object_id if ct_id == question_ct_id else None,
+                )
+                if fact is None:
+                    skipped += 1
+                else:
+                    facts.append(fact)
+            QuizAnswerFact.objects.bulk_create(facts, batch_size=batch_size, ignore_conflicts=True)
+            attempted += len(facts)
+            self.stdout.write(f'  Scanned {scanned} events...')
+
+        created = QuizAnswerFact.objects.count() - facts_before
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfill complete: {created} facts written ({attempted} attempted), {skipped} events skipped '
+            f'(no user, quiz_id or is_correct) out of {scanned} scanned.'
+        ))
+        self.stdout.write('Set ANALYTICS_USE_ANSWER_FACTS = True to read from the fact table.')
@@ -0,0 +1,33 @@
+"""
+Management command to recompute the quiz stats rollups from ActivityEvent.
+
+The rollups (QuizStatsRollup / QuestionStatsRollup) are incremented as answers
+come in; run this once after deploying them to load the history, and again
+whenever they need repairing (e.g. after deleting events).
+
+Usage:
+    python manage.py rebuild_quiz_stats
+    python manage.py rebuild_quiz_stats --quiz-id 12 --quiz-id 15
+"""
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import rebuild_quiz_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-quiz and per-question answer stats from activity events'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--quiz-id',
+            type=int,
+            action='append',
+            dest='quiz_ids',
+            help='Only rebuild this quiz (repeatable; default: all quizzes)',
+        )
+
+    def handle(self, *args, **options):
+        quizzes, questions = rebuild_quiz_rollups(quiz_ids=options['quiz_ids'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt stats for {quizzes} quizzes and {questions} questions.'
+        ))
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0010_activityevent_session_id_quizsessionprogress'),
+        ('quizzes', '0007_question_avg_time_spent_ms_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizAnswerFact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.UUIDField(blank=True, null=True)),
+                ('is_correct', models.BooleanField()),
+                ('time_spent_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('quality_of_recall', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('attempt_index', models.PositiveIntegerField(blank=True, null=True)),
+                ('timestamp', models.DateTimeField(db_index=True)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='answer_fact', to='analytics.activityevent')),
+                ('question', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='quizzes.question')),
+                ('quiz', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='quizzes.quiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_answer_facts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Quiz Answer Fact',
+                'verbose_name_plural': 'Quiz Answer Facts',
+                'indexes': [models.Index(fields=['user', 'quiz', 'timestamp'], name='analytics_q_user_id_935371_idx'), models.Index(fields=['user', 'question'], name='analytics_q_user_id_ec151c_idx'), models.Index(fields=['user', 'is_correct', 'timestamp'], name='analytics_q_user_id_da3673_idx'), models.Index(fields=['quiz', 'question'], name='analytics_q_quiz_id_7c1db7_idx')],
+            },
+        ),
+    ]
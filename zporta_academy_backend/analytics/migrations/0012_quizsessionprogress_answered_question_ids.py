@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0011_quizanswerfact'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizsessionprogress',
+            name='answered_question_ids',
+            field=models.JSONField(blank=True, default=list, help_text='Distinct question ids answered in this session'),
+        ),
+        migrations.AlterField(
+            model_name='quizsessionprogress',
+            name='answered_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of distinct questions answered so far'),
+        ),
+        migrations.AlterField(
+            model_name='quizsessionprogress',
+            name='correct_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of questions answered correctly (first answer in the session)'),
+        ),
+    ]
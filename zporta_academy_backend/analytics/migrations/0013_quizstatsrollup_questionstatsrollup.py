@@ -0,0 +1,47 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0012_quizsessionprogress_answered_question_ids'),
+        ('quizzes', '0007_question_avg_time_spent_ms_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizStatsRollup',
+            fields=[
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats_rollup', serialize=False, to='quizzes.quiz')),
+                ('answers', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('wrong', models.PositiveIntegerField(default=0)),
+                ('distinct_users', models.PositiveIntegerField(default=0)),
+                ('finishers', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Quiz Stats Rollup',
+                'verbose_name_plural': 'Quiz Stats Rollups',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionStatsRollup',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats_rollup', serialize=False, to='quizzes.question')),
+                ('answers', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('wrong', models.PositiveIntegerField(default=0)),
+                ('distinct_users', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_stats_rollups', to='quizzes.quiz')),
+            ],
+            options={
+                'verbose_name': 'Question Stats Rollup',
+                'verbose_name_plural': 'Question Stats Rollups',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-17 04:10
+
+from django.db import migrations, models
+
+
+def close_duplicate_open_sessions(apps, schema_editor):
+    """Keep the latest open session per (user, quiz); older ones were abandoned."""
+    QuizSessionProgress = apps.get_model('analytics', 'QuizSessionProgress')
+    seen = set()
+    stale = []
+    open_sessions = QuizSessionProgress.objects.filter(status='in_progress').order_by(
+        'user_id', 'quiz_id', '-started_at', '-id'
+    ).values_list('id', 'user_id', 'quiz_id')
+    for pk, user_id, quiz_id in open_sessions.iterator():
+        if (user_id, quiz_id) in seen:
+            stale.append(pk)
+        else:
+            seen.add((user_id, quiz_id))
+    for i in range(0, len(stale), 1000):
+        QuizSessionProgress.objects.filter(pk__in=stale[i:i + 1000]).update(status='completed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0013_quizstatsrollup_questionstatsrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_sessions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='quizsessionprogress',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'in_progress')), fields=('user', 'quiz'), name='unique_open_quiz_session'),
+        ),
+    ]
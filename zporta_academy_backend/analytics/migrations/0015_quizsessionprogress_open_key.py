@@ -0,0 +1,53 @@
+# Generated by Django 5.1.6 on 2026-10-17 12:20
+
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Cast, Concat
+
+
+def close_duplicate_open_sessions(apps, schema_editor):
+    """
+    Keep the latest open session per (user, quiz). MySQL skipped the partial
+    constraint of 0014, so duplicates may have been created since.
+    """
+    QuizSessionProgress = apps.get_model('analytics', 'QuizSessionProgress')
+    seen = set()
+    stale = []
+    open_sessions = QuizSessionProgress.objects.filter(status='in_progress').order_by(
+        'user_id', 'quiz_id', '-started_at', '-id'
+    ).values_list('id', 'user_id', 'quiz_id')
+    for pk, user_id, quiz_id in open_sessions.iterator():
+        if (user_id, quiz_id) in seen:
+            stale.append(pk)
+        else:
+            seen.add((user_id, quiz_id))
+    for i in range(0, len(stale), 1000):
+        QuizSessionProgress.objects.filter(pk__in=stale[i:i + 1000]).update(status='completed')
+
+
+def fill_open_keys(apps, schema_editor):
+    QuizSessionProgress = apps.get_model('analytics', 'QuizSessionProgress')
+    QuizSessionProgress.objects.filter(status='in_progress').update(
+        open_key=Concat(Cast('user_id', models.CharField()), Value(':'), Cast('quiz_id', models.CharField()))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0014_quizsessionprogress_unique_open_quiz_session'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='quizsessionprogress',
+            name='unique_open_quiz_session',
+        ),
+        migrations.RunPython(close_duplicate_open_sessions, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='quizsessionprogress',
+            name='open_key',
+            field=models.CharField(blank=True, editable=False, help_text='user_id:quiz_id while the session is in progress', max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(fill_open_keys, migrations.RunPython.noop),
+    ]
@@ -8,7 +8,8 @@ from django.contrib.contenttypes.fields import GenericForeignKey
 from django.conf import settings
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-import math
+
+from .sm2 import retention_estimate
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -68,7 +69,9 @@ class ActivityEvent(models.Model):
     
     def save(self, *args, **kwargs):
         """Override save to always validate metadata before saving."""
-        self.full_clean()  # This calls clean() and validates all fields
+        # Validates all fields and calls clean(); foreign keys are left to the
+        # database constraints (checking them here costs a query each per event).
+        self.full_clean(exclude=['user', 'content_type'])
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -151,13 +154,13 @@ class MemoryStat(models.Model):
                     ])
             return False 
 
-        capped_interval_contribution = min(self.interval_days, max_stability_contribution_from_interval)
-        ef_multiplier = self.easiness_factor / 2.5 if self.easiness_factor else 1.0
-        stability_s = max(min_stability, capped_interval_contribution * ef_multiplier * stability_factor_base_multiplier)
-        
-        if stability_s <= 0: stability_s = min_stability
-            
-        new_retention_estimate = round(math.exp(-time_since_review_days / stability_s), 4)
+        # Same forgetting curve as the nightly bulk task (analytics.sm2)
+        new_retention_estimate = float(retention_estimate(
+            time_since_review_days, self.interval_days, self.easiness_factor or 0.0,
+            stability_factor_base_multiplier=stability_factor_base_multiplier,
+            min_stability=min_stability,
+            max_stability_contribution_from_interval=max_stability_contribution_from_interval,
+        ))
 
         if self.current_retention_estimate != new_retention_estimate: 
             self.current_retention_estimate = new_retention_estimate
@@ -211,11 +214,16 @@ class QuizSessionProgress(models.Model):
                       )
     answered_count  = models.PositiveIntegerField(
                          default=0,
-                         help_text="Number of questions answered so far"
+                         help_text="Number of distinct questions answered so far"
                       )
     correct_count   = models.PositiveIntegerField(
                          default=0,
-                         help_text="Number of correct answers so far"
+                         help_text="Number of questions answered correctly (first answer in the session)"
+                      )
+    answered_question_ids = models.JSONField(
+                         default=list,
+                         blank=True,
+                         help_text="Distinct question ids answered in this session"
                       )
     status          = models.CharField(
                          max_length=20,
@@ -228,6 +236,17 @@ class QuizSessionProgress(models.Model):
                          blank=True,
                          help_text="When answered_count == total_questions"
                       )
+    # One open session per learner and quiz (concurrent first answers share
+    # it). A plain unique key rather than a partial one, which MySQL lacks:
+    # "user_id:quiz_id" while in progress, NULL (not unique) once closed.
+    open_key        = models.CharField(
+                         max_length=64,
+                         null=True,
+                         blank=True,
+                         unique=True,
+                         editable=False,
+                         help_text="user_id:quiz_id while the session is in progress"
+                      )
 
     class Meta:
         verbose_name = "Quiz Session Progress"
@@ -238,5 +257,124 @@ class QuizSessionProgress(models.Model):
             models.Index(fields=['user', 'quiz', 'status']),
         ]
 
+    @staticmethod
+    def open_key_for(user_id, quiz_id):
+        return f"{user_id}:{quiz_id}"
+
+    def save(self, *args, **kwargs):
+        self.open_key = self.open_key_for(self.user_id, self.quiz_id) if self.status == self.IN_PROGRESS else None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'status' in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'open_key']
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"Session {self.session_id} ({self.status}) for {self.user.username}"
+
+class QuizAnswerFact(models.Model):
+    """
+    One typed, indexed row per 'quiz_answer_submitted' ActivityEvent.
+
+    Written by log_event() next to the event; backfilled for older events by
+    `manage.py backfill_quiz_answer_facts`. Readers switch over from JSON
+    `metadata__*` filters when settings.ANALYTICS_USE_ANSWER_FACTS is True.
+    Quiz/question keep their ids (no FK constraint) when the content is deleted.
+    """
+    event          = models.OneToOneField(
+                        ActivityEvent,
+                        on_delete=models.CASCADE,
+                        related_name='answer_fact'
+                     )
+    user           = models.ForeignKey(
+                        settings.AUTH_USER_MODEL,
+                        on_delete=models.CASCADE,
+                        related_name='quiz_answer_facts'
+                     )
+    quiz           = models.ForeignKey(
+                        'quizzes.Quiz',
+                        on_delete=models.DO_NOTHING,
+                        db_constraint=False,
+                        related_name='+'
+                     )
+    question       = models.ForeignKey(
+                        'quizzes.Question',
+                        on_delete=models.DO_NOTHING,
+                        db_constraint=False,
+                        null=True,
+                        blank=True,
+                        related_name='+'
+                     )
+    session_id     = models.UUIDField(null=True, blank=True)
+    is_correct     = models.BooleanField()
+    time_spent_ms  = models.PositiveIntegerField(null=True, blank=True)
+    quality_of_recall = models.PositiveSmallIntegerField(null=True, blank=True)
+    attempt_index  = models.PositiveIntegerField(null=True, blank=True)
+    timestamp      = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Quiz Answer Fact"
+        verbose_name_plural = "Quiz Answer Facts"
+        indexes = [
+            models.Index(fields=['user', 'quiz', 'timestamp']),
+            models.Index(fields=['user', 'question']),
+            models.Index(fields=['user', 'is_correct', 'timestamp']),
+            models.Index(fields=['quiz', 'question']),
+        ]
+
+    def __str__(self):
+        return f"Answer by user {self.user_id} on quiz {self.quiz_id} / question {self.question_id} ({'correct' if self.is_correct else 'wrong'})"
+
+
+class QuizStatsRollup(models.Model):
+    """
+    Pre-aggregated public stats for one quiz (QuizDetailedAnalyticsView).
+
+    Incremented on every answer / first completion (analytics.rollups) and
+    rebuilt from ActivityEvent by `manage.py rebuild_quiz_stats`.
+    """
+    quiz           = models.OneToOneField(
+                        'quizzes.Quiz',
+                        on_delete=models.CASCADE,
+                        primary_key=True,
+                        related_name='stats_rollup'
+                     )
+    answers        = models.PositiveIntegerField(default=0)
+    correct        = models.PositiveIntegerField(default=0)
+    wrong          = models.PositiveIntegerField(default=0)
+    distinct_users = models.PositiveIntegerField(default=0)
+    finishers      = models.PositiveIntegerField(default=0)
+    updated_at     = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Quiz Stats Rollup"
+        verbose_name_plural = "Quiz Stats Rollups"
+
+    def __str__(self):
+        return f"Stats for quiz {self.quiz_id}: {self.answers} answers, {self.distinct_users} users"
+
+
+class QuestionStatsRollup(models.Model):
+    """Pre-aggregated public stats for one question; see QuizStatsRollup."""
+    question       = models.OneToOneField(
+                        'quizzes.Question',
+                        on_delete=models.CASCADE,
+                        primary_key=True,
+                        related_name='stats_rollup'
+                     )
+    quiz           = models.ForeignKey(
+                        'quizzes.Quiz',
+                        on_delete=models.CASCADE,
+                        related_name='question_stats_rollups'
+                     )
+    answers        = models.PositiveIntegerField(default=0)
+    correct        = models.PositiveIntegerField(default=0)
+    wrong          = models.PositiveIntegerField(default=0)
+    distinct_users = models.PositiveIntegerField(default=0)
+    updated_at     = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Question Stats Rollup"
+        verbose_name_plural = "Question Stats Rollups"
+
     def __str__(self):
-        return f"Session {self.session_id} ({self.status}) for {self.user.username}"
\ No newline at end of file
+        return f"Stats for question {self.question_id}: {self.answers} answers"
@@ -0,0 +1,186 @@
+# analytics/rollups.py
+"""
+Per-quiz and per-question answer counters behind the public quiz stats
+endpoint (QuizDetailedAnalyticsView).
+
+Counters are bumped with F() updates as answers come in (RecordQuizAnswerView)
+and when a user completes a quiz for the first time (log_event). Anything the
+increments can miss (history, deleted events, races on first rows) is fixed
+by `manage.py rebuild_quiz_stats`, which recomputes them from ActivityEvent.
+
+The endpoint reads one rollup row per quiz plus its question rows, and caches
+the rendered stats for QUIZ_STATS_CACHE_TIMEOUT seconds.
+"""
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import ActivityEvent, QuestionStatsRollup, QuizStatsRollup
+
+QUIZ_STATS_CACHE_TIMEOUT = 60  # seconds; counters move on every answer
+
+
+def _stats_key(quiz_id):
+    return f"quiz_stats_{quiz_id}"
+
+
+def _bump(model, lookup, create_defaults, **increments):
+    """Atomically add `increments` to the row matching `lookup`, creating it if needed."""
+    updates = {field: F(field) + value for field, value in increments.items() if value}
+    if not updates:
+        return
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **create_defaults, **increments)
+    except IntegrityError:
+        # Created concurrently; the row exists now
+        model.objects.filter(**lookup).update(**updates)
+
+
+def record_answer_stats(quiz_id, question_id, is_correct, new_quiz_user=False, new_question_user=False):
+    """Count one submitted answer on the quiz and question rollups."""
+    correct, wrong = (1, 0) if is_correct else (0, 1)
+    _bump(QuizStatsRollup, {'quiz_id': quiz_id}, {},
+          answers=1, correct=correct, wrong=wrong, distinct_users=int(new_quiz_user))
+    _bump(QuestionStatsRollup, {'question_id': question_id}, {'quiz_id': quiz_id},
+          answers=1, correct=correct, wrong=wrong, distinct_users=int(new_question_user))
+
+
+def record_finisher(quiz_id):
+    """Count a user's first completion of a quiz."""
+    _bump(QuizStatsRollup, {'quiz_id': quiz_id}, {}, finishers=1)
+
+
+def _percentage(part, total):
+    return round((part / total * 100) if total > 0 else 0, 2)
+
+
+def get_quiz_stats(quiz):
+    """Public stats payload for a quiz (DetailedQuizAnalyticsSerializer shape), cached briefly."""
+    key = _stats_key(quiz.id)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    rollup = QuizStatsRollup.objects.filter(quiz_id=quiz.id).first() or QuizStatsRollup(quiz_id=quiz.id)
+    question_rollups = {
+        r.question_id: r for r in QuestionStatsRollup.objects.filter(quiz_id=quiz.id)
+    }
+
+    questions_stats = []
+    for q_id, text in quiz.questions.order_by('id').values_list('id', 'question_text'):
+        q = question_rollups.get(q_id) or QuestionStatsRollup(question_id=q_id)
+        text = str(text)
+        questions_stats.append({
+            'question_id': q_id,
+            'question_text': text[:100] + ('...' if len(text) > 100 else ''),
+            'times_answered': q.answers,
+            'distinct_users_answered': q.distinct_users,
+            'times_correct': q.correct,
+            'times_wrong': q.wrong,
+            'percentage_correct': _percentage(q.correct, q.answers),
+            'percentage_wrong': _percentage(q.wrong, q.answers),
+        })
+
+    data = {
+        'quiz_id': quiz.id,
+        'quiz_title': quiz.title,
+        'unique_participants': rollup.distinct_users,
+        'unique_finishers': rollup.finishers,
+        'total_answers_submitted_for_quiz': rollup.answers,
+        'total_correct_answers_for_quiz': rollup.correct,
+        'total_wrong_answers_for_quiz': rollup.wrong,
+        'overall_correctness_percentage': _percentage(rollup.correct, rollup.answers),
+        'overall_wrongness_percentage': _percentage(rollup.wrong, rollup.answers),
+        'questions_stats': questions_stats,
+    }
+    cache.set(key, data, QUIZ_STATS_CACHE_TIMEOUT)
+    return data
+
+
+def rebuild_quiz_rollups(quiz_ids=None, chunk_size=5000):
+    """
+    Recompute rollups from ActivityEvent, with the same definitions the stats
+    endpoint used to query live:
+
+    * a quiz counts answer events tagged with its quiz_id OR answering one of its questions,
+    * a question counts answer events whose object is the question,
+    * finishers are distinct users with a 'quiz_completed' event on the quiz.
+
+    quiz_ids: restrict to these quizzes (default: all). Returns (quizzes, questions) written.
+    """
+    from quizzes.models import Quiz, Question
+
+    quizzes = Quiz.objects.all()
+    if quiz_ids is not None:
+        quizzes = quizzes.filter(id__in=quiz_ids)
+    quiz_set = set(quizzes.values_list('id', flat=True))
+    question_quiz = dict(Question.objects.filter(quiz_id__in=quiz_set).values_list('id', 'quiz_id'))
+
+    question_ct = ContentType.objects.get_for_model(Question)
+    events = ActivityEvent.objects.filter(content_type=question_ct, event_type='quiz_answer_submitted')
+    if quiz_ids is not None:
+        events = events.filter(object_id__in=list(question_quiz)) | events.filter(metadata__quiz_id__in=list(quiz_set))
+
+    def counters():
+        return {'answers': 0, 'correct': 0, 'wrong': 0, 'users': set()}
+
+    quiz_counts = defaultdict(counters)
+    question_counts = defaultdict(counters)
+    rows = events.values_list('user_id', 'object_id', 'metadata__quiz_id', 'metadata__is_correct')
+    for user_id, object_id, meta_quiz_id, is_correct in rows.iterator(chunk_size=chunk_size):
+        targets = []
+        if object_id in question_quiz:
+            targets.append(question_counts[object_id])
+        owners = {question_quiz.get(object_id)}
+        try:
+            owners.add(int(meta_quiz_id))
+        except (TypeError, ValueError):
+            pass
+        targets.extend(quiz_counts[q] for q in owners if q in quiz_set)
+        for c in targets:
+            c['answers'] += 1
+            c['correct'] += is_correct is True
+            c['wrong'] += is_correct is False
+            c['users'].add(user_id)
+
+    completions = ActivityEvent.objects.filter(
+        content_type=ContentType.objects.get_for_model(Quiz), event_type='quiz_completed',
+    )
+    if quiz_ids is not None:
+        completions = completions.filter(object_id__in=quiz_set)
+    finishers = dict(
+        completions.values('object_id').annotate(n=Count('user', distinct=True)).values_list('object_id', 'n')
+    )
+
+    def fields(c):
+        return {'answers': c['answers'], 'correct': c['correct'], 'wrong': c['wrong'],
+                'distinct_users': len(c['users'])}
+
+    quiz_rows = [
+        QuizStatsRollup(quiz_id=quiz_id, finishers=finishers.get(quiz_id, 0),
+                        **fields(quiz_counts.get(quiz_id) or counters()))
+        for quiz_id in quiz_set
+    ]
+    question_rows = [
+        QuestionStatsRollup(question_id=question_id, quiz_id=quiz_id,
+                            **fields(question_counts.get(question_id) or counters()))
+        for question_id, quiz_id in question_quiz.items()
+    ]
+
+    quiz_rollups, question_rollups = QuizStatsRollup.objects.all(), QuestionStatsRollup.objects.all()
+    if quiz_ids is not None:
+        quiz_rollups = quiz_rollups.filter(quiz_id__in=quiz_set)
+        question_rollups = question_rollups.filter(quiz_id__in=quiz_set)
+    with transaction.atomic():
+        quiz_rollups.delete()
+        question_rollups.delete()
+        QuizStatsRollup.objects.bulk_create(quiz_rows, batch_size=1000)
+        QuestionStatsRollup.objects.bulk_create(question_rows, batch_size=1000)
+    cache.delete_many([_stats_key(quiz_id) for quiz_id in quiz_set])
+    return len(quiz_rows), len(question_rows)
@@ -1,56 +1,30 @@
+# analytics/signals.py
+"""
+Publishes new ActivityEvents on the post-commit event bus (analytics/events.py).
+
+Downstream trackers (users, gamification) subscribe to the bus instead of
+ActivityEvent post_save, so writing an event costs the request nothing
+beyond the INSERT itself.
+"""
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.utils import timezone
-from django.db.models import F
-from .models import QuizSessionProgress, ActivityEvent
-from quizzes.models import Quiz  # ensure this import matches your quizzes app
 
-@receiver(post_save, sender=ActivityEvent)
-def update_quiz_session_progress(sender, instance, created, **kwargs):
-    # Only on new answer events
-    if not created or instance.event_type != 'quiz_answer_submitted':
-        return
+from .events import ANSWER_SUBMITTED, publish
+from .models import ActivityEvent
 
-    session_id = instance.session_id
-    if not session_id:
-        return  # ignore if somehow missing
+PUBLISHED_EVENT_TYPES = {ANSWER_SUBMITTED}
 
-    user = instance.user
-    metadata = instance.metadata or {}
-    quiz_id = metadata.get('quiz_id')
-    is_correct = metadata.get('is_correct', False)
 
-    # Fetch the quiz to get total questions
-    try:
-        quiz = Quiz.objects.get(pk=quiz_id)
-    except Quiz.DoesNotExist:
+@receiver(post_save, sender=ActivityEvent, dispatch_uid='analytics_publish_activity_event')
+def publish_activity_event(sender, instance, created, **kwargs):
+    if not created or instance.event_type not in PUBLISHED_EVENT_TYPES or not instance.user_id:
         return
-
-    total_qs = quiz.questions.count()
-
-    # Get or create a progress record for this session
-    progress, created_prog = QuizSessionProgress.objects.get_or_create(
-        session_id=session_id,
-        defaults={
-            'user': user,
-            'quiz': quiz,
-            'total_questions': total_qs,
-            'started_at': instance.timestamp or timezone.now(),
-        }
-    )
-
-    # Atomically increment counts
-    updates = {'answered_count': F('answered_count') + 1}
-    if is_correct:
-        updates['correct_count'] = F('correct_count') + 1
-
-    QuizSessionProgress.objects.filter(pk=progress.pk).update(**updates)
-
-    # Refresh from DB to get actual numbers
-    progress.refresh_from_db()
-
-    # If reached completion, mark it
-    if progress.answered_count >= progress.total_questions and progress.status != QuizSessionProgress.COMPLETED:
-        progress.status = QuizSessionProgress.COMPLETED
-        progress.completed_at = timezone.now()
-        progress.save()
+    publish(instance.event_type, instance.user_id, {
+        'event_id': instance.id,
+        'event_type': instance.event_type,
+        'content_type_id': instance.content_type_id,
+        'object_id': instance.object_id,
+        'metadata': instance.metadata or {},
+        'timestamp': instance.timestamp.isoformat(),
+        'session_id': str(instance.session_id) if instance.session_id else None,
+    })
@@ -0,0 +1,128 @@
+# analytics/sm2.py
+"""
+Vectorized SM-2 scheduling and retention decay.
+
+The formulas are written with NumPy so the same code serves a single answer
+(update_memory_stat_item) and millions of rows (the nightly decay task).
+apply_retention_decay() walks MemoryStat in primary-key chunks, computes the
+new retention estimates as arrays and writes back only the rows that changed
+with bulk_update (one UPDATE ... CASE statement per batch).
+"""
+import logging
+
+import numpy as np
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+MIN_EASINESS_FACTOR = 1.3
+MAX_INTERVAL_DAYS = 365.0 * 2
+
+# Retention decay defaults (see MemoryStat.update_daily_retention_decay)
+STABILITY_BASE_MULTIPLIER = 1.5
+MIN_STABILITY = 0.5
+MAX_STABILITY_INTERVAL = 180
+
+DECAY_CHUNK_SIZE = 5000
+DECAY_UPDATE_BATCH_SIZE = 1000
+
+
+def sm2_next(easiness_factor, repetitions, interval_days, quality):
+    """
+    Apply one SM-2 review. Accepts scalars or equally shaped arrays and
+    returns (easiness_factor, repetitions, interval_days) as arrays.
+    """
+    ef = np.asarray(easiness_factor, dtype=float)
+    reps = np.asarray(repetitions, dtype=int)
+    interval = np.asarray(interval_days, dtype=float)
+    q = np.asarray(quality, dtype=int)
+
+    passed = q >= 3
+    new_ef = np.where(
+        passed,
+        np.maximum(ef + (0.1 - (5 - q) * (0.08 + (5 - q) * 0.02)), MIN_EASINESS_FACTOR),
+        ef,
+    )
+    new_reps = np.where(passed, reps + 1, 0)
+    grown = np.select(
+        [new_reps == 1, new_reps == 2],
+        [1.0, 6.0],
+        default=np.ceil(interval * new_ef),
+    )
+    new_interval = np.minimum(np.where(passed, grown, 1.0), MAX_INTERVAL_DAYS)
+    new_interval = np.where(passed & (new_interval < 1.0), 1.0, new_interval)
+    return new_ef, new_reps, new_interval
+
+
+def retention_estimate(days_since_review, interval_days, easiness_factor,
+                       stability_factor_base_multiplier=STABILITY_BASE_MULTIPLIER,
+                       min_stability=MIN_STABILITY,
+                       max_stability_contribution_from_interval=MAX_STABILITY_INTERVAL):
+    """
+    Exponential forgetting curve, R = exp(-t / S), rounded to 4 decimals.
+    Items reviewed "in the future" (t <= 0) are fully retained.
+    """
+    days = np.asarray(days_since_review, dtype=float)
+    interval = np.asarray(interval_days, dtype=float)
+    ef = np.asarray(easiness_factor, dtype=float)
+
+    ef_multiplier = np.where(ef > 0, ef / 2.5, 1.0)
+    stability = np.maximum(
+        min_stability,
+        np.minimum(interval, max_stability_contribution_from_interval) * ef_multiplier * stability_factor_base_multiplier,
+    )
+    stability = np.where(stability > 0, stability, min_stability)
+    return np.where(days <= 0, 1.0, np.round(np.exp(-np.maximum(days, 0) / stability), 4))
+
+
+def apply_retention_decay(queryset=None, chunk_size=DECAY_CHUNK_SIZE, now=None):
+    """
+    Recompute current_retention_estimate for every reviewed MemoryStat.
+
+    Returns (processed, updated, errors). A failing chunk is logged and
+    skipped so one bad batch does not abort the whole run.
+    """
+    from .models import MemoryStat
+
+    now = now or timezone.now()
+    now_ts = now.timestamp()
+    qs = queryset if queryset is not None else MemoryStat.objects.all()
+    qs = qs.filter(last_reviewed_at__isnull=False).order_by('id')
+
+    processed = updated = errors = 0
+    last_id = 0
+    while True:
+        rows = list(
+            qs.filter(id__gt=last_id).values_list(
+                'id', 'last_reviewed_at', 'interval_days', 'easiness_factor', 'current_retention_estimate',
+            )[:chunk_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        processed += len(rows)
+
+        try:
+            ids, reviewed_at, interval, ef, current = zip(*rows)
+            days = (now_ts - np.fromiter((dt.timestamp() for dt in reviewed_at), dtype=float, count=len(rows))) / 86400.0
+            new_retention = retention_estimate(
+                days,
+                np.array(interval, dtype=float),
+                np.array([v or 0.0 for v in ef], dtype=float),
+            )
+            changed = np.flatnonzero(new_retention != np.array(current, dtype=float))
+            if changed.size:
+                MemoryStat.objects.bulk_update(
+                    [
+                        MemoryStat(id=ids[i], current_retention_estimate=float(new_retention[i]), updated_at=now)
+                        for i in changed
+                    ],
+                    ['current_retention_estimate', 'updated_at'],
+                    batch_size=DECAY_UPDATE_BATCH_SIZE,
+                )
+                updated += int(changed.size)
+        except Exception as e:
+            errors += len(rows)
+            logger.error(f"Retention decay failed for MemoryStat ids {rows[0][0]}..{last_id}: {e}", exc_info=True)
+
+    return processed, updated, errors
@@ -3,7 +3,7 @@ from celery import shared_task
 from django.utils import timezone
 import logging
 
-from .models import MemoryStat
+from .sm2 import apply_retention_decay
 from .utils import generate_question_performance_report # Import the new utility
 
 logger = logging.getLogger(__name__)
@@ -11,26 +11,16 @@ logger = logging.getLogger(__name__)
 @shared_task(name="analytics.update_daily_memory_stats_retention_decay")
 def update_all_memory_stats_retention_decay_task():
     """
-    Celery task to update the current_retention_estimate for all relevant MemoryStat objects
-    using the method defined on the MemoryStat model.
+    Celery task to update the current_retention_estimate for all relevant MemoryStat objects.
+    Rows are processed in chunks with the vectorized engine in analytics/sm2.py and
+    only changed rows are written back (bulk UPDATE).
     This should be scheduled to run daily.
     """
     start_time = timezone.now()
     logger.info(f"Starting daily task: update_all_memory_stats_retention_decay_task at {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    stats_to_process = MemoryStat.objects.filter(last_reviewed_at__isnull=False)
-    updated_count = 0
-    errors_count = 0
-    total_processed = stats_to_process.count() # Get count before iteration for more accurate logging
 
-    for stat in stats_to_process.iterator(): # Use iterator for large querysets
-        try:
-            if stat.update_daily_retention_decay(): # Call the model method
-                updated_count += 1
-        except Exception as e:
-            errors_count +=1
-            logger.error(f"Error updating retention for MemoryStat ID {stat.id} (User: {stat.user_id}, Item: {stat.content_type_id}-{stat.object_id}): {e}", exc_info=True)
-    
+    total_processed, updated_count, errors_count = apply_retention_decay(now=start_time)
+
     end_time = timezone.now()
     duration = (end_time - start_time).total_seconds()
     logger.info(
@@ -74,6 +64,17 @@ def generate_periodic_performance_reports_task(days_history=7):
     logger.info(f"Periodic performance report task complete. Duration: {duration:.2f}s. Result: {result_message}")
     return result_message
 
+
+@shared_task(name="analytics.drain_domain_events")
+def drain_domain_events():
+    """
+    Deliver buffered domain events (analytics/events.py) to their consumers.
+    Queued on demand after commits; CELERY_BEAT_SCHEDULE runs it every minute too.
+    """
+    from .events import drain
+
+    return {'handled': drain()}
+
 # --- To schedule these tasks with Celery Beat ---
 # Add to your Django settings.py (e.g., zporta/settings/base.py or local.py):
 #
@@ -94,3 +95,4 @@ def generate_periodic_performance_reports_task(days_history=7):
 # Remember to have your Celery worker and Celery Beat services running.
 # Worker: celery -A zporta worker -l info
 # Beat:   celery -A zporta beat -l info --scheduler django_celery_beat.schedulers:DatabaseScheduler
+
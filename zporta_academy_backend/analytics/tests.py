@@ -1,3 +1,276 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from analytics import events, rollups, utils
+from analytics.models import ActivityEvent, MemoryStat, QuizAnswerFact
+from analytics.sm2 import apply_retention_decay, sm2_next
+from gamification.models import Activity
+from quizzes.models import Quiz, Question
+from users.activity_models import UserActivity
+from zporta import profiling
+from zporta.testing import FakeRedis
+from users.learning_score_service import compute_learning_score
+
+
+class SM2EngineTests(TestCase):
+    def test_vectorized_schedule_matches_sm2_rules(self):
+        ef, reps, interval = sm2_next([2.5, 2.5, 2.5, 1.3], [0, 1, 2, 5], [0.0, 1.0, 6.0, 10.0], [5, 4, 3, 1])
+        self.assertEqual(list(reps), [1, 2, 3, 0])
+        self.assertEqual(list(interval), [1.0, 6.0, 15.0, 1.0])
+        self.assertAlmostEqual(ef[0], 2.6)
+        self.assertAlmostEqual(ef[2], 2.36)
+        self.assertAlmostEqual(ef[3], 1.3)
+
+    def test_bulk_decay_matches_per_row_method(self):
+        user = User.objects.create_user(username='learner', password='pw')
+        author = User.objects.create_user(username='author', password='pw')
+        quiz_ct = ContentType.objects.get_for_model(Quiz)
+        now = timezone.now()
+        stats = []
+        for i in range(12):
+            quiz = Quiz.objects.create(title=f'Decay {i}', created_by=author)
+            stats.append(MemoryStat.objects.create(
+                user=user, content_type=quiz_ct, object_id=quiz.id,
+                interval_days=float(i), easiness_factor=1.3 + i * 0.1, repetitions=i,
+                last_reviewed_at=now - timedelta(days=i, hours=3),
+            ))
+
+        processed, updated, errors = apply_retention_decay(chunk_size=5, now=now)
+        self.assertEqual((processed, updated, errors), (12, 12, 0))
+
+        for stat in stats:
+            bulk_value = MemoryStat.objects.get(pk=stat.pk).current_retention_estimate
+            with mock.patch('analytics.models.timezone.now', return_value=now):
+                stat.update_daily_retention_decay()
+            self.assertEqual(stat.current_retention_estimate, bulk_value)
+
+        # Nothing changed since the last run: no rows are written again
+        self.assertEqual(apply_retention_decay(now=now), (12, 0, 0))
+
+
+class DifficultyModelCacheTests(TestCase):
+    def test_model_is_loaded_once_per_file_version(self):
+        utils._difficulty_model_cache.update(mtime=None, model=None)
+        with mock.patch('analytics.utils.joblib.load', return_value='model') as load:
+            self.assertEqual(utils.get_difficulty_model(), 'model')
+            self.assertEqual(utils.get_difficulty_model(), 'model')
+            self.assertEqual(load.call_count, 1)
+            with mock.patch('analytics.utils.os.path.getmtime', return_value=-1.0):
+                utils.get_difficulty_model()
+            self.assertEqual(load.call_count, 2)
+        utils._difficulty_model_cache.update(mtime=None, model=None)
+
+
+class QuizAnswerFactTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='learner', password='pw')
+        author = User.objects.create_user(username='author', password='pw')
+        self.quiz = Quiz.objects.create(title='Facts', created_by=author)
+        self.questions = [
+            Question.objects.create(quiz=self.quiz, question_text=f'Q{i}', question_type='mcq',
+                                    option1='a', option2='b', correct_option=1)
+            for i in range(2)
+        ]
+
+    def _metadata(self, question, is_correct):
+        return {'quiz_id': self.quiz.id, 'question_id': question.id, 'is_correct': is_correct,
+                'time_spent_ms': 4000, 'quality_of_recall_used': 4 if is_correct else 1}
+
+    def test_log_event_and_backfill_write_facts(self):
+        session_id = utils.get_or_create_quiz_session_id(self.user, self.quiz.id)
+        utils.log_event(self.user, 'quiz_answer_submitted', instance=self.questions[0],
+                        metadata=self._metadata(self.questions[0], True), session_id=session_id)
+        fact = QuizAnswerFact.objects.get(user=self.user)
+        self.assertEqual((fact.quiz_id, fact.question_id, fact.is_correct), (self.quiz.id, self.questions[0].id, True))
+        self.assertEqual(fact.session_id, session_id)
+
+        # History written before the fact table existed
+        ActivityEvent.objects.create(
+            user=self.user, event_type='quiz_answer_submitted',
+            content_type=ContentType.objects.get_for_model(Question), object_id=self.questions[1].id,
+            metadata=self._metadata(self.questions[1], False),
+        )
+        out = StringIO()
+        call_command('backfill_quiz_answer_facts', '--batch-size', '1', stdout=out)
+        self.assertIn('1 facts written (1 attempted)', out.getvalue())
+        self.assertEqual(QuizAnswerFact.objects.filter(user=self.user).count(), 2)
+
+        legacy = compute_learning_score(self.user)['quiz_items']
+        with override_settings(ANALYTICS_USE_ANSWER_FACTS=True):
+            self.assertEqual(compute_learning_score(self.user)['quiz_items'], legacy)
+        self.assertEqual([item['question_id'] for item in legacy], [self.questions[0].id])
+
+
+class DomainEventBusTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pw')
+        self.learners = [User.objects.create_user(username=f'learner{i}', password='pw') for i in range(2)]
+        self.quiz = Quiz.objects.create(title='Bus', created_by=self.author)
+        self.question = Question.objects.create(quiz=self.quiz, question_text='Q', question_type='mcq',
+                                                option1='a', option2='b', correct_option=1)
+
+    def _answer(self, user, is_correct=True):
+        utils.log_event(user, 'quiz_answer_submitted', instance=self.question, related_object=self.quiz,
+                        metadata={'quiz_id': self.quiz.id, 'question_id': self.question.id, 'is_correct': is_correct})
+
+    @override_settings(EVENT_BUS_ASYNC=False)
+    def test_trackers_run_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._answer(self.learners[0])
+            self._answer(self.learners[0])  # same question again: no second award
+        self.assertFalse(Activity.objects.exists())
+
+        for callback in callbacks:
+            callback()
+        learner = self.learners[0]
+        self.assertEqual(Activity.objects.filter(user=learner, is_mistake=False).count(), 1)
+        self.assertEqual(Activity.objects.filter(user=self.author, activity_type='quiz_first_attempt').count(), 1)
+        self.assertEqual(UserActivity.objects.filter(user=learner, activity_type='CORRECT_ANSWER').count(), 1)
+        self.assertEqual(UserActivity.objects.filter(user=self.author, activity_type='QUIZ_FIRST_ATTEMPT').count(), 1)
+        self.assertEqual(learner.score.total_points, 1)
+
+    @override_settings(EVENT_BUS_ASYNC=True)
+    def test_async_delivery_is_debounced_and_batched_per_user(self):
+        batches = []
+        subscribers = {events.ANSWER_SUBMITTED: [lambda user_id, payloads: batches.append((user_id, len(payloads)))]}
+        with mock.patch.object(events, '_subscribers', subscribers), \
+                mock.patch('analytics.events.get_redis', return_value=FakeRedis()), \
+                mock.patch('analytics.tasks.drain_domain_events.apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                self._answer(self.learners[0])
+                self._answer(self.learners[1], is_correct=False)
+                self._answer(self.learners[0], is_correct=False)
+            self.assertEqual(apply_async.call_count, 1)
+            self.assertEqual(batches, [])
+
+            self.assertEqual(events.drain(), 3)
+        self.assertEqual(batches, [(self.learners[0].id, 2), (self.learners[1].id, 1)])
+
+    @override_settings(EVENT_BUS_ASYNC=True)
+    def test_async_delivery_without_redis_dispatches_on_commit(self):
+        # A per-process buffer would be invisible to the worker that drains it
+        with mock.patch('analytics.tasks.drain_domain_events.apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                self._answer(self.learners[0])
+        apply_async.assert_not_called()
+        self.assertEqual(Activity.objects.filter(user=self.learners[0]).count(), 1)
+        self.assertEqual(events.drain(), 0)
+
+
+@override_settings(REQUEST_PROFILING_SAMPLE_RATE=1.0)
+class RequestProfilingTests(TestCase):
+    def setUp(self):
+        profiling.clear_samples()
+        self.author = User.objects.create_user(username='author', password='pw')
+
+    def test_profile_counts_queries_duplicates_and_cache(self):
+        profiling.install()
+        profile = profiling.start_profile()
+        try:
+            for i in range(6):
+                list(Quiz.objects.filter(id=i))
+            list(Quiz.objects.filter(id__in=[1, 2, 3]))
+            list(Quiz.objects.filter(id__in=[4, 5]))
+            cache.set('profiled', 1)
+            cache.get('profiled')
+            cache.get('not-there')
+        finally:
+            profiling.stop_profile()
+
+        self.assertEqual(profile.queries, 8)
+        self.assertEqual([count for _, count in profile.duplicates()], [6])
+        self.assertEqual(len(profile.statements), 2)  # both IN-lists share one fingerprint
+        self.assertEqual((profile.cache_hits, profile.cache_misses), (1, 1))
+
+    def test_server_timing_header_and_staff_page(self):
+        Quiz.objects.create(title='Profiled', created_by=self.author, status='published')
+        self.assertNotIn('Server-Timing', self.client.get('/api/quizzes/'))
+        with override_settings(DEBUG=True):
+            response = self.client.get('/api/quizzes/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('ser;dur=', response['Server-Timing'])
+
+        self.client.force_login(self.author)
+        self.assertNotIn('Server-Timing', self.client.get('/api/quizzes/'))
+        self.assertEqual(self.client.get('/admin/analytics/request-profiles/').status_code, 302)
+
+        self.author.is_staff = True
+        self.author.save()
+        self.assertIn('Server-Timing', self.client.get('/api/quizzes/'))
+        page = self.client.get('/admin/analytics/request-profiles/')
+        self.assertEqual(page.status_code, 200)
+        self.assertIn('GET /api/quizzes/', [row['endpoint'] for row in page.context['endpoints']])
+        # A bad ?limit= falls back to the default instead of a 500
+        self.assertEqual(self.client.get('/admin/analytics/request-profiles/?limit=abc').status_code, 200)
+        self.assertEqual(len(self.client.get('/admin/analytics/request-profiles/?limit=-5').context['endpoints']), 1)
+
+    def test_ring_buffer_keeps_the_newest_samples_in_redis(self):
+        redis = FakeRedis()
+        with mock.patch('zporta.profiling.get_redis', return_value=redis), \
+                override_settings(REQUEST_PROFILING_BUFFER_SIZE=3):
+            for n in range(5):
+                profiling.record_sample({'endpoint': f'GET /e{n}', 'duration_ms': n})
+            self.assertEqual([s['endpoint'] for s in profiling.recent_samples()], ['GET /e4', 'GET /e3', 'GET /e2'])
+            self.assertEqual(redis.llen(cache.make_key(profiling.RING_BUFFER_KEY)), 3)
+
+
+class QuizStatsRollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username='author', password='pw')
+        self.quiz = Quiz.objects.create(title='Stats', created_by=author, status='published')
+        self.questions = [
+            Question.objects.create(quiz=self.quiz, question_text=f'Q{i}', question_type='mcq',
+                                    option1='a', option2='b', correct_option=1)
+            for i in range(2)
+        ]
+        self.learners = [User.objects.create_user(username=f'learner{i}', password='pw') for i in range(2)]
+
+    def _answer(self, user, question, option):
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/api/quizzes/{self.quiz.id}/record-answer/',
+                {'question_id': question.id, 'selected_option': option, 'time_spent_ms': 3000},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def _stats(self):
+        cache.clear()
+        with self.assertNumQueries(3):  # quiz rollup, question rollups, question texts
+            rollups.get_quiz_stats(self.quiz)
+        response = self.client.get(f'/api/analytics/quizzes/{self.quiz.id}/detailed-statistics/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_counters_follow_answers_and_match_rebuild(self):
+        first, second = self.learners
+        self._answer(first, self.questions[0], 1)
+        self._answer(first, self.questions[1], 2)  # completes the quiz
+        self._answer(first, self.questions[0], 2)  # new session, same user
+        self._answer(second, self.questions[0], 1)
+
+        stats = self._stats()
+        self.assertEqual(
+            (stats['unique_participants'], stats['unique_finishers'], stats['total_answers_submitted_for_quiz'],
+             stats['total_correct_answers_for_quiz'], stats['total_wrong_answers_for_quiz']),
+            (2, 1, 4, 2, 2),
+        )
+        self.assertEqual(stats['overall_correctness_percentage'], 50.0)
+        q0 = stats['questions_stats'][0]
+        self.assertEqual((q0['times_answered'], q0['distinct_users_answered'], q0['times_correct']), (3, 2, 2))
+
+        out = StringIO()
+        call_command('rebuild_quiz_stats', '--quiz-id', str(self.quiz.id), stdout=out)
+        self.assertIn('1 quizzes', out.getvalue())
+        self.assertEqual(self._stats(), stats)
@@ -3,11 +3,13 @@ import logging
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
 from django.db.models import F, Avg, Count, Q # Import Q
 import math
 import os 
 from django.conf import settings 
 import uuid
+import threading
 # Import newly used libraries
 import pandas as pd
 import numpy as np
@@ -16,7 +18,10 @@ from sklearn.model_selection import train_test_split
 import joblib 
 from analytics.models import QuizAttempt
 from quizzes.models import Quiz
-from .models import ActivityEvent, MemoryStat 
+from .models import ActivityEvent, MemoryStat, QuizAnswerFact, QuizSessionProgress
+from .sm2 import sm2_next
+from .answer_facts import answer_facts_enabled, record_answer_fact
+from .rollups import record_finisher
 
 try:
     from quizzes.models import Quiz, Question as QuizzesQuestion
@@ -44,29 +49,78 @@ DIFFICULTY_MODEL_PATH = os.path.join(AI_MODEL_DIR, DIFFICULTY_MODEL_FILENAME)
 
 def get_or_create_quiz_session_id(user, quiz_id):
     """
-    Return an existing open session_id for this user+quiz,
-    or generate a new one if none—or if the prior one has been completed.
+    Return the session_id of the user's open QuizSessionProgress for this quiz,
+    or a brand-new one if there is none (never started, or last one completed).
     """
-    # Look for the most recent event with a session_id for this quiz
-    last = ActivityEvent.objects.filter(
+    session_id = QuizSessionProgress.objects.filter(
+        user=user, quiz_id=quiz_id, status=QuizSessionProgress.IN_PROGRESS
+    ).order_by('-started_at').values_list('session_id', flat=True).first()
+    return session_id or uuid.uuid4()
+
+
+def _open_quiz_session(user, quiz):
+    return QuizSessionProgress.objects.select_for_update().filter(
+        open_key=QuizSessionProgress.open_key_for(user.pk, quiz.pk)
+    ).first()
+
+
+def start_or_resume_quiz_session(user, quiz):
+    """
+    Lock and return (progress, created) for the user's open session on this quiz.
+
+    A new QuizSessionProgress (and its 'quiz_started' event) is created when
+    the user has no session in progress. Must run inside a transaction.
+    At most one session per (user, quiz) is open (the unique open_key): when
+    a concurrent request opens it first, that session is locked and returned.
+    """
+    progress = _open_quiz_session(user, quiz)
+    if progress is not None:
+        return progress, False
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            progress = QuizSessionProgress.objects.create(
+                user=user,
+                quiz=quiz,
+                total_questions=quiz.questions.count(),
+                started_at=now,
+            )
+    except IntegrityError:
+        return _open_quiz_session(user, quiz), False
+    log_event(
         user=user,
-        session_id__isnull=False,
-        metadata__quiz_id=quiz_id
-    ).order_by('-timestamp').first()
-
-    if last:
-        # Check if a quiz_completed came *after* that event
-        completed_after = ActivityEvent.objects.filter(
-            user=user,
-            event_type='quiz_completed',
-            metadata__quiz_id=quiz_id,
-            timestamp__gt=last.timestamp
-        ).exists()
-        if not completed_after:
-            return last.session_id
-
-    # Otherwise: start a brand-new session
-    return uuid.uuid4()
+        event_type='quiz_started',
+        instance=quiz,
+        metadata={'quiz_id': quiz.id, 'started_at': now.isoformat()},
+        session_id=progress.session_id,
+    )
+    return progress, True
+
+
+def record_quiz_session_answer(progress, question_id, is_correct):
+    """
+    Count one answer on a locked session; returns True when it completes the session.
+
+    Counters track distinct questions: re-answering a question in the same
+    session does not move answered_count / correct_count.
+    """
+    answered = progress.answered_question_ids or []
+    if question_id in answered:
+        return False
+
+    progress.answered_question_ids = answered + [question_id]
+    progress.answered_count = len(progress.answered_question_ids)
+    progress.correct_count += int(bool(is_correct))
+    update_fields = ['answered_question_ids', 'answered_count', 'correct_count']
+    completed = progress.answered_count >= progress.total_questions
+    if completed:
+        progress.status = QuizSessionProgress.COMPLETED
+        progress.completed_at = timezone.now()
+        update_fields += ['status', 'completed_at']
+    progress.save(update_fields=update_fields)
+    return completed
+
 
 def ensure_ai_model_dir_and_placeholder_model():
     """Ensures the AI model directory exists and creates a placeholder model if none exists."""
@@ -85,6 +139,24 @@ def ensure_ai_model_dir_and_placeholder_model():
 ensure_ai_model_dir_and_placeholder_model()
 
 
+# Process-wide cache of the difficulty model; reloaded when the file on disk changes.
+_difficulty_model_cache = {'mtime': None, 'model': None}
+_difficulty_model_lock = threading.Lock()
+
+
+def get_difficulty_model():
+    """Return the loaded difficulty model, loading it only when the file's mtime changes."""
+    mtime = os.path.getmtime(DIFFICULTY_MODEL_PATH)  # FileNotFoundError is handled by callers
+    if _difficulty_model_cache['mtime'] == mtime:
+        return _difficulty_model_cache['model']
+    with _difficulty_model_lock:
+        if _difficulty_model_cache['mtime'] != mtime:
+            _difficulty_model_cache['model'] = joblib.load(DIFFICULTY_MODEL_PATH)
+            _difficulty_model_cache['mtime'] = mtime
+            logger.info(f"Loaded AI difficulty model from {DIFFICULTY_MODEL_PATH} (mtime {mtime})")
+        return _difficulty_model_cache['model']
+
+
 # --- Event Logging ---
 def log_event(user, event_type, instance=None, metadata=None, related_object=None, session_id=None):
     if metadata is None: metadata = {}
@@ -110,19 +182,36 @@ def log_event(user, event_type, instance=None, metadata=None, related_object=Non
         elif instance:
             logger.warning(f"log_event: 'instance' provided but is not a valid model instance: {type(instance)}")
 
-        ActivityEvent.objects.create(
+        first_completion = (
+            event_type == 'quiz_completed' and isinstance(instance, Quiz) and user and user.is_authenticated
+            and not ActivityEvent.objects.filter(
+                user=user, event_type='quiz_completed', content_type=ct, object_id=obj_id
+            ).exists()
+        )
+        event = ActivityEvent.objects.create(
             user=user if user and user.is_authenticated else None,
             event_type=event_type, content_type=ct, object_id=obj_id,
             metadata=metadata, timestamp=timezone.now(),
             session_id=session_id
         )
+        if event_type == 'quiz_answer_submitted':
+            try:
+                with transaction.atomic():
+                    record_answer_fact(event)
+            except Exception as e:
+                logger.error(f"log_event: Failed to write answer fact for event {event.id}: {e}", exc_info=True)
+        if first_completion:
+            record_finisher(obj_id)
         # NEW LOGIC TO CREATE QuizAttempt
         if event_type == 'quiz_answer_submitted':
             quiz_id = metadata.get('quiz_id')
             is_correct = metadata.get('is_correct')
             
             if quiz_id is not None and is_correct is not None:
-                quiz_instance = Quiz.objects.filter(pk=quiz_id).first()
+                if isinstance(related_object, Quiz) and related_object.pk == quiz_id:
+                    quiz_instance = related_object
+                else:
+                    quiz_instance = Quiz.objects.filter(pk=quiz_id).first()
                 if quiz_instance:
                     QuizAttempt.objects.create(
                         user=user,
@@ -131,9 +220,10 @@ def log_event(user, event_type, instance=None, metadata=None, related_object=Non
                     )
         if PROFILE_MODEL_AVAILABLE and UserProfile and event_type == 'quiz_answer_submitted' and metadata.get('is_correct') and user and user.is_authenticated:
             try:
-                profile, _ = UserProfile.objects.get_or_create(user=user)
-                profile.growth_score = F('growth_score') + 1
-                profile.save(update_fields=['growth_score'])
+                if not UserProfile.objects.filter(user=user).update(growth_score=F('growth_score') + 1):
+                    profile, _ = UserProfile.objects.get_or_create(user=user)
+                    profile.growth_score = F('growth_score') + 1
+                    profile.save(update_fields=['growth_score'])
             except Exception as e:
                  logger.error(f"log_event: Failed to update growth_score for user {user.id}: {e}", exc_info=True)
     except Exception as e:
@@ -145,7 +235,7 @@ def log_event(user, event_type, instance=None, metadata=None, related_object=Non
 def get_ai_assisted_difficulty_prediction(memory_stat_instance):
     model = None
     try:
-        model = joblib.load(DIFFICULTY_MODEL_PATH)
+        model = get_difficulty_model()
     except FileNotFoundError:
         logger.warning(f"AI difficulty model not found at {DIFFICULTY_MODEL_PATH}. Ensure placeholder or real model exists.")
         return "unknown (model_not_found)"
@@ -220,19 +310,13 @@ def update_memory_stat_item(user, learnable_item, quality_of_recall, time_spent_
         stat.last_time_spent_ms = time_spent_ms
     
     q = quality_of_recall
-    if q >= 3: 
-        stat.easiness_factor += (0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
-        if stat.easiness_factor < 1.3: stat.easiness_factor = 1.3
-        stat.repetitions += 1
-        if stat.repetitions == 1: stat.interval_days = 1.0
-        elif stat.repetitions == 2: stat.interval_days = 6.0
-        else: stat.interval_days = math.ceil(stat.interval_days * stat.easiness_factor)
-    else: 
-        stat.repetitions = 0
-        stat.interval_days = 1.0
-    
-    stat.interval_days = min(stat.interval_days, 365.0 * 2) 
-    if q >=3 and stat.interval_days < 1.0: stat.interval_days = 1.0
+    # SM-2 step shared with the vectorized scheduler (analytics.sm2)
+    easiness_factor, repetitions, interval_days = sm2_next(
+        stat.easiness_factor, stat.repetitions, stat.interval_days, q
+    )
+    stat.easiness_factor = float(easiness_factor)
+    stat.repetitions = int(repetitions)
+    stat.interval_days = float(interval_days)
 
     stat.last_reviewed_at = timezone.now()
     stat.next_review_at = stat.last_reviewed_at + timedelta(days=float(stat.interval_days))
@@ -283,21 +367,28 @@ def generate_question_performance_report(days_history=30):
         logger.error(f"Could not get ContentType for QuizzesQuestion: {e}")
         return None
 
-    # Corrected filter to avoid repeating 'metadata__has_key'
-    answer_events_qs = ActivityEvent.objects.filter(
-        Q(metadata__has_key='time_spent_ms') & Q(metadata__has_key='is_correct'), # Ensure both keys exist
-        content_type=question_ct,
-        event_type='quiz_answer_submitted',
-        timestamp__gte=cutoff_date,
-        # We also need quiz_id in metadata for context if grouping by quiz later,
-        # but for now, we are grouping by question_id (object_id)
-        # metadata__has_key='quiz_id' # Optional, if you need it for further grouping
-    ).values(
-        'object_id', 
-        'metadata__time_spent_ms',
-        'metadata__is_correct',
-        'metadata__quiz_id' 
-    )
+    if answer_facts_enabled():
+        answer_events_qs = QuizAnswerFact.objects.filter(
+            timestamp__gte=cutoff_date,
+            question__isnull=False,
+            time_spent_ms__isnull=False,
+        ).values('question_id', 'time_spent_ms', 'is_correct', 'quiz_id')
+    else:
+        # Corrected filter to avoid repeating 'metadata__has_key'
+        answer_events_qs = ActivityEvent.objects.filter(
+            Q(metadata__has_key='time_spent_ms') & Q(metadata__has_key='is_correct'), # Ensure both keys exist
+            content_type=question_ct,
+            event_type='quiz_answer_submitted',
+            timestamp__gte=cutoff_date,
+            # We also need quiz_id in metadata for context if grouping by quiz later,
+            # but for now, we are grouping by question_id (object_id)
+            # metadata__has_key='quiz_id' # Optional, if you need it for further grouping
+        ).values(
+            'object_id', 
+            'metadata__time_spent_ms',
+            'metadata__is_correct',
+            'metadata__quiz_id' 
+        )
     
     if not answer_events_qs.exists():
         logger.info("generate_question_performance_report: No relevant answer events found.")
@@ -3,7 +3,7 @@ import logging
 from datetime import timedelta, datetime
 
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Avg, Count, Max, Min, Prefetch, Q, Sum, Case, When, IntegerField
+from django.db.models import Avg, Count, Max, Min, Prefetch, Q
 from django.utils import timezone
 from rest_framework import generics, status, views, viewsets
 from rest_framework.decorators import api_view, permission_classes
@@ -19,6 +19,7 @@ from analytics.models import ActivityEvent
 from analytics.models import QuizAttempt
 from analytics.utils import (log_event, predict_overall_quiz_retention_days,
                              update_memory_stat_item)
+from analytics.rollups import get_quiz_stats
 from quizzes.models import Question, Quiz
 from quizzes.serializers import QuizSerializer
 from subjects.models import Subject
@@ -69,76 +70,9 @@ class QuizDetailedAnalyticsView(views.APIView):
             )):
                 return Response({"error": "Quiz not public."}, status=status.HTTP_404_NOT_FOUND)
 
-        quiz_content_type = ContentType.objects.get_for_model(QuizzesQuiz)
-        question_ct = ContentType.objects.get_for_model(QuizzesQuestion)
-
-        # Backward-compatible: include events that either carry quiz_id in metadata
-        # OR are tied to any question of this quiz via object_id.
-        quiz_qids = QuizzesQuestion.objects.filter(quiz=quiz_instance).values('id')
-        answer_events_for_quiz_questions = ActivityEvent.objects.filter(
-            content_type=question_ct,
-            event_type='quiz_answer_submitted'
-        ).filter(
-            Q(metadata__quiz_id=quiz_id) | Q(object_id__in=quiz_qids)
-        )
-
-        unique_participants = answer_events_for_quiz_questions.values('user').distinct().count()
-
-        unique_finishers = ActivityEvent.objects.filter(
-            content_type=quiz_content_type, object_id=quiz_id, event_type='quiz_completed'
-        ).values('user').distinct().count()
-
-        total_answers_submitted_for_quiz = answer_events_for_quiz_questions.count()
-        correct_wrong_counts = answer_events_for_quiz_questions.aggregate(
-            total_correct=Sum(Case(When(metadata__is_correct=True, then=1), default=0, output_field=IntegerField())),
-            total_wrong=Sum(Case(When(metadata__is_correct=False, then=1), default=0, output_field=IntegerField())),
-        )
-        total_correct_answers_for_quiz = correct_wrong_counts.get('total_correct', 0)
-        total_wrong_answers_for_quiz = correct_wrong_counts.get('total_wrong', 0)
-
-        overall_correctness_percentage = (total_correct_answers_for_quiz / total_answers_submitted_for_quiz * 100) if total_answers_submitted_for_quiz > 0 else 0
-        overall_wrongness_percentage = (total_wrong_answers_for_quiz / total_answers_submitted_for_quiz * 100) if total_answers_submitted_for_quiz > 0 else 0
-
-        questions_stats_list = []
-        quiz_questions = QuizzesQuestion.objects.filter(quiz=quiz_instance).order_by('id')
-
-        for q_instance in quiz_questions:
-            q_id = q_instance.id
-            # Per-question counts should include all answers to that question,
-            # regardless of whether older rows lack metadata.quiz_id.
-            q_events = ActivityEvent.objects.filter(
-                content_type=question_ct,
-                object_id=q_id,
-                event_type='quiz_answer_submitted'
-            )
-            q_distinct_answered_users = q_events.values('user').distinct().count()
-            q_correct = q_events.filter(metadata__is_correct=True).count()
-            q_wrong = q_events.filter(metadata__is_correct=False).count()
-            q_total_submissions = q_events.count()
-
-            questions_stats_list.append({
-                'question_id': q_id,
-                'question_text': str(q_instance.question_text)[:100] + ('...' if len(str(q_instance.question_text)) > 100 else ''),
-                'times_answered': q_total_submissions,
-                'distinct_users_answered': q_distinct_answered_users,
-                'times_correct': q_correct,
-                'times_wrong': q_wrong,
-                'percentage_correct': round((q_correct / q_total_submissions * 100) if q_total_submissions > 0 else 0, 2),
-                'percentage_wrong': round((q_wrong / q_total_submissions * 100) if q_total_submissions > 0 else 0, 2),
-            })
-
-        analytics_data = {
-            'quiz_id': quiz_id,
-            'quiz_title': quiz_instance.title,
-            'unique_participants': unique_participants,
-            'unique_finishers': unique_finishers,
-            'total_answers_submitted_for_quiz': total_answers_submitted_for_quiz,
-            'total_correct_answers_for_quiz': total_correct_answers_for_quiz,
-            'total_wrong_answers_for_quiz': total_wrong_answers_for_quiz,
-            'overall_correctness_percentage': round(overall_correctness_percentage, 2),
-            'overall_wrongness_percentage': round(overall_wrongness_percentage, 2),
-            'questions_stats': questions_stats_list
-        }
+        # Counters are maintained per answer (analytics.rollups); see
+        # `manage.py rebuild_quiz_stats` to recompute them from events.
+        analytics_data = get_quiz_stats(quiz_instance)
         serializer = DetailedQuizAnalyticsSerializer(analytics_data)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -1801,6 +1801,7 @@ class CachedAIInsightAdmin(admin.ModelAdmin):
     list_filter = (
         'engine',
         'subject',
+        'needs_refresh',
         'created_at',
         'expires_at',
     )
@@ -1831,7 +1832,7 @@ class CachedAIInsightAdmin(admin.ModelAdmin):
             'description': '💾 Shows how much this cache is being reused and tokens saved'
         }),
         ('Lifetime', {
-            'fields': ('created_at', 'expires_at'),
+            'fields': ('created_at', 'expires_at', 'language', 'needs_refresh', 'refresh_claimed_until'),
         }),
     )
     
@@ -1885,6 +1886,8 @@ class CachedAIInsightAdmin(admin.ModelAdmin):
         is_fresh = obj.expires_at > timezone.now()
         if is_fresh:
             return '✅ Fresh'
+        if obj.needs_refresh:
+            return '🔄 Stale, refresh queued'
         return '⏱️ Expired'
     freshness_status.short_description = 'Status'
     
@@ -2164,3 +2167,32 @@ class CacheStatisticsAdmin(admin.ModelAdmin):
         return False
 
 
+
+
+# ===== BATCH PODCAST GENERATION (dailycast/batch.py) =====
+
+from dailycast.models import PodcastBatch, PodcastBatchItem
+
+
+class PodcastBatchItemInline(admin.TabularInline):
+    model = PodcastBatchItem
+    extra = 0
+    can_delete = False
+    fields = ['user', 'status', 'podcast', 'llm_ms', 'tts_ms', 'error_message', 'finished_at']
+    readonly_fields = fields
+    raw_id_fields = ['user', 'podcast']
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PodcastBatch)
+class PodcastBatchAdmin(admin.ModelAdmin):
+    list_display = ['id', 'status', 'language', 'total', 'completed', 'failed', 'fake_providers', 'created_at', 'finished_at']
+    list_filter = ['status', 'fake_providers']
+    readonly_fields = ['language', 'fake_providers', 'status', 'total', 'completed', 'failed',
+                       'requested_by', 'created_at', 'started_at', 'finished_at']
+    inlines = [PodcastBatchItemInline]
+
+    def has_add_permission(self, request):
+        return False
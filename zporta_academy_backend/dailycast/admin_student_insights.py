@@ -13,10 +13,10 @@ from django.db.models import Count, Avg, Q
 from django.http import JsonResponse
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
-from datetime import timedelta
 
 from dailycast.ai_analyzer import UserLearningAnalyzer, analyze_user_and_generate_feedback, _run_ai_deep_analysis
-from dailycast.models import CachedAIInsight, CachedUserAnalytics, CacheStatistics
+from dailycast.models import CachedAIInsight, CachedUserAnalytics
+from dailycast.cache_manager import get_cached_ai_insight, save_ai_insight_cache
 from enrollment.models import Enrollment
 
 User = get_user_model()
@@ -420,51 +420,12 @@ class StudentLearningInsightAdmin(admin.ModelAdmin):
             logger.info(f"🤖 Generating AI insights for user {user_id}, subject={subject}, engine={engine}")
             
             # ============================================================================
-            # STEP 1: CHECK CACHE - If fresh cache exists, use it and save tokens!
+            # STEP 1: CHECK CACHE - If a cache entry exists (fresh or stale), use it and save tokens!
             # ============================================================================
-            cache_found = False
-            cache_hit = False
-            
-            try:
-                cached = CachedAIInsight.objects.get(
-                    user=user,
-                    subject=subject,
-                    engine=engine
-                )
-                
-                # Check if cache is still fresh (not expired)
-                if cached.expires_at > timezone.now():
-                    cache_hit = True
-                    ai_insights = _sanitize_ai_insights(cached.ai_insights)
-                    cached.hits += 1
-                    
-                    # Use actual tokens from original API call
-                    tokens_saved = cached.tokens_used or 1500
-                    cached.tokens_saved += tokens_saved
-                    cached.save(update_fields=['hits', 'tokens_saved'])
-                    
-                    logger.info(f"✅ CACHE HIT: {user.username} - Subject: {subject or 'All'} - Engine: {engine}")
-                    logger.info(f"   📊 Hit count: {cached.hits}, Tokens saved: {cached.tokens_saved}")
-                    cache_found = True
-                    
-                    # Update statistics with cost calculation
-                    today = timezone.now().date()
-                    stats, _ = CacheStatistics.objects.get_or_create(date=today)
-                    stats.ai_insights_cached += 1
-                    stats.ai_insights_hits += cached.hits
-                    stats.ai_tokens_saved += tokens_saved
-                    
-                    # Calculate cost saved by using cache
-                    cost_saved_cents = CacheStatistics.estimate_cost(tokens_saved, engine)
-                    stats.cost_saved_cents += cost_saved_cents
-                    
-                    stats.save(update_fields=['ai_insights_cached', 'ai_insights_hits', 'ai_tokens_saved', 'cost_saved_cents'])
-                    logger.info(f"   💚 Cost saved: ${cost_saved_cents/100:.4f}")
-                else:
-                    logger.info(f"⏱️  CACHE EXPIRED: {user.username} - Subject: {subject or 'All'}")
-                    
-            except CachedAIInsight.DoesNotExist:
-                logger.info(f"❌ CACHE MISS: {user.username} - Subject: {subject or 'All'}")
+            cache_hit, cached_insights, cache_stale = get_cached_ai_insight(user, subject=subject, engine=engine)
+            if cache_hit:
+                # Stale entries are served as-is; the background refresher regenerates them
+                ai_insights = _sanitize_ai_insights(cached_insights)
             
             # ============================================================================
             # STEP 2: IF NO CACHE, GENERATE NEW ANALYSIS
@@ -494,46 +455,16 @@ class StudentLearningInsightAdmin(admin.ModelAdmin):
                 # ====================================================================
                 # STEP 3: SAVE TO CACHE FOR FUTURE USE
                 # ====================================================================
-                try:
-                    expires_at = timezone.now() + timedelta(hours=24)  # 24-hour cache
-                    
-                    CachedAIInsight.objects.update_or_create(
-                        user=user,
-                        subject=subject,
-                        engine=engine,
-                        defaults={
-                            'ai_insights': ai_insights,
-                            'tokens_used': actual_tokens,  # Real tokens from API
-                            'expires_at': expires_at,
-                        }
-                    )
-                    
-                    logger.info(f"💾 CACHED: {user.username} - Subject: {subject or 'All'} - Engine: {engine}")
-                    logger.info(f"   ⏰ Cache expires: {expires_at.strftime('%Y-%m-%d %H:%M:%S')}")
-                    
-                    # Update statistics with actual usage and cost
-                    today = timezone.now().date()
-                    stats, _ = CacheStatistics.objects.get_or_create(date=today)
-                    stats.ai_insights_generated += 1
-                    stats.ai_tokens_used += actual_tokens
-                    
-                    # Calculate actual cost using real input/output token breakdown
-                    if input_tokens > 0 and output_tokens > 0:
-                        cost_cents = CacheStatistics.estimate_cost(
-                            actual_tokens, engine, 
-                            input_tokens=input_tokens, 
-                            output_tokens=output_tokens
-                        )
-                        logger.info(f"   💰 Cost: ${cost_cents/100:.4f} ({input_tokens} in + {output_tokens} out = {actual_tokens} tokens, {engine})")
-                    else:
-                        cost_cents = CacheStatistics.estimate_cost(actual_tokens, engine)
-                        logger.info(f"   💰 Cost: ${cost_cents/100:.4f} for {actual_tokens} tokens using {engine}")
-                    
-                    stats.cost_usd_cents += cost_cents
-                    stats.save(update_fields=['ai_insights_generated', 'ai_tokens_used', 'cost_usd_cents'])
-                    
-                except Exception as e:
-                    logger.warning(f"Could not cache AI insights: {e}")
+                save_ai_insight_cache(
+                    user,
+                    ai_insights,
+                    subject=subject,
+                    engine=engine,
+                    tokens_used=actual_tokens,  # Real tokens from API
+                    language=target_language,
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                )
             
             # ============================================================================
             # STEP 4: RETURN RESULTS
@@ -544,6 +475,7 @@ class StudentLearningInsightAdmin(admin.ModelAdmin):
                 'subject': subject or 'All Subjects',
                 'engine': engine,
                 'cached': cache_hit,  # Was this from cache?
+                'stale': cache_hit and cache_stale,  # Served stale, refresh queued
                 'cache_source': 'database' if cache_hit else 'ai_model',
                 'timestamp': timezone.now().isoformat()
             })
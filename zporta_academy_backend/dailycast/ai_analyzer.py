@@ -5,7 +5,6 @@ Reduces API costs by processing data locally before generating recommendations
 """
 import logging
 import json
-from datetime import timedelta
 from typing import Dict, List, Optional
 from collections import Counter, defaultdict
 from pathlib import Path
@@ -43,344 +42,17 @@ class UserLearningAnalyzer:
         self.user = user
         self.analysis_data = {}
         
-    def collect_user_learning_data(self) -> Dict:
+    def collect_user_learning_data(self, use_cache: bool = True) -> Dict:
         """
         Collect comprehensive learning data from all app sources.
+        Served from CachedUserAnalytics while fresh (see dailycast.learning_data).
         """
-        from dailycast.services_interactive import collect_user_stats
-        
-        # Get base stats from existing function
-        stats = collect_user_stats(self.user)
-        
-        # Enhanced data collection
-        data = {
-            'user_id': self.user.id,
-            'username': self.user.username,
-            'timestamp': timezone.now().isoformat(),
-            
-            # Course enrollment data
-            'enrolled_courses': stats.get('enrolled_courses', []),
-            'total_courses': len(stats.get('enrolled_courses', [])),
-            
-            # Activity data
-            'lessons_completed': stats.get('lessons_completed', 0),
-            'notes_count': stats.get('notes_count', 0),
-            'quizzes_completed': stats.get('quizzes_completed', 0),
-            'total_points': stats.get('total_points', 0),
-            
-            # Time-based activity
-            'recent_activity': self._get_recent_activity_summary(),
-            
-            # Performance metrics
-            'quiz_accuracy': self._calculate_quiz_accuracy(),
-            'completion_rate': self._calculate_completion_rate(),
-            
-            # Learning patterns
-            'active_days': self._count_active_days(),
-            'study_streak': self._calculate_study_streak(),
-            'preferred_time': self._detect_preferred_study_time(),
-            
-            # Weak areas
-            'weak_topics': self._identify_weak_topics(),
-            'strong_topics': self._identify_strong_topics(),
-            
-            # Course progress
-            'course_progress': self._get_course_progress_details(),
-        }
+        from dailycast.learning_data import get_learning_data
         
+        data = get_learning_data(self.user, refresh=not use_cache)
         self.analysis_data = data
         return data
     
-    def _get_recent_activity_summary(self) -> Dict:
-        """Get activity summary for last 7/30 days."""
-        try:
-            from analytics.models import ActivityEvent
-            
-            now = timezone.now()
-            week_ago = now - timedelta(days=7)
-            month_ago = now - timedelta(days=30)
-            
-            week_events = ActivityEvent.objects.filter(
-                user=self.user,
-                timestamp__gte=week_ago
-            )
-            
-            month_events = ActivityEvent.objects.filter(
-                user=self.user,
-                timestamp__gte=month_ago
-            )
-            
-            return {
-                'last_7_days': {
-                    'total_events': week_events.count(),
-                    'lessons': week_events.filter(event_type='lesson_completed').count(),
-                    'quizzes': week_events.filter(event_type='quiz_completed').count(),
-                },
-                'last_30_days': {
-                    'total_events': month_events.count(),
-                    'lessons': month_events.filter(event_type='lesson_completed').count(),
-                    'quizzes': month_events.filter(event_type='quiz_completed').count(),
-                }
-            }
-        except Exception as e:
-            logger.warning(f"Could not get recent activity: {e}")
-            return {'last_7_days': {}, 'last_30_days': {}}
-    
-    def _calculate_quiz_accuracy(self) -> float:
-        """Calculate average quiz score (percentage of correct answers)."""
-        try:
-            from analytics.models import QuizAttempt, QuizSessionProgress
-            
-            # Try to calculate from QuizSessionProgress (more accurate)
-            sessions = QuizSessionProgress.objects.filter(
-                user=self.user,
-                status='completed'
-            )
-            
-            if sessions.exists():
-                accuracies = []
-                for session in sessions:
-                    if session.total_questions > 0:
-                        accuracy = (session.correct_count / session.total_questions) * 100
-                        accuracies.append(accuracy)
-                
-                if accuracies:
-                    return sum(accuracies) / len(accuracies)
-            
-            # Fallback: count correct attempts
-            total_attempts = QuizAttempt.objects.filter(user=self.user).count()
-            if total_attempts == 0:
-                return 0.0
-            
-            correct_attempts = QuizAttempt.objects.filter(user=self.user, is_correct=True).count()
-            return (correct_attempts / total_attempts) * 100 if total_attempts > 0 else 0.0
-            
-        except Exception as e:
-            logger.warning(f"Could not calculate quiz accuracy: {e}")
-            return 0.0
-    
-    def _calculate_completion_rate(self) -> float:
-        """Calculate course completion rate."""
-        try:
-            from enrollment.models import Enrollment
-            
-            enrollments = Enrollment.objects.filter(user=self.user)
-            if not enrollments.exists():
-                return 0.0
-            
-            total = enrollments.count()
-            completed = enrollments.filter(status='completed').count()
-            
-            return (completed / total * 100) if total > 0 else 0.0
-            
-        except Exception as e:
-            logger.warning(f"Could not calculate completion rate: {e}")
-            return 0.0
-    
-    def _count_active_days(self) -> int:
-        """Count unique days user was active in last 30 days."""
-        try:
-            from analytics.models import ActivityEvent
-            
-            thirty_days_ago = timezone.now() - timedelta(days=30)
-            events = ActivityEvent.objects.filter(
-                user=self.user,
-                timestamp__gte=thirty_days_ago
-            )
-            
-            unique_dates = events.values_list('timestamp__date', flat=True).distinct()
-            return len(unique_dates)
-            
-        except Exception as e:
-            logger.warning(f"Could not count active days: {e}")
-            return 0
-    
-    def _calculate_study_streak(self) -> int:
-        """Calculate current consecutive days of activity."""
-        try:
-            from analytics.models import ActivityEvent
-            
-            now = timezone.now()
-            streak = 0
-            
-            for i in range(365):  # Check up to 1 year back
-                check_date = (now - timedelta(days=i)).date()
-                has_activity = ActivityEvent.objects.filter(
-                    user=self.user,
-                    timestamp__date=check_date
-                ).exists()
-                
-                if has_activity:
-                    streak += 1
-                else:
-                    break  # Streak broken
-            
-            return streak
-            
-        except Exception as e:
-            logger.warning(f"Could not calculate streak: {e}")
-            return 0
-    
-    def _detect_preferred_study_time(self) -> str:
-        """Detect when user typically studies."""
-        try:
-            from analytics.models import ActivityEvent
-            
-            month_ago = timezone.now() - timedelta(days=30)
-            events = ActivityEvent.objects.filter(
-                user=self.user,
-                timestamp__gte=month_ago
-            )
-            
-            hours = [e.timestamp.hour for e in events]
-            if not hours:
-                return "unknown"
-            
-            avg_hour = sum(hours) / len(hours)
-            
-            if 6 <= avg_hour < 12:
-                return "morning"
-            elif 12 <= avg_hour < 18:
-                return "afternoon"
-            elif 18 <= avg_hour < 23:
-                return "evening"
-            else:
-                return "night"
-                
-        except Exception as e:
-            logger.warning(f"Could not detect study time: {e}")
-            return "unknown"
-    
-    def _identify_weak_topics(self) -> List[Dict]:
-        """Identify topics where user struggles."""
-        try:
-            from analytics.models import QuizSessionProgress
-            from courses.models import Course
-            
-            # Get completed quiz sessions
-            sessions = QuizSessionProgress.objects.filter(
-                user=self.user,
-                status='completed'
-            ).select_related('quiz')
-            
-            # Group by course/topic and calculate average scores
-            topic_scores = defaultdict(list)
-            
-            for session in sessions:
-                if session.total_questions > 0 and session.quiz:
-                    accuracy = (session.correct_count / session.total_questions) * 100
-                    # Safely get course title
-                    topic_name = 'Unknown'
-                    if hasattr(session.quiz, 'course') and session.quiz.course:
-                        topic_name = session.quiz.course.title if hasattr(session.quiz.course, 'title') else 'Unknown'
-                    topic_scores[topic_name].append(accuracy)
-            
-            # Find topics with scores below 70%
-            weak_topics = []
-            for topic, scores in topic_scores.items():
-                if scores:
-                    avg_score = sum(scores) / len(scores)
-                    if avg_score < 70:
-                        weak_topics.append({
-                            'topic': topic,
-                            'avg_score': round(avg_score, 1),
-                            'attempts': len(scores)
-                        })
-            
-            # Sort by score (weakest first)
-            weak_topics.sort(key=lambda x: x['avg_score'])
-            return weak_topics[:5]  # Top 5 weak areas
-            
-        except Exception as e:
-            logger.warning(f"Could not identify weak topics: {e}")
-            return []
-    
-    def _identify_strong_topics(self) -> List[Dict]:
-        """Identify topics where user excels."""
-        try:
-            from analytics.models import QuizSessionProgress
-            from courses.models import Course
-            
-            # Get completed quiz sessions
-            sessions = QuizSessionProgress.objects.filter(
-                user=self.user,
-                status='completed'
-            ).select_related('quiz')
-            
-            topic_scores = defaultdict(list)
-            
-            for session in sessions:
-                if session.total_questions > 0 and session.quiz:
-                    accuracy = (session.correct_count / session.total_questions) * 100
-                    # Safely get course title
-                    topic_name = 'Unknown'
-                    if hasattr(session.quiz, 'course') and session.quiz.course:
-                        topic_name = session.quiz.course.title if hasattr(session.quiz.course, 'title') else 'Unknown'
-                    topic_scores[topic_name].append(accuracy)
-            
-            # Find topics with scores above 85%
-            strong_topics = []
-            for topic, scores in topic_scores.items():
-                if scores:
-                    avg_score = sum(scores) / len(scores)
-                    if avg_score >= 85:
-                        strong_topics.append({
-                            'topic': topic,
-                            'avg_score': round(avg_score, 1),
-                            'attempts': len(scores)
-                        })
-            
-            # Sort by score (strongest first)
-            strong_topics.sort(key=lambda x: x['avg_score'], reverse=True)
-            return strong_topics[:5]
-            
-        except Exception as e:
-            logger.warning(f"Could not identify strong topics: {e}")
-            return []
-    
-    def _get_course_progress_details(self) -> List[Dict]:
-        """Get detailed progress for each enrolled course."""
-        try:
-            from enrollment.models import Enrollment
-            from lessons.models import LessonCompletion
-            
-            enrollments = Enrollment.objects.filter(user=self.user)
-            
-            progress_list = []
-            for enrollment in enrollments:
-                # Get the course from the generic foreign key
-                course = enrollment.content_object
-                
-                # Only process if this is a course enrollment
-                if not hasattr(course, 'lessons'):
-                    continue
-                
-                # Count lessons in course
-                total_lessons = course.lessons.count()
-                
-                # Count completed lessons
-                completed_lessons = LessonCompletion.objects.filter(
-                    user=self.user,
-                    lesson__course=course
-                ).count() if total_lessons > 0 else 0
-                
-                progress_pct = (completed_lessons / total_lessons * 100) if total_lessons > 0 else 0
-                
-                progress_list.append({
-                    'course_id': course.id,
-                    'course_title': getattr(course, 'title', str(course)),
-                    'total_lessons': total_lessons,
-                    'completed_lessons': completed_lessons,
-                    'progress_percent': round(progress_pct, 1),
-                    'enrollment_date': enrollment.enrollment_date.isoformat() if enrollment.enrollment_date else None
-                })
-            
-            return progress_list
-            
-        except Exception as e:
-            logger.warning(f"Could not get course progress: {e}")
-            return []
-    
     def generate_recommendations(self) -> Dict:
         """
         Generate personalized study recommendations using local analytics.
@@ -3,14 +3,11 @@ Analytics Tracker: Monitor token usage, cache hits, costs, and performance.
 Real-time metrics for the admin dashboard.
 """
 
-import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from datetime import datetime
+from typing import Dict
 from decimal import Decimal
 
-from django.contrib.auth.models import User
-from django.core.cache import cache
-from django.utils import timezone
+from dailycast import counters
 
 
 class AnalyticsTracker:
@@ -21,6 +18,9 @@ class AnalyticsTracker:
     - Cost estimates (tokens × rate)
     - Request counts and speeds
     - Error rates
+    
+    Each metric is a hash of atomic counters (dailycast.counters), so
+    concurrent workers never overwrite each other's increments.
     """
     
     # Pricing (adjust as needed)
@@ -28,6 +28,7 @@ class AnalyticsTracker:
     
     # Cache prefix
     PREFIX = "analytics:"
+    METRICS_TIMEOUT = 86400 * 7  # 7 days
     
     def __init__(self):
         pass
@@ -42,38 +43,31 @@ class AnalyticsTracker:
     
     def track_preprocess(self, user_id: int, input_tokens: int, output_tokens: int) -> None:
         """Track preprocessing metrics."""
-        key = self._get_key(user_id, "preprocess")
-        data = cache.get(key, {"count": 0, "input": 0, "output": 0})
-        data["count"] += 1
-        data["input"] += input_tokens
-        data["output"] += output_tokens
-        cache.set(key, data, timeout=86400 * 7)  # 7 days
+        counters.hincr(
+            self._get_key(user_id, "preprocess"),
+            {"count": 1, "input": input_tokens, "output": output_tokens},
+            timeout=self.METRICS_TIMEOUT,
+        )
     
     def track_feedback(self, user_id: int, input_tokens: int, output_tokens: int, cached: bool = False) -> None:
         """Track feedback/LLM call metrics."""
-        key = self._get_key(user_id, "feedback")
-        data = cache.get(key, {"count": 0, "input": 0, "output": 0, "cached": 0})
-        data["count"] += 1
-        data["input"] += input_tokens
-        data["output"] += output_tokens
-        if cached:
-            data["cached"] += 1
-        cache.set(key, data, timeout=86400 * 7)
+        counters.hincr(
+            self._get_key(user_id, "feedback"),
+            {"count": 1, "input": input_tokens, "output": output_tokens, "cached": int(cached)},
+            timeout=self.METRICS_TIMEOUT,
+        )
     
     def track_audio(self, user_id: int, duration_seconds: int) -> None:
         """Track audio generation metrics."""
-        key = self._get_key(user_id, "audio")
-        data = cache.get(key, {"count": 0, "total_seconds": 0})
-        data["count"] += 1
-        data["total_seconds"] += duration_seconds
-        cache.set(key, data, timeout=86400 * 7)
+        counters.hincr(
+            self._get_key(user_id, "audio"),
+            {"count": 1, "total_seconds": duration_seconds},
+            timeout=self.METRICS_TIMEOUT,
+        )
     
     def track_error(self, user_id: int, error_type: str) -> None:
         """Track error occurrences."""
-        key = self._get_key(user_id, "errors")
-        data = cache.get(key, {})
-        data[error_type] = data.get(error_type, 0) + 1
-        cache.set(key, data, timeout=86400 * 7)
+        counters.hincr(self._get_key(user_id, "errors"), {error_type: 1}, timeout=self.METRICS_TIMEOUT)
     
     def get_user_daily_metrics(self, user_id: int) -> Dict:
         """Get all metrics for a user today."""
@@ -82,10 +76,10 @@ class AnalyticsTracker:
         audio_key = self._get_key(user_id, "audio")
         error_key = self._get_key(user_id, "errors")
         
-        preprocess_data = cache.get(preprocess_key, {})
-        feedback_data = cache.get(feedback_key, {})
-        audio_data = cache.get(audio_key, {})
-        error_data = cache.get(error_key, {})
+        preprocess_data = counters.hgetall(preprocess_key)
+        feedback_data = counters.hgetall(feedback_key)
+        audio_data = counters.hgetall(audio_key)
+        error_data = counters.hgetall(error_key)
         
         # Calculate totals
         total_input_tokens = preprocess_data.get("input", 0) + feedback_data.get("input", 0)
@@ -5,3 +5,6 @@ class DailycastConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "dailycast"
     verbose_name = "Dailycast"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,307 @@
+"""
+Batch podcast pipeline: daily podcasts for a cohort of users.
+
+create_podcast_for_user() does stats -> LLM -> TTS serially for one user.
+For a cohort, the slow parts are provider calls, so the pipeline overlaps them:
+
+  1. Script stage: LLM calls fan out on a thread pool. Each provider has its
+     own concurrency cap (DAILYCAST_BATCH_LLM_CONCURRENCY), so throughput is
+     bounded by provider quotas rather than by one request at a time.
+  2. Audio stage: each finished script goes to a separate TTS pool
+     (DAILYCAST_BATCH_TTS_WORKERS). The MP3 stream is copied to storage in
+     chunks (services.save_audio_stream).
+
+Pool threads only talk to providers and storage; all database work (progress,
+DailyPodcast rows) stays on the calling thread. Every user has a
+PodcastBatchItem with its own status, timings and error, and one failure
+never stops the batch: errors are caught per item, and a chunk task that
+still fails marks its unfinished items failed instead of raising, so the
+chord callback always closes the batch.
+
+Entry points:
+  - start_podcast_batch(): create the batch and dispatch a Celery chord of
+    chunk tasks (or run it inline)
+  - run_batch_items(): the pipeline for one chunk
+  - manage.py generate_batch_podcasts (--fake for an offline benchmark)
+
+Caps apply per process: a chunk task, or the inline command. With several
+Celery workers taking chunks at once, the provider-wide concurrency is cap x
+worker concurrency on the queue the batch tasks run on.
+"""
+
+import io
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.utils import timezone
+
+from dailycast.models import DailyPodcast, PodcastBatch, PodcastBatchItem
+from dailycast.services import (
+    collect_user_stats,
+    estimate_duration_seconds,
+    generate_podcast_script,
+    open_audio_stream,
+    save_audio_stream,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LLM_CONCURRENCY = {"openai": 8, "gemini": 4, "fake": 16, "default": 4}
+DEFAULT_TTS_WORKERS = 4
+DEFAULT_CHUNK_SIZE = 50
+
+
+class ProviderLimiter:
+    """Per-provider concurrency caps shared by the threads of one pipeline run."""
+
+    def __init__(self, caps: dict | None = None):
+        self.caps = dict(DEFAULT_LLM_CONCURRENCY)
+        self.caps.update(caps or getattr(settings, "DAILYCAST_BATCH_LLM_CONCURRENCY", {}))
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, provider: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if provider not in self._semaphores:
+                cap = self.caps.get(provider, self.caps["default"])
+                self._semaphores[provider] = threading.BoundedSemaphore(max(1, cap))
+            return self._semaphores[provider]
+
+    @contextmanager
+    def slot(self, provider: str):
+        with self._semaphore(provider):
+            yield
+
+    @property
+    def total(self) -> int:
+        """Enough pool threads to fill every provider's cap."""
+        return sum(cap for name, cap in self.caps.items() if name != "default")
+
+
+class RealProviders:
+    """The providers create_podcast_for_user uses (LLM fallback chain, Polly)."""
+
+    def script(self, user, language, stats, limiter):
+        return generate_podcast_script(user, language, stats, limiter=limiter)
+
+    def audio(self, script_text, language):
+        return open_audio_stream(script_text, language)
+
+
+class FakeProviders:
+    """
+    Local stand-ins with fixed latencies, to benchmark the pipeline offline.
+    Podcasts are stored with provider "fake".
+    """
+
+    def __init__(self, llm_latency=0.2, tts_latency=0.1, audio_bytes=256 * 1024):
+        self.llm_latency = llm_latency
+        self.tts_latency = tts_latency
+        self.audio_bytes = audio_bytes
+
+    def script(self, user, language, stats, limiter):
+        with limiter.slot("fake"):
+            time.sleep(self.llm_latency)
+        words = " ".join(["practice"] * 700)
+        return f"Hello {user.username}, here is today's {language} review. {words}", "fake"
+
+    def audio(self, script_text, language):
+        time.sleep(self.tts_latency)
+        return io.BytesIO(b"\xff\xfb" * (self.audio_bytes // 2)), "fake"
+
+
+def _elapsed_ms(started):
+    return int((time.monotonic() - started) * 1000)
+
+
+def _script_job(providers, limiter, user, language, stats):
+    started = time.monotonic()
+    text, provider = providers.script(user, language, stats, limiter)
+    return text, provider, _elapsed_ms(started)
+
+
+def _audio_job(providers, user_id, script_text, language):
+    """Synthesize and upload; returns (stored file name or None, provider, ms)."""
+    started = time.monotonic()
+    stream, provider = providers.audio(script_text, language)
+    name = None
+    if stream is not None:
+        # Unbound FileField file: storage upload happens here, the row is saved by the caller
+        field_file = DailyPodcast(user_id=user_id).audio_file
+        if save_audio_stream(field_file, f"podcast_{user_id}_{int(time.time())}.mp3", stream):
+            name = field_file.name
+    return name, provider, _elapsed_ms(started)
+
+
+def _finish_item(item, status, **fields):
+    now = timezone.now()
+    PodcastBatchItem.objects.filter(pk=item.pk).update(status=status, finished_at=now, **fields)
+    counter = "completed" if status == PodcastBatchItem.STATUS_COMPLETED else "failed"
+    PodcastBatch.objects.filter(pk=item.batch_id).update(**{counter: F(counter) + 1})
+
+
+def run_batch_items(batch, item_ids=None, providers=None, tts_workers=None) -> dict:
+    """
+    Run the pipeline for the batch's pending items (optionally only `item_ids`).
+    Returns {"completed": n, "failed": n}.
+    """
+    items = batch.items.filter(status=PodcastBatchItem.STATUS_PENDING).select_related("user")
+    if item_ids is not None:
+        items = items.filter(pk__in=item_ids)
+    items = list(items)
+    if providers is None:
+        providers = FakeProviders() if batch.fake_providers else RealProviders()
+    limiter = ProviderLimiter()
+    tts_workers = tts_workers or getattr(settings, "DAILYCAST_BATCH_TTS_WORKERS", DEFAULT_TTS_WORKERS)
+    language = batch.language
+    result = {"completed": 0, "failed": 0}
+
+    def fail(item, exc, stage):
+        logger.warning("Dailycast batch %s: user %s failed at %s: %s", batch.pk, item.user_id, stage, exc)
+        _finish_item(item, PodcastBatchItem.STATUS_FAILED, error_message=f"{stage}: {exc}"[:2000])
+        result["failed"] += 1
+
+    llm_pool = ThreadPoolExecutor(max_workers=max(1, limiter.total), thread_name_prefix="dailycast-llm")
+    tts_pool = ThreadPoolExecutor(max_workers=max(1, tts_workers), thread_name_prefix="dailycast-tts")
+    try:
+        pending = {}  # future -> (stage, item, context)
+        now = timezone.now()
+        PodcastBatchItem.objects.filter(pk__in=[i.pk for i in items]).update(
+            status=PodcastBatchItem.STATUS_SCRIPTING, started_at=now,
+        )
+        for item in items:
+            try:
+                stats = collect_user_stats(item.user)
+            except Exception as exc:  # noqa: BLE001
+                fail(item, exc, "stats")
+                continue
+            future = llm_pool.submit(_script_job, providers, limiter, item.user, language, stats)
+            pending[future] = ("script", item, None)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, item, context = pending.pop(future)
+                try:
+                    value = future.result()
+                    if stage == "script":
+                        script_text, llm_provider, llm_ms = value
+                        PodcastBatchItem.objects.filter(pk=item.pk).update(
+                            status=PodcastBatchItem.STATUS_SYNTHESIZING, llm_ms=llm_ms,
+                        )
+                        audio = tts_pool.submit(_audio_job, providers, item.user_id, script_text, language)
+                        pending[audio] = ("audio", item, (script_text, llm_provider))
+                        continue
+
+                    stage = "save"
+                    audio_name, tts_provider, tts_ms = value
+                    script_text, llm_provider = context
+                    podcast = DailyPodcast.objects.create(
+                        user_id=item.user_id,
+                        primary_language=language,
+                        script_text=script_text,
+                        llm_provider=llm_provider,
+                        tts_provider=tts_provider,
+                        audio_file=audio_name,
+                        duration_seconds=estimate_duration_seconds(script_text),
+                        status=DailyPodcast.STATUS_COMPLETED,
+                        requested_by_user=False,
+                        requested_by=batch.requested_by,
+                        user_request_type="celery_task",
+                    )
+                    _finish_item(item, PodcastBatchItem.STATUS_COMPLETED, podcast=podcast, tts_ms=tts_ms)
+                except Exception as exc:  # noqa: BLE001
+                    fail(item, exc, stage)
+                    continue
+                result["completed"] += 1
+    finally:
+        llm_pool.shutdown(wait=True, cancel_futures=True)
+        tts_pool.shutdown(wait=True, cancel_futures=True)
+    return result
+
+
+UNFINISHED_STATUSES = [
+    PodcastBatchItem.STATUS_PENDING,
+    PodcastBatchItem.STATUS_SCRIPTING,
+    PodcastBatchItem.STATUS_SYNTHESIZING,
+]
+
+
+def fail_unfinished_items(batch_id, item_ids=None, reason="not run") -> int:
+    """Mark items that never reached a final status as failed; returns how many."""
+    items = PodcastBatchItem.objects.filter(batch_id=batch_id, status__in=UNFINISHED_STATUSES)
+    if item_ids is not None:
+        items = items.filter(pk__in=item_ids)
+    count = items.update(
+        status=PodcastBatchItem.STATUS_FAILED, error_message=reason[:2000], finished_at=timezone.now(),
+    )
+    if count:
+        PodcastBatch.objects.filter(pk=batch_id).update(failed=F("failed") + count)
+    return count
+
+
+def finish_batch(batch_id) -> PodcastBatch:
+    """
+    Close a batch once every chunk has run: "completed" with no failures,
+    "failed" when nothing succeeded, otherwise "partial".
+    """
+    fail_unfinished_items(batch_id, reason="unfinished when the batch closed")
+    batch = PodcastBatch.objects.get(pk=batch_id)
+    if not batch.failed:
+        batch.status = PodcastBatch.STATUS_COMPLETED
+    elif batch.completed:
+        batch.status = PodcastBatch.STATUS_PARTIAL
+    else:
+        batch.status = PodcastBatch.STATUS_FAILED
+    batch.finished_at = timezone.now()
+    batch.save(update_fields=["status", "finished_at"])
+    return batch
+
+
+def create_batch(user_ids, language=None, fake=False, requested_by=None) -> PodcastBatch:
+    User = get_user_model()
+    user_ids = list(User.objects.filter(pk__in=user_ids, is_active=True).values_list("pk", flat=True))
+    batch = PodcastBatch.objects.create(
+        language=language or getattr(settings, "DAILYCAST_DEFAULT_LANGUAGE", "en"),
+        fake_providers=fake,
+        total=len(user_ids),
+        requested_by=requested_by,
+    )
+    PodcastBatchItem.objects.bulk_create(
+        [PodcastBatchItem(batch=batch, user_id=user_id) for user_id in user_ids], batch_size=1000,
+    )
+    return batch
+
+
+def start_podcast_batch(user_ids, language=None, fake=False, requested_by=None,
+                        run_async=True, chunk_size=None) -> PodcastBatch:
+    """
+    Create a batch for `user_ids` and run it: as a Celery chord of chunk tasks
+    followed by finish_podcast_batch (default), or inline in this process.
+    """
+    from celery import chord
+
+    from dailycast.tasks import finish_podcast_batch, run_podcast_batch_chunk
+
+    batch = create_batch(user_ids, language=language, fake=fake, requested_by=requested_by)
+    batch.status = PodcastBatch.STATUS_RUNNING
+    batch.started_at = timezone.now()
+    batch.save(update_fields=["status", "started_at"])
+
+    if not run_async:
+        run_batch_items(batch)
+        return finish_batch(batch.pk)
+
+    chunk_size = chunk_size or getattr(settings, "DAILYCAST_BATCH_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+    item_ids = list(batch.items.values_list("pk", flat=True))
+    chunks = [item_ids[i:i + chunk_size] for i in range(0, len(item_ids), chunk_size)]
+    if not chunks:
+        return finish_batch(batch.pk)
+    chord(run_podcast_batch_chunk.s(batch.pk, chunk) for chunk in chunks)(finish_podcast_batch.s(batch.pk))
+    return batch
@@ -9,253 +9,63 @@ Purpose:
   - Track cache hits/misses for optimization
   - Save tokens and reduce API costs
 
-How It Works:
+How It Works (stale-while-revalidate):
   1. Check if cached result exists for this user + subject + engine
-  2. If cache is fresh (not expired), return cached result
-  3. If cache is stale or missing, run AI analysis
-  4. Store new result in cache with timestamp
-  5. Return cached result to frontend
+  2. If it exists, return it - fresh or stale
+  3. A stale hit is flagged needs_refresh; refresh_stale_insights() (Celery
+     beat, dailycast.refresh_stale_ai_insights) regenerates it in the
+     background and re-stamps expires_at
+  4. Only a miss runs AI analysis on the request
 
-Cache Structure:
+Read path:
+  One SELECT and one UPDATE by primary key. hits / tokens_saved move with
+  F() expressions (and needs_refresh rides along on a stale hit), so the
+  request never reads-modifies-writes the row. Daily totals go to
+  dailycast.counters.
+
+Refresher:
+  - claims up to DAILYCAST_INSIGHT_REFRESH_BATCH flagged rows under a row
+    lock (SELECT ... FOR UPDATE SKIP LOCKED) and stamps a lease
+    (refresh_claimed_until), so concurrent beats never take the same row; a
+    worker that dies just lets its lease run out
+  - regenerates on DAILYCAST_INSIGHT_REFRESH_WORKERS threads
+  - reserves tokens against a daily per-engine budget
+    (DAILYCAST_INSIGHT_REFRESH_DAILY_TOKENS); over budget, the row stays
+    flagged and keeps being served stale until tomorrow's budget
+  - a failed generation keeps the old insights; the lease doubles as back-off
+
+Cache Structure (dailycast.models):
   - CachedAIInsight: Stores AI analysis results (11 sections)
   - CachedUserAnalytics: Stores user learning analytics data
   - CacheStatistics: Tracks cache performance metrics
 """
 
 import logging
-import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import timedelta
-from django.db import models
-from django.contrib.auth import get_user_model
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
 from django.utils import timezone
 
-User = get_user_model()
+from dailycast import counters
+from dailycast.counters import record_cache_stats
+from dailycast.models import CachedAIInsight, CachedUserAnalytics, CacheStatistics
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_TOKEN_ESTIMATE = 1500  # when a generation reported no usage
+DEFAULT_REFRESH_BATCH = 20
+DEFAULT_REFRESH_WORKERS = 4
+DEFAULT_LEASE_SECONDS = 15 * 60
+DEFAULT_DAILY_TOKENS = {'default': 500_000}
+BUDGET_KEY = "dailycast:insight_refresh_tokens:{}:{}"  # engine, date
+BUDGET_TIMEOUT = 60 * 60 * 48
 
-class CachedAIInsight(models.Model):
-    """
-    Stores AI-generated insights (comprehensive learning analysis) to avoid re-generating.
-    Reduces token usage significantly by reusing analysis results.
-    
-    Key Fields:
-    - user: Which student
-    - subject: Which subject (empty = all subjects)
-    - engine: Which AI model (gemini, gpt-4o, etc)
-    - ai_insights: Full JSON response from AI (11 sections)
-    - tokens_saved: Estimated tokens saved by using this cache
-    - hits: Number of times this cache was reused
-    - created_at: When the analysis was first run
-    - expires_at: When cache should be refreshed
-    """
-    
-    SUBJECT_CHOICES = [
-        ('', 'All Subjects'),
-        ('English', 'English'),
-        ('Math', 'Math'),
-        ('Science', 'Science'),
-        ('History', 'History'),
-        ('Spanish', 'Spanish'),
-        ('French', 'French'),
-        ('Japanese', 'Japanese'),
-    ]
-    
-    ENGINE_CHOICES = [
-        ('gemini-2.0-flash-exp', '⚡ Gemini 2.0 Flash (Fast)'),
-        ('gemini-2.0-pro-exp', '✨ Gemini 2.0 Pro (Best)'),
-        ('gemini-1.5-pro', '🔧 Gemini 1.5 Pro'),
-        ('gpt-4o-mini', '⚡ GPT-4o Mini (Fast)'),
-        ('gpt-4o', '🎯 GPT-4o (Balanced)'),
-        ('gpt-4-turbo', '🚀 GPT-4 Turbo (Best)'),
-    ]
-    
-    user = models.ForeignKey(
-        User,
-        on_delete=models.CASCADE,
-        related_name='cached_ai_insights',
-        db_index=True,
-        help_text="Student whose insights are cached"
-    )
-    
-    subject = models.CharField(
-        max_length=50,
-        default='',
-        blank=True,
-        help_text="Subject focus (empty = all subjects)"
-    )
-    
-    engine = models.CharField(
-        max_length=50,
-        default='gemini-2.0-flash-exp',
-        choices=ENGINE_CHOICES,
-        help_text="Which AI engine was used"
-    )
-    
-    # The actual cached AI analysis result (JSON with 11 sections)
-    ai_insights = models.JSONField(
-        help_text="Full AI analysis: summary, assessment, vocabulary_gaps, grammar_analysis, quiz_recommendations, difficulty_progression, external_resources, study_guide, learning_journey, specific_actions, potential_struggles"
-    )
-    
-    # Cache performance metrics
-    tokens_used = models.IntegerField(
-        default=0,
-        help_text="Approximate tokens used to generate this analysis"
-    )
-    
-    tokens_saved = models.IntegerField(
-        default=0,
-        help_text="Tokens saved by reusing this cache instead of regenerating"
-    )
-    
-    hits = models.IntegerField(
-        default=0,
-        help_text="Number of times this cached result was reused"
-    )
-    
-    # Cache lifetime
-    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
-    updated_at = models.DateTimeField(auto_now=True)  # Track when cache was last updated
-    expires_at = models.DateTimeField(
-        db_index=True,
-        help_text="When this cache should be refreshed (24 hours after creation)"
-    )
-    needs_refresh = models.BooleanField(
-        default=False,
-        help_text="Flag to indicate cache should be refreshed on next opportunity"
-    )
-    
-    class Meta:
-        verbose_name = "Cached AI Insight"
-        verbose_name_plural = "💾 Cached AI Insights"
-        indexes = [
-            models.Index(fields=['user', 'subject', 'engine']),
-            models.Index(fields=['expires_at']),
-            models.Index(fields=['created_at', '-hits']),
-        ]
-        ordering = ['-created_at']
-        unique_together = ['user', 'subject', 'engine']  # Only one cache per user+subject+engine
-    
-    def __str__(self):
-        return f"Cache: {self.user.username} - {self.subject or 'All'} ({self.engine}) - {self.hits} hits"
-    
-    def is_fresh(self):
-        """Check if cache is still valid (not expired)."""
-        return timezone.now() < self.expires_at
-    
-    def mark_as_used(self):
-        """Increment hit counter when cache is used."""
-        self.hits += 1
-        self.tokens_saved += self.tokens_used  # Each reuse saves tokens
-        self.save(update_fields=['hits', 'tokens_saved'])
-        logger.info(f"✓ Cache hit for {self.user.username} ({self.subject or 'All'}): {self.hits} hits, {self.tokens_saved} tokens saved")
-
-
-class CachedUserAnalytics(models.Model):
-    """
-    Stores collected user analytics data (courses, lessons, quizzes, notes, etc.)
-    to avoid re-querying database for the same information.
-    
-    Reduces database queries and improves page load speed.
-    
-    Key Fields:
-    - user: Which student
-    - analytics_data: Full collected learning data (JSON)
-    - last_updated: When this analytics data was last collected
-    - expires_at: When analytics should be refreshed
-    """
-    
-    user = models.OneToOneField(
-        User,
-        on_delete=models.CASCADE,
-        related_name='cached_analytics',
-        primary_key=True,
-        help_text="Student whose analytics are cached"
-    )
-    
-    # Full analytics data snapshot
-    analytics_data = models.JSONField(
-        help_text="Collected learning data: total_courses, lessons_completed, notes_count, quizzes_completed, quiz_accuracy, study_streak, active_days, enrolled_courses, weak_topics, strong_topics, recent_activity"
-    )
-    
-    # Lifecycle tracking
-    last_updated = models.DateTimeField(auto_now=True, db_index=True)
-    expires_at = models.DateTimeField(
-        db_index=True,
-        help_text="When analytics cache should be refreshed (updates daily)"
-    )
-    
-    # Usage stats
-    reads = models.IntegerField(
-        default=0,
-        help_text="How many times this cached analytics was used"
-    )
-    
-    class Meta:
-        verbose_name = "Cached User Analytics"
-        verbose_name_plural = "📊 Cached User Analytics"
-        indexes = [
-            models.Index(fields=['expires_at']),
-        ]
-    
-    def __str__(self):
-        return f"Analytics Cache: {self.user.username} - {self.reads} reads - {self.is_fresh()}"
-    
-    def is_fresh(self):
-        """Check if analytics cache is still valid."""
-        return timezone.now() < self.expires_at
-    
-    def mark_as_read(self):
-        """Increment read counter when cache is accessed."""
-        self.reads += 1
-        self.save(update_fields=['reads'])
-
-
-class CacheStatistics(models.Model):
-    """
-    Tracks overall cache performance and savings.
-    
-    Metrics:
-    - Total tokens saved across all cached insights
-    - Cache hit rate (hits / total requests)
-    - Average cache freshness
-    - API cost savings
-    """
-    
-    date = models.DateField(auto_now_add=True, unique=True, db_index=True)
-    
-    # AI Insights cache stats
-    ai_insights_generated = models.IntegerField(default=0, help_text="New AI analyses generated today")
-    ai_insights_cached = models.IntegerField(default=0, help_text="AI analyses served from cache today")
-    ai_insights_hits = models.IntegerField(default=0, help_text="Total cache hits for AI insights")
-    ai_tokens_used = models.IntegerField(default=0, help_text="Tokens used by new AI generations")
-    ai_tokens_saved = models.IntegerField(default=0, help_text="Tokens saved by cache reuse")
-    
-    # Analytics cache stats
-    analytics_generated = models.IntegerField(default=0, help_text="New analytics data collected today")
-    analytics_cached = models.IntegerField(default=0, help_text="Analytics served from cache today")
-    analytics_db_queries_saved = models.IntegerField(default=0, help_text="DB queries avoided by caching")
-    
-    class Meta:
-        verbose_name = "Cache Statistics"
-        verbose_name_plural = "📈 Cache Statistics"
-        ordering = ['-date']
-    
-    def __str__(self):
-        return f"Cache Stats - {self.date}"
-    
-    def cache_hit_rate(self):
-        """Calculate AI insights cache hit rate."""
-        total = self.ai_insights_generated + self.ai_insights_cached
-        if total == 0:
-            return 0
-        return (self.ai_insights_cached / total) * 100
-    
-    def cost_savings(self):
-        """Estimate API cost saved (rough calculation)."""
-        # Approximate: 1000 tokens ≈ $0.0001 for Gemini, $0.00015 for GPT-4o
-        # Using average of $0.000125 per 1000 tokens
-        savings = (self.ai_tokens_saved / 1000) * 0.000125
-        return f"~${savings:.4f}"
+
+def _insight_ttl():
+    return timedelta(hours=getattr(settings, 'DAILYCAST_AI_INSIGHT_CACHE_HOURS', 24))
 
 
 # ============================================================================
@@ -265,69 +75,66 @@ class CacheStatistics(models.Model):
 def get_cached_ai_insight(user, subject='', engine='gemini-2.0-flash-exp'):
     """
     Retrieve cached AI insight using stale-while-revalidate pattern.
-    
+
     Strategy:
     - If cache is fresh: return it immediately (serve from cache)
     - If cache is stale but exists: return it AND mark for background refresh
     - If cache doesn't exist: return None (requires fresh analysis)
-    
+
     Returns:
         - (True, cached_data, needs_refresh) if cache exists
         - (False, None, False) if cache doesn't exist
     """
-    try:
-        cache = CachedAIInsight.objects.get(
-            user=user,
-            subject=subject,
-            engine=engine
-        )
-        
-        is_fresh = cache.is_fresh()
-        
-        if is_fresh:
-            # Cache is fresh - use it and increment hits
-            cache.mark_as_used()
-            logger.info(f"✓ Cache HIT (fresh): {user.username} - {subject or 'All'} - {engine}")
-            # Update statistics
-            update_cache_stats(
-                ai_insights_cached=1,
-                ai_insights_hits=1,
-                ai_tokens_saved=cache.tokens_used
-            )
-            return True, cache.ai_insights, False
-        else:
-            # Cache is stale - use it but mark for refresh
-            cache.mark_as_used()
-            cache.needs_refresh = True
-            cache.save(update_fields=['needs_refresh', 'hits', 'tokens_saved'])
-            logger.info(f"⚠️ Cache HIT (stale): {user.username} - {subject or 'All'} - {engine} - MARKED FOR REFRESH")
-            # Update statistics
-            update_cache_stats(
-                ai_insights_cached=1,
-                ai_insights_hits=1,
-                ai_tokens_saved=cache.tokens_used
-            )
-            return True, cache.ai_insights, True  # Return cached data + refresh flag
-    
-    except CachedAIInsight.DoesNotExist:
+    cached = CachedAIInsight.objects.filter(
+        user=user,
+        subject=subject,
+        engine=engine
+    ).values('pk', 'ai_insights', 'tokens_used', 'expires_at', 'needs_refresh').first()
+
+    if cached is None:
         logger.info(f"✗ Cache MISS: {user.username} - {subject or 'All'} - {engine}")
         return False, None, False
 
+    stale = cached['expires_at'] <= timezone.now()
+    tokens_saved = cached['tokens_used'] or DEFAULT_TOKEN_ESTIMATE
+    updates = {
+        'hits': F('hits') + 1,
+        'tokens_saved': F('tokens_saved') + tokens_saved,
+    }
+    if stale and not cached['needs_refresh']:
+        updates['needs_refresh'] = True
+    CachedAIInsight.objects.filter(pk=cached['pk']).update(**updates)
+
+    if stale:
+        logger.info(f"⚠️ Cache HIT (stale): {user.username} - {subject or 'All'} - {engine} - MARKED FOR REFRESH")
+    else:
+        logger.info(f"✓ Cache HIT (fresh): {user.username} - {subject or 'All'} - {engine}")
+    update_cache_stats(
+        ai_insights_cached=1,
+        ai_insights_hits=1,
+        ai_tokens_saved=tokens_saved,
+        cost_saved_cents=CacheStatistics.estimate_cost(tokens_saved, engine),
+    )
+    return True, cached['ai_insights'], stale
+
 
-def save_ai_insight_cache(user, ai_insights, subject='', engine='gemini-2.0-flash-exp', tokens_used=0):
+def save_ai_insight_cache(user, ai_insights, subject='', engine='gemini-2.0-flash-exp', tokens_used=0,
+                          language='English', input_tokens=0, output_tokens=0):
     """
     Save AI insights to cache.
-    
+
     Args:
         user: User object
         ai_insights: Dict with 11 sections (summary, assessment, etc.)
         subject: Subject filter (empty = all)
         engine: AI engine used
         tokens_used: Approximate tokens consumed
+        language: Output language (the refresher regenerates in the same one)
+        input_tokens / output_tokens: Actual split, when the API reported it
     """
     try:
-        expires_at = timezone.now() + timedelta(hours=24)  # 24-hour cache
-        
+        expires_at = timezone.now() + _insight_ttl()
+
         cache, created = CachedAIInsight.objects.update_or_create(
             user=user,
             subject=subject,
@@ -335,60 +142,70 @@ def save_ai_insight_cache(user, ai_insights, subject='', engine='gemini-2.0-flas
             defaults={
                 'ai_insights': ai_insights,
                 'tokens_used': tokens_used,
+                'language': language,
                 'expires_at': expires_at,
+                'needs_refresh': False,
+                'refresh_claimed_until': None,
             }
         )
-        
+
         action = "Created" if created else "Updated"
         logger.info(f"✓ {action} cache for {user.username} - {subject or 'All'} - {engine}")
-        
+
         # Update statistics
-        update_cache_stats(ai_insights_generated=1, ai_tokens_used=tokens_used)
-        
+        _record_generation(engine, tokens_used, input_tokens, output_tokens)
+
         return cache
-    
+
     except Exception as e:
         logger.exception(f"Error saving AI insight cache: {e}")
         return None
 
 
+def _record_generation(engine, tokens_used, input_tokens=0, output_tokens=0):
+    if input_tokens > 0 and output_tokens > 0:
+        cost_cents = CacheStatistics.estimate_cost(
+            tokens_used, engine, input_tokens=input_tokens, output_tokens=output_tokens
+        )
+    else:
+        cost_cents = CacheStatistics.estimate_cost(tokens_used, engine)
+    update_cache_stats(ai_insights_generated=1, ai_tokens_used=tokens_used, cost_usd_cents=cost_cents)
+    return cost_cents
+
+
 def get_cached_user_analytics(user):
     """
     Retrieve cached user analytics if available and fresh.
-    
+
     Returns:
         - (True, analytics_data) if cache exists and is fresh
         - (False, None) if cache doesn't exist or is stale
     """
-    try:
-        cache = CachedUserAnalytics.objects.get(user=user)
-        
-        if cache.is_fresh():
-            cache.mark_as_read()
-            logger.info(f"✓ Analytics Cache HIT: {user.username}")
-            # Update statistics
-            update_cache_stats(analytics_cached=1)
-            return True, cache.analytics_data
-        else:
-            logger.info(f"⏱️ Analytics Cache EXPIRED: {user.username}")
-            return False, None
-    
-    except CachedUserAnalytics.DoesNotExist:
+    cached = CachedUserAnalytics.objects.filter(user=user).values('pk', 'analytics_data', 'expires_at').first()
+    if cached is None:
         logger.info(f"✗ Analytics Cache MISS: {user.username}")
         return False, None
+    if cached['expires_at'] <= timezone.now():
+        logger.info(f"⏱️ Analytics Cache EXPIRED: {user.username}")
+        return False, None
+
+    CachedUserAnalytics.objects.filter(pk=cached['pk']).update(reads=F('reads') + 1)
+    logger.info(f"✓ Analytics Cache HIT: {user.username}")
+    update_cache_stats(analytics_cached=1)
+    return True, cached['analytics_data']
 
 
 def save_user_analytics_cache(user, analytics_data):
     """
     Save user analytics to cache.
-    
+
     Args:
         user: User object
         analytics_data: Dict with collected learning data
     """
     try:
         expires_at = timezone.now() + timedelta(hours=24)  # Daily refresh
-        
+
         cache, created = CachedUserAnalytics.objects.update_or_create(
             user=user,
             defaults={
@@ -396,15 +213,15 @@ def save_user_analytics_cache(user, analytics_data):
                 'expires_at': expires_at,
             }
         )
-        
+
         action = "Created" if created else "Updated"
         logger.info(f"✓ {action} analytics cache for {user.username}")
-        
+
         # Update statistics
         update_cache_stats(analytics_generated=1)
-        
+
         return cache
-    
+
     except Exception as e:
         logger.exception(f"Error saving user analytics cache: {e}")
         return None
@@ -413,50 +230,37 @@ def save_user_analytics_cache(user, analytics_data):
 def update_cache_stats(**kwargs):
     """
     Update daily cache statistics.
-    
+
     Usage:
         update_cache_stats(ai_insights_cached=1, ai_tokens_saved=1000)
+
+    Counted in Redis (dailycast.counters) and written to CacheStatistics by
+    the periodic flush, so request threads never wait on the daily row.
     """
-    try:
-        today = timezone.now().date()
-        stats, created = CacheStatistics.objects.get_or_create(date=today)
-        
-        # Update fields
-        for field, value in kwargs.items():
-            if hasattr(stats, field):
-                current = getattr(stats, field)
-                setattr(stats, field, current + value)
-        
-        stats.save()
-    except Exception as e:
-        logger.exception(f"Error updating cache statistics: {e}")
+    record_cache_stats(**kwargs)
 
 
 def get_caches_needing_refresh():
     """
     Get all cached AI insights that are marked for refresh.
     Used for background refresh process to update stale caches.
-    
+
     Returns:
         QuerySet of CachedAIInsight objects with needs_refresh=True
     """
-    return CachedAIInsight.objects.filter(needs_refresh=True).order_by('updated_at')
+    return CachedAIInsight.objects.filter(needs_refresh=True).order_by('expires_at')
 
 
 def clear_refresh_flag(cache_id):
     """
-    Mark a cache item as refreshed (clear the needs_refresh flag).
-    
+    Mark a cache item as refreshed (clear the needs_refresh flag and its lease).
+
     Args:
         cache_id: ID of the CachedAIInsight object
     """
-    try:
-        cache = CachedAIInsight.objects.get(id=cache_id)
-        cache.needs_refresh = False
-        cache.updated_at = timezone.now()
-        cache.save(update_fields=['needs_refresh', 'updated_at'])
+    if CachedAIInsight.objects.filter(id=cache_id).update(needs_refresh=False, refresh_claimed_until=None):
         logger.info(f"✓ Refresh flag cleared for cache {cache_id}")
-    except CachedAIInsight.DoesNotExist:
+    else:
         logger.warning(f"Cache {cache_id} not found for refresh flag clear")
 
 
@@ -464,18 +268,135 @@ def clear_expired_caches():
     """
     Delete expired cache entries to keep database clean.
     Should be run as a periodic task (daily).
+
+    AI insights waiting for the refresher are kept: they are still served.
     """
     now = timezone.now()
-    
+
     # Clear expired AI insights
-    ai_expired = CachedAIInsight.objects.filter(expires_at__lt=now).delete()
+    ai_expired = CachedAIInsight.objects.filter(expires_at__lt=now, needs_refresh=False).delete()
     logger.info(f"✓ Cleared {ai_expired[0]} expired AI insight caches")
-    
+
     # Clear expired user analytics
     analytics_expired = CachedUserAnalytics.objects.filter(expires_at__lt=now).delete()
     logger.info(f"✓ Cleared {analytics_expired[0]} expired user analytics caches")
-    
+
     return {
         'ai_insights_cleared': ai_expired[0],
         'analytics_cleared': analytics_expired[0]
     }
+
+
+# ============================================================================
+# BACKGROUND REFRESH
+# ============================================================================
+
+def claim_stale_insights(limit=None, lease_seconds=None):
+    """
+    Claim up to `limit` flagged insights for this worker (oldest first).
+    Rows locked or leased by another worker are skipped.
+    """
+    limit = limit or getattr(settings, 'DAILYCAST_INSIGHT_REFRESH_BATCH', DEFAULT_REFRESH_BATCH)
+    lease_seconds = lease_seconds or getattr(settings, 'DAILYCAST_INSIGHT_REFRESH_LEASE_SECONDS', DEFAULT_LEASE_SECONDS)
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            CachedAIInsight.objects.select_for_update(skip_locked=True)
+            .filter(needs_refresh=True)
+            .filter(Q(refresh_claimed_until__isnull=True) | Q(refresh_claimed_until__lt=now))
+            .order_by('expires_at')
+            .values_list('pk', flat=True)[:limit]
+        )
+        CachedAIInsight.objects.filter(pk__in=ids).update(
+            refresh_claimed_until=now + timedelta(seconds=lease_seconds)
+        )
+    return list(CachedAIInsight.objects.filter(pk__in=ids).select_related('user').order_by('expires_at'))
+
+
+def _daily_budget(engine):
+    budgets = dict(DEFAULT_DAILY_TOKENS)
+    budgets.update(getattr(settings, 'DAILYCAST_INSIGHT_REFRESH_DAILY_TOKENS', {}))
+    return budgets.get(engine, budgets['default'])
+
+
+def _budget_key(engine):
+    return BUDGET_KEY.format(engine, timezone.now().date().isoformat())
+
+
+def _reserve_tokens(engine, tokens) -> bool:
+    """Take `tokens` from today's budget for `engine`; False (and nothing taken) if it would overrun."""
+    key = _budget_key(engine)
+    if counters.incr(key, tokens, timeout=BUDGET_TIMEOUT) <= _daily_budget(engine):
+        return True
+    counters.incr(key, -tokens, timeout=BUDGET_TIMEOUT)
+    return False
+
+
+def _regenerate(insight):
+    """Pool thread: collect learning data and call the AI engine."""
+    from dailycast.ai_analyzer import UserLearningAnalyzer, _run_ai_deep_analysis
+
+    try:
+        data = UserLearningAnalyzer(insight.user).collect_user_learning_data()
+        return _run_ai_deep_analysis(
+            insight.user, data, insight.engine, subject=insight.subject, target_language=insight.language
+        )
+    finally:
+        connection.close()
+
+
+def refresh_stale_insights(limit=None, workers=None) -> dict:
+    """Claim a batch of stale insights and regenerate them. Returns counts."""
+    insights = claim_stale_insights(limit)
+    result = {'claimed': len(insights), 'refreshed': 0, 'failed': 0, 'over_budget': 0, 'tokens_used': 0}
+    if not insights:
+        return result
+
+    # Reserve each row's last known usage; settled against the real usage below
+    reserved, runnable = {}, []
+    for insight in insights:
+        estimate = insight.tokens_used or DEFAULT_TOKEN_ESTIMATE
+        if _reserve_tokens(insight.engine, estimate):
+            reserved[insight.pk] = estimate
+            runnable.append(insight)
+        else:
+            result['over_budget'] += 1
+    if result['over_budget']:
+        over = [i.pk for i in insights if i.pk not in reserved]
+        # Still flagged, lease released: picked up again once the budget resets
+        CachedAIInsight.objects.filter(pk__in=over).update(refresh_claimed_until=None)
+        logger.info(f"AI insight refresh: {len(over)} insights over today's token budget")
+
+    workers = workers or getattr(settings, 'DAILYCAST_INSIGHT_REFRESH_WORKERS', DEFAULT_REFRESH_WORKERS)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(runnable) or 1))) as pool:
+        futures = {pool.submit(_regenerate, insight): insight for insight in runnable}
+        for future in as_completed(futures):
+            insight = futures[future]
+            try:
+                ai_insights = future.result()
+            except Exception as e:
+                ai_insights = {'error': str(e)}
+
+            if ai_insights.get('error'):
+                # Keep serving the old insights; retried when the lease runs out
+                logger.warning(f"AI insight refresh failed for cache {insight.pk}: {ai_insights['error']}")
+                counters.incr(_budget_key(insight.engine), -reserved[insight.pk], timeout=BUDGET_TIMEOUT)
+                result['failed'] += 1
+                continue
+
+            usage = ai_insights.get('_token_usage') or {}
+            tokens = usage.get('total_tokens') or DEFAULT_TOKEN_ESTIMATE
+            counters.incr(_budget_key(insight.engine), tokens - reserved[insight.pk], timeout=BUDGET_TIMEOUT)
+            CachedAIInsight.objects.filter(pk=insight.pk).update(
+                ai_insights=ai_insights,
+                tokens_used=tokens,
+                expires_at=timezone.now() + _insight_ttl(),
+                needs_refresh=False,
+                refresh_claimed_until=None,
+            )
+            _record_generation(insight.engine, tokens, usage.get('input_tokens', 0), usage.get('output_tokens', 0))
+            result['refreshed'] += 1
+            result['tokens_used'] += tokens
+
+    logger.info(f"AI insight refresh: {result}")
+    return result
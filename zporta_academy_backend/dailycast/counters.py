@@ -0,0 +1,236 @@
+"""
+Counters: atomic shared counters for rate limits, usage metrics and cache stats.
+
+Every counter update is a single Redis command (INCRBY / HINCRBY, pipelined
+when several fields move at once), so concurrent web and Celery workers never
+lose increments the way a cache.get / mutate / cache.set round trip does.
+
+With django-redis the commands go straight to the default cache's Redis
+connection (keys still get the cache KEY_PREFIX). Any other cache backend
+(locmem in tests and local development) falls back to a process-wide lock,
+which is only atomic within one process.
+
+Also here:
+  - a sliding-window log (sorted set) for the "last N seconds" rate-limit mode
+  - daily CacheStatistics totals buffered in a Redis hash and written to the
+    database by flush_cache_stats() (Celery beat) with one F() update per day
+"""
+
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from zporta.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+_fallback_lock = threading.Lock()
+
+
+def _key(key: str) -> str:
+    return cache.make_key(key)
+
+
+# ── Plain counters ────────────────────────────────────────────────────────
+def incr(key: str, amount: int = 1, timeout: int | None = None) -> int:
+    """Add `amount` to a counter (created at 0) and return the new value."""
+    client = get_redis()
+    if client is not None:
+        pipe = client.pipeline()
+        pipe.incrby(_key(key), amount)
+        if timeout:
+            pipe.expire(_key(key), timeout)
+        return int(pipe.execute()[0])
+    with _fallback_lock:
+        value = int(cache.get(key, 0)) + amount
+        cache.set(key, value, timeout=timeout)
+        return value
+
+
+def incr_within(key: str, limit: int, timeout: int | None = None) -> bool:
+    """
+    Add one to a counter unless that takes it past `limit`; returns whether it did.
+
+    The increment comes first and is rolled back on overflow, so two callers
+    can never both take the last slot.
+    """
+    if incr(key, timeout=timeout) <= limit:
+        return True
+    incr(key, -1, timeout=timeout)
+    return False
+
+
+def get(key: str) -> int:
+    client = get_redis()
+    if client is not None:
+        return int(client.get(_key(key)) or 0)
+    return int(cache.get(key, 0))
+
+
+def delete(*keys: str) -> None:
+    client = get_redis()
+    if client is not None:
+        if keys:
+            client.delete(*[_key(k) for k in keys])
+        return
+    cache.delete_many(list(keys))
+
+
+# ── Hash counters (several fields under one key) ──────────────────────────
+def hincr(key: str, fields: dict, timeout: int | None = None) -> None:
+    """Add each value in `fields` to the matching hash field, in one round trip."""
+    fields = {name: int(value) for name, value in fields.items() if value}
+    if not fields:
+        return
+    client = get_redis()
+    if client is not None:
+        pipe = client.pipeline()
+        for name, value in fields.items():
+            pipe.hincrby(_key(key), name, value)
+        if timeout:
+            pipe.expire(_key(key), timeout)
+        pipe.execute()
+        return
+    with _fallback_lock:
+        data = cache.get(key) or {}
+        for name, value in fields.items():
+            data[name] = data.get(name, 0) + value
+        cache.set(key, data, timeout=timeout)
+
+
+def hgetall(key: str) -> dict:
+    client = get_redis()
+    if client is not None:
+        return {name.decode(): int(value) for name, value in client.hgetall(_key(key)).items()}
+    return dict(cache.get(key) or {})
+
+
+def hdrain(key: str) -> dict:
+    """Read and delete a hash atomically; increments after the call start a new hash."""
+    client = get_redis()
+    if client is not None:
+        pipe = client.pipeline(transaction=True)
+        pipe.hgetall(_key(key))
+        pipe.delete(_key(key))
+        data, _ = pipe.execute()
+        return {name.decode(): int(value) for name, value in data.items()}
+    with _fallback_lock:
+        data = cache.get(key) or {}
+        cache.delete(key)
+        return dict(data)
+
+
+# ── Sliding window ────────────────────────────────────────────────────────
+def window_hit(key: str, window_seconds: int, limit: int | None = None) -> tuple[bool, int]:
+    """
+    Record one event in a sliding window of `window_seconds`.
+
+    Returns (allowed, count). With a `limit`, an event that would exceed it is
+    taken back and allowed is False. The event is added before counting, so
+    two callers can never both take the last slot.
+    """
+    now = time.time()
+    client = get_redis()
+    if client is not None:
+        member = f"{now}:{uuid.uuid4().hex}"
+        pipe = client.pipeline(transaction=True)
+        pipe.zremrangebyscore(_key(key), 0, now - window_seconds)
+        pipe.zadd(_key(key), {member: now})
+        pipe.zcard(_key(key))
+        pipe.expire(_key(key), int(window_seconds) + 1)
+        count = int(pipe.execute()[2])
+        if limit is not None and count > limit:
+            client.zrem(_key(key), member)
+            return False, count - 1
+        return True, count
+    with _fallback_lock:
+        events = [t for t in cache.get(key) or [] if t > now - window_seconds]
+        if limit is not None and len(events) >= limit:
+            return False, len(events)
+        events.append(now)
+        cache.set(key, events, timeout=int(window_seconds) + 1)
+        return True, len(events)
+
+
+def window_count(key: str, window_seconds: int) -> int:
+    now = time.time()
+    client = get_redis()
+    if client is not None:
+        return int(client.zcount(_key(key), now - window_seconds, "+inf"))
+    return sum(1 for t in cache.get(key) or [] if t > now - window_seconds)
+
+
+# ── Daily CacheStatistics buffer ──────────────────────────────────────────
+CACHE_STATS_TIMEOUT = 86400 * 3  # survives a missed flush or two
+
+
+def _cache_stats_key(day) -> str:
+    return f"dailycast:cache_stats:{day.isoformat()}"
+
+
+def _cache_stats_fields():
+    from .models import CacheStatistics
+    return {
+        f.name for f in CacheStatistics._meta.concrete_fields
+        if f.get_internal_type() == "IntegerField"
+    }
+
+
+def record_cache_stats(**fields) -> None:
+    """
+    Count today's CacheStatistics deltas without touching the database.
+
+    Usage:
+        record_cache_stats(ai_insights_cached=1, ai_tokens_saved=1000)
+    """
+    allowed = _cache_stats_fields()
+    unknown = set(fields) - allowed
+    if unknown:
+        logger.warning(f"record_cache_stats: ignoring unknown fields {sorted(unknown)}")
+    try:
+        hincr(
+            _cache_stats_key(timezone.now().date()),
+            {name: value for name, value in fields.items() if name in allowed},
+            timeout=CACHE_STATS_TIMEOUT,
+        )
+    except Exception as e:
+        logger.exception(f"Error recording cache statistics: {e}")
+
+
+def flush_cache_stats(days: int = 2) -> int:
+    """
+    Move buffered totals into CacheStatistics rows (today and the previous
+    `days - 1` days, so a flush just after midnight still lands yesterday's
+    tail). One F() update per day. Returns the number of days written.
+    """
+    from .models import CacheStatistics
+
+    today = timezone.now().date()
+    written = 0
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+        deltas = hdrain(_cache_stats_key(day))
+        if not deltas:
+            continue
+        updates = {name: F(name) + value for name, value in deltas.items()}
+        try:
+            if not CacheStatistics.objects.filter(date=day).update(**updates):
+                try:
+                    with transaction.atomic():
+                        # raw save keeps `date` (auto_now_add would overwrite it with today)
+                        CacheStatistics(date=day, **deltas).save_base(raw=True)
+                except IntegrityError:
+                    CacheStatistics.objects.filter(date=day).update(**updates)
+        except Exception:
+            # Put the totals back for the next flush
+            hincr(_cache_stats_key(day), deltas, timeout=CACHE_STATS_TIMEOUT)
+            raise
+        written += 1
+    return written
@@ -5,6 +5,7 @@ Admin-only access to real-time analytics.
 
 import json
 from datetime import datetime
+from django.apps import apps
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.http import JsonResponse
@@ -26,6 +27,15 @@ def is_staff(user):
     return user.is_staff
 
 
+def _ai_usage_today():
+    """Platform-wide ai_core usage since midnight UTC, read from the hourly rollups."""
+    if not apps.is_installed("ai_core"):
+        return None
+    from ai_core.usage import usage_totals
+
+    return usage_totals(tz.now().replace(hour=0, minute=0, second=0, microsecond=0))
+
+
 @login_required
 @user_passes_test(is_staff)
 def ai_performance_dashboard(request):
@@ -66,6 +76,7 @@ def ai_performance_dashboard(request):
         "total_cost_today_jpy": f"¥{total_cost_usd * 150:.0f}",
         "user_metrics": user_metrics,
         "cache_stats": {"backend": "django_cache", "note": "See admin panel for detailed stats"},
+        "ai_usage_today": _ai_usage_today(),
     }
     
     return render(request, "dailycast/ai_performance_dashboard.html", context)
@@ -0,0 +1,300 @@
+"""
+Learning data snapshot behind UserLearningAnalyzer.collect_user_learning_data().
+
+build_learning_data() reads each source once, as projected values:
+  - ActivityEvent: one grouped query, counts per (date, hour, event_type)
+    over the last year, with the 7 and 30 day counts as filtered aggregates
+    (at most a few thousand rows even for heavy users)
+  - QuizSessionProgress: completed sessions as (correct, total, course title)
+  - Enrollment / Course / LessonCompletion: one query each, grouped in SQL
+  - Note and QuizAttempt counts
+and then computes every metric (7/30 day activity, active days, streak,
+preferred time, accuracy, weak and strong topics, course progress) in plain
+Python passes over those rows. Query count is constant in the user's history.
+
+get_learning_data() serves the snapshot from CachedUserAnalytics. Writes
+that change it (events, quiz sessions, lesson completions, enrollments,
+notes; see dailycast/signals.py) call mark_stale(), which only sets a cache
+key; a snapshot computed before that moment is rebuilt on the next read.
+Snapshots also expire after DAILYCAST_ANALYTICS_CACHE_HOURS.
+"""
+
+import logging
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from dailycast.counters import record_cache_stats
+from dailycast.models import CachedUserAnalytics
+
+logger = logging.getLogger(__name__)
+
+STREAK_DAYS = 365
+WEAK_TOPIC_SCORE = 70
+STRONG_TOPIC_SCORE = 85
+STALE_KEY = "dailycast:user_analytics_stale:{}"
+STALE_TIMEOUT = 60 * 60 * 24 * 7  # longer than any snapshot lives
+
+
+# ── Invalidation ──────────────────────────────────────────────────────────
+def mark_stale(user_id) -> None:
+    """Invalidate the user's snapshot: one cache write, no database query."""
+    if user_id:
+        cache.set(STALE_KEY.format(user_id), time.time(), STALE_TIMEOUT)
+
+
+def _is_fresh(row) -> bool:
+    if row.expires_at <= timezone.now():
+        return False
+    computed_at = parse_datetime(row.analytics_data.get("timestamp") or "")
+    if computed_at is None:
+        return False
+    stale_since = cache.get(STALE_KEY.format(row.pk))
+    return stale_since is None or computed_at.timestamp() > stale_since
+
+
+def _hydrate(data: dict) -> dict:
+    """JSON round trip turns datetimes into strings; templates expect datetimes."""
+    for course in data.get("enrolled_courses", []):
+        if isinstance(course.get("enrollment_date"), str):
+            course["enrollment_date"] = parse_datetime(course["enrollment_date"])
+    return data
+
+
+def get_learning_data(user, refresh: bool = False) -> dict:
+    """Cached snapshot for `user`, rebuilt when stale, expired or `refresh`."""
+    if not refresh:
+        row = CachedUserAnalytics.objects.filter(user=user).first()
+        if row is not None and _is_fresh(row):
+            CachedUserAnalytics.objects.filter(pk=row.pk).update(reads=F("reads") + 1)
+            record_cache_stats(analytics_cached=1)
+            return _hydrate(row.analytics_data)
+
+    data = build_learning_data(user)
+    hours = getattr(settings, "DAILYCAST_ANALYTICS_CACHE_HOURS", 24)
+    CachedUserAnalytics.objects.update_or_create(
+        user=user,
+        defaults={
+            "analytics_data": _serializable(data),
+            "expires_at": timezone.now() + timedelta(hours=hours),
+        },
+    )
+    record_cache_stats(analytics_generated=1)
+    return data
+
+
+def _serializable(data: dict) -> dict:
+    data = dict(data)
+    data["enrolled_courses"] = [
+        {**course, "enrollment_date": course["enrollment_date"].isoformat() if course.get("enrollment_date") else None}
+        for course in data["enrolled_courses"]
+    ]
+    return data
+
+
+# ── Aggregation ───────────────────────────────────────────────────────────
+def build_learning_data(user) -> dict:
+    now = timezone.now()
+    data = {
+        "user_id": user.id,
+        "username": user.username,
+        "timestamp": now.isoformat(),
+        "total_points": 0,
+    }
+    data.update(_activity_metrics(user, now))
+    data.update(_quiz_metrics(user))
+    data.update(_course_metrics(user))
+    data["notes_count"] = _count_notes(user)
+    return data
+
+
+def _activity_metrics(user, now) -> dict:
+    empty = {
+        "recent_activity": {"last_7_days": {}, "last_30_days": {}},
+        "active_days": 0,
+        "study_streak": 0,
+        "preferred_time": "unknown",
+    }
+    week_ago, month_ago = now - timedelta(days=7), now - timedelta(days=30)
+    try:
+        from analytics.models import ActivityEvent
+
+        buckets = list(
+            ActivityEvent.objects.filter(user=user, timestamp__gte=now - timedelta(days=STREAK_DAYS))
+            .values_list("timestamp__date", "timestamp__hour", "event_type")
+            .annotate(
+                week=Count("id", filter=Q(timestamp__gte=week_ago)),
+                month=Count("id", filter=Q(timestamp__gte=month_ago)),
+            )
+            .order_by()
+        )
+    except Exception as e:
+        logger.warning(f"Could not load activity for user {user.id}: {e}")
+        return empty
+
+    windows = {"last_7_days": Counter(), "last_30_days": Counter()}
+    month_dates, all_dates = set(), set()
+    hour_total = hour_events = 0
+
+    for day, hour, event_type, week, month in buckets:
+        all_dates.add(day)
+        if not month:
+            continue
+        month_dates.add(day)
+        hour_total += hour * month
+        hour_events += month
+        for scope, n in (("last_7_days", week), ("last_30_days", month)):
+            windows[scope]["total_events"] += n
+            if event_type == "lesson_completed":
+                windows[scope]["lessons"] += n
+            elif event_type == "quiz_completed":
+                windows[scope]["quizzes"] += n
+
+    streak = 0
+    today = timezone.localdate(now)
+    while streak < STREAK_DAYS and today - timedelta(days=streak) in all_dates:
+        streak += 1
+
+    return {
+        "recent_activity": {
+            scope: {key: counts[key] for key in ("total_events", "lessons", "quizzes")}
+            for scope, counts in windows.items()
+        },
+        "active_days": len(month_dates),
+        "study_streak": streak,
+        "preferred_time": _time_of_day(hour_total / hour_events) if hour_events else "unknown",
+    }
+
+
+def _time_of_day(avg_hour: float) -> str:
+    if 6 <= avg_hour < 12:
+        return "morning"
+    if 12 <= avg_hour < 18:
+        return "afternoon"
+    if 18 <= avg_hour < 23:
+        return "evening"
+    return "night"
+
+
+def _quiz_metrics(user) -> dict:
+    result = {"quiz_accuracy": 0.0, "weak_topics": [], "strong_topics": [], "quizzes_completed": 0}
+    try:
+        from analytics.models import QuizAttempt, QuizSessionProgress
+
+        sessions = QuizSessionProgress.objects.filter(
+            user=user, status=QuizSessionProgress.COMPLETED, total_questions__gt=0,
+        ).values_list("correct_count", "total_questions", "quiz__course__title")
+
+        accuracies = []
+        topic_scores = defaultdict(list)
+        for correct, total, course_title in sessions:
+            accuracy = correct / total * 100
+            accuracies.append(accuracy)
+            topic_scores[course_title or "Unknown"].append(accuracy)
+
+        attempts = QuizAttempt.objects.filter(user=user).aggregate(
+            total=Count("id"), correct=Count("id", filter=Q(is_correct=True)),
+        )
+        result["quizzes_completed"] = attempts["total"]
+        if accuracies:
+            result["quiz_accuracy"] = sum(accuracies) / len(accuracies)
+        elif attempts["total"]:
+            result["quiz_accuracy"] = attempts["correct"] / attempts["total"] * 100
+
+        topics = [
+            {"topic": topic, "avg_score": round(sum(scores) / len(scores), 1), "attempts": len(scores)}
+            for topic, scores in topic_scores.items()
+        ]
+        result["weak_topics"] = sorted(
+            (t for t in topics if t["avg_score"] < WEAK_TOPIC_SCORE), key=lambda t: t["avg_score"]
+        )[:5]
+        result["strong_topics"] = sorted(
+            (t for t in topics if t["avg_score"] >= STRONG_TOPIC_SCORE), key=lambda t: t["avg_score"], reverse=True
+        )[:5]
+    except Exception as e:
+        logger.warning(f"Could not compute quiz metrics for user {user.id}: {e}")
+    return result
+
+
+def _course_metrics(user) -> dict:
+    result = {
+        "enrolled_courses": [],
+        "total_courses": 0,
+        "completion_rate": 0.0,
+        "course_progress": [],
+        "lessons_completed": 0,
+    }
+    try:
+        from django.contrib.contenttypes.models import ContentType
+
+        from courses.models import Course
+        from enrollment.models import Enrollment
+        from lessons.models import LessonCompletion
+
+        course_type = ContentType.objects.get_for_model(Course)
+        enrollments = list(
+            Enrollment.objects.filter(user=user).values_list(
+                "content_type_id", "object_id", "enrollment_type", "status", "enrollment_date",
+            )
+        )
+        if enrollments:
+            completed = sum(1 for e in enrollments if e[3] == "completed")
+            result["completion_rate"] = completed / len(enrollments) * 100
+
+        course_enrollments = [e for e in enrollments if e[0] == course_type.id]
+        courses = {
+            row["id"]: row
+            for row in Course.all_objects.filter(id__in=[e[1] for e in course_enrollments])
+            .annotate(lesson_total=Count("lessons"))
+            .values("id", "title", "subject__name", "lesson_total")
+        }
+
+        completions = dict(
+            LessonCompletion.objects.filter(user=user)
+            .values_list("lesson__course_id")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        result["lessons_completed"] = sum(completions.values())
+
+        for _, course_id, enrollment_type, _, enrolled_at in course_enrollments:
+            course = courses.get(course_id)
+            if course is None:
+                continue
+            if enrollment_type == "course":
+                result["enrolled_courses"].append({
+                    "id": course_id,
+                    "title": course["title"],
+                    "subject": course["subject__name"] or "Unknown",
+                    "enrollment_date": enrolled_at,
+                })
+            total = course["lesson_total"]
+            done = completions.get(course_id, 0) if total else 0
+            result["course_progress"].append({
+                "course_id": course_id,
+                "course_title": course["title"],
+                "total_lessons": total,
+                "completed_lessons": done,
+                "progress_percent": round(done / total * 100, 1) if total else 0,
+                "enrollment_date": enrolled_at.isoformat() if enrolled_at else None,
+            })
+        result["total_courses"] = len(result["enrolled_courses"])
+    except Exception as e:
+        logger.warning(f"Could not compute course metrics for user {user.id}: {e}")
+    return result
+
+
+def _count_notes(user) -> int:
+    try:
+        from notes.models import Note
+
+        return Note.objects.filter(user=user).count()
+    except Exception as e:
+        logger.warning(f"Error counting notes for user {user.id}: {e}")
+        return 0
@@ -0,0 +1,91 @@
+"""
+Generate daily podcasts for a cohort of users with the batch pipeline
+(dailycast/batch.py).
+
+Usage:
+    python manage.py generate_batch_podcasts --user-ids 3 8 21
+    python manage.py generate_batch_podcasts --active-since-days 7 --limit 500
+    python manage.py generate_batch_podcasts --active-since-days 30 --inline
+
+Offline benchmark (local fake LLM/TTS, nothing leaves the machine):
+    python manage.py generate_batch_podcasts --user-ids 1 2 3 --fake --inline \
+        --fake-llm-latency 0.8 --fake-tts-latency 0.4
+
+By default the batch is dispatched to Celery as a chord; --inline runs it in
+this process and prints throughput.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from dailycast.batch import FakeProviders, create_batch, finish_batch, run_batch_items, start_podcast_batch
+from dailycast.models import PodcastBatch
+
+
+class Command(BaseCommand):
+    help = "Generate daily podcasts for a cohort of users (bounded-concurrency batch pipeline)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-ids", nargs="+", type=int, help="Users to include")
+        parser.add_argument(
+            "--active-since-days", type=int,
+            help="Include active users who logged in within this many days",
+        )
+        parser.add_argument("--limit", type=int, help="At most this many users")
+        parser.add_argument(
+            "--language", default=getattr(settings, "DAILYCAST_DEFAULT_LANGUAGE", "en"),
+            help="Language code (default: settings.DAILYCAST_DEFAULT_LANGUAGE)",
+        )
+        parser.add_argument("--inline", action="store_true", help="Run in this process instead of Celery")
+        parser.add_argument("--fake", action="store_true", help="Use local fake providers (benchmark)")
+        parser.add_argument("--fake-llm-latency", type=float, default=0.2, help="Seconds per fake LLM call")
+        parser.add_argument("--fake-tts-latency", type=float, default=0.1, help="Seconds per fake TTS call")
+        parser.add_argument("--tts-workers", type=int, help="TTS pool size (default: DAILYCAST_BATCH_TTS_WORKERS)")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.filter(is_active=True).order_by("pk")
+        if options["user_ids"]:
+            users = users.filter(pk__in=options["user_ids"])
+        elif options["active_since_days"]:
+            users = users.filter(last_login__gte=timezone.now() - timedelta(days=options["active_since_days"]))
+        else:
+            raise CommandError("Pass --user-ids or --active-since-days")
+        if options["limit"]:
+            users = users[:options["limit"]]
+        user_ids = list(users.values_list("pk", flat=True))
+        if not user_ids:
+            raise CommandError("No matching users")
+
+        if not options["inline"]:
+            batch = start_podcast_batch(user_ids, language=options["language"], fake=options["fake"])
+            self.stdout.write(self.style.SUCCESS(
+                f"Dispatched batch {batch.pk} for {batch.total} users. "
+                f"Progress: admin › Podcast Batches."
+            ))
+            return
+
+        batch = create_batch(user_ids, language=options["language"], fake=options["fake"])
+        batch.status = PodcastBatch.STATUS_RUNNING
+        batch.started_at = timezone.now()
+        batch.save(update_fields=["status", "started_at"])
+        providers = None
+        if options["fake"]:
+            providers = FakeProviders(
+                llm_latency=options["fake_llm_latency"], tts_latency=options["fake_tts_latency"],
+            )
+
+        self.stdout.write(f"Batch {batch.pk}: generating {batch.total} podcasts inline...")
+        started = time.monotonic()
+        result = run_batch_items(batch, providers=providers, tts_workers=options["tts_workers"])
+        elapsed = time.monotonic() - started
+        finish_batch(batch.pk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Batch {batch.pk}: {result['completed']} completed, {result['failed']} failed "
+            f"in {elapsed:.1f}s ({batch.total / elapsed:.2f} podcasts/s)"
+        ))
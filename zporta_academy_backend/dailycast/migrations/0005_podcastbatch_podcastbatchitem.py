@@ -0,0 +1,58 @@
+# Generated by Django 5.1.6 on 2026-10-17 02:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dailycast', '0004_cacheduseranalytics_cachestatistics_cachedaiinsight'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PodcastBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.CharField(default='en', max_length=12)),
+                ('fake_providers', models.BooleanField(default=False, help_text='Offline benchmark run: local fake LLM/TTS instead of real providers')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Completed with failures')], db_index=True, default='pending', max_length=20)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='podcast_batches_requested', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Podcast Batch',
+                'verbose_name_plural': 'Podcast Batches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PodcastBatchItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('scripting', 'Writing script'), ('synthesizing', 'Synthesizing audio'), ('completed', 'Completed'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20)),
+                ('error_message', models.TextField(blank=True)),
+                ('llm_ms', models.PositiveIntegerField(blank=True, help_text='Script generation time', null=True)),
+                ('tts_ms', models.PositiveIntegerField(blank=True, help_text='Synthesis + upload time', null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='dailycast.podcastbatch')),
+                ('podcast', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='batch_items', to='dailycast.dailypodcast')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='podcast_batch_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Podcast Batch Item',
+                'verbose_name_plural': 'Podcast Batch Items',
+                'ordering': ['batch', 'id'],
+                'unique_together': {('batch', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dailycast', '0005_podcastbatch_podcastbatchitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cachedaiinsight',
+            name='language',
+            field=models.CharField(default='English', help_text='Output language the insights were generated in', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='cachedaiinsight',
+            name='needs_refresh',
+            field=models.BooleanField(db_index=True, default=False, help_text='Served stale; the background refresher regenerates it'),
+        ),
+        migrations.AddField(
+            model_name='cachedaiinsight',
+            name='refresh_claimed_until',
+            field=models.DateTimeField(blank=True, help_text='Refresher lease: another worker may claim it after this time', null=True),
+        ),
+    ]
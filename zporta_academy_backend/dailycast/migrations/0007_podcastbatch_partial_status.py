@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-17 11:40
+
+from django.db import migrations, models
+
+
+def mark_partial_batches(apps, schema_editor):
+    # "failed" used to mean "completed with failures"; keep it only for
+    # batches where nothing succeeded.
+    PodcastBatch = apps.get_model('dailycast', 'PodcastBatch')
+    PodcastBatch.objects.filter(status='failed', completed__gt=0).update(status='partial')
+
+
+def unmark_partial_batches(apps, schema_editor):
+    PodcastBatch = apps.get_model('dailycast', 'PodcastBatch')
+    PodcastBatch.objects.filter(status='partial').update(status='failed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dailycast', '0006_cachedaiinsight_refresh'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='podcastbatch',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('partial', 'Completed with errors'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20),
+        ),
+        migrations.RunPython(mark_partial_batches, unmark_partial_batches),
+    ]
@@ -653,8 +653,24 @@ class CachedAIInsight(models.Model):
     tokens_saved = models.IntegerField(default=0)
     hits = models.IntegerField(default=0, help_text="Times this cache was reused")
     
+    language = models.CharField(
+        max_length=50,
+        default='English',
+        help_text="Output language the insights were generated in"
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     expires_at = models.DateTimeField(db_index=True)
+    needs_refresh = models.BooleanField(
+        default=False,
+        db_index=True,
+        help_text="Served stale; the background refresher regenerates it"
+    )
+    refresh_claimed_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Refresher lease: another worker may claim it after this time"
+    )
     
     class Meta:
         verbose_name = "Cached AI Insight"
@@ -787,3 +803,92 @@ class CacheStatistics(models.Model):
         
         # Convert to cents
         return int(cost_usd * 100)
+
+
+# ============================================================================
+# BATCH GENERATION - One run of daily podcasts for a cohort of users
+# ============================================================================
+
+class PodcastBatch(models.Model):
+    """
+    A cohort run of the batch podcast pipeline (dailycast/batch.py).
+    Counters are updated with F() as items finish, so progress can be
+    watched in the admin while the batch runs. A finished batch is
+    "completed" (no failures), "partial" (some items failed) or "failed"
+    (no item succeeded).
+    """
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_PARTIAL = "partial"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_PARTIAL, "Completed with errors"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    language = models.CharField(max_length=12, default="en")
+    fake_providers = models.BooleanField(
+        default=False,
+        help_text="Offline benchmark run: local fake LLM/TTS instead of real providers",
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    total = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    requested_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="podcast_batches_requested",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Podcast Batch"
+        verbose_name_plural = "Podcast Batches"
+
+    def __str__(self) -> str:
+        return f"Batch {self.pk}: {self.completed + self.failed}/{self.total} [{self.status}]"
+
+
+class PodcastBatchItem(models.Model):
+    """Progress of one user's podcast within a PodcastBatch."""
+    STATUS_PENDING = "pending"
+    STATUS_SCRIPTING = "scripting"
+    STATUS_SYNTHESIZING = "synthesizing"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SCRIPTING, "Writing script"),
+        (STATUS_SYNTHESIZING, "Synthesizing audio"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    batch = models.ForeignKey(PodcastBatch, on_delete=models.CASCADE, related_name="items")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="podcast_batch_items")
+    podcast = models.ForeignKey(
+        DailyPodcast, on_delete=models.SET_NULL, null=True, blank=True, related_name="batch_items",
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    error_message = models.TextField(blank=True)
+    llm_ms = models.PositiveIntegerField(null=True, blank=True, help_text="Script generation time")
+    tts_ms = models.PositiveIntegerField(null=True, blank=True, help_text="Synthesis + upload time")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["batch", "id"]
+        unique_together = ["batch", "user"]
+        verbose_name = "Podcast Batch Item"
+        verbose_name_plural = "Podcast Batch Items"
+
+    def __str__(self) -> str:
+        return f"Batch {self.batch_id} / user {self.user_id} [{self.status}]"
@@ -3,14 +3,12 @@ Rate Limiter: Enforce daily caps on AI feedback and audio generation.
 Tracks usage per user + day to prevent abuse and control costs.
 """
 
-import json
-from datetime import datetime, timedelta
-from typing import Dict, Tuple, Optional
-from pathlib import Path
+from datetime import datetime
+from typing import Dict, Tuple
 
-from django.contrib.auth.models import User
-from django.core.cache import cache
-from django.utils import timezone
+from django.conf import settings
+
+from dailycast import counters
 
 
 class RateLimiter:
@@ -21,6 +19,14 @@ class RateLimiter:
       - 1 AI feedback request per day (max 500 words)
       - 1 audio generation per day (max 6 minutes)
       - Extra requests queue for later billing or soft-block
+    
+    try_consume_feedback / try_consume_audio check the caps and take a slot
+    in one atomic step (increment, compare, roll back on overflow); there is
+    no separate check, so two requests can never both take the last slot.
+    Counters live in dailycast.counters. Two modes
+    (settings.DAILYCAST_RATE_LIMIT_MODE):
+      - "daily": per-UTC-day counters, reset at midnight (default)
+      - "sliding": events in the last DAILYCAST_RATE_LIMIT_WINDOW_SECONDS
     """
     
     # Daily limits
@@ -31,23 +37,45 @@ class RateLimiter:
     
     # Cache prefix
     PREFIX = "ratelimit:"
+    DAY_SECONDS = 86400
+    
+    def __init__(self, mode: str | None = None, window_seconds: int | None = None):
+        self.mode = mode or getattr(settings, "DAILYCAST_RATE_LIMIT_MODE", "daily")
+        self.window_seconds = window_seconds or getattr(
+            settings, "DAILYCAST_RATE_LIMIT_WINDOW_SECONDS", self.DAY_SECONDS
+        )
     
-    def __init__(self):
-        pass
+    def _get_key(self, kind: str, user_id: int) -> str:
+        if self.mode == "sliding":
+            return f"{self.PREFIX}{kind}:{user_id}:window"
+        today = datetime.utcnow().date().isoformat()
+        return f"{self.PREFIX}{kind}:{user_id}:{today}"
     
     def _get_key_feedback(self, user_id: int) -> str:
         """Generate key for daily feedback count."""
-        today = datetime.utcnow().date().isoformat()
-        return f"{self.PREFIX}feedback:{user_id}:{today}"
+        return self._get_key("feedback", user_id)
     
     def _get_key_audio(self, user_id: int) -> str:
         """Generate key for daily audio count."""
-        today = datetime.utcnow().date().isoformat()
-        return f"{self.PREFIX}audio:{user_id}:{today}"
+        return self._get_key("audio", user_id)
     
-    def can_request_feedback(self, user_id: int, word_count: int) -> Tuple[bool, str]:
+    def _used(self, kind: str, user_id: int) -> int:
+        key = self._get_key(kind, user_id)
+        if self.mode == "sliding":
+            return counters.window_count(key, self.window_seconds)
+        return counters.get(key)
+    
+    def _consume(self, kind: str, user_id: int, limit: int) -> bool:
+        """Take one slot unless the limit is used up, in one atomic step."""
+        key = self._get_key(kind, user_id)
+        if self.mode == "sliding":
+            allowed, _ = counters.window_hit(key, self.window_seconds, limit=limit)
+            return allowed
+        return counters.incr_within(key, limit, timeout=self.DAY_SECONDS)
+    
+    def try_consume_feedback(self, user_id: int, word_count: int = 0) -> Tuple[bool, str]:
         """
-        Check if user can request feedback today.
+        Check the caps and take today's feedback slot.
         
         Returns:
             (allowed, reason)
@@ -56,18 +84,15 @@ class RateLimiter:
         if word_count > self.WORDS_LIMIT_PER_FEEDBACK:
             return False, f"Feedback limited to {self.WORDS_LIMIT_PER_FEEDBACK} words. You provided {word_count}. Trim and try again."
         
-        # Check daily limit
-        key = self._get_key_feedback(user_id)
-        count = cache.get(key, 0)
-        
-        if count >= self.FEEDBACK_LIMIT_PER_DAY:
+        # Check and take the daily slot
+        if not self._consume("feedback", user_id, self.FEEDBACK_LIMIT_PER_DAY):
             return False, f"You've used your daily feedback. Try again tomorrow or upgrade your plan."
         
         return True, "OK"
     
-    def can_request_audio(self, user_id: int, duration_seconds: int) -> Tuple[bool, str]:
+    def try_consume_audio(self, user_id: int, duration_seconds: int = 0) -> Tuple[bool, str]:
         """
-        Check if user can request audio today.
+        Check the caps and take today's audio slot.
         
         Returns:
             (allowed, reason)
@@ -76,34 +101,16 @@ class RateLimiter:
         if duration_seconds > self.AUDIO_LENGTH_LIMIT_SECONDS:
             return False, f"Audio limited to {self.AUDIO_LENGTH_LIMIT_SECONDS} seconds. Your request is {duration_seconds}s."
         
-        # Check daily limit
-        key = self._get_key_audio(user_id)
-        count = cache.get(key, 0)
-        
-        if count >= self.AUDIO_LIMIT_PER_DAY:
+        # Check and take the daily slot
+        if not self._consume("audio", user_id, self.AUDIO_LIMIT_PER_DAY):
             return False, f"You've used your daily audio. Try again tomorrow or upgrade your plan."
         
         return True, "OK"
     
-    def consume_feedback(self, user_id: int) -> None:
-        """Mark feedback as used (increment counter)."""
-        key = self._get_key_feedback(user_id)
-        count = cache.get(key, 0)
-        cache.set(key, count + 1, timeout=86400)  # 24 hours
-    
-    def consume_audio(self, user_id: int) -> None:
-        """Mark audio as used (increment counter)."""
-        key = self._get_key_audio(user_id)
-        count = cache.get(key, 0)
-        cache.set(key, count + 1, timeout=86400)  # 24 hours
-    
     def get_user_daily_usage(self, user_id: int) -> Dict:
         """Return user's daily usage summary."""
-        feedback_key = self._get_key_feedback(user_id)
-        audio_key = self._get_key_audio(user_id)
-        
-        feedback_used = cache.get(feedback_key, 0)
-        audio_used = cache.get(audio_key, 0)
+        feedback_used = self._used("feedback", user_id)
+        audio_used = self._used("audio", user_id)
         
         return {
             "feedback_used": feedback_used,
@@ -117,34 +124,21 @@ class RateLimiter:
     
     def reset_user_daily_usage(self, user_id: int) -> None:
         """Clear user's daily counters (admin only)."""
-        feedback_key = self._get_key_feedback(user_id)
-        audio_key = self._get_key_audio(user_id)
-        cache.delete(feedback_key)
-        cache.delete(audio_key)
+        counters.delete(self._get_key_feedback(user_id), self._get_key_audio(user_id))
 
 
 # Singleton instance
 rate_limiter = RateLimiter()
 
 
-def check_feedback_allowed(user_id: int, word_count: int) -> Tuple[bool, str]:
-    """Public interface."""
-    return rate_limiter.can_request_feedback(user_id, word_count)
-
-
-def check_audio_allowed(user_id: int, duration_seconds: int) -> Tuple[bool, str]:
-    """Public interface."""
-    return rate_limiter.can_request_audio(user_id, duration_seconds)
-
+def try_consume_feedback(user_id: int, word_count: int = 0) -> Tuple[bool, str]:
+    """Public interface: check the caps and use today's feedback slot."""
+    return rate_limiter.try_consume_feedback(user_id, word_count)
 
-def mark_feedback_used(user_id: int) -> None:
-    """Public interface."""
-    return rate_limiter.consume_feedback(user_id)
 
-
-def mark_audio_used(user_id: int) -> None:
-    """Public interface."""
-    return rate_limiter.consume_audio(user_id)
+def try_consume_audio(user_id: int, duration_seconds: int = 0) -> Tuple[bool, str]:
+    """Public interface: check the caps and use today's audio slot."""
+    return rate_limiter.try_consume_audio(user_id, duration_seconds)
 
 
 def get_daily_usage(user_id: int) -> Dict:
@@ -1,17 +1,25 @@
 import logging
+import shutil
+import tempfile
 import time
+from contextlib import nullcontext
 from math import ceil
-from typing import Dict, Tuple
+from typing import IO, Dict, Optional, Tuple
+from xml.sax.saxutils import escape as xml_escape
 
 import requests
 from django.conf import settings
-from django.core.files.base import ContentFile
+from django.core.files.base import File
 from django.utils import timezone
 
 from dailycast.models import DailyPodcast
+from dailycast.tts_cache import synthesize_script
 
 logger = logging.getLogger(__name__)
 
+AUDIO_CHUNK_SIZE = 64 * 1024
+AUDIO_SPOOL_MAX_MEMORY = 1024 * 1024  # larger audio spills to a temp file
+
 
 try:
     from intelligence.models import UserAbilityProfile
@@ -134,8 +142,18 @@ def _build_prompt(user, language: str, user_stats: Dict) -> str:
     )
 
 
-def generate_podcast_script(user, language: str, user_stats: Dict, provider: str = None) -> Tuple[str, str]:
-    """Generate script via specified provider, or fallback chain."""
+def _provider_slot(limiter, provider: str):
+    """Concurrency slot for one provider call (batch pipeline); no-op without a limiter."""
+    return limiter.slot(provider) if limiter is not None else nullcontext()
+
+
+def generate_podcast_script(user, language: str, user_stats: Dict, provider: str = None,
+                            limiter=None) -> Tuple[str, str]:
+    """Generate script via specified provider, or fallback chain.
+
+    `limiter` (dailycast.batch.ProviderLimiter) caps concurrent calls per
+    provider when many scripts are generated in parallel.
+    """
     prompt = _build_prompt(user, language, user_stats)
 
     openai_key = getattr(settings, "OPENAI_API_KEY", None)
@@ -144,7 +162,8 @@ def generate_podcast_script(user, language: str, user_stats: Dict, provider: str
     # If provider is explicitly requested, try it first
     if provider == 'openai' and openai_key:
         try:
-            return _generate_with_openai(openai_key, prompt)
+            with _provider_slot(limiter, "openai"):
+                return _generate_with_openai(openai_key, prompt)
         except Exception as e:
             logger.error(f"OpenAI generation failed: {e}")
             # Fall through to normal chain or re-raise? 
@@ -153,20 +172,23 @@ def generate_podcast_script(user, language: str, user_stats: Dict, provider: str
     
     if provider == 'gemini' and gemini_key:
         try:
-            return _generate_with_gemini(gemini_key, prompt)
+            with _provider_slot(limiter, "gemini"):
+                return _generate_with_gemini(gemini_key, prompt)
         except Exception as e:
             logger.error(f"Gemini generation failed: {e}")
 
     # Default fallback chain
     if openai_key:
         try:
-            return _generate_with_openai(openai_key, prompt)
+            with _provider_slot(limiter, "openai"):
+                return _generate_with_openai(openai_key, prompt)
         except Exception as exc:  # noqa: BLE001
             logger.warning("Dailycast: OpenAI failed, falling back to Gemini (%s)", exc)
 
     if gemini_key:
         try:
-            return _generate_with_gemini(gemini_key, prompt)
+            with _provider_slot(limiter, "gemini"):
+                return _generate_with_gemini(gemini_key, prompt)
         except Exception as exc:
              logger.warning("Dailycast: Gemini failed, using template (%s)", exc)
 
@@ -199,11 +221,26 @@ def _pick_polly_voice(language: str) -> Tuple[str, str]:
     return "Joanna", "neural"
 
 
-def synthesize_audio(script_text: str, language: str) -> Tuple[bytes, str]:
-    """Convert text to speech using Amazon Polly (optional - saves MP3 to media folder).
-    
-    Audio files are saved directly to MEDIA_ROOT/podcasts/ (no S3 needed).
-    If AWS credentials are not configured, gracefully skips audio generation.
+def _polly_request(text: str, voice_id: str, engine: str, rate: str) -> Dict:
+    if rate:
+        return {
+            "Text": f'<speak><prosody rate="{rate}">{xml_escape(text)}</prosody></speak>',
+            "TextType": "ssml",
+            "OutputFormat": "mp3",
+            "VoiceId": voice_id,
+            "Engine": engine,
+        }
+    return {"Text": text, "OutputFormat": "mp3", "VoiceId": voice_id, "Engine": engine}
+
+
+def open_audio_stream(script_text: str, language: str) -> Tuple[Optional[IO[bytes]], str]:
+    """Synthesize the script with Amazon Polly and return (readable MP3 stream, provider).
+
+    The script is synthesized sentence by sentence through the chunk cache
+    (dailycast.tts_cache), so unchanged sentences are never re-synthesized
+    and long scripts are not truncated. The stream is read by the caller
+    (see save_audio_stream). Returns (None, "none") if AWS credentials are
+    not configured or Polly fails.
     """
     import boto3  # Lazy import to avoid hard dependency on import time
     from botocore.exceptions import BotoCoreError, ClientError
@@ -214,34 +251,75 @@ def synthesize_audio(script_text: str, language: str) -> Tuple[bytes, str]:
     # Skip Polly if credentials are not configured
     if not aws_key or not aws_secret:
         logger.warning("Dailycast: AWS credentials not configured, skipping audio generation")
-        # Return empty bytes with "none" provider to skip audio
-        return b"", "none"
+        return None, "none"
     
     voice_id, engine = _pick_polly_voice(language)
+    rate = getattr(settings, "DAILYCAST_TTS_RATE", "") or ""
+    # Own session: the default boto3 session is not safe to share across batch threads
+    polly = boto3.session.Session().client(
+        "polly",
+        region_name=getattr(settings, "AWS_REGION", "us-east-1"),
+        aws_access_key_id=aws_key,
+        aws_secret_access_key=aws_secret,
+    )
+
+    def synth(text: str) -> bytes:
+        response = polly.synthesize_speech(**_polly_request(text, voice_id, engine, rate))
+        audio_stream = response.get("AudioStream")
+        if not audio_stream:
+            raise ValueError("Polly returned no audio stream")
+        try:
+            return audio_stream.read()
+        finally:
+            audio_stream.close()
+
     try:
-        polly = boto3.client(
-            "polly",
-            region_name=getattr(settings, "AWS_REGION", "us-east-1"),
-            aws_access_key_id=aws_key,
-            aws_secret_access_key=aws_secret,
-        )
-        response = polly.synthesize_speech(
-            Text=script_text[:4500],  # Polly limit safety
-            OutputFormat="mp3",
-            VoiceId=voice_id,
-            Engine=engine,
-        )
+        stream, stats = synthesize_script(script_text, "polly", voice_id, synth, engine=engine, rate=rate)
     except (BotoCoreError, ClientError) as exc:  # pragma: no cover - network error path
         logger.error("Dailycast: Polly synthesis failed: %s", exc)
         logger.warning("Dailycast: Skipping audio, will store script only")
-        return b"", "none"
+        return None, "none"
+
+    logger.info(
+        "Dailycast: Polly audio from %s chunks (%s cached, %s synthesized)",
+        stats["chunks"], stats["cached"], stats["synthesized"],
+    )
+    return stream, "polly"
+
+
+def synthesize_audio(script_text: str, language: str) -> Tuple[bytes, str]:
+    """Convert text to speech using Amazon Polly (optional - saves MP3 to media folder).
+    
+    Audio files are saved directly to MEDIA_ROOT/podcasts/ (no S3 needed).
+    If AWS credentials are not configured, gracefully skips audio generation.
+    Prefer open_audio_stream + save_audio_stream, which never buffer the whole MP3.
+    """
+    audio_stream, provider = open_audio_stream(script_text, language)
+    if audio_stream is None:
+        return b"", provider
+    try:
+        return audio_stream.read(), provider
+    finally:
+        audio_stream.close()
+
 
-    audio_stream = response.get("AudioStream")
-    if not audio_stream:
-        raise ValueError("Polly returned no audio stream")
+def save_audio_stream(field_file, filename: str, audio_stream: IO[bytes]) -> bool:
+    """Copy an audio stream into a FileField's storage in AUDIO_CHUNK_SIZE chunks.
 
-    audio_bytes = audio_stream.read()
-    return audio_bytes, "polly"
+    The stream is spooled (in memory up to AUDIO_SPOOL_MAX_MEMORY, then a temp
+    file) so storages that need a seekable file still work. Returns False,
+    saving nothing, if the stream was empty.
+    """
+    try:
+        with tempfile.SpooledTemporaryFile(max_size=AUDIO_SPOOL_MAX_MEMORY) as spool:
+            shutil.copyfileobj(audio_stream, spool, AUDIO_CHUNK_SIZE)
+            if not spool.tell():
+                return False
+            spool.seek(0)
+            field_file.save(filename, File(spool, name=filename), save=False)
+            return True
+    finally:
+        audio_stream.close()
 
 
 def estimate_duration_seconds(script_text: str) -> int:
@@ -288,17 +366,17 @@ def create_podcast_for_user(
 
     try:
         script_text, llm_provider = generate_podcast_script(user, language, stats)
-        audio_bytes, tts_provider = synthesize_audio(script_text, language)
+        audio_stream, tts_provider = open_audio_stream(script_text, language)
 
         podcast.script_text = script_text
         podcast.llm_provider = llm_provider
         podcast.tts_provider = tts_provider
         podcast.duration_seconds = estimate_duration_seconds(script_text)
 
-        # Only save audio file if we have bytes
-        if audio_bytes:
+        # Only save audio file if synthesis produced a stream
+        if audio_stream is not None:
             filename = f"podcast_{user.id}_{int(time.time())}.mp3"
-            podcast.audio_file.save(filename, ContentFile(audio_bytes), save=False)
+            save_audio_stream(podcast.audio_file, filename, audio_stream)
 
         podcast.status = DailyPodcast.STATUS_COMPLETED
         podcast.error_message = None
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .learning_data import mark_stale
+
+# Writes that change a user's learning data snapshot (dailycast.learning_data)
+LEARNING_DATA_SOURCES = (
+    "analytics.ActivityEvent",
+    "analytics.QuizSessionProgress",
+    "lessons.LessonCompletion",
+    "enrollment.Enrollment",
+    "notes.Note",
+)
+
+
+def invalidate_learning_data(sender, instance, **kwargs):
+    mark_stale(getattr(instance, "user_id", None))
+
+
+for _source in LEARNING_DATA_SOURCES:
+    receiver([post_save, post_delete], sender=_source, dispatch_uid=f"dailycast_learning_data_{_source}")(
+        invalidate_learning_data
+    )
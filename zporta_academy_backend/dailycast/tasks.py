@@ -214,3 +214,62 @@ def cleanup_old_podcasts(days=30):
     except Exception as e:
         logger.error(f"Cleanup task failed: {str(e)}")
         return {'error': str(e)}
+
+
+@shared_task(name="dailycast.flush_cache_statistics")
+def flush_cache_statistics():
+    """
+    Write the CacheStatistics totals counted in Redis (dailycast.counters) to
+    the database. Scheduled every minute via CELERY_BEAT_SCHEDULE.
+    """
+    from dailycast.counters import flush_cache_stats
+
+    days = flush_cache_stats()
+    return {'days_flushed': days}
+
+
+# ============================================================================
+# BATCH PODCAST PIPELINE (see dailycast/batch.py)
+# ============================================================================
+
+@shared_task(name="dailycast.run_podcast_batch_chunk")
+def run_podcast_batch_chunk(batch_id, item_ids):
+    """
+    Run the script/audio pipeline for one chunk of a PodcastBatch (chord header).
+
+    Never raises: a failed chord header would skip finish_podcast_batch and
+    leave the batch running, so the chunk's unfinished items are failed instead.
+    """
+    from dailycast.batch import fail_unfinished_items, run_batch_items
+    from dailycast.models import PodcastBatch
+
+    try:
+        batch = PodcastBatch.objects.get(pk=batch_id)
+        result = run_batch_items(batch, item_ids=item_ids)
+    except Exception as e:
+        logger.exception(f"Dailycast batch {batch_id}: chunk of {len(item_ids)} aborted: {e}")
+        failed = fail_unfinished_items(batch_id, item_ids=item_ids, reason=f"chunk: {e}")
+        return {'failed': failed, 'error': str(e)}
+    logger.info(f"Dailycast batch {batch_id}: chunk of {len(item_ids)} done {result}")
+    return result
+
+
+@shared_task(name="dailycast.finish_podcast_batch")
+def finish_podcast_batch(chunk_results, batch_id):
+    """Chord callback: mark the batch completed, partial or failed."""
+    from dailycast.batch import finish_batch
+
+    batch = finish_batch(batch_id)
+    logger.info(f"Dailycast batch {batch_id} finished: {batch.completed} completed, {batch.failed} failed")
+    return {'batch_id': batch_id, 'completed': batch.completed, 'failed': batch.failed}
+
+
+@shared_task(name="dailycast.refresh_stale_ai_insights")
+def refresh_stale_ai_insights():
+    """
+    Regenerate CachedAIInsight rows that were served stale (see
+    dailycast.cache_manager). Scheduled every few minutes via CELERY_BEAT_SCHEDULE.
+    """
+    from dailycast.cache_manager import refresh_stale_insights
+
+    return refresh_stale_insights()
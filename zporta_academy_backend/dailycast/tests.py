@@ -0,0 +1,291 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from dailycast import counters
+from dailycast.batch import FakeProviders, create_batch, start_podcast_batch
+from dailycast.models import CacheStatistics, PodcastBatch, PodcastBatchItem
+from dailycast.rate_limiter import RateLimiter
+from dailycast.tasks import finish_podcast_batch, flush_cache_statistics, run_podcast_batch_chunk
+from dailycast.tts_cache import chunk_key, chunk_path, synthesize_script
+from zporta.testing import FakeRedis
+
+
+class CountersTestMixin:
+    """Runs every counter against the Redis branch and the cache fallback."""
+
+    def setUp(self):
+        cache.clear()
+        self.redis = FakeRedis() if self.use_redis else None
+        patcher = mock.patch('dailycast.counters.get_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_plain_counters(self):
+        self.assertEqual(counters.incr('hits'), 1)
+        self.assertEqual(counters.incr('hits', 4, timeout=60), 5)
+        self.assertEqual(counters.incr('hits', -2), 3)
+        self.assertEqual(counters.get('hits'), 3)
+        counters.delete('hits')
+        self.assertEqual(counters.get('hits'), 0)
+
+    def test_hash_counters_and_drain(self):
+        counters.hincr('metrics', {'calls': 1, 'tokens': 120, 'skipped': 0})
+        counters.hincr('metrics', {'calls': 1, 'tokens': 30}, timeout=60)
+        self.assertEqual(counters.hgetall('metrics'), {'calls': 2, 'tokens': 150})
+        self.assertEqual(counters.hdrain('metrics'), {'calls': 2, 'tokens': 150})
+        self.assertEqual(counters.hgetall('metrics'), {})
+
+    def test_sliding_window(self):
+        self.assertEqual([counters.window_hit('window', 60, limit=2) for _ in range(3)],
+                         [(True, 1), (True, 2), (False, 2)])
+        self.assertEqual(counters.window_count('window', 60), 2)
+        with mock.patch('dailycast.counters.time.time', return_value=timezone.now().timestamp() + 120):
+            self.assertEqual(counters.window_count('window', 60), 0)
+            self.assertEqual(counters.window_hit('window', 60), (True, 1))
+
+    def test_incr_within_rolls_back_on_overflow(self):
+        self.assertEqual([counters.incr_within('capped', 2) for _ in range(3)], [True, True, False])
+        self.assertEqual(counters.get('capped'), 2)
+
+    def test_concurrent_increments_are_not_lost(self):
+        def bump():
+            for _ in range(25):
+                counters.incr('race')
+                counters.hincr('race-hash', {'n': 1})
+
+        threads = [threading.Thread(target=bump) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counters.get('race'), 200)
+        self.assertEqual(counters.hgetall('race-hash'), {'n': 200})
+
+    def test_rate_limiter_daily_and_sliding(self):
+        for limiter in (RateLimiter(), RateLimiter(mode='sliding', window_seconds=60)):
+            self.assertFalse(limiter.try_consume_feedback(7, 501)[0])
+            self.assertEqual(limiter.try_consume_feedback(7, 100), (True, 'OK'))
+            self.assertFalse(limiter.try_consume_feedback(7, 100)[0])
+            self.assertEqual(limiter.get_user_daily_usage(7)['feedback_used'], 1)
+            self.assertEqual(limiter.try_consume_audio(7, 120), (True, 'OK'))
+            self.assertEqual(limiter.get_user_daily_usage(7)['audio_remaining'], 0)
+            limiter.reset_user_daily_usage(7)
+
+    def test_two_consumes_at_the_last_slot_take_it_once(self):
+        for mode in ('daily', 'sliding'):
+            limiter = RateLimiter(mode=mode, window_seconds=60)
+            limiter.FEEDBACK_LIMIT_PER_DAY = 3
+            for _ in range(2):
+                limiter.try_consume_feedback(7)
+            barrier = threading.Barrier(2)
+            results = []
+
+            def consume():
+                barrier.wait()
+                results.append(limiter.try_consume_feedback(7)[0])
+
+            threads = [threading.Thread(target=consume) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(sorted(results), [False, True])
+            self.assertEqual(limiter.get_user_daily_usage(7)['feedback_used'], 3)
+            limiter.reset_user_daily_usage(7)
+
+    def test_cache_statistics_are_flushed_with_f_updates(self):
+        counters.record_cache_stats(ai_insights_cached=1, ai_tokens_saved=1000, not_a_field=5)
+        counters.record_cache_stats(ai_insights_cached=1, ai_tokens_saved=500)
+        self.assertFalse(CacheStatistics.objects.exists())
+
+        self.assertEqual(flush_cache_statistics.apply().get(), {'days_flushed': 1})
+        stats = CacheStatistics.objects.get(date=timezone.now().date())
+        self.assertEqual((stats.ai_insights_cached, stats.ai_tokens_saved), (2, 1500))
+
+        counters.record_cache_stats(ai_insights_hits=3)
+        self.assertEqual(flush_cache_statistics.apply().get(), {'days_flushed': 1})
+        self.assertEqual(flush_cache_statistics.apply().get(), {'days_flushed': 0})
+        stats.refresh_from_db()
+        self.assertEqual((stats.ai_insights_cached, stats.ai_insights_hits), (2, 3))
+
+    def test_failed_flush_keeps_the_totals(self):
+        counters.record_cache_stats(ai_insights_generated=2)
+        with mock.patch.object(CacheStatistics.objects, 'filter', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                counters.flush_cache_stats()
+        self.assertEqual(counters.flush_cache_stats(), 1)
+        self.assertEqual(CacheStatistics.objects.get().ai_insights_generated, 2)
+
+
+class RedisCountersTests(CountersTestMixin, TestCase):
+    use_redis = True
+
+    def test_counters_live_in_redis(self):
+        counters.incr('hits')
+        counters.hincr('metrics', {'calls': 1})
+        self.assertEqual(self.redis.get(cache.make_key('hits')), b'1')
+        self.assertIsNone(cache.get('hits'))
+        self.assertEqual(self.redis.hgetall(cache.make_key('metrics')), {b'calls': b'1'})
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class FallbackCountersTests(CountersTestMixin, TestCase):
+    use_redis = False
+
+
+class GenerationViewLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.learner = User.objects.create_user(username='learner', password='pw')
+        staff = User.objects.create_user(username='staff', password='pw', is_staff=True)
+        self.client.force_login(staff)
+
+    @mock.patch('dailycast.ai_analyzer.analyze_user_and_generate_feedback', return_value={'success': True})
+    def test_analysis_takes_the_learners_feedback_slot(self, analyze):
+        url = f'/api/admin/ajax/analyze-user/?user_id={self.learner.id}'
+        self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('daily feedback', response.json()['error'])
+        analyze.assert_called_once()
+
+
+class _Providers(FakeProviders):
+    """Instant fake providers; scripts fail for the given usernames, audio is not stored."""
+
+    def __init__(self, fail_for=()):
+        super().__init__(llm_latency=0, tts_latency=0)
+        self.fail_for = set(fail_for)
+
+    def script(self, user, language, stats, limiter):
+        if user.username in self.fail_for:
+            raise RuntimeError("provider quota exceeded")
+        return super().script(user, language, stats, limiter)
+
+    def audio(self, script_text, language):
+        return None, "fake"
+
+
+@mock.patch('dailycast.batch.collect_user_stats', return_value={})
+class PodcastBatchTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.users = [User.objects.create_user(username=name, password='pw') for name in ('ann', 'bob', 'cy')]
+        self.user_ids = [user.pk for user in self.users]
+
+    def _run(self, providers):
+        with mock.patch('dailycast.batch.FakeProviders', return_value=providers):
+            return start_podcast_batch(self.user_ids, fake=True, run_async=False)
+
+    def test_all_items_succeed(self, _stats):
+        batch = self._run(_Providers())
+        self.assertEqual((batch.status, batch.completed, batch.failed), (PodcastBatch.STATUS_COMPLETED, 3, 0))
+
+    def test_some_failures_make_the_batch_partial(self, _stats):
+        batch = self._run(_Providers(fail_for={'bob'}))
+        self.assertEqual((batch.status, batch.completed, batch.failed), (PodcastBatch.STATUS_PARTIAL, 2, 1))
+        item = batch.items.get(user__username='bob')
+        self.assertEqual(item.status, PodcastBatchItem.STATUS_FAILED)
+        self.assertIn('provider quota exceeded', item.error_message)
+
+    def test_nothing_succeeding_fails_the_batch(self, _stats):
+        batch = self._run(_Providers(fail_for={'ann', 'bob', 'cy'}))
+        self.assertEqual((batch.status, batch.completed, batch.failed), (PodcastBatch.STATUS_FAILED, 0, 3))
+
+    def test_save_errors_are_caught_per_item(self, _stats):
+        def duration(text):
+            if 'bob' in text:
+                raise ValueError("bad script")
+            return 60
+
+        with mock.patch('dailycast.batch.estimate_duration_seconds', side_effect=duration):
+            batch = self._run(_Providers())
+        self.assertEqual((batch.status, batch.completed, batch.failed), (PodcastBatch.STATUS_PARTIAL, 2, 1))
+        self.assertEqual(batch.items.get(user__username='bob').error_message, 'save: bad script')
+
+    def test_crashed_chunk_still_lets_the_chord_close_the_batch(self, _stats):
+        batch = create_batch(self.user_ids, fake=True)
+        batch.status = PodcastBatch.STATUS_RUNNING
+        batch.save(update_fields=['status'])
+        item_ids = list(batch.items.values_list('pk', flat=True))
+
+        with mock.patch('dailycast.batch.run_batch_items', side_effect=RuntimeError('worker lost')):
+            chunk = run_podcast_batch_chunk.apply(args=(batch.pk, item_ids[:2])).get()
+        self.assertEqual(chunk, {'failed': 2, 'error': 'worker lost'})
+
+        result = finish_podcast_batch.apply(args=([chunk], batch.pk)).get()
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, PodcastBatch.STATUS_FAILED)
+        self.assertEqual(result, {'batch_id': batch.pk, 'completed': 0, 'failed': 3})
+        self.assertFalse(batch.items.exclude(status=PodcastBatchItem.STATUS_FAILED).exists())
+        self.assertIsNotNone(batch.finished_at)
+
+
+class TTSChunkCacheTests(SimpleTestCase):
+    SCRIPT = "Hello there. Today we review verbs.\n\nGreat work this week!"
+
+    def setUp(self):
+        # A fresh in-memory storage per test
+        self.enterContext(override_settings(
+            STORAGES={'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'}},
+            DAILYCAST_TTS_CACHE_DIR='tts_cache',
+        ))
+        self.calls = []
+
+    def synth(self, text):
+        self.calls.append(text)
+        return b"ID3\x03\x00\x00\x00\x00\x00\x00" + text.encode()
+
+    def _synthesize(self, text, **params):
+        stream, stats = synthesize_script(text, "polly", "Joanna", self.synth, **params)
+        with stream:
+            return stream.read(), stats
+
+    def test_miss_synthesizes_and_stores_each_chunk(self):
+        audio, stats = self._synthesize(self.SCRIPT)
+        self.assertEqual(stats, {"chunks": 3, "cached": 0, "synthesized": 3})
+        self.assertEqual(audio, b"Hello there.Today we review verbs.Great work this week!")
+        path = chunk_path(chunk_key("Hello there.", "polly", "Joanna"), "polly")
+        with default_storage.open(path, "rb") as stored:
+            self.assertEqual(stored.read(), b"Hello there.")
+
+    def test_hit_reads_chunks_back_without_synthesizing(self):
+        first, _ = self._synthesize(self.SCRIPT)
+        self.calls.clear()
+        second, stats = self._synthesize(self.SCRIPT)
+        self.assertEqual(second, first)
+        self.assertEqual(stats, {"chunks": 3, "cached": 3, "synthesized": 0})
+        self.assertEqual(self.calls, [])
+
+    def test_edit_only_synthesizes_the_changed_sentence(self):
+        self._synthesize(self.SCRIPT)
+        self.calls.clear()
+        _, stats = self._synthesize(self.SCRIPT.replace("verbs", "nouns"))
+        self.assertEqual(stats["synthesized"], 1)
+        self.assertEqual(self.calls, ["Today we review nouns."])
+
+    def test_voice_params_change_the_cache_entry(self):
+        self._synthesize(self.SCRIPT)
+        _, stats = self._synthesize(self.SCRIPT, engine="neural", rate="90%")
+        self.assertEqual(stats["cached"], 0)
+
+    def test_key_is_stable_for_identical_text_voice_and_params(self):
+        key = chunk_key("Hello there.", "polly", "Joanna", "neural", "90%")
+        self.assertEqual(key, chunk_key("Hello there.", "polly", "Joanna", "neural", "90%"))
+        # Pinned: a format change would orphan every stored chunk
+        self.assertEqual(key, "b6ecbf09da403b34438b2e07a5567f951575f9a89216623d353310cd7f228519")
+        for other in (
+            chunk_key("Hello there!", "polly", "Joanna", "neural", "90%"),
+            chunk_key("Hello there.", "polly", "Matthew", "neural", "90%"),
+            chunk_key("Hello there.", "polly", "Joanna", "standard", "90%"),
+            chunk_key("Hello there.", "polly", "Joanna", "neural", "100%"),
+            chunk_key("Hello there.", "openai", "Joanna", "neural", "90%"),
+        ):
+            self.assertNotEqual(other, key)
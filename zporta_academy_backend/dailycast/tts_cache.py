@@ -0,0 +1,185 @@
+"""
+TTS chunk cache: sentence-level synthesis with a content-addressed audio cache.
+
+A script is split into sentences (paragraph breaks are kept as boundaries,
+very long sentences are split at whitespace). Each chunk's audio is stored
+under a hash of (provider, voice, engine, rate, text), so:
+
+  - regenerating a podcast after a small edit only synthesizes the changed
+    sentences; every other chunk is read back from storage
+  - scripts of any length can be synthesized (no provider request limit to
+    truncate against)
+
+Missing chunks are synthesized in parallel (DAILYCAST_TTS_CHUNK_WORKERS per
+script, at most DAILYCAST_TTS_MAX_CONCURRENCY provider calls per process).
+The MP3 chunks are joined frame-for-frame, without re-encoding: ID3 tags are
+stripped and the MPEG frames concatenated in script order.
+
+Chunks live in default_storage under DAILYCAST_TTS_CACHE_DIR, next to the
+podcast audio itself.
+
+Usage:
+    stream, stats = synthesize_script(text, "polly", "Joanna", synth_fn)
+"""
+
+import hashlib
+import logging
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Callable, Dict, List, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "tts_cache"
+DEFAULT_MAX_CHUNK_CHARS = 1500  # well under Polly's 3000 billed characters per request
+DEFAULT_CHUNK_WORKERS = 4
+DEFAULT_MAX_CONCURRENCY = 8
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# Latin punctuation needs following whitespace; CJK full stops end a sentence on their own
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?…])\s+|(?<=[。！？])")
+
+_provider_slots: Dict[str, threading.BoundedSemaphore] = {}
+_provider_slots_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default) or default
+
+
+def _hard_split(sentence: str, max_chars: int) -> List[str]:
+    """Split an over-long sentence at whitespace (or mid-word if it has none)."""
+    pieces = []
+    while len(sentence) > max_chars:
+        cut = sentence.rfind(" ", 0, max_chars + 1)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+
+def split_script(text: str, max_chars: int | None = None) -> List[str]:
+    """Split a script into sentence chunks of at most `max_chars` characters."""
+    max_chars = max_chars or _setting("DAILYCAST_TTS_MAX_CHUNK_CHARS", DEFAULT_MAX_CHUNK_CHARS)
+    chunks = []
+    for paragraph in _PARAGRAPH_BREAK.split(text or ""):
+        paragraph = " ".join(paragraph.split())
+        for sentence in _SENTENCE_BREAK.split(paragraph):
+            sentence = sentence.strip()
+            if sentence:
+                chunks.extend(_hard_split(sentence, max_chars))
+    return chunks
+
+
+def chunk_key(text: str, provider: str, voice: str, engine: str = "", rate: str = "") -> str:
+    payload = "\0".join([provider, voice or "", engine or "", rate or "", text])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def chunk_path(key: str, provider: str) -> str:
+    cache_dir = _setting("DAILYCAST_TTS_CACHE_DIR", DEFAULT_CACHE_DIR)
+    return f"{cache_dir}/{provider}/{key[:2]}/{key}.mp3"
+
+
+def strip_id3(data: bytes) -> bytes:
+    """Drop a leading ID3v2 tag and a trailing ID3v1 tag, leaving the MPEG frames."""
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+        footer = 10 if data[5] & 0x10 else 0
+        data = data[10 + size + footer:]
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        data = data[:-128]
+    return data
+
+
+def _provider_slot(provider: str) -> threading.BoundedSemaphore:
+    with _provider_slots_lock:
+        if provider not in _provider_slots:
+            cap = _setting("DAILYCAST_TTS_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)
+            _provider_slots[provider] = threading.BoundedSemaphore(max(1, cap))
+        return _provider_slots[provider]
+
+
+def _store(path: str, data: bytes) -> None:
+    """Write a chunk; identical content makes a lost race harmless."""
+    if default_storage.exists(path):
+        return
+    saved = default_storage.save(path, ContentFile(data))
+    if saved != path:  # another worker stored the same chunk first
+        default_storage.delete(saved)
+
+
+def _synthesize_chunk(text: str, path: str, provider: str, synth: Callable[[str], bytes]) -> bytes:
+    with _provider_slot(provider):
+        data = strip_id3(synth(text))
+    if not data:
+        raise ValueError(f"{provider} returned no audio for a {len(text)}-character chunk")
+    try:
+        _store(path, data)
+    except Exception as exc:  # noqa: BLE001 - a cache write failure must not lose the audio
+        logger.warning("Dailycast TTS cache: could not store %s: %s", path, exc)
+    return data
+
+
+def synthesize_script(
+    script_text: str,
+    provider: str,
+    voice: str,
+    synth: Callable[[str], bytes],
+    engine: str = "",
+    rate: str = "",
+    max_chunk_chars: int | None = None,
+    workers: int | None = None,
+) -> Tuple[IO[bytes], Dict[str, int]]:
+    """
+    Return (MP3 stream positioned at 0, stats) for the whole script.
+
+    `synth(text) -> bytes` synthesizes one chunk with the given provider and
+    voice; it is called only for chunks missing from the cache, from pool
+    threads. The first synthesis error is raised after the pool finishes
+    (chunks that did succeed stay cached for the retry).
+    """
+    chunks = split_script(script_text, max_chunk_chars)
+    paths = [chunk_path(chunk_key(text, provider, voice, engine, rate), provider) for text in chunks]
+
+    missing = {}
+    for text, path in zip(chunks, paths):
+        if path not in missing and not default_storage.exists(path):
+            missing[path] = text
+
+    fresh = {}
+    if missing:
+        workers = workers or _setting("DAILYCAST_TTS_CHUNK_WORKERS", DEFAULT_CHUNK_WORKERS)
+        with ThreadPoolExecutor(max_workers=min(workers, len(missing)), thread_name_prefix="dailycast-tts-chunk") as pool:
+            futures = {
+                path: pool.submit(_synthesize_chunk, text, path, provider, synth)
+                for path, text in missing.items()
+            }
+        for path, future in futures.items():
+            fresh[path] = future.result()
+
+    stream = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    try:
+        for path in paths:
+            if path in fresh:
+                stream.write(fresh[path])
+            else:
+                with default_storage.open(path, "rb") as cached:
+                    stream.write(strip_id3(cached.read()))
+    except Exception:
+        stream.close()
+        raise
+    stream.seek(0)
+
+    stats = {"chunks": len(chunks), "cached": len(chunks) - len(missing), "synthesized": len(missing)}
+    return stream, stats
@@ -14,7 +14,8 @@ from lessons.models import Lesson
 from quizzes.models import Quiz
 from enrollment.models import Enrollment
 from dailycast.models import DailyPodcast
-from dailycast.services import _generate_with_openai, _generate_with_gemini
+from dailycast.rate_limiter import try_consume_audio, try_consume_feedback
+from dailycast.services import _generate_with_openai, _generate_with_gemini, estimate_duration_seconds
 import logging
 import requests
 
@@ -265,6 +266,13 @@ def regenerate_audio_ajax(request):
                 'error': 'This podcast has no script text to regenerate from'
             }, status=400)
         
+        allowed, reason = try_consume_audio(podcast.user_id, estimate_duration_seconds(script_text))
+        if not allowed:
+            return JsonResponse({
+                'success': False,
+                'error': reason
+            }, status=429)
+        
         # Import the TTS service - MUST USE synthesize_audio_for_language which prioritizes ElevenLabs
         from dailycast.services_interactive import synthesize_audio_for_language
         
@@ -1128,6 +1136,13 @@ def analyze_user_ai_ajax(request):
                 'error': f'User with ID {user_id} not found'
             }, status=404)
         
+        allowed, reason = try_consume_feedback(user.id)
+        if not allowed:
+            return JsonResponse({
+                'success': False,
+                'error': reason
+            }, status=429)
+        
         # Run analysis (uses local Python libraries, minimal API calls)
         logger.info(f"🔍 Starting AI analysis for user {user.username}")
         result = analyze_user_and_generate_feedback(user)
@@ -5,10 +5,13 @@ from django.contrib.contenttypes.models import ContentType
 from .models import Enrollment
 from courses.models import Course    
 from lessons.serializers import LessonSerializer # Ensure these exist and work
-from lessons.content_filters import mask_restricted_sections
+from lessons.content_filters import GatingContext, lesson_segments, mask_restricted_sections
+from quizzes.models import Quiz
 from quizzes.serializers import QuizSerializer # Ensure these exist and work
 from lessons.models import LessonCompletion, Lesson
 from django.core.cache import cache
+from django.db.models import Count, prefetch_related_objects
+from collections import defaultdict
 import logging # Import logging
 
 from .models import CollaborationSession, SessionStroke, SessionNote
@@ -36,6 +39,121 @@ class SimpleUserSerializer(serializers.ModelSerializer):
 
 logger = logging.getLogger(__name__) # Setup logger
 
+COURSE_CONTENT_CACHE_KEY = "course_lessons_quizzes_{}"
+
+
+class EnrollmentBatch:
+    """
+    Everything EnrollmentSerializer reads besides the enrollment rows, loaded for
+    a whole list of enrollments in a fixed number of grouped queries:
+      - users and their profiles (user_details)
+      - course rows with subject and lesson count (replaces the content_object lookup)
+      - lesson completions for every (user, course) pair (progress + lesson_completions)
+      - share invites for the request's shared_token
+      - cached lesson/quiz payloads, fetched with one cache round trip; courses
+        missing from the cache are rendered together (one lesson query and one
+        quiz query for all of them, with their relations prefetched)
+    """
+
+    def __init__(self, enrollments, request=None):
+        self.enrollment_ids = {e.pk for e in enrollments}
+        prefetch_related_objects(enrollments, 'user', 'user__profile')
+
+        course_ct = ContentType.objects.get_for_model(Course)
+        course_enrollments = [
+            e for e in enrollments if e.enrollment_type == 'course' and e.content_type_id == course_ct.id
+        ]
+        course_ids = {e.object_id for e in course_enrollments}
+        self.courses = Course.all_objects.select_related('subject').annotate(
+            lesson_total=Count('lessons')
+        ).in_bulk(course_ids) if course_ids else {}
+
+        self.completions = defaultdict(list)
+        if course_enrollments:
+            completions = LessonCompletion.objects.filter(
+                user_id__in={e.user_id for e in course_enrollments},
+                lesson__course_id__in=course_ids,
+            ).values_list('user_id', 'lesson__course_id', 'lesson_id', 'completed_at')
+            for user_id, course_id, lesson_id, completed_at in completions:
+                self.completions[user_id, course_id].append((lesson_id, completed_at))
+
+        self.invites = {}
+        token = request.query_params.get('shared_token') if request is not None else None
+        if token:
+            self.invites = {
+                invite.enrollment_id: invite
+                for invite in ShareInvite.objects.filter(
+                    token=token, enrollment_id__in=self.enrollment_ids,
+                ).select_related('invited_by')
+            }
+
+        self.course_content = cache.get_many([COURSE_CONTENT_CACHE_KEY.format(i) for i in course_ids])
+        missed = [
+            course_id for course_id in self.courses
+            if not self.course_content.get(COURSE_CONTENT_CACHE_KEY.format(course_id))
+        ]
+        if missed:
+            rendered = self._render_course_content(missed, request)
+            cache.set_many(rendered, 300)  # 5 minutes
+            self.course_content.update(rendered)
+
+    @staticmethod
+    def _render_course_content(course_ids, request):
+        """Raw (unmasked) lesson/quiz payloads for several courses, keyed by cache key."""
+        lessons = defaultdict(list)
+        for lesson in Lesson.objects.filter(
+            course_id__in=course_ids, status=Lesson.PUBLISHED,
+        ).order_by('position').select_related(
+            'course', 'subject', 'created_by', 'template_ref',
+        ).prefetch_related('tags', 'quizzes'):
+            lessons[lesson.course_id].append(lesson)
+
+        quizzes = defaultdict(list)
+        for quiz in Quiz.objects.filter(course_id__in=course_ids).select_related(
+            'subject', 'course', 'lesson', 'created_by__profile',
+        ).prefetch_related(
+            'tags', 'questions__fill_blank__words', 'questions__fill_blank__solutions',
+        ):
+            quizzes[quiz.course_id].append(quiz)
+
+        rendered = {}
+        for course_id in course_ids:
+            serialized_lessons_raw = []
+            serialized_quizzes_raw = []
+            lesson_gating = {}
+            try:
+                serialized_lessons_raw = LessonSerializer(lessons[course_id], many=True, context={'request': request}).data
+                # Precompiled gating segments, so masking never parses HTML
+                lesson_gating = {lesson.id: lesson_segments(lesson) for lesson in lessons[course_id]}
+            except Exception as e:
+                logger.error(f"Error serializing lessons for course {course_id}: {e}")
+            try:
+                serialized_quizzes_raw = QuizSerializer(quizzes[course_id], many=True, context={'request': request}).data
+            except Exception as e:
+                logger.error(f"Error serializing quizzes for course {course_id}: {e}")
+            rendered[COURSE_CONTENT_CACHE_KEY.format(course_id)] = {
+                'lessons': serialized_lessons_raw,
+                'quizzes': serialized_quizzes_raw,
+                'gating': lesson_gating,
+            }
+        return rendered
+
+    def course(self, enrollment):
+        if enrollment.enrollment_type != 'course':
+            return None
+        return self.courses.get(enrollment.object_id)
+
+    def lesson_completions(self, enrollment):
+        return self.completions.get((enrollment.user_id, enrollment.object_id), [])
+
+
+class EnrollmentListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        enrollments = list(data.all() if hasattr(data, 'all') else data)
+        self.context['enrollment_batch'] = EnrollmentBatch(enrollments, self.context.get('request'))
+        return super().to_representation(enrollments)
+
+
 class EnrollmentSerializer(serializers.ModelSerializer):
     course = serializers.SerializerMethodField()
     progress = serializers.SerializerMethodField()
@@ -54,17 +172,22 @@ class EnrollmentSerializer(serializers.ModelSerializer):
             'course', 'progress', 'share_invite', 'lesson_completions'
         ]
         read_only_fields = ['enrollment_date', 'user', 'user_details', 'content_type', 'course', 'progress', 'share_invite', 'lesson_completions']
+        list_serializer_class = EnrollmentListSerializer
+
+    def _batch(self, obj):
+        """The list's EnrollmentBatch; a single enrollment gets a batch of its own."""
+        batch = self.context.get('enrollment_batch')
+        if batch is None or obj.pk not in batch.enrollment_ids:
+            batch = EnrollmentBatch([obj], self.context.get('request'))
+            self.context['enrollment_batch'] = batch
+        return batch
 
     def get_share_invite(self, obj):
         request = self.context.get('request')
         if not request:
             return None
-        token = request.query_params.get('shared_token')
-        if not token:
-            return None
-        try:
-            invite = obj.invitations.get(token=token)
-        except ShareInvite.DoesNotExist:
+        invite = self._batch(obj).invites.get(obj.pk)
+        if invite is None:
             return None
         return {
             'invited_by': invite.invited_by.username,
@@ -89,8 +212,9 @@ class EnrollmentSerializer(serializers.ModelSerializer):
 
     def get_course(self, obj):
         # Only process if it's a course enrollment and the object exists
-        if obj.enrollment_type == 'course' and obj.content_object:
-            course_obj = obj.content_object
+        batch = self._batch(obj)
+        course_obj = batch.course(obj)
+        if course_obj is not None:
             cover = getattr(course_obj, 'cover_image', None)
             request = self.context.get('request')
             cover_url = None
@@ -111,35 +235,23 @@ class EnrollmentSerializer(serializers.ModelSerializer):
                 }
 
             # --- Cached raw lessons/quizzes (unmasked) ---
-            cache_key = f"course_lessons_quizzes_{course_obj.id}"
-            cached = cache.get(cache_key)
-            if not cached:
-                serialized_lessons_raw = []
-                serialized_quizzes_raw = []
-                try:
-                    lessons_qs = course_obj.lessons.filter(status=Lesson.PUBLISHED).order_by('position').select_related('course')
-                    serialized_lessons_raw = LessonSerializer(lessons_qs, many=True, context={'request': request}).data
-                except Exception as e:
-                    logger.error(f"Error serializing lessons for course {course_obj.id}: {e}")
-                try:
-                    quizzes_qs = course_obj.quizzes.all()
-                    serialized_quizzes_raw = QuizSerializer(quizzes_qs, many=True, context={'request': request}).data
-                except Exception as e:
-                    logger.error(f"Error serializing quizzes for course {course_obj.id}: {e}")
-                cache.set(cache_key, {
-                    'lessons': serialized_lessons_raw,
-                    'quizzes': serialized_quizzes_raw
-                }, 300)  # 5 minutes
-                cached = {'lessons': serialized_lessons_raw, 'quizzes': serialized_quizzes_raw}
+            cache_key = COURSE_CONTENT_CACHE_KEY.format(course_obj.id)
+            cached = batch.course_content[cache_key]
 
             # Apply gating masks per request/user (do not cache masked content)
             serialized_lessons = []
             user = getattr(request, 'user', None) if request else None
             if cached['lessons']:
+                # Enrolled course ids and course rows load once per request, shared by every enrollment
+                gating = self.context.setdefault('lesson_gating', GatingContext(user)) if request else None
+                lesson_gating = cached.get('gating', {})
                 for l in cached['lessons']:
                     l_copy = dict(l)
                     if request and l_copy.get('content') and not (getattr(user, 'is_authenticated', False) and getattr(user, 'is_staff', False)):
-                        l_copy['content'] = mask_restricted_sections(l_copy['content'], user, bound_course=course_obj)
+                        l_copy['content'] = mask_restricted_sections(
+                            l_copy['content'], user, bound_course=course_obj,
+                            segments=lesson_gating.get(l_copy.get('id')), gating=gating,
+                        )
                     serialized_lessons.append(l_copy)
 
             serialized_quizzes = cached['quizzes'] or []
@@ -159,57 +271,29 @@ class EnrollmentSerializer(serializers.ModelSerializer):
         return None # Return None if not a course enrollment or object missing
 
     def get_progress(self, obj):
-        if obj.enrollment_type == 'course' and obj.content_object:
-            course = obj.content_object
-            total_lessons = 0
-            if hasattr(course, 'lessons'):
-                 try:
-                    total_lessons = course.lessons.count()
-                 except Exception as e:
-                    logger.error(f"Error counting lessons for course {course.id}: {e}")
-                    return 0 # Return 0 if lessons can't be counted
+        batch = self._batch(obj)
+        course = batch.course(obj)
+        if course is None:
+            return None # Return None if not applicable
 
-            if total_lessons == 0:
-                return 100 # Or 0? Decide what progress means if there are no lessons. Let's say 100% complete if 0 lessons.
+        total_lessons = course.lesson_total
+        if total_lessons == 0:
+            return 100 # Or 0? Decide what progress means if there are no lessons. Let's say 100% complete if 0 lessons.
 
-            try:
-                # Make sure this model and filter are correct for your lesson completion tracking
-                from lessons.models import LessonCompletion # Ensure this import is valid
-                completed_lessons = LessonCompletion.objects.filter(
-                    user=obj.user,
-                    lesson__course=course,
-                    completed_at__isnull=False  # Check if completed_at timestamp is set
-                ).count()
-                progress = int((completed_lessons / total_lessons) * 100)
-                return progress
-            except ImportError:
-                 logger.error("Could not import LessonCompletion model. Progress calculation skipped.")
-                 return None # Or 0
-            except Exception as e:
-                # Log the specific error
-                logger.error(f"Error calculating progress for enrollment {obj.id}: {e}")
-                return 0 # Return 0 on error
-        return None # Return None if not applicable
+        completed_lessons = sum(1 for _, completed_at in batch.lesson_completions(obj) if completed_at is not None)
+        return int((completed_lessons / total_lessons) * 100)
 
     def get_lesson_completions(self, obj):
-        if obj.enrollment_type != 'course' or not obj.content_object:
-            return []
-        course = obj.content_object
-        try:
-            qs = LessonCompletion.objects.filter(
-                user=obj.user,
-                lesson__course=course
-            ).select_related('lesson')
-            return [
-                {
-                    'lesson_id': c.lesson_id,
-                    'completed_at': c.completed_at.isoformat()
-                }
-                for c in qs
-            ]
-        except Exception as e:
-            logger.error(f"Error fetching completions for enrollment {obj.id}: {e}")
+        batch = self._batch(obj)
+        if batch.course(obj) is None:
             return []
+        return [
+            {
+                'lesson_id': lesson_id,
+                'completed_at': completed_at.isoformat()
+            }
+            for lesson_id, completed_at in batch.lesson_completions(obj)
+        ]
     
 class CollaborationSessionSerializer(serializers.ModelSerializer):
     class Meta:
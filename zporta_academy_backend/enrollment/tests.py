@@ -1,3 +1,86 @@
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from courses.models import Course
+from enrollment.models import Enrollment
+from lessons.models import Lesson, LessonCompletion
+from quizzes.models import Quiz
+
+# Queries for the user's enrollment list once course payloads are cached: the
+# enrollments, then the EnrollmentBatch groups (users, profiles, courses with
+# lesson counts, completions), plus the enrolled course ids when a lesson has
+# gated sections. Independent of the number of enrollments (was ~5 per enrollment).
+ENROLLMENT_LIST_QUERY_BUDGET = 6
+# With an empty cache, EnrollmentBatch also renders every course payload: one
+# query for the lessons of all courses (with course, subject, author and
+# template joined), one for their tags and one for their attached quizzes, and
+# one for the course-level quizzes. Was ~14 per enrollment.
+ENROLLMENT_LIST_COLD_QUERY_BUDGET = ENROLLMENT_LIST_QUERY_BUDGET + 4
+
+
+class EnrollmentListQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username='teacher', password='pw')
+        self.student = User.objects.create_user(username='student', password='pw')
+        course_ct = ContentType.objects.get_for_model(Course)
+        for i in range(50):
+            course = Course.objects.create(
+                title=f'Course {i}', created_by=self.teacher, course_type='free', is_draft=False,
+            )
+            lessons = [
+                Lesson.objects.create(
+                    title=f'Lesson {i}.{n}', content='<p>Body</p>', created_by=self.teacher,
+                    course=course, status=Lesson.PUBLISHED, position=n,
+                )
+                for n in range(4)
+            ]
+            LessonCompletion.objects.create(user=self.student, lesson=lessons[0])
+            Quiz.objects.create(title=f'Quiz {i}', created_by=self.teacher, status='published', lesson=lessons[0])
+            Enrollment.objects.create(
+                user=self.student, content_type=course_ct, object_id=course.id, enrollment_type='course',
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def _list(self):
+        response = self.client.get('/api/enrollment/user/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return data['results'] if isinstance(data, dict) else data
+
+    def test_enrollment_list_queries_do_not_grow_with_enrollments(self):
+        # First request fills the per-course lesson/quiz payload cache
+        self.assertEqual(len(self._list()), 50)
+
+        with CaptureQueriesContext(connection) as ctx:
+            enrollments = self._list()
+        self.assertLessEqual(len(ctx.captured_queries), ENROLLMENT_LIST_QUERY_BUDGET)
+
+        self.assertEqual(len(enrollments), 50)
+        for enrollment in enrollments:
+            self.assertEqual(enrollment['progress'], 25)
+            self.assertEqual(len(enrollment['lesson_completions']), 1)
+            self.assertEqual(len(enrollment['course']['lessons']), 4)
+            self.assertEqual(enrollment['user_details']['username'], 'student')
+
+    def test_cold_cache_renders_every_course_in_grouped_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            enrollments = self._list()
+        self.assertLessEqual(len(ctx.captured_queries), ENROLLMENT_LIST_COLD_QUERY_BUDGET)
+
+        self.assertEqual(len(enrollments), 50)
+        for enrollment in enrollments:
+            lessons = enrollment['course']['lessons']
+            self.assertEqual([lesson['position'] for lesson in lessons], [0, 1, 2, 3])
+            self.assertEqual(len(lessons[0]['quizzes']), 1)
+            self.assertEqual(lessons[0]['created_by'], 'teacher')
+        # The rendered payloads were cached for the next request
+        with CaptureQueriesContext(connection) as ctx:
+            self._list()
+        self.assertLessEqual(len(ctx.captured_queries), ENROLLMENT_LIST_QUERY_BUDGET)
@@ -12,7 +12,7 @@ from users.models import User # For guides
 
 from courses.serializers import CourseSerializer
 from lessons.serializers import LessonSerializer
-from quizzes.serializers import QuizSerializer
+from quizzes.cache import get_quiz_payloads, payload_kind
 from users.serializers import UserSerializer # For guides
 
 class ExplorerSearchView(APIView):
@@ -62,7 +62,9 @@ class ExplorerSearchView(APIView):
         lessons = Lesson.objects.filter(lesson_query)[:10]
         
         # Use .distinct() to prevent duplicate quizzes in results
-        quizzes = Quiz.objects.filter(quiz_query).distinct()[:10]
+        quiz_ids = [quiz.id for quiz in Quiz.objects.filter(quiz_query).distinct().only('id')[:10]]
+        # Rendered quizzes come from the shared payload cache; `?view=card` for compact cards
+        quiz_payloads = get_quiz_payloads(quiz_ids, kind=payload_kind(request), request=request)
         
         guides = User.objects.filter(guide_query, profile__active_guide=True)[:10]
 
@@ -70,6 +72,6 @@ class ExplorerSearchView(APIView):
         return Response({
             'courses': CourseSerializer(courses, many=True, context={'request': request}).data,
             'lessons': LessonSerializer(lessons, many=True, context={'request': request}).data,
-            'quizzes': QuizSerializer(quizzes, many=True, context={'request': request}).data,
+            'quizzes': [quiz_payloads[qid] for qid in quiz_ids if qid in quiz_payloads],
             'guides': UserSerializer(guides, many=True, context={'request': request}).data,
         })
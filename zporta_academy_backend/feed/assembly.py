@@ -0,0 +1,66 @@
+# feed/assembly.py
+"""
+Per-request state for building a feed.
+
+Every feed source needs to know which quizzes the user has already tried and
+records which quizzes were shown. Doing that per item costs one query (or one
+INSERT) per quiz; FeedAssembly loads the attempted set once and buffers
+exposures until flush(), which writes them with a single bulk_create.
+"""
+import logging
+from contextlib import contextmanager
+
+from analytics.models import FeedExposure, QuizAttempt
+
+logger = logging.getLogger(__name__)
+
+
+class FeedAssembly:
+    def __init__(self, user):
+        self.user = user
+        self._attempted_ids = None
+        self._exposures = []
+
+    @property
+    def attempted_ids(self):
+        if self._attempted_ids is None:
+            self._attempted_ids = set(
+                QuizAttempt.objects.filter(user=self.user)
+                .order_by()
+                .values_list('quiz_id', flat=True)
+                .distinct()
+            )
+        return self._attempted_ids
+
+    def tried(self, quiz_id):
+        return quiz_id in self.attempted_ids
+
+    def expose(self, quiz_id, source):
+        """Buffer a FeedExposure row; written by flush()."""
+        self._exposures.append(FeedExposure(user=self.user, quiz_id=quiz_id, source=source))
+
+    def flush(self):
+        if not self._exposures:
+            return 0
+        exposures, self._exposures = self._exposures, []
+        try:
+            FeedExposure.objects.bulk_create(exposures, batch_size=500)
+        except Exception as e:
+            # Exposure logging must never break the feed itself
+            logger.error(f"Failed to write {len(exposures)} feed exposures for user {self.user.id}: {e}", exc_info=True)
+            return 0
+        return len(exposures)
+
+
+@contextmanager
+def feed_assembly(user, assembly=None):
+    """
+    Yield the caller's FeedAssembly, or a private one that is flushed on exit.
+    Lets each feed builder work standalone or as one stage of a larger feed.
+    """
+    if assembly is not None:
+        yield assembly
+        return
+    assembly = FeedAssembly(user)
+    yield assembly
+    assembly.flush()
@@ -0,0 +1,84 @@
+# feed/feed_cache.py
+"""
+Storage for the materialized per-user feed.
+
+The ranked quiz-id lists built by feed.services.build_feed_candidates are kept
+in the cache (Redis in production) so that /feed requests only slice ids and
+hydrate them from the shared quiz payload cache.
+
+Refreshes are triggered by MatchScore / MemoryStat / QuizAttempt changes
+(see feed/signals.py). When a Celery broker is configured the rebuild runs in
+the background (debounced per user); otherwise the entry is simply dropped and
+rebuilt lazily by the next request.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+FEED_CACHE_TIMEOUT = 15 * 60        # hard expiry; new quizzes show up at least this often
+FEED_REFRESH_DEBOUNCE = 30          # seconds; collapses bursts of answer events
+
+
+def _feed_key(user_id):
+    return f"feed_candidates_{user_id}"
+
+
+def _refresh_pending_key(user_id):
+    return f"feed_refresh_pending_{user_id}"
+
+
+def get_cached_feed(user_id):
+    return cache.get(_feed_key(user_id))
+
+
+def store_feed(user_id, candidates):
+    cache.set(_feed_key(user_id), candidates, timeout=FEED_CACHE_TIMEOUT)
+
+
+def invalidate_user_feed(user_id):
+    cache.delete(_feed_key(user_id))
+
+
+def _async_refresh_enabled():
+    return getattr(
+        settings,
+        'FEED_ASYNC_REFRESH',
+        bool(getattr(settings, 'CELERY_BROKER_URL', None)),
+    )
+
+
+def schedule_feed_refresh(user_id):
+    """
+    Request a rebuild of the user's materialized feed after the current
+    transaction commits.
+    """
+    if not user_id:
+        return
+
+    if not _async_refresh_enabled():
+        transaction.on_commit(lambda: invalidate_user_feed(user_id))
+        return
+
+    # Only one refresh per user per debounce window; the task clears the flag
+    # before it starts building, so later changes schedule a new run.
+    if not cache.add(_refresh_pending_key(user_id), 1, timeout=FEED_REFRESH_DEBOUNCE * 2):
+        return
+
+    def _enqueue():
+        try:
+            from .tasks import refresh_user_feed
+            refresh_user_feed.apply_async(args=[user_id], countdown=FEED_REFRESH_DEBOUNCE)
+        except Exception as e:
+            logger.warning(f"Could not enqueue feed refresh for user {user_id}: {e}")
+            cache.delete(_refresh_pending_key(user_id))
+            invalidate_user_feed(user_id)
+
+    transaction.on_commit(_enqueue)
+
+
+def clear_refresh_pending(user_id):
+    cache.delete(_refresh_pending_key(user_id))
@@ -2,13 +2,16 @@
 
 from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
+from collections import namedtuple
 from datetime import timedelta
 import logging
 
 from quizzes.models import Quiz
+from quizzes.cache import get_quiz_payloads
 from analytics.models import MemoryStat, FeedExposure, QuizAttempt
-from quizzes.serializers import QuizSerializer
 from users.models import UserPreference
+from .assembly import feed_assembly
+from .feed_cache import get_cached_feed, store_feed, FEED_CACHE_TIMEOUT
 
 # AI Intelligence imports
 try:
@@ -17,6 +20,7 @@ try:
         get_ai_challenge_quizzes,
         get_ai_confidence_builders
     )
+    from intelligence.models import MatchScore
     AI_AVAILABLE = True
 except ImportError:
     AI_AVAILABLE = False
@@ -25,7 +29,10 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 def log_quiz_feed_exposure(user, quiz, source):
-    """Record that we showed this quiz to the user in this feed."""
+    """
+    Record that we showed this quiz to the user in this feed.
+    Feed builders buffer exposures through FeedAssembly.expose() instead.
+    """
     FeedExposure.objects.create(user=user, quiz=quiz, source=source)
 
 
@@ -48,31 +55,39 @@ def _base_pool(user):
     return qs
 
 
-def _language_bucket_selection(pool_qs, limit, prefs):
+def _language_buckets(pool_qs, prefs):
     """
-    From pool_qs, pick:
-      - 80% quizzes in prefs.languages_spoken[0]
-      - 15% quizzes in English
-      -  5% other languages
-    Ordered by -created_at (newest first) within each bucket.
+    Split pool_qs into (primary language, English, other) querysets.
     """
-    if limit <= 0:
-        return []
-
     primary_lang = prefs.languages_spoken[0] if prefs.languages_spoken else "en"
-    # Buckets
     primary_qs = pool_qs.filter(languages__contains=[primary_lang])
     english_qs = pool_qs.filter(languages__contains=["en"]).exclude(id__in=primary_qs)
     other_qs   = pool_qs.exclude(id__in=primary_qs).exclude(id__in=english_qs)
+    return primary_qs, english_qs, other_qs
+
 
-    # Counts
+def _bucket_counts(limit):
+    """80% primary language, 15% English, 5% other."""
     cnt_primary = int(limit * 0.80)
     cnt_english = int(limit * 0.15)
     cnt_other   = limit - cnt_primary - cnt_english
+    return cnt_primary, cnt_english, cnt_other
+
+
+def _language_bucket_selection(pool_qs, limit, prefs):
+    """
+    From pool_qs, pick:
+      - 80% quizzes in prefs.languages_spoken[0]
+      - 15% quizzes in English
+      -  5% other languages
+    Ordered by -created_at (newest first) within each bucket.
+    """
+    if limit <= 0:
+        return []
 
-    selected = list(primary_qs.order_by('-created_at')[:cnt_primary])
-    selected += list(english_qs.order_by('-created_at')[:cnt_english])
-    selected += list(other_qs.order_by('-created_at')[:cnt_other])
+    selected = []
+    for bucket_qs, count in zip(_language_buckets(pool_qs, prefs), _bucket_counts(limit)):
+        selected += list(bucket_qs.order_by('-created_at')[:count])
 
     return selected
 
@@ -102,7 +117,26 @@ def _location_reorder(quizzes, prefs):
     return ordered
 
 
-def get_explore_quizzes(user, limit=5):
+def _suggestions(quiz_ids, source, why_new, feed_ctx, expose=False, why_tried=None, kind='full'):
+    """Hydrate quiz ids into feed items using the shared payload cache."""
+    payloads = get_quiz_payloads(quiz_ids, kind=kind)
+    suggestions = []
+    for quiz_id in quiz_ids:
+        payload = payloads.get(quiz_id)
+        if not payload:
+            continue
+        tried = feed_ctx.tried(quiz_id)
+        if expose:
+            feed_ctx.expose(quiz_id, source)
+        suggestions.append({
+            **payload,
+            "why": (why_tried or TRIED_WHY) if tried else why_new,
+            "source": source,
+        })
+    return suggestions
+
+
+def get_explore_quizzes(user, limit=5, assembly=None, kind='full'):
     """
     “Explore” feed: newest quizzes, but STRICTLY in the user’s subjects + languages,
     then reorder by location preference.
@@ -113,9 +147,7 @@ def get_explore_quizzes(user, limit=5):
         return []
 
     # 1) Filter by language too
-    filtered = Quiz.objects.filter(
-        id__in=[q.id for q in pool]
-    )
+    filtered = pool
     primary = (prefs.languages_spoken[0] if prefs.languages_spoken else '') or ''
     primary = primary.lower()
     filtered = filtered.filter(languages__contains=[primary]) if primary else filtered
@@ -128,25 +160,19 @@ def get_explore_quizzes(user, limit=5):
         filtered = pool
 
     # 2) Order by newest
-    newest = filtered.order_by('-created_at')[:limit]
+    newest = filtered.order_by('-created_at').only('id', 'detected_location')[:limit]
     # 3) Location reorder
     ordered = _location_reorder(list(newest), prefs)
 
     # 4) Serialize & expose
-    suggestions = []
-    for quiz in ordered:
-        tried = QuizAttempt.objects.filter(user=user, quiz=quiz).exists()
-        why   = "🌎 Latest quizzes to explore" if not tried else "🔄 Quiz available for review"
-        log_quiz_feed_exposure(user, quiz, "explore")
-        suggestions.append({
-            **QuizSerializer(quiz).data,
-            "why": why,
-            "source": "explore"
-        })
-    return suggestions
+    with feed_assembly(user, assembly) as feed_ctx:
+        return _suggestions(
+            [quiz.id for quiz in ordered], "explore", "🌎 Latest quizzes to explore",
+            feed_ctx, expose=True, kind=kind,
+        )
 
 
-def get_personalized_quizzes(user, limit=50):
+def get_personalized_quizzes(user, limit=50, assembly=None, kind='full'):
     """
     “Personalized” feed: subject → language distribution → location reorder.
     """
@@ -155,6 +181,7 @@ def get_personalized_quizzes(user, limit=50):
     if not prefs:
         return []
 
+    pool = pool.only('id', 'detected_location', 'created_at')
     # 1) Language bucket selection
     if prefs.languages_spoken:
         lang_selected = _language_bucket_selection(pool, limit, prefs)
@@ -163,20 +190,14 @@ def get_personalized_quizzes(user, limit=50):
     # 2) Location reorder
     final_list = _location_reorder(lang_selected, prefs)
 
-    # 3) Serialize & expose
-    suggestions = []
-    for quiz in final_list:
-        tried = QuizAttempt.objects.filter(user=user, quiz=quiz).exists()
-        why   = "🔍 Based on your interests" if not tried else "🔄 Quiz available for review"
-        suggestions.append({
-            **QuizSerializer(quiz).data,
-            "why": why,
-            "source": "personalized",
-        })
-    return suggestions
+    # 3) Serialize
+    with feed_assembly(user, assembly) as feed_ctx:
+        return _suggestions(
+            [quiz.id for quiz in final_list], "personalized", "🔍 Based on your interests", feed_ctx, kind=kind,
+        )
 
 
-def get_review_queue(user, limit=50):
+def get_review_queue(user, limit=50, assembly=None, kind='full'):
     """
     “Review” feed: spaced-repetition items only.
     """
@@ -189,87 +210,274 @@ def get_review_queue(user, limit=50):
         source="review"
     ).values_list('quiz_id', flat=True)
 
-    stats = MemoryStat.objects.filter(
-        user=user,
-        content_type=quiz_ct,
-        next_review_at__lte=now
-    ).exclude(object_id__in=recent_ids).order_by('next_review_at')[:limit]
+    stats = list(
+        MemoryStat.objects.filter(
+            user=user,
+            content_type=quiz_ct,
+            next_review_at__lte=now
+        ).exclude(object_id__in=recent_ids)
+        .order_by('next_review_at')
+        .values_list('object_id', 'next_review_at', 'repetitions')[:limit]
+    )
 
+    payloads = get_quiz_payloads([object_id for object_id, _, _ in stats], kind=kind)
     suggestions = []
-    for stat in stats:
-        quiz = stat.learnable_item
-        if not quiz:
-            continue
+    with feed_assembly(user, assembly) as feed_ctx:
+        for object_id, next_review_at, repetitions in stats:
+            payload = payloads.get(object_id)
+            if not payload:
+                continue
+            feed_ctx.expose(object_id, "review")
+            suggestions.append({
+                **payload,
+                "why": _review_why(next_review_at, repetitions, now),
+                "source": "review"
+            })
+    return suggestions
+
 
-        overdue = (now - stat.next_review_at).days
-        if stat.repetitions == 0:
-            why = "🆕 First-time review"
-        elif overdue > 7:
-            why = f"🔥 Very overdue! ({overdue} days late)"
+# ---------------------------------------------------------------------------
+# Materialized feed
+#
+# build_feed_candidates() ranks every source once and keeps only lightweight
+# rows (ids + the few fields needed for ordering). The result is cached per
+# user (feed/feed_cache.py) and refreshed in the background when MatchScore,
+# MemoryStat or QuizAttempt rows change. generate_user_feed() then only slices
+# these lists and hydrates the chosen ids from the shared quiz payload cache.
+# ---------------------------------------------------------------------------
+
+FEED_POOL_SIZE = 500  # per source; NextQuizView asks for at most 500 items
+
+FeedCandidate = namedtuple('FeedCandidate', ['id', 'detected_location', 'created_at'])
+FeedSlot = namedtuple('FeedSlot', ['quiz_id', 'source', 'why', 'why_tried', 'extra'])
+
+TRIED_WHY = "🔄 Quiz available for review"
+
+
+def _candidates(qs, size):
+    rows = qs.order_by('-created_at').values_list('id', 'detected_location', 'created_at')[:size]
+    return [FeedCandidate(*row) for row in rows]
+
+
+def _build_review_candidates(user, now, size):
+    # Include items falling due before the cached entry expires; the
+    # request-time slice keeps only those that are actually due.
+    quiz_ct = ContentType.objects.get_for_model(Quiz)
+    horizon = now + timedelta(seconds=FEED_CACHE_TIMEOUT)
+    return list(
+        MemoryStat.objects.filter(
+            user=user,
+            content_type=quiz_ct,
+            next_review_at__lte=horizon,
+        ).order_by('next_review_at').values_list('object_id', 'next_review_at', 'repetitions')[:size]
+    )
+
+
+def _build_ai_candidates(user, size):
+    if not AI_AVAILABLE:
+        return None
+    try:
+        quiz_ct = ContentType.objects.get_for_model(Quiz)
+        match_scores = list(
+            MatchScore.objects.filter(user=user, content_type=quiz_ct).order_by('-match_score')[:size]
+        )
+        if not match_scores:
+            return None
+        published = set(
+            Quiz.objects.filter(
+                id__in=[ms.object_id for ms in match_scores],
+                status='published',
+            ).values_list('id', flat=True)
+        )
+        return [
+            (ms.object_id, ms.get_why_explanation(), round(ms.match_score, 1), round(ms.difficulty_gap, 1))
+            for ms in match_scores
+            if ms.object_id in published
+        ]
+    except Exception as e:
+        logger.error(f"Error building AI feed candidates for user {user.id}: {e}", exc_info=True)
+        return None
+
+
+def build_feed_candidates(user, size=FEED_POOL_SIZE):
+    """
+    Rank all feed sources for `user` and return a cacheable dict of
+    lightweight candidate lists (no serialized quiz data).
+    """
+    now   = timezone.now()
+    prefs = _get_user_prefs(user)
+    pool  = _base_pool(user)
+
+    personalized = {'buckets': None, 'newest': []}
+    explore = {'primary': None, 'english': [], 'pool': []}
+    if prefs:
+        if prefs.languages_spoken:
+            personalized['buckets'] = [
+                _candidates(bucket_qs, size) for bucket_qs in _language_buckets(pool, prefs)
+            ]
         else:
-            why = f"🧠 Review now ({overdue} days overdue)"
+            personalized['newest'] = _candidates(pool, size)
+
+        primary = ((prefs.languages_spoken[0] if prefs.languages_spoken else '') or '').lower()
+        if primary:
+            explore['primary'] = _candidates(pool.filter(languages__contains=[primary]), size)
+        explore['english'] = _candidates(pool.filter(languages__contains=["en"]), size)
+        explore['pool'] = _candidates(pool, size)
+
+    return {
+        'built_at': now,
+        'location': (prefs.location if prefs else '') or '',
+        'review': _build_review_candidates(user, now, size),
+        'personalized_ai': _build_ai_candidates(user, size),
+        'personalized': personalized,
+        'explore': explore,
+    }
+
+
+def get_feed_candidates(user):
+    """Materialized candidates from the cache, building them on a miss."""
+    candidates = get_cached_feed(user.id)
+    if candidates is None:
+        candidates = build_feed_candidates(user)
+        store_feed(user.id, candidates)
+    return candidates
+
+
+class _LocationPrefs:
+    """Minimal stand-in for UserPreference in _location_reorder."""
+    def __init__(self, location):
+        self.location = location
+
+
+def _compose_personalized(candidates, limit):
+    personalized = candidates['personalized']
+    if personalized['buckets'] is not None:
+        selected = []
+        for bucket, count in zip(personalized['buckets'], _bucket_counts(limit)):
+            selected += bucket[:count]
+    else:
+        selected = personalized['newest'][:limit]
+    return _location_reorder(selected, _LocationPrefs(candidates['location']))
 
-        log_quiz_feed_exposure(user, quiz, "review")
-        suggestions.append({
-            **QuizSerializer(quiz).data,
-            "why": why,
-            "source": "review"
-        })
-    return suggestions
 
+def _compose_explore(candidates, limit):
+    explore = candidates['explore']
+    filtered = explore['primary'] if explore['primary'] is not None else explore['pool']
+    # fallback English if no primary-language items available
+    if len(filtered) < limit:
+        merged = {c.id: c for c in filtered}
+        for c in explore['english']:
+            merged.setdefault(c.id, c)
+        filtered = sorted(merged.values(), key=lambda c: c.created_at, reverse=True)
+    # ultimate fallback: if still empty, take newest subject-only pool
+    if not filtered:
+        filtered = explore['pool']
+    return _location_reorder(filtered[:limit], _LocationPrefs(candidates['location']))
+
+
+def _review_why(next_review_at, repetitions, now):
+    overdue = (now - next_review_at).days
+    if repetitions == 0:
+        return "🆕 First-time review"
+    elif overdue > 7:
+        return f"🔥 Very overdue! ({overdue} days late)"
+    return f"🧠 Review now ({overdue} days overdue)"
+
+
+def _plan_feed_slots(user, candidates, limit, now):
+    """Ordered FeedSlots: review → AI personalized → personalized → explore → top-up."""
+    slots = []
+
+    # 1) Review
+    recent_review_ids = set(
+        FeedExposure.objects.filter(
+            user=user,
+            shown_at__gte=now - timedelta(days=1),
+            source="review"
+        ).values_list('quiz_id', flat=True)
+    )
+    due = [
+        row for row in candidates['review']
+        if row[1] <= now and row[0] not in recent_review_ids
+    ][:limit]
+    for quiz_id, next_review_at, repetitions in due:
+        why = _review_why(next_review_at, repetitions, now)
+        slots.append(FeedSlot(quiz_id, "review", why, why, {}))
+
+    # 2) Personalized (AI first, classic as fallback)
+    for quiz_id, why, match_score, difficulty_gap in (candidates['personalized_ai'] or [])[:limit]:
+        slots.append(FeedSlot(
+            quiz_id, "personalized_ai", why, "🔄 Review this quiz to reinforce learning",
+            {"match_score": match_score, "difficulty_gap": difficulty_gap},
+        ))
+    for c in _compose_personalized(candidates, limit):
+        slots.append(FeedSlot(c.id, "personalized", "🔍 Based on your interests", TRIED_WHY, {}))
+
+    # 3) Explore
+    for c in _compose_explore(candidates, limit):
+        slots.append(FeedSlot(c.id, "explore", "🌎 Latest quizzes to explore", TRIED_WHY, {}))
+
+    # 4) Top-up: continue the personalized ranking for any remaining slots
+    for c in _compose_personalized(candidates, limit * 2):
+        slots.append(FeedSlot(c.id, "personalized", "🔍 Based on your interests", TRIED_WHY, {}))
 
-def generate_user_feed(user, limit=55):
+    return slots
+
+
+def generate_user_feed(user, limit=55, assembly=None, kind='full'):
     """
     Unified feed:
       1) Review →
       2) Personalized →
       3) Explore →
       4) Top-up using the same personalized logic (subject→language→location)
+
+    Served from the materialized candidate lists; only the chosen quizzes are
+    hydrated, from the shared quiz payload cache. The user's attempted set is
+    loaded once and exposures are written in one bulk insert, so the query
+    count does not grow with `limit`. kind='card' returns compact quiz cards
+    (quizzes.serializers.QuizCardSerializer) instead of full quiz payloads.
     """
-    final_feed = []
-    seen_ids   = set()
-    ten_mins   = timezone.now() - timedelta(minutes=10)
+    now        = timezone.now()
+    candidates = get_feed_candidates(user)
+    ten_mins   = now - timedelta(minutes=10)
 
     recently_tried = set(
         QuizAttempt.objects.filter(
             user=user,
             attempted_at__gte=ten_mins
-        ).values_list('quiz_id', flat=True)
+        ).order_by().values_list('quiz_id', flat=True)
     )
 
-    def add(items):
-        for itm in items:
-            if 'status' in itm and itm['status'] != 'published':
-                continue
-            if itm["id"] not in seen_ids and itm["id"] not in recently_tried:
-                final_feed.append(itm)
-                seen_ids.add(itm["id"])
-                if len(final_feed) >= limit:
-                    return True
-        return False
-
-    # 1) Review
-    if add(get_review_queue(user, limit)):
-        return final_feed
-
-    # 2) Personalized (try AI first, fallback to classic)
-    if AI_AVAILABLE and get_ai_personalized_quizzes:
-        ai_personalized = get_ai_personalized_quizzes(user, limit)
-        if ai_personalized and add(ai_personalized):
-            return final_feed
-    
-    # Fallback to classic personalized
-    if add(get_personalized_quizzes(user, limit)):
-        return final_feed
-
-    # 3) Explore
-    if add(get_explore_quizzes(user, limit)):
-        return final_feed
-
-    # 4) Top-up: re-run personalized logic for the remaining slots
-    remaining = limit - len(final_feed)
-    if remaining > 0:
-        topup = get_personalized_quizzes(user, remaining)
-        add(topup)
+    final_feed = []
+    seen_ids   = set(recently_tried)
+    pending    = iter(_plan_feed_slots(user, candidates, limit, now))
+
+    with feed_assembly(user, assembly) as feed_ctx:
+        while len(final_feed) < limit:
+            batch = []
+            for slot in pending:
+                if slot.quiz_id in seen_ids:
+                    continue
+                seen_ids.add(slot.quiz_id)
+                batch.append(slot)
+                if len(batch) >= limit - len(final_feed):
+                    break
+            if not batch:
+                break
+
+            payloads = get_quiz_payloads([slot.quiz_id for slot in batch], kind=kind)
+            for slot in batch:
+                payload = payloads.get(slot.quiz_id)
+                if not payload or payload.get('status') != 'published':
+                    continue
+                final_feed.append({
+                    **payload,
+                    **slot.extra,
+                    "why": slot.why_tried if feed_ctx.tried(slot.quiz_id) else slot.why,
+                    "source": slot.source,
+                })
+                if slot.source in ("review", "explore"):
+                    feed_ctx.expose(slot.quiz_id, slot.source)
 
     return final_feed
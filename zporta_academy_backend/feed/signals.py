@@ -0,0 +1,58 @@
+# feed/signals.py
+"""
+Keep the materialized per-user feed (feed/feed_cache.py) fresh.
+
+Bulk writers (e.g. compute_match_scores, which bypasses post_save with
+bulk_create) call feed.feed_cache.schedule_feed_refresh themselves.
+"""
+from django.db.models.signals import m2m_changed, post_init, post_save
+from django.dispatch import receiver
+
+from analytics.models import MemoryStat, QuizAttempt
+from intelligence.models import MatchScore
+from users.models import UserPreference
+from .feed_cache import schedule_feed_refresh, invalidate_user_feed
+
+
+@receiver(post_save, sender=MatchScore)
+@receiver(post_save, sender=MemoryStat)
+@receiver(post_save, sender=QuizAttempt)
+def refresh_feed_on_learning_change(sender, instance, **kwargs):
+    if kwargs.get('raw', False):
+        return
+    schedule_feed_refresh(instance.user_id)
+
+
+# UserPreference fields the candidate pool depends on (see feed/services.py)
+FEED_PREFERENCE_FIELDS = ('languages_spoken', 'location')
+
+
+def _feed_preferences(instance):
+    return tuple(getattr(instance, name) for name in FEED_PREFERENCE_FIELDS)
+
+
+@receiver(post_init, sender=UserPreference)
+def remember_feed_preferences(sender, instance, **kwargs):
+    instance._feed_preferences = _feed_preferences(instance)
+
+
+@receiver(post_save, sender=UserPreference)
+def invalidate_feed_on_preferences(sender, instance, created, **kwargs):
+    # Only a language/location change alters the candidate pool; other saves
+    # (report language, bio, ...) keep the materialized feed.
+    current = _feed_preferences(instance)
+    changed = created or current != getattr(instance, '_feed_preferences', None)
+    instance._feed_preferences = current
+    if changed and not kwargs.get('raw', False):
+        invalidate_user_feed(instance.user_id)
+
+
+@receiver(m2m_changed, sender=UserPreference.interested_subjects.through)
+@receiver(m2m_changed, sender=UserPreference.interested_tags.through)
+def refresh_feed_on_interests(sender, instance, action, pk_set, **kwargs):
+    # add() of subjects/tags the user already has sends an empty pk_set:
+    # answering quizzes in a known subject does not touch the feed.
+    if not isinstance(instance, UserPreference):
+        return
+    if action == 'post_clear' or (action in ('post_add', 'post_remove') and pk_set):
+        schedule_feed_refresh(instance.user_id)
@@ -0,0 +1,30 @@
+# feed/tasks.py
+import logging
+
+from celery import shared_task
+from django.contrib.auth import get_user_model
+
+from .feed_cache import clear_refresh_pending, store_feed
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="feed.refresh_user_feed")
+def refresh_user_feed(user_id):
+    """Rebuild and store the materialized feed for one user."""
+    from .services import build_feed_candidates
+
+    clear_refresh_pending(user_id)
+    user = get_user_model().objects.filter(pk=user_id).first()
+    if not user:
+        return {"status": "not_found", "user_id": user_id}
+
+    candidates = build_feed_candidates(user)
+    store_feed(user_id, candidates)
+    return {
+        "status": "refreshed",
+        "user_id": user_id,
+        "review": len(candidates['review']),
+        "personalized_ai": len(candidates['personalized_ai'] or []),
+        "explore": len(candidates['explore']['pool']),
+    }
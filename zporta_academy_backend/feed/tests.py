@@ -1,3 +1,177 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from analytics.models import MemoryStat, FeedExposure, QuizAttempt
+from intelligence.feed_enhancement import get_ai_personalized_quizzes
+from intelligence.models import MatchScore
+from quizzes.cache import get_quiz_payloads
+from quizzes.models import Quiz, Question
+from users.models import UserPreference
+from feed import services
+from feed.feed_cache import get_cached_feed, store_feed
+
+
+class MaterializedFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='learner', password='pw')
+        # No preferences: the feed is driven by the review queue only.
+        UserPreference.objects.filter(user=self.user).delete()
+        self.author = User.objects.create_user(username='author', password='pw')
+        self.quiz = Quiz.objects.create(title='Capitals', created_by=self.author, status='published')
+        Question.objects.create(quiz=self.quiz, question_text='Capital of France?', question_type='mcq',
+                                option1='Paris', option2='Rome', correct_option=1)
+        MemoryStat.objects.create(
+            user=self.user,
+            content_type=ContentType.objects.get_for_model(Quiz),
+            object_id=self.quiz.id,
+            next_review_at=timezone.now() - timedelta(days=2),
+            repetitions=1,
+        )
+        cache.clear()
+
+    def test_feed_is_materialized_and_reused(self):
+        feed = services.generate_user_feed(self.user)
+        self.assertEqual([itm['id'] for itm in feed], [self.quiz.id])
+        self.assertEqual(feed[0]['source'], 'review')
+        self.assertIsNotNone(get_cached_feed(self.user.id))
+        self.assertEqual(FeedExposure.objects.filter(user=self.user, source='review').count(), 1)
+
+        # Second request: no re-ranking, quiz payload comes from the shared cache.
+        FeedExposure.objects.all().delete()
+        # recently tried, recent review exposures, attempted set, exposure insert
+        with self.assertNumQueries(4):
+            feed = services.generate_user_feed(self.user)
+        self.assertEqual(len(feed), 1)
+
+    def test_quiz_payload_cache_is_invalidated_on_save(self):
+        self.assertEqual(get_quiz_payloads([self.quiz.id])[self.quiz.id]['title'], 'Capitals')
+        self.quiz.title = 'World capitals'
+        self.quiz.save()
+        self.assertEqual(get_quiz_payloads([self.quiz.id])[self.quiz.id]['title'], 'World capitals')
+
+    def test_card_payload_is_compact_and_invalidated(self):
+        card = get_quiz_payloads([self.quiz.id], kind='card')[self.quiz.id]
+        self.assertNotIn('questions', card)
+        self.assertEqual(card['question_count'], 1)
+        self.assertEqual(card['created_by'], 'author')
+
+        Question.objects.create(quiz=self.quiz, question_text='Capital of Italy?', question_type='mcq',
+                                option1='Paris', option2='Rome', correct_option=2)
+        self.assertEqual(get_quiz_payloads([self.quiz.id], kind='card')[self.quiz.id]['question_count'], 2)
+
+        feed = services.generate_user_feed(self.user, kind='card')
+        self.assertEqual(feed[0]['source'], 'review')
+        self.assertNotIn('questions', feed[0])
+
+
+    @override_settings(FEED_ASYNC_REFRESH=False)
+    def test_answers_in_known_subjects_keep_the_feed(self):
+        from subjects.models import Subject
+        from users.signals import update_user_preferences_from_events
+
+        subject = Subject.objects.create(name='Geography', created_by=self.author)
+        self.quiz.subject = subject
+        self.quiz.save()
+        pref = UserPreference.objects.create(user=self.user)
+        pref.interested_subjects.add(subject)
+        events = [{'metadata': {'quiz_id': self.quiz.id}}]
+        # The SQLite test database cannot build a feed with preferences; seed it
+        store_feed(self.user.id, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            update_user_preferences_from_events(self.user.id, events)
+        self.assertIsNotNone(get_cached_feed(self.user.id))
+
+        pref.report_language = 'ja'
+        pref.save()
+        self.assertIsNotNone(get_cached_feed(self.user.id))
+
+        # A new subject changes the candidate pool
+        self.quiz.subject = Subject.objects.create(name='History', created_by=self.author)
+        self.quiz.save()
+        store_feed(self.user.id, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            update_user_preferences_from_events(self.user.id, events)
+        self.assertIsNone(get_cached_feed(self.user.id))
+
+        store_feed(self.user.id, [])
+        pref = UserPreference.objects.get(user=self.user)
+        pref.languages_spoken = ['ja']
+        pref.save()
+        self.assertIsNone(get_cached_feed(self.user.id))
+
+
+class FeedQueryCountTests(TestCase):
+    """Feed assembly must cost a constant number of queries, whatever the size."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='learner', password='pw')
+        UserPreference.objects.filter(user=self.user).delete()
+        self.author = User.objects.create_user(username='author', password='pw')
+        self.quiz_ct = ContentType.objects.get_for_model(Quiz)
+
+    def _make_due_quizzes(self, count):
+        due = timezone.now() - timedelta(days=1)
+        quizzes = []
+        offset = Quiz.objects.count()
+        for i in range(offset, offset + count):
+            quiz = Quiz.objects.create(title=f'Quiz {i}', created_by=self.author, status='published')
+            MemoryStat.objects.create(
+                user=self.user, content_type=self.quiz_ct, object_id=quiz.id,
+                next_review_at=due, repetitions=1,
+            )
+            MatchScore.objects.create(
+                user=self.user, content_type=self.quiz_ct, object_id=quiz.id,
+                match_score=50 + i, difficulty_gap=0,
+            )
+            quizzes.append(quiz)
+        QuizAttempt.objects.create(user=self.user, quiz=quizzes[0], is_correct=True)
+        cache.delete(f"feed_candidates_{self.user.id}")
+        # Warm the shared payload cache; rendering cost is not what we measure here.
+        get_quiz_payloads([q.id for q in quizzes])
+        return quizzes
+
+    def _count_queries(self, func):
+        FeedExposure.objects.all().delete()
+        with CaptureQueriesContext(connection) as ctx:
+            result = func()
+        return len(ctx.captured_queries), result
+
+    def test_unified_feed_query_count_is_constant(self):
+        self._make_due_quizzes(5)
+        services.get_feed_candidates(self.user)
+        small, feed = self._count_queries(lambda: services.generate_user_feed(self.user, limit=55))
+        self.assertEqual(len(feed), 4)  # the attempted quiz was tried < 10 minutes ago
+
+        self._make_due_quizzes(55)
+        services.get_feed_candidates(self.user)
+        large, feed = self._count_queries(lambda: services.generate_user_feed(self.user, limit=55))
+        self.assertEqual(len(feed), 55)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 4)
+        review_items = [itm for itm in feed if itm['source'] == 'review']
+        self.assertEqual(FeedExposure.objects.filter(user=self.user).count(), len(review_items))
+
+    def test_source_builders_query_count_is_constant(self):
+        self._make_due_quizzes(5)
+        small_review, _ = self._count_queries(lambda: services.get_review_queue(self.user, limit=55))
+        small_ai, _ = self._count_queries(lambda: get_ai_personalized_quizzes(self.user, limit=55))
+
+        self._make_due_quizzes(50)
+        large_review, review = self._count_queries(lambda: services.get_review_queue(self.user, limit=55))
+        large_ai, ai = self._count_queries(lambda: get_ai_personalized_quizzes(self.user, limit=55))
+
+        self.assertEqual(len(review), 55)
+        self.assertEqual(len(ai), 55)
+        self.assertEqual(small_review, large_review)
+        self.assertEqual(small_ai, large_ai)
+        tried = [itm for itm in ai if itm['why'] == "🔄 Review this quiz to reinforce learning"]
+        self.assertEqual(len(tried), 2)
@@ -7,28 +7,29 @@ from rest_framework.views import APIView
 from .services import get_explore_quizzes, get_personalized_quizzes, get_review_queue
 from .serializers import QuizFeedSerializer
 from quizzes.models import Quiz, Question
+from quizzes.cache import payload_kind
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 import os, json, random
 
-# Feeds (return serialized dicts from services)
+# Feeds (return serialized dicts from services; `?view=card` for compact quiz cards)
 class ExploreQuizListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         limit = int(request.query_params.get('limit', 10))
-        return Response(get_explore_quizzes(request.user, limit))
+        return Response(get_explore_quizzes(request.user, limit, kind=payload_kind(request)))
 
 class PersonalizedQuizListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         limit = int(request.query_params.get('limit', 10))
-        return Response(get_personalized_quizzes(request.user, limit))
+        return Response(get_personalized_quizzes(request.user, limit, kind=payload_kind(request)))
 
 class ReviewQuizListView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request):
         limit = int(request.query_params.get('limit', 10))
-        return Response(get_review_queue(request.user, limit))
+        return Response(get_review_queue(request.user, limit, kind=payload_kind(request)))
 
 
     
@@ -37,7 +38,7 @@ class UnifiedFeedView(generics.GenericAPIView):
     serializer_class = QuizFeedSerializer
 
     def get(self, request):
-        data = generate_user_feed(request.user)
+        data = generate_user_feed(request.user, kind=payload_kind(request))
         return Response(data)
 
 class NextQuizView(APIView):
@@ -47,6 +48,13 @@ class NextQuizView(APIView):
         q = Question.objects.filter(quiz=quiz).order_by('id').first()
         return q
 
+    def get_first_question_permalink(self, payload):
+        """Same as get_first_question, but from a serialized quiz payload."""
+        questions = [q for q in payload.get('questions') or [] if q.get('id') is not None]
+        if not questions:
+            return None
+        return min(questions, key=lambda q: q['id']).get('permalink')
+
     def normalize_current(self, request):
         """Resolve current quiz from params: accepts question permalink or quiz id/permalink."""
         current_question = request.query_params.get('current_question')
@@ -210,21 +218,32 @@ class NextQuizView(APIView):
                 continue
             if itm['id'] in exclude_ids:
                 continue
-            quiz_obj = Quiz.objects.filter(id=itm['id']).first()
-            if not quiz_obj:
-                continue
-            # Skip if quiz is not published
-            if quiz_obj.status != 'published':
-                continue
-            first_q = self.get_first_question(quiz_obj)
-            if not first_q:
-                continue
+            if 'questions' in itm:
+                # Hydrated feed payloads already carry status and questions
+                if itm.get('status') != 'published':
+                    continue
+                first_q_permalink = self.get_first_question_permalink(itm)
+                if not first_q_permalink:
+                    continue
+                quiz_id, quiz_title, quiz_permalink = itm['id'], itm.get('title'), itm.get('permalink')
+            else:
+                quiz_obj = Quiz.objects.filter(id=itm['id']).first()
+                if not quiz_obj:
+                    continue
+                # Skip if quiz is not published
+                if quiz_obj.status != 'published':
+                    continue
+                first_q = self.get_first_question(quiz_obj)
+                if not first_q:
+                    continue
+                first_q_permalink = first_q.permalink
+                quiz_id, quiz_title, quiz_permalink = quiz_obj.id, quiz_obj.title, quiz_obj.permalink
             items.append({
-                "quiz_id": quiz_obj.id,
-                "quiz_title": quiz_obj.title,
-                "quiz_permalink": quiz_obj.permalink,
-                "first_question_permalink": first_q.permalink,
-                "first_question_url": f"/quizzes/q/{first_q.permalink}",
+                "quiz_id": quiz_id,
+                "quiz_title": quiz_title,
+                "quiz_permalink": quiz_permalink,
+                "first_question_permalink": first_q_permalink,
+                "first_question_url": f"/quizzes/q/{first_q_permalink}",
             })
             if len(items) >= limit:
                 break
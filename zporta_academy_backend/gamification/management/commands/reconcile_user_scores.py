@@ -0,0 +1,27 @@
+"""
+Management command to check UserScore counters against the Activity history.
+
+Usage:
+    python manage.py reconcile_user_scores            # repair drifted rows
+    python manage.py reconcile_user_scores --dry-run  # only report
+"""
+
+from django.core.management.base import BaseCommand
+
+from gamification.models import UserScore
+
+
+class Command(BaseCommand):
+    help = 'Detect and repair UserScore drift (counters are maintained incrementally)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+        parser.add_argument('--batch-size', type=int, default=500, help='Scores checked per transaction')
+
+    def handle(self, *args, **options):
+        result = UserScore.reconcile(batch_size=options['batch_size'], fix=not options['dry_run'])
+        verb = 'found' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {result['checked']} scores: {verb} {result['drifted']} drifted, "
+            f"{result['missing']} users without a score row"
+        ))
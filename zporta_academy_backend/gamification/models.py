@@ -1,5 +1,8 @@
+from collections import defaultdict
+
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Q, Sum
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.utils import timezone
@@ -84,8 +87,16 @@ class UserScore(models.Model):
     def __str__(self):
         return f"Score({self.user}: {self.total_points})"
 
+    # Activity type -> breakdown counter (counts every row of the type, mistakes included)
+    BREAKDOWN_FIELDS = {
+        ActivityType.LESSON_COMPLETED: "lessons_completed",
+        ActivityType.COURSE_COMPLETED: "courses_completed",
+        ActivityType.CORRECT_ANSWER: "correct_answers",
+    }
+    COUNTER_FIELDS = ("total_points", "lessons_completed", "courses_completed", "correct_answers")
+
     def recalculate(self):
-        qs = Activity.objects.filter(user=self.user)
+        qs = Activity.objects.filter(user_id=self.user_id)
         self.total_points = qs.aggregate(models.Sum("points"))["points__sum"] or 0
         self.lessons_completed = qs.filter(activity_type=ActivityType.LESSON_COMPLETED).count()
         self.courses_completed = qs.filter(activity_type=ActivityType.COURSE_COMPLETED).count()
@@ -94,3 +105,94 @@ class UserScore(models.Model):
         self.save(update_fields=[
             "total_points", "lessons_completed", "courses_completed", "correct_answers", "last_calculated"
         ])
+
+    @classmethod
+    def apply_activities(cls, activities):
+        """
+        Add newly created activities to their owners' scores: one F() update
+        per user, whatever the size of their history. A user without a score
+        row gets one built by recalculate() (which already counts them).
+        """
+        deltas = defaultdict(lambda: defaultdict(int))
+        for activity in activities:
+            delta = deltas[activity.user_id]
+            delta["total_points"] += activity.points
+            field = cls.BREAKDOWN_FIELDS.get(activity.activity_type)
+            if field:
+                delta[field] += 1
+
+        for user_id, delta in deltas.items():
+            updates = {field: F(field) + value for field, value in delta.items() if value}
+            if updates and cls.objects.filter(user_id=user_id).update(**updates):
+                continue
+            if not updates and cls.objects.filter(user_id=user_id).exists():
+                continue
+            try:
+                with transaction.atomic():
+                    score = cls.objects.create(user_id=user_id)
+            except IntegrityError:
+                # Created concurrently (with or without these activities): counters move as usual
+                if updates:
+                    cls.objects.filter(user_id=user_id).update(**updates)
+                continue
+            score.recalculate()
+
+    @classmethod
+    def expected_counters(cls, user_ids):
+        """{user_id: {counter: value}} computed from Activity in one grouped query."""
+        rows = Activity.objects.filter(user_id__in=user_ids).values("user_id").annotate(
+            total_points=Sum("points"),
+            **{
+                field: Count("id", filter=Q(activity_type=activity_type))
+                for activity_type, field in cls.BREAKDOWN_FIELDS.items()
+            },
+        ).order_by()
+        expected = {user_id: dict.fromkeys(cls.COUNTER_FIELDS, 0) for user_id in user_ids}
+        for row in rows:
+            expected[row.pop("user_id")] = {field: row[field] or 0 for field in cls.COUNTER_FIELDS}
+        return expected
+
+    @classmethod
+    def reconcile(cls, batch_size=500, fix=True):
+        """
+        Compare every score with its Activity history, in batches of
+        `batch_size` users, and rewrite the rows that drifted (when `fix`).
+        Users with activities but no score row get one. Score rows of a batch
+        are locked while it is checked, so a concurrent apply_activities()
+        lands either before the check (and is counted) or after the repair.
+        Returns {"checked", "drifted", "missing"}.
+        """
+        missing = list(
+            Activity.objects.filter(user__score__isnull=True)
+            .values_list("user_id", flat=True).distinct().order_by()
+        )
+        result = {"checked": 0, "drifted": 0, "missing": len(missing)}
+        if fix and missing:
+            cls.objects.bulk_create(
+                [cls(user_id=user_id) for user_id in missing], batch_size=batch_size, ignore_conflicts=True
+            )
+
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                scores = list(
+                    cls.objects.select_for_update().filter(pk__gt=last_pk).order_by("pk")[:batch_size]
+                )
+                if not scores:
+                    return result
+                last_pk = scores[-1].pk
+                expected = cls.expected_counters([score.user_id for score in scores])
+
+                drifted = []
+                now = timezone.now()
+                for score in scores:
+                    values = expected[score.user_id]
+                    if any(getattr(score, field) != values[field] for field in cls.COUNTER_FIELDS):
+                        for field, value in values.items():
+                            setattr(score, field, value)
+                        score.last_calculated = now
+                        drifted.append(score)
+                result["checked"] += len(scores)
+                result["drifted"] += len(drifted)
+                if fix and drifted:
+                    cls.objects.bulk_update(drifted, [*cls.COUNTER_FIELDS, "last_calculated"])
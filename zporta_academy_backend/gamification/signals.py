@@ -1,79 +1,102 @@
 # gamification/signals.py
 """
 Signal handlers to automatically track activities from source tables.
+
+Quiz answers arrive in per-user batches from the post-commit event bus
+(analytics/events.py) rather than ActivityEvent post_save.
 """
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
+from django.utils.dateparse import parse_datetime
 
 from .models import Activity, ActivityType, UserScore
-from analytics.models import ActivityEvent
+from analytics.events import ANSWER_SUBMITTED, subscribe
 from lessons.models import LessonCompletion
 from enrollment.models import CourseCompletion, Enrollment
 from courses.models import Course
 
 
-@receiver(post_save, sender=ActivityEvent)
-def track_quiz_answer(sender, instance, created, **kwargs):
-    """Track correct quiz answers AND mistakes from ActivityEvent"""
-    if not created or instance.event_type != 'quiz_answer_submitted':
-        return
-    
-    metadata = instance.metadata or {}
-    is_correct = metadata.get('is_correct', False)
-    
-    user = instance.user
-    if not user:
-        return
-    
-    quiz_id = metadata.get('quiz_id')
-    question_id = metadata.get('question_id')
-    
-    if not quiz_id or not question_id:
+def _insert_new(activities):
+    """
+    Insert activities one by one and return those actually inserted. A
+    unique_key written meanwhile (a replayed or concurrently drained event)
+    is skipped, so it is never scored twice. Callers pre-filter existing
+    keys, so conflicts are rare.
+    """
+    created = []
+    for activity in activities:
+        try:
+            with transaction.atomic():
+                activity.save(force_insert=True)
+        except IntegrityError:
+            continue
+        created.append(activity)
+    return created
+
+
+@subscribe(ANSWER_SUBMITTED)
+def track_quiz_answers(user_id, events):
+    """Track correct quiz answers AND mistakes from a user's answer events"""
+    answers = [
+        (event, event['metadata']) for event in events
+        if event['metadata'].get('quiz_id') and event['metadata'].get('question_id')
+    ]
+    if not answers:
         return
-    
-    # Create unique key - include timestamp for mistakes (can have multiple)
-    if is_correct:
-        unique_key = f"quiz_{user.id}_q_{question_id}"
-    else:
-        # Track each mistake separately
-        unique_key = f"mistake_{user.id}_q_{question_id}_t_{instance.timestamp.timestamp()}"
-    
-    # Check if already tracked (only for correct answers)
-    if is_correct and Activity.objects.filter(unique_key=unique_key).exists():
+
+    def unique_key(event, metadata):
+        # Include timestamp for mistakes (can have multiple)
+        if metadata.get('is_correct', False):
+            return f"quiz_{user_id}_q_{metadata['question_id']}"
+        timestamp = parse_datetime(event['timestamp'])
+        return f"mistake_{user_id}_q_{metadata['question_id']}_t_{timestamp.timestamp()}"
+
+    keyed = [(unique_key(event, metadata), event, metadata) for event, metadata in answers]
+    existing = set(Activity.objects.filter(unique_key__in=[key for key, _, _ in keyed]).values_list('unique_key', flat=True))
+    keyed = [answer for answer in keyed if answer[0] not in existing]
+    if not keyed:
         return
-    
-    try:
-        from quizzes.models import Quiz
-        quiz = Quiz.objects.get(id=quiz_id)
-    except Quiz.DoesNotExist:
+
+    from quizzes.models import Quiz
+    quizzes = Quiz.objects.in_bulk({metadata['quiz_id'] for _, _, metadata in keyed})
+    quiz_type = ContentType.objects.get_for_model(Quiz)
+
+    activities = {}
+    for key, event, metadata in keyed:
+        quiz = quizzes.get(metadata['quiz_id'])
+        if quiz is None or key in activities:
+            continue
+        is_correct = metadata.get('is_correct', False)
+        # Create activity (correct answers get points, mistakes get tracked for analytics)
+        activities[key] = Activity(
+            user_id=user_id,
+            activity_type=ActivityType.CORRECT_ANSWER,
+            points=Activity.get_points_for_activity(ActivityType.CORRECT_ANSWER) if is_correct else 0,
+            content_type=quiz_type,
+            object_id=quiz.id,
+            unique_key=key,
+            is_mistake=not is_correct,
+            metadata={
+                'quiz_id': quiz.id,
+                'quiz_title': quiz.title,
+                'quiz_permalink': quiz.permalink,
+                'question_id': metadata['question_id'],
+                'question_text': metadata.get('question_text', ''),
+                'topic': metadata.get('topic', ''),
+                'subject': metadata.get('subject', ''),
+                'is_correct': is_correct,
+                'event_id': event['event_id'],
+            },
+            created_at=parse_datetime(event['timestamp']),
+        )
+    if not activities:
         return
-    
-    # Create activity (correct answers get points, mistakes get tracked for analytics)
-    Activity.objects.create(
-        user=user,
-        activity_type=ActivityType.CORRECT_ANSWER,
-        points=Activity.get_points_for_activity(ActivityType.CORRECT_ANSWER) if is_correct else 0,
-        content_type=ContentType.objects.get_for_model(quiz),
-        object_id=quiz.id,
-        unique_key=unique_key,
-        is_mistake=not is_correct,
-        metadata={
-            'quiz_id': quiz_id,
-            'quiz_title': quiz.title,
-            'quiz_permalink': quiz.permalink,
-            'question_id': question_id,
-            'question_text': metadata.get('question_text', ''),
-            'topic': metadata.get('topic', ''),
-            'subject': metadata.get('subject', ''),
-            'is_correct': is_correct,
-            'event_id': instance.id,
-        },
-        created_at=instance.timestamp
-    )
-    
-    # Update user score
-    update_user_score(user)
+
+    # Update user score with the rows this call inserted
+    UserScore.apply_activities(_insert_new(activities.values()))
 
 
 @receiver(post_save, sender=LessonCompletion)
@@ -94,7 +117,7 @@ def track_lesson_completion(sender, instance, created, **kwargs):
     time_spent_seconds = instance.get_time_spent_seconds()
     
     # Create activity for student
-    Activity.objects.create(
+    activity = Activity.objects.create(
         user=user,
         activity_type=ActivityType.LESSON_COMPLETED,
         points=Activity.get_points_for_activity(ActivityType.LESSON_COMPLETED),
@@ -117,14 +140,14 @@ def track_lesson_completion(sender, instance, created, **kwargs):
         created_at=instance.completed_at
     )
     
-    update_user_score(user)
+    UserScore.apply_activities([activity])
     
     # Track standalone lesson for teacher
     if lesson.course is None and lesson.created_by and lesson.created_by != user:
         teacher_unique_key = f"standalone_{lesson.created_by.id}_l_{lesson.id}_u_{user.id}"
         
         if not Activity.objects.filter(unique_key=teacher_unique_key).exists():
-            Activity.objects.create(
+            activity = Activity.objects.create(
                 user=lesson.created_by,
                 activity_type=ActivityType.STANDALONE_LESSON,
                 points=Activity.get_points_for_activity(ActivityType.STANDALONE_LESSON),
@@ -139,7 +162,7 @@ def track_lesson_completion(sender, instance, created, **kwargs):
                 },
                 created_at=instance.completed_at
             )
-            update_user_score(lesson.created_by)
+            UserScore.apply_activities([activity])
 
 
 @receiver(post_save, sender=CourseCompletion)
@@ -159,7 +182,7 @@ def track_course_completion(sender, instance, created, **kwargs):
     # Calculate time spent on entire course
     time_spent_seconds = instance.get_time_spent_seconds()
     
-    Activity.objects.create(
+    activity = Activity.objects.create(
         user=user,
         activity_type=ActivityType.COURSE_COMPLETED,
         points=Activity.get_points_for_activity(ActivityType.COURSE_COMPLETED),
@@ -179,7 +202,7 @@ def track_course_completion(sender, instance, created, **kwargs):
         created_at=instance.completed_at
     )
     
-    update_user_score(user)
+    UserScore.apply_activities([activity])
 
 
 @receiver(post_save, sender=Enrollment)
@@ -208,7 +231,7 @@ def track_enrollment(sender, instance, created, **kwargs):
     if Activity.objects.filter(unique_key=unique_key).exists():
         return
     
-    Activity.objects.create(
+    activity = Activity.objects.create(
         user=teacher,
         activity_type=activity_type,
         points=Activity.get_points_for_activity(activity_type),
@@ -229,13 +252,13 @@ def track_enrollment(sender, instance, created, **kwargs):
         created_at=instance.enrollment_date
     )
     
-    update_user_score(teacher)
+    UserScore.apply_activities([activity])
 
     # Also track enrollment as a student learning activity (+2 points).
     # This lets students earn points immediately upon enrolling, not only after course completion.
     student_unique_key = f"enrollment_student_{student.id}_c_{course.id}"
     if not Activity.objects.filter(unique_key=student_unique_key).exists():
-        Activity.objects.create(
+        activity = Activity.objects.create(
             user=student,
             activity_type=ActivityType.COURSE_ENROLLED,
             points=Activity.get_points_for_activity(ActivityType.COURSE_ENROLLED),
@@ -254,61 +277,51 @@ def track_enrollment(sender, instance, created, **kwargs):
             },
             created_at=instance.enrollment_date
         )
-        update_user_score(student)
+        UserScore.apply_activities([activity])
 
 
-@receiver(post_save, sender=ActivityEvent)
-def track_quiz_first_attempt(sender, instance, created, **kwargs):
+@subscribe(ANSWER_SUBMITTED)
+def track_quiz_first_attempts(user_id, events):
     """Track first quiz attempt by student for teacher"""
-    if not created or instance.event_type != 'quiz_answer_submitted':
-        return
-    
-    user = instance.user
-    if not user:
-        return
-    
-    metadata = instance.metadata or {}
-    quiz_id = metadata.get('quiz_id')
-    
-    if not quiz_id:
+    quiz_ids = {event['metadata']['quiz_id'] for event in events if event['metadata'].get('quiz_id')}
+    if not quiz_ids:
         return
-    
-    try:
-        from quizzes.models import Quiz
-        quiz = Quiz.objects.get(id=quiz_id)
-    except Quiz.DoesNotExist:
-        return
-    
-    teacher = quiz.created_by
-    if not teacher or teacher == user:
-        return
-    
-    unique_key = f"quiz_first_{teacher.id}_q_{quiz_id}_u_{user.id}"
-    
-    if Activity.objects.filter(unique_key=unique_key).exists():
+
+    from quizzes.models import Quiz
+    quizzes = [
+        quiz for quiz in Quiz.objects.filter(pk__in=quiz_ids).exclude(created_by__isnull=True)
+        if quiz.created_by_id != user_id
+    ]
+    keys = {quiz.id: f"quiz_first_{quiz.created_by_id}_q_{quiz.id}_u_{user_id}" for quiz in quizzes}
+    existing = set(Activity.objects.filter(unique_key__in=keys.values()).values_list('unique_key', flat=True))
+    quizzes = [quiz for quiz in quizzes if keys[quiz.id] not in existing]
+    if not quizzes:
         return
-    
-    Activity.objects.create(
-        user=teacher,
-        activity_type=ActivityType.QUIZ_FIRST_ATTEMPT,
-        points=Activity.get_points_for_activity(ActivityType.QUIZ_FIRST_ATTEMPT),
-        content_type=ContentType.objects.get_for_model(quiz),
-        object_id=quiz.id,
-        unique_key=unique_key,
-        metadata={
-            'quiz_id': quiz_id,
-            'quiz_title': quiz.title,
-            'quiz_permalink': quiz.permalink,
-            'student_id': user.id,
-            'student_username': user.username,
-        },
-        created_at=instance.timestamp
-    )
-    
-    update_user_score(teacher)
 
+    first_event = {}
+    for event in events:
+        first_event.setdefault(event['metadata'].get('quiz_id'), event)
+    student_username = get_user_model().objects.filter(pk=user_id).values_list('username', flat=True).first()
+    quiz_type = ContentType.objects.get_for_model(Quiz)
+
+    created = _insert_new([
+        Activity(
+            user_id=quiz.created_by_id,
+            activity_type=ActivityType.QUIZ_FIRST_ATTEMPT,
+            points=Activity.get_points_for_activity(ActivityType.QUIZ_FIRST_ATTEMPT),
+            content_type=quiz_type,
+            object_id=quiz.id,
+            unique_key=keys[quiz.id],
+            metadata={
+                'quiz_id': quiz.id,
+                'quiz_title': quiz.title,
+                'quiz_permalink': quiz.permalink,
+                'student_id': user_id,
+                'student_username': student_username,
+            },
+            created_at=parse_datetime(first_event[quiz.id]['timestamp']),
+        )
+        for quiz in quizzes
+    ])
 
-def update_user_score(user):
-    """Update or create user score after activity"""
-    score, created = UserScore.objects.get_or_create(user=user)
-    score.recalculate()
+    UserScore.apply_activities(created)
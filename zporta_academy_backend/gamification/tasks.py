@@ -0,0 +1,13 @@
+# gamification/tasks.py
+from celery import shared_task
+
+from .models import UserScore
+
+
+@shared_task(name="gamification.reconcile_user_scores")
+def reconcile_user_scores():
+    """
+    Repair UserScore counters that drifted from the Activity history.
+    Scheduled daily via CELERY_BEAT_SCHEDULE.
+    """
+    return UserScore.reconcile()
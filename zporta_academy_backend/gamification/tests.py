@@ -0,0 +1,80 @@
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from analytics import events, utils
+from gamification.models import Activity, ActivityType, UserScore
+from gamification.signals import _insert_new
+from quizzes.models import Quiz, Question
+from zporta.testing import FakeRedis
+
+
+class UserScoreCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pw')
+        self.learner = User.objects.create_user(username='learner', password='pw')
+        self.quiz = Quiz.objects.create(title='Scores', created_by=self.author)
+        self.question = Question.objects.create(quiz=self.quiz, question_text='Q', question_type='mcq',
+                                                option1='a', option2='b', correct_option=1)
+
+    def _answer(self, is_correct=True):
+        utils.log_event(self.learner, 'quiz_answer_submitted', instance=self.question, related_object=self.quiz,
+                        metadata={'quiz_id': self.quiz.id, 'question_id': self.question.id, 'is_correct': is_correct})
+
+    def _scores(self):
+        return {
+            score.user_id: (score.total_points, score.correct_answers)
+            for score in UserScore.objects.filter(user__in=[self.learner, self.author])
+        }
+
+    @override_settings(EVENT_BUS_ASYNC=False)
+    def test_score_counters_are_incremental_and_reconciled(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._answer()
+        with self.captureOnCommitCallbacks(execute=True):
+            self._answer(is_correct=False)
+        score = UserScore.objects.get(user=self.learner)
+        self.assertEqual((score.total_points, score.correct_answers), (1, 2))
+
+        with self.assertNumQueries(1):
+            UserScore.apply_activities([Activity(user=self.learner, activity_type=ActivityType.LESSON_COMPLETED, points=5)])
+        UserScore.objects.filter(user=self.author).update(total_points=99)
+
+        self.assertEqual(UserScore.reconcile(fix=False), {'checked': 2, 'drifted': 2, 'missing': 0})
+        self.assertEqual(UserScore.reconcile(), {'checked': 2, 'drifted': 2, 'missing': 0})
+        self.assertEqual(UserScore.reconcile(), {'checked': 2, 'drifted': 0, 'missing': 0})
+        score.refresh_from_db()
+        self.assertEqual((score.total_points, score.lessons_completed), (1, 0))
+
+    @override_settings(EVENT_BUS_ASYNC=True)
+    def test_replayed_events_are_not_scored_twice(self):
+        redis = FakeRedis()
+        with mock.patch('analytics.events.get_redis', return_value=redis), \
+                mock.patch('analytics.tasks.drain_domain_events.apply_async'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self._answer()
+                self._answer(is_correct=False)
+            delivered = [json.loads(item) for item in redis.lrange(events.BUFFER_KEY, 0, -1)]
+            self.assertEqual(events.drain(), 2)
+        scores = self._scores()
+        self.assertEqual(scores[self.learner.id], (1, 2))
+
+        # At-least-once delivery: the same batch again changes nothing
+        events.dispatch(delivered)
+        self.assertEqual(self._scores(), scores)
+        self.assertEqual(Activity.objects.count(), 3)
+        self.assertEqual(UserScore.reconcile(fix=False)['drifted'], 0)
+
+    def test_only_inserted_activities_are_returned(self):
+        def activity(key):
+            return Activity(user=self.learner, activity_type=ActivityType.CORRECT_ANSWER, points=1, unique_key=key)
+
+        Activity.objects.create(user=self.learner, activity_type=ActivityType.CORRECT_ANSWER, points=1,
+                                unique_key='quiz_taken')
+        created = _insert_new([activity('quiz_taken'), activity('quiz_new')])
+        self.assertEqual([a.unique_key for a in created], ['quiz_new'])
+        self.assertEqual(Activity.objects.filter(unique_key__startswith='quiz_').count(), 2)
@@ -9,8 +9,8 @@ Integrates with the existing feed/services.py module.
 import logging
 from django.contrib.contenttypes.models import ContentType
 from quizzes.models import Quiz
-from quizzes.serializers import QuizSerializer
-from analytics.models import QuizAttempt
+from quizzes.cache import get_quiz_payloads
+from feed.assembly import feed_assembly
 
 try:
     from intelligence.models import MatchScore, UserAbilityProfile
@@ -21,7 +21,7 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
-def get_ai_personalized_quizzes(user, limit=50):
+def get_ai_personalized_quizzes(user, limit=50, assembly=None):
     """
     Get personalized quiz recommendations using AI match scores.
     
@@ -33,47 +33,44 @@ def get_ai_personalized_quizzes(user, limit=50):
     
     try:
         quiz_ct = ContentType.objects.get_for_model(Quiz)
-        match_scores = MatchScore.objects.filter(
+        match_scores = list(MatchScore.objects.filter(
             user=user,
             content_type=quiz_ct
-        ).select_related('content_type').order_by('-match_score')[:limit]
+        ).order_by('-match_score')[:limit])
         
-        if not match_scores.exists():
+        if not match_scores:
             logger.info(f"No AI match scores available for user {user.id}")
             return None
         
-        # Fetch actual quiz objects
+        # Keep published quizzes only, then hydrate from the shared payload cache
         quiz_ids = [ms.object_id for ms in match_scores]
-        quizzes = Quiz.objects.filter(
+        published = set(Quiz.objects.filter(
             id__in=quiz_ids,
             status='published'
-        ).select_related('subject').prefetch_related('tags')
-        
-        quiz_dict = {q.id: q for q in quizzes}
+        ).values_list('id', flat=True))
+        payloads = get_quiz_payloads([qid for qid in quiz_ids if qid in published])
         
         # Build suggestions with AI explanations
         suggestions = []
-        for ms in match_scores:
-            quiz = quiz_dict.get(ms.object_id)
-            if not quiz:
-                continue
-            
-            # Check if user has attempted this quiz
-            tried = QuizAttempt.objects.filter(user=user, quiz=quiz).exists()
-            
-            # Generate explanation
-            if not tried:
-                why = ms.get_why_explanation()
-            else:
-                why = "🔄 Review this quiz to reinforce learning"
-            
-            suggestions.append({
-                **QuizSerializer(quiz).data,
-                "why": why,
-                "source": "personalized_ai",
-                "match_score": round(ms.match_score, 1),
-                "difficulty_gap": round(ms.difficulty_gap, 1),
-            })
+        with feed_assembly(user, assembly) as feed_ctx:
+            for ms in match_scores:
+                payload = payloads.get(ms.object_id)
+                if not payload:
+                    continue
+                
+                # Generate explanation
+                if not feed_ctx.tried(ms.object_id):
+                    why = ms.get_why_explanation()
+                else:
+                    why = "🔄 Review this quiz to reinforce learning"
+                
+                suggestions.append({
+                    **payload,
+                    "why": why,
+                    "source": "personalized_ai",
+                    "match_score": round(ms.match_score, 1),
+                    "difficulty_gap": round(ms.difficulty_gap, 1),
+                })
         
         logger.info(f"AI personalization returned {len(suggestions)} items for user {user.id}")
         return suggestions
@@ -97,25 +94,25 @@ def get_ai_challenge_quizzes(user, limit=10):
             user=user,
             content_type=quiz_ct,
             difficulty_gap__gte=50  # Challenging content
-        ).select_related('content_type').order_by('-match_score')[:limit]
+        ).order_by('-match_score')[:limit]
         
-        if not match_scores.exists():
+        match_scores = list(match_scores)
+        if not match_scores:
             return []
         
         quiz_ids = [ms.object_id for ms in match_scores]
-        quizzes = Quiz.objects.filter(
+        published = set(Quiz.objects.filter(
             id__in=quiz_ids,
             status='published'
-        ).select_related('subject')
-        
-        quiz_dict = {q.id: q for q in quizzes}
+        ).values_list('id', flat=True))
+        quiz_dict = get_quiz_payloads([qid for qid in quiz_ids if qid in published])
         
         suggestions = []
         for ms in match_scores:
-            quiz = quiz_dict.get(ms.object_id)
-            if quiz:
+            payload = quiz_dict.get(ms.object_id)
+            if payload:
                 suggestions.append({
-                    **QuizSerializer(quiz).data,
+                    **payload,
                     "why": "🚀 Challenge yourself with this harder content!",
                     "source": "challenge",
                     "match_score": round(ms.match_score, 1),
@@ -142,25 +139,25 @@ def get_ai_confidence_builders(user, limit=10):
             user=user,
             content_type=quiz_ct,
             difficulty_gap__lte=-30  # Easier content
-        ).select_related('content_type').order_by('-match_score')[:limit]
+        ).order_by('-match_score')[:limit]
         
-        if not match_scores.exists():
+        match_scores = list(match_scores)
+        if not match_scores:
             return []
         
         quiz_ids = [ms.object_id for ms in match_scores]
-        quizzes = Quiz.objects.filter(
+        published = set(Quiz.objects.filter(
             id__in=quiz_ids,
             status='published'
-        ).select_related('subject')
-        
-        quiz_dict = {q.id: q for q in quizzes}
+        ).values_list('id', flat=True))
+        quiz_dict = get_quiz_payloads([qid for qid in quiz_ids if qid in published])
         
         suggestions = []
         for ms in match_scores:
-            quiz = quiz_dict.get(ms.object_id)
-            if quiz:
+            payload = quiz_dict.get(ms.object_id)
+            if payload:
                 suggestions.append({
-                    **QuizSerializer(quiz).data,
+                    **payload,
                     "why": "⚡ Quick win to build confidence!",
                     "source": "confidence",
                     "match_score": round(ms.match_score, 1),
@@ -124,6 +124,9 @@ class Command(BaseCommand):
                     'success_rate': success_rate,
                     'avg_time_spent_seconds': avg_time_seconds,
                     'attempt_count': attempt_count,
+                    # Reset the running aggregates kept by intelligence.online
+                    'correct_count': round(success_rate * attempt_count / 100),
+                    'total_time_spent_ms': int(avg_time_seconds * 1000 * attempt_count),
                     'metadata': {
                         'last_computed': timezone.now().isoformat(),
                         'days_analyzed': days,
@@ -193,6 +196,9 @@ class Command(BaseCommand):
                     'success_rate': success_rate,
                     'avg_time_spent_seconds': avg_time_seconds,
                     'attempt_count': attempt_count,
+                    # Reset the running aggregates kept by intelligence.online
+                    'correct_count': round(success_rate * attempt_count / 100),
+                    'total_time_spent_ms': int(avg_time_seconds * 1000 * attempt_count),
                     'metadata': {
                         'last_computed': timezone.now().isoformat(),
                         'days_analyzed': days,
@@ -6,38 +6,54 @@ Usage:
     python manage.py compute_match_scores
 
 This command:
-1. For each active user, finds candidate quizzes
-2. Computes match scores based on ZPD, preferences, and recency
-3. Stores top N matches per user in MatchScore table
+1. Builds quiz feature arrays (difficulty, subject, languages, tags) once
+2. Scores blocks of users against all candidate quizzes with NumPy
+   (ZPD, preferences, recently attempted quizzes excluded)
+3. Keeps the top N matches per user and only rewrites MatchScore rows that
+   are new, gone, or whose score moved by more than --min-delta
 
 Should be run every 6-12 hours or after ability/difficulty updates.
 """
 
 import logging
+import time
 from datetime import timedelta
 from django.core.management.base import BaseCommand
-from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Q, Max
 from django.utils import timezone
 
-from intelligence.models import UserAbilityProfile, ContentDifficultyProfile, MatchScore
-from intelligence.utils import (
-    compute_match_score,
-    compute_preference_alignment,
-    compute_recency_penalty
-)
+from intelligence.matching import QuizFeatures, UserBlock, score_block, stored_zpd_scores
+from intelligence.models import UserAbilityProfile, MatchScore
 from quizzes.models import Quiz
 from users.models import UserPreference
-from analytics.models import ActivityEvent
+from analytics.answer_facts import answer_facts_enabled
+from analytics.models import ActivityEvent, QuizAnswerFact
+from feed.feed_cache import schedule_feed_refresh
 
-User = get_user_model()
 logger = logging.getLogger(__name__)
 
+MATCH_UPDATE_FIELDS = [
+    'match_score', 'difficulty_gap', 'zpd_score', 'preference_alignment_score',
+    'recency_penalty', 'metadata', 'computed_at',
+]
+
+
+def _why_tags(difficulty_gap, preference_score):
+    why_parts = []
+    if abs(difficulty_gap) <= 50:
+        why_parts.append("optimal_difficulty")
+    if preference_score > 0.6:
+        why_parts.append("matches_interests")
+    if difficulty_gap > 50:
+        why_parts.append("challenge")
+    elif difficulty_gap < -50:
+        why_parts.append("confidence_builder")
+    return why_parts
+
 
 class Command(BaseCommand):
     help = 'Compute match scores for all users'
-    
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--top-n',
@@ -54,179 +70,168 @@ class Command(BaseCommand):
             '--batch-size',
             type=int,
             default=50,
-            help='Number of users to process per batch (default: 50)'
+            help='Number of users scored together per block (default: 50)'
         )
-    
+        parser.add_argument(
+            '--min-delta',
+            type=float,
+            default=1.0,
+            help='Only rewrite an existing match whose score moved by more than this (default: 1.0)'
+        )
+
     def handle(self, *args, **options):
         top_n = options['top_n']
         user_id = options.get('user_id')
-        batch_size = options['batch_size']
-        
+        batch_size = max(1, options['batch_size'])
+        min_delta = options['min_delta']
+
         self.stdout.write(self.style.SUCCESS(
             f'Starting match score computation (top_n={top_n})'
         ))
-        
+
         start_time = timezone.now()
-        
-        # Get users with ability profiles
+        quiz_ct = ContentType.objects.get_for_model(Quiz)
+
+        t0 = time.monotonic()
+        features = QuizFeatures.load()
+        self.stdout.write(f'  Loaded {len(features)} candidate quizzes in {time.monotonic() - t0:.1f}s')
+
+        # Users with ability profiles
+        abilities = UserAbilityProfile.objects.order_by('user_id')
         if user_id:
-            users = User.objects.filter(id=user_id, ability_profile__isnull=False)
-        else:
-            users = User.objects.filter(ability_profile__isnull=False)
-        
-        total_users = users.count()
+            abilities = abilities.filter(user_id=user_id)
+        abilities = list(abilities.values_list('user_id', 'overall_ability_score'))
+
+        total_users = len(abilities)
         processed = 0
-        
-        quiz_ct = ContentType.objects.get_for_model(Quiz)
-        
-        for user in users.iterator(chunk_size=batch_size):
+        totals = {'created': 0, 'updated': 0, 'deleted': 0, 'skipped': 0}
+
+        for i in range(0, total_users, batch_size):
+            block = abilities[i:i + batch_size]
             try:
-                match_count = self.compute_user_matches(user, top_n, quiz_ct)
-                processed += 1
-                
-                if processed % 10 == 0:
-                    self.stdout.write(f'  Processed {processed}/{total_users} users...')
+                counts = self.compute_block_matches(features, block, top_n, min_delta, quiz_ct)
             except Exception as e:
-                logger.error(f"Error computing matches for user {user.id}: {e}", exc_info=True)
+                logger.error(f"Error computing matches for users {block[0][0]}..{block[-1][0]}: {e}", exc_info=True)
                 continue
-        
+            for key, value in counts.items():
+                totals[key] += value
+            processed += len(block)
+            if (i // batch_size + 1) % 20 == 0:
+                self.stdout.write(f'  Processed {processed}/{total_users} users...')
+
         elapsed = (timezone.now() - start_time).total_seconds()
+        self.stdout.write(
+            f"  Rows: {totals['created']} created, {totals['updated']} updated, "
+            f"{totals['deleted']} deleted, {totals['skipped']} skipped (moved <= {min_delta})"
+        )
         self.stdout.write(self.style.SUCCESS(
             f'Match score computation complete. Processed {processed} users in {elapsed:.1f} seconds'
         ))
-    
-    def compute_user_matches(self, user, top_n, quiz_ct):
-        """Compute match scores for a single user."""
-        # Get user's ability profile
-        try:
-            ability_profile = UserAbilityProfile.objects.get(user=user)
-            user_ability = ability_profile.overall_ability_score
-        except UserAbilityProfile.DoesNotExist:
-            logger.warning(f"No ability profile for user {user.id}")
-            return 0
-        
-        # Get user preferences
-        try:
-            user_prefs = UserPreference.objects.get(user=user)
-        except UserPreference.DoesNotExist:
-            user_prefs = None
-        
-        # Get candidate quizzes (filter by user's interested subjects if available)
-        candidate_quizzes = Quiz.objects.filter(status='published')
-        
-        if user_prefs and user_prefs.interested_subjects.exists():
-            # Prioritize quizzes in user's interested subjects
-            interested_subjects = user_prefs.interested_subjects.all()
-            candidate_quizzes = candidate_quizzes.filter(
-                Q(subject__in=interested_subjects) |
-                Q(subject__isnull=True)
-            )
-        
-        # Limit to quizzes with difficulty scores
-        candidate_quizzes = candidate_quizzes.filter(
-            computed_difficulty_score__isnull=False
-        ).select_related('subject').prefetch_related('tags')
-        
-        # Get user's recent attempt history for recency penalty
-        recent_attempts = {}
-        last_30_days = timezone.now() - timedelta(days=30)
-        
-        recent_quiz_attempts = ActivityEvent.objects.filter(
-            user=user,
+
+    def load_user_block(self, features, block):
+        """Preferences of a block of users, loaded with a handful of queries."""
+        user_ids = [uid for uid, _ in block]
+        pref_users = {}
+        languages = {}
+        for pref_id, uid, langs in UserPreference.objects.filter(user_id__in=user_ids).values_list(
+            'id', 'user_id', 'languages_spoken'
+        ):
+            pref_users[pref_id] = uid
+            languages[uid] = langs if isinstance(langs, list) else []
+
+        subjects, tags = {}, {}
+        for pref_id, subject_id in UserPreference.interested_subjects.through.objects.filter(
+            userpreference_id__in=list(pref_users)
+        ).values_list('userpreference_id', 'subject_id'):
+            subjects.setdefault(pref_users[pref_id], []).append(subject_id)
+        for pref_id, tag_id in UserPreference.interested_tags.through.objects.filter(
+            userpreference_id__in=list(pref_users)
+        ).values_list('userpreference_id', 'tag_id'):
+            tags.setdefault(pref_users[pref_id], []).append(tag_id)
+
+        return UserBlock(
+            features, user_ids, [ability for _, ability in block],
+            subjects=subjects, tags=tags, languages=languages,
+        )
+
+    def recent_attempt_pairs(self, user_ids):
+        """(user_id, quiz_id) pairs attempted within the last 7 days; excluded from matches."""
+        since = timezone.now() - timedelta(days=7)
+        if answer_facts_enabled():
+            return set(QuizAnswerFact.objects.filter(
+                user_id__in=user_ids, timestamp__gt=since
+            ).values_list('user_id', 'quiz_id').distinct())
+        pairs = set()
+        for uid, quiz_id in ActivityEvent.objects.filter(
+            user_id__in=user_ids,
             event_type='quiz_answer_submitted',
-            timestamp__gte=last_30_days,
+            timestamp__gt=since,
             metadata__has_key='quiz_id'
-        ).values('metadata__quiz_id').annotate(
-            last_attempt=Max('timestamp')
-        )
-        
-        for attempt in recent_quiz_attempts:
-            quiz_id = attempt['metadata__quiz_id']
-            recent_attempts[quiz_id] = attempt['last_attempt']
-        
-        # Compute match scores for all candidate quizzes
-        match_scores = []
-        
-        for quiz in candidate_quizzes[:1000]:  # Limit to 1000 candidates per user for performance
-            # Skip if recently attempted (within 7 days)
-            last_attempt = recent_attempts.get(quiz.id)
-            if last_attempt and (timezone.now() - last_attempt).days < 7:
+        ).values_list('user_id', 'metadata__quiz_id').distinct():
+            try:
+                pairs.add((uid, int(quiz_id)))
+            except (TypeError, ValueError):
                 continue
-            
-            # Get quiz difficulty
-            quiz_difficulty = quiz.computed_difficulty_score
-            
-            # Compute preference alignment
-            preference_score = compute_preference_alignment(quiz, user_prefs)
-            
-            # Compute recency penalty
-            recency_penalty = compute_recency_penalty(last_attempt) if last_attempt else 0.0
-            
-            # Compute overall match score
-            match_score_value = compute_match_score(
-                user_ability=user_ability,
-                quiz_difficulty=quiz_difficulty,
-                preference_score=preference_score,
-                recency_penalty=recency_penalty
-            )
-            
-            # Compute difficulty gap for ZPD
-            difficulty_gap = quiz_difficulty - user_ability
-            
-            match_scores.append({
-                'quiz': quiz,
-                'match_score': match_score_value,
-                'difficulty_gap': difficulty_gap,
-                'preference_score': preference_score,
-                'recency_penalty': recency_penalty,
-            })
-        
-        # Sort by match score and take top N
-        match_scores.sort(key=lambda x: x['match_score'], reverse=True)
-        top_matches = match_scores[:top_n]
-        
-        # Clear old match scores for this user (for this content type)
-        MatchScore.objects.filter(user=user, content_type=quiz_ct).delete()
-        
-        # Bulk create new match scores
-        match_score_objects = []
-        for match_data in top_matches:
-            quiz = match_data['quiz']
-            
-            # Compute ZPD score
-            difficulty_gap = match_data['difficulty_gap']
-            if -50 <= difficulty_gap <= 50:
-                zpd_score = 1.0 - abs(difficulty_gap) / 100
-            else:
-                zpd_score = max(0.1, 0.5 - abs(difficulty_gap - 50) / 200)
-            
-            # Generate explanation metadata
-            why_parts = []
-            if abs(difficulty_gap) <= 50:
-                why_parts.append("optimal_difficulty")
-            if match_data['preference_score'] > 0.6:
-                why_parts.append("matches_interests")
-            if difficulty_gap > 50:
-                why_parts.append("challenge")
-            elif difficulty_gap < -50:
-                why_parts.append("confidence_builder")
-            
-            match_score_objects.append(MatchScore(
-                user=user,
-                content_type=quiz_ct,
-                object_id=quiz.id,
-                match_score=match_data['match_score'],
-                difficulty_gap=difficulty_gap,
-                zpd_score=zpd_score,
-                preference_alignment_score=match_data['preference_score'],
-                recency_penalty=match_data['recency_penalty'],
-                metadata={
-                    'why_tags': why_parts,
-                    'computed_at': timezone.now().isoformat(),
-                }
-            ))
-        
-        if match_score_objects:
-            MatchScore.objects.bulk_create(match_score_objects, batch_size=100)
-        
-        return len(match_score_objects)
+        return pairs
+
+    def compute_block_matches(self, features, block, top_n, min_delta, quiz_ct):
+        """Score one block of users and sync their MatchScore rows."""
+        users = self.load_user_block(features, block)
+        results = score_block(features, users, self.recent_attempt_pairs(users.user_ids), top_n=top_n)
+
+        existing = {}
+        for row_id, uid, object_id, score in MatchScore.objects.filter(
+            user_id__in=users.user_ids, content_type=quiz_ct
+        ).values_list('id', 'user_id', 'object_id', 'match_score'):
+            existing[(uid, object_id)] = (row_id, score)
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        keep = set()
+        skipped = 0
+        changed_users = set()
+
+        for uid, matches in results.items():
+            for quiz_id, score, gap, preference in matches:
+                keep.add((uid, quiz_id))
+                current = existing.get((uid, quiz_id))
+                if current is not None and abs(current[1] - score) <= min_delta:
+                    skipped += 1
+                    continue
+                values = dict(
+                    match_score=score,
+                    difficulty_gap=gap,
+                    zpd_score=float(stored_zpd_scores(gap)),
+                    preference_alignment_score=preference,
+                    recency_penalty=0.0,
+                    metadata={
+                        'why_tags': _why_tags(gap, preference),
+                        'computed_at': now.isoformat(),
+                    },
+                    computed_at=now,
+                )
+                if current is None:
+                    to_create.append(MatchScore(user_id=uid, content_type=quiz_ct, object_id=quiz_id, **values))
+                else:
+                    to_update.append(MatchScore(id=current[0], **values))
+                changed_users.add(uid)
+
+        stale = [(key, row_id) for key, (row_id, _) in existing.items() if key not in keep]
+        if stale:
+            MatchScore.objects.filter(id__in=[row_id for _, row_id in stale]).delete()
+            changed_users.update(uid for (uid, _), _ in stale)
+        if to_update:
+            MatchScore.objects.bulk_update(to_update, MATCH_UPDATE_FIELDS, batch_size=500)
+        if to_create:
+            MatchScore.objects.bulk_create(to_create, batch_size=500)
+
+        # Bulk writes skip post_save, so refresh the materialized feeds here
+        for uid in changed_users:
+            schedule_feed_refresh(uid)
+
+        return {
+            'created': len(to_create),
+            'updated': len(to_update),
+            'deleted': len(stale),
+            'skipped': skipped,
+        }
@@ -4,25 +4,33 @@ Management command to compute ability scores for all users.
 
 Usage:
     python manage.py compute_user_abilities
+    python manage.py compute_user_abilities --workers 4
 
 This command:
-1. Analyzes each user's quiz attempt history
-2. Computes ability scores using ELO-style rating system
-3. Ranks users and computes percentiles
-4. Updates UserAbilityProfile and denormalized fields on Profile model
+1. Loads quiz difficulty and subject maps once
+2. Streams quiz_answer_submitted events ordered by user (one cursor per shard)
+3. Computes ability scores using ELO-style rating system, sharded by user id
+   across a process pool (--workers)
+4. Writes UserAbilityProfile and denormalized fields on Profile with bulk_update
+5. Ranks users and computes percentiles in one sorted pass
 
 Should be run daily or every 12 hours.
 """
 
 import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Q, Avg
+from django.db.models import Count
 from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
-from django.db import connection
+from django.db import connection, connections
 
 from intelligence.models import UserAbilityProfile, ContentDifficultyProfile
+from intelligence.online import refresh_rankings
 from intelligence.utils import compute_user_ability_elo
 from quizzes.models import Quiz
 from analytics.models import ActivityEvent
@@ -31,10 +39,173 @@ from users.models import Profile
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+DEFAULT_DIFFICULTY = 400.0
+DEFAULT_TIME_SPENT_MS = 15000
+STREAM_FETCH_SIZE = 2000
+WRITE_BATCH_SIZE = 1000
+
+# Raw SQL instead of ORM key transforms: bypasses JSONField decoder issues on
+# legacy non-object metadata rows (see METADATA_CORRUPTION_QUICKREF.md).
+ATTEMPTS_SQL = """
+    SELECT
+        user_id,
+        JSON_EXTRACT(metadata, '$.quiz_id') as quiz_id,
+        JSON_EXTRACT(metadata, '$.is_correct') as is_correct,
+        JSON_EXTRACT(metadata, '$.time_spent_ms') as time_spent_ms
+    FROM analytics_activityevent
+    WHERE event_type = 'quiz_answer_submitted'
+      AND timestamp >= %s
+      AND user_id %% %s = %s
+      AND UPPER(JSON_TYPE(metadata)) = 'OBJECT'
+      AND JSON_EXTRACT(metadata, '$.quiz_id') IS NOT NULL
+      AND JSON_EXTRACT(metadata, '$.is_correct') IS NOT NULL
+    ORDER BY user_id, timestamp ASC
+"""
+
+
+def _json_value(raw):
+    """SQL JSON_EXTRACT results arrive as text/bytes/numbers; JSON null as 'null'."""
+    if raw is None:
+        return None
+    if isinstance(raw, bytes):
+        raw = raw.decode()
+    if isinstance(raw, str):
+        raw = raw.strip().strip('"')
+        if raw.lower() == 'null' or raw == '':
+            return None
+    return raw
+
+
+def _parse_attempt(quiz_id_raw, is_correct_raw, time_spent_raw):
+    try:
+        quiz_id = int(_json_value(quiz_id_raw) or 0) or None
+    except (ValueError, TypeError):
+        quiz_id = None
+
+    is_correct = _json_value(is_correct_raw)
+    if isinstance(is_correct, str):
+        is_correct = is_correct.lower() in ('true', '1')
+    else:
+        is_correct = bool(is_correct)
+
+    try:
+        time_spent_ms = int(float(_json_value(time_spent_raw) or DEFAULT_TIME_SPENT_MS))
+    except (ValueError, TypeError):
+        time_spent_ms = DEFAULT_TIME_SPENT_MS
+
+    return quiz_id, is_correct, time_spent_ms
+
+
+def summarize_attempts(attempt_data, subject_attempts):
+    """
+    Turn one user's chronological attempts into the UserAbilityProfile fields.
+
+    attempt_data: list of {is_correct, quiz_difficulty, time_spent_ms}
+    subject_attempts: {subject_id: [same dicts]}
+    """
+    overall_ability = compute_user_ability_elo(attempt_data)
+
+    ability_by_subject = {}
+    for subject_id, subj_attempts in subject_attempts.items():
+        if len(subj_attempts) >= 3:  # Minimum attempts for subject-specific score
+            ability_by_subject[str(subject_id)] = compute_user_ability_elo(subj_attempts)
+
+    total_attempts = len(attempt_data)
+    correct_attempts = sum(1 for a in attempt_data if a['is_correct'])
+
+    # Trend: last 30% of attempts ("recent") vs overall
+    if total_attempts >= 10:
+        recent_count = max(3, int(total_attempts * 0.3))
+        recent_data = attempt_data[-recent_count:]
+        recent_correct = sum(1 for a in recent_data if a['is_correct'])
+        recent_performance = (recent_correct / len(recent_data)) * 100
+        overall_performance = (correct_attempts / total_attempts) * 100
+        performance_trend = recent_performance - overall_performance
+    else:
+        performance_trend = 0.0
+
+    return {
+        'overall_ability_score': overall_ability,
+        'ability_by_subject': ability_by_subject,
+        'total_quizzes_attempted': total_attempts,
+        'total_correct_answers': correct_attempts,
+        'recent_performance_trend': performance_trend,
+    }
+
+
+def _stream_cursor():
+    """Server-side cursor on MySQL so the event stream is not buffered in memory."""
+    connection.ensure_connection()
+    if connection.vendor == 'mysql':
+        try:
+            from MySQLdb.cursors import SSCursor
+            return connection.connection.cursor(SSCursor)
+        except ImportError:
+            pass
+    return connection.chunked_cursor()
+
+
+def compute_shard(shard, shard_count, cutoff_date, eligible_user_ids, difficulties, quiz_subjects):
+    """
+    Compute abilities for every eligible user with user_id % shard_count == shard.
+    Runs in a worker process (or inline for a single worker).
+
+    Returns {user_id: summarize_attempts(...)}.
+    """
+    results = {}
+    current_user = None
+    attempt_data = []
+    subject_attempts = {}
+
+    def finish():
+        if current_user is not None and attempt_data:
+            results[current_user] = summarize_attempts(attempt_data, subject_attempts)
+
+    cursor = _stream_cursor()
+    try:
+        cursor.execute(ATTEMPTS_SQL, [connection.ops.adapt_datetimefield_value(cutoff_date), shard_count, shard])
+        while True:
+            rows = cursor.fetchmany(STREAM_FETCH_SIZE)
+            if not rows:
+                break
+            for user_id, quiz_id_raw, is_correct_raw, time_spent_raw in rows:
+                if eligible_user_ids is not None and user_id not in eligible_user_ids:
+                    continue
+                if user_id != current_user:
+                    finish()
+                    current_user, attempt_data, subject_attempts = user_id, [], {}
+
+                quiz_id, is_correct, time_spent_ms = _parse_attempt(quiz_id_raw, is_correct_raw, time_spent_raw)
+                if not quiz_id:
+                    continue
+
+                attempt = {
+                    'is_correct': is_correct,
+                    'quiz_difficulty': difficulties.get(quiz_id, DEFAULT_DIFFICULTY),
+                    'time_spent_ms': time_spent_ms,
+                }
+                attempt_data.append(attempt)
+                subject_id = quiz_subjects.get(quiz_id)
+                if subject_id:
+                    subject_attempts.setdefault(subject_id, []).append(attempt)
+        finish()
+    finally:
+        cursor.close()
+    return results
+
+
+def _compute_shard_in_worker(args):
+    # Forked workers must not share the parent's DB connection
+    connections.close_all()
+    try:
+        return compute_shard(*args)
+    finally:
+        connections.close_all()
+
 
 class Command(BaseCommand):
     help = 'Compute ability scores and rankings for all users'
-    
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--min-attempts',
@@ -53,215 +224,144 @@ class Command(BaseCommand):
             type=int,
             help='Compute for specific user ID only'
         )
-    
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of worker processes; users are sharded by id (default: 1)'
+        )
+
     def handle(self, *args, **options):
         min_attempts = options['min_attempts']
         days = options['days']
         user_id = options.get('user_id')
-        
+        workers = max(1, options['workers'])
+        if user_id:
+            workers = 1
+
         self.stdout.write(self.style.SUCCESS(
-            f'Starting user ability computation with min_attempts={min_attempts}, days={days}'
+            f'Starting user ability computation with min_attempts={min_attempts}, days={days}, workers={workers}'
         ))
-        
+
         start_time = timezone.now()
-        cutoff_date = timezone.now() - timezone.timedelta(days=days)
-        
-        # Get users with sufficient quiz attempts
+        cutoff_date = start_time - timezone.timedelta(days=days)
+        timings = {}
+
+        # 1) Lookup maps and eligible users, loaded once
+        t0 = time.monotonic()
+        difficulties, quiz_subjects = self.load_quiz_maps()
         if user_id:
-            users = User.objects.filter(id=user_id)
+            eligible_user_ids = {user_id}
         else:
-            users = User.objects.filter(
-                analytics_activity_events__event_type='quiz_answer_submitted',
-                analytics_activity_events__timestamp__gte=cutoff_date
-            ).annotate(
-                attempt_count=Count('analytics_activity_events')
-            ).filter(attempt_count__gte=min_attempts)
-        
-        processed = 0
-        quiz_ct = ContentType.objects.get_for_model(Quiz)
-        
-        for user in users:
-            try:
-                self.compute_user_ability(user, cutoff_date, quiz_ct)
-                processed += 1
-                
-                if processed % 50 == 0:
-                    self.stdout.write(f'  Processed {processed} users...')
-            except Exception as e:
-                logger.error(f"Error computing ability for user {user.id}: {e}", exc_info=True)
-                continue
-        
-        # Compute rankings and percentiles
+            eligible_user_ids = set(
+                ActivityEvent.objects.filter(
+                    event_type='quiz_answer_submitted',
+                    timestamp__gte=cutoff_date,
+                    user_id__isnull=False,
+                ).values('user_id')
+                .annotate(attempt_count=Count('id'))
+                .filter(attempt_count__gte=min_attempts)
+                .values_list('user_id', flat=True)
+            )
+        timings['load'] = time.monotonic() - t0
+
+        # 2) Stream events and compute ELO per user, sharded by user id
+        t0 = time.monotonic()
+        results = {}
+        if eligible_user_ids:
+            shard_args = [
+                (shard, workers, cutoff_date, eligible_user_ids, difficulties, quiz_subjects)
+                for shard in range(workers)
+            ]
+            if workers == 1:
+                results = compute_shard(*shard_args[0])
+            else:
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                    for shard_results in pool.map(_compute_shard_in_worker, shard_args):
+                        results.update(shard_results)
+        timings['compute'] = time.monotonic() - t0
+
+        # 3) Persist profiles
+        t0 = time.monotonic()
+        self.save_profiles(results, cutoff_date)
+        timings['write'] = time.monotonic() - t0
+
+        # 4) Rankings and percentiles
+        t0 = time.monotonic()
         self.compute_rankings()
-        
+        timings['rank'] = time.monotonic() - t0
+
         elapsed = (timezone.now() - start_time).total_seconds()
+        self.stdout.write(
+            '  Timing: ' + ', '.join(f'{phase} {seconds:.2f}s' for phase, seconds in timings.items())
+        )
         self.stdout.write(self.style.SUCCESS(
-            f'User ability computation complete. Processed {processed} users in {elapsed:.1f} seconds'
+            f'User ability computation complete. Processed {len(results)} users in {elapsed:.1f} seconds'
         ))
-    
-    def compute_user_ability(self, user, cutoff_date, quiz_ct):
-        """Compute ability score for a single user using raw SQL."""
-        # Use raw SQL to get quiz attempts (bypasses JSONField decoder issues)
-        sql = """
-            SELECT 
-                JSON_EXTRACT(metadata, '$.quiz_id') as quiz_id,
-                JSON_EXTRACT(metadata, '$.is_correct') as is_correct,
-                JSON_EXTRACT(metadata, '$.time_spent_ms') as time_spent_ms,
-                timestamp
-            FROM analytics_activityevent
-            WHERE user_id = %s
-              AND event_type = 'quiz_answer_submitted'
-              AND timestamp >= %s
-              AND JSON_TYPE(metadata) = 'OBJECT'
-              AND JSON_EXTRACT(metadata, '$.quiz_id') IS NOT NULL
-              AND JSON_EXTRACT(metadata, '$.is_correct') IS NOT NULL
-            ORDER BY timestamp ASC
+
+    def load_quiz_maps(self):
         """
-        
-        with connection.cursor() as cursor:
-            cursor.execute(sql, [user.id, cutoff_date])
-            attempts_raw = cursor.fetchall()
-        
-        if not attempts_raw:
-            return
-        
-        # Prepare attempt data for ELO computation
-        attempt_data = []
-        quiz_difficulties = {}
-        subject_attempts = {}
-        
-        for quiz_id_raw, is_correct_raw, time_spent_raw, timestamp in attempts_raw:
-            # Convert SQL results to Python types (handle JSON null as string 'null')
-            try:
-                quiz_id = int(quiz_id_raw) if quiz_id_raw and str(quiz_id_raw).lower() != 'null' else None
-            except (ValueError, TypeError):
-                quiz_id = None
-            
-            try:
-                is_correct = bool(is_correct_raw) if is_correct_raw and str(is_correct_raw).lower() != 'null' else False
-            except (ValueError, TypeError):
-                is_correct = False
-            
-            try:
-                time_spent_ms = int(time_spent_raw) if time_spent_raw and str(time_spent_raw).lower() != 'null' else 15000
-            except (ValueError, TypeError):
-                time_spent_ms = 15000
-            
-            if not quiz_id:
-                continue
-            
-            # Get quiz difficulty (from ContentDifficultyProfile or Quiz model)
-            if quiz_id not in quiz_difficulties:
-                try:
-                    diff_profile = ContentDifficultyProfile.objects.get(
-                        content_type=quiz_ct,
-                        object_id=quiz_id
-                    )
-                    quiz_difficulties[quiz_id] = float(diff_profile.computed_difficulty_score)
-                except ContentDifficultyProfile.DoesNotExist:
-                    # Fallback to Quiz.computed_difficulty_score or default
-                    try:
-                        quiz = Quiz.objects.get(id=quiz_id)
-                        quiz_difficulties[quiz_id] = float(quiz.computed_difficulty_score or 400.0)
-                    except Quiz.DoesNotExist:
-                        quiz_difficulties[quiz_id] = 400.0
-            
-            attempt_data.append({
-                'is_correct': is_correct,
-                'quiz_difficulty': quiz_difficulties[quiz_id],
-                'time_spent_ms': time_spent_ms
-            })
-            
-            # Track subject-specific attempts
-            try:
-                quiz = Quiz.objects.get(id=quiz_id)
-                if quiz.subject_id:
-                    if quiz.subject_id not in subject_attempts:
-                        subject_attempts[quiz.subject_id] = []
-                    
-                    subject_attempts[quiz.subject_id].append({
-                        'is_correct': is_correct,
-                        'quiz_difficulty': quiz_difficulties.get(quiz_id, 400.0),
-                        'time_spent_ms': time_spent_ms
-                    })
-            except Quiz.DoesNotExist:
-                pass
-        
-        if not attempt_data:
+        Return ({quiz_id: difficulty}, {quiz_id: subject_id}).
+        ContentDifficultyProfile wins over Quiz.computed_difficulty_score.
+        """
+        quiz_ct = ContentType.objects.get_for_model(Quiz)
+        difficulties = {}
+        quiz_subjects = {}
+        for quiz_id, score, subject_id in Quiz.objects.values_list('id', 'computed_difficulty_score', 'subject_id').iterator():
+            difficulties[quiz_id] = float(score or DEFAULT_DIFFICULTY)
+            if subject_id:
+                quiz_subjects[quiz_id] = subject_id
+        for quiz_id, score in ContentDifficultyProfile.objects.filter(
+            content_type=quiz_ct
+        ).values_list('object_id', 'computed_difficulty_score').iterator():
+            difficulties[quiz_id] = float(score)
+        return difficulties, quiz_subjects
+
+    def save_profiles(self, results, cutoff_date):
+        """Create/update UserAbilityProfile rows and Profile denormalized fields in bulk."""
+        if not results:
             return
-        
-        # Compute overall ability using ELO
-        overall_ability = compute_user_ability_elo(attempt_data)
-        
-        # Compute subject-specific abilities
-        ability_by_subject = {}
-        for subject_id, subj_attempts in subject_attempts.items():
-            if len(subj_attempts) >= 3:  # Minimum attempts for subject-specific score
-                ability_by_subject[str(subject_id)] = compute_user_ability_elo(subj_attempts)
-        
-        # Compute performance metrics
-        total_attempts = len(attempt_data)
-        correct_attempts = sum(1 for a in attempt_data if a['is_correct'])
-        
-        # Compute 30-day trend (simplified without timestamp comparison)
-        if total_attempts >= 10:
-            # Use last 30% of attempts as "recent"
-            recent_count = max(3, int(total_attempts * 0.3))
-            recent_data = attempt_data[-recent_count:]
-            
-            recent_correct = sum(1 for a in recent_data if a['is_correct'])
-            recent_performance = (recent_correct / len(recent_data)) * 100
-            overall_performance = (correct_attempts / total_attempts) * 100
-            performance_trend = recent_performance - overall_performance
-        else:
-            performance_trend = 0.0
-        
-        # Update or create UserAbilityProfile
-        profile, created = UserAbilityProfile.objects.update_or_create(
-            user=user,
-            defaults={
-                'overall_ability_score': overall_ability,
-                'ability_by_subject': ability_by_subject,
-                'total_quizzes_attempted': total_attempts,
-                'total_correct_answers': correct_attempts,
-                'recent_performance_trend': performance_trend,
-                'metadata': {
-                    'last_computed': timezone.now().isoformat(),
-                    'days_analyzed': (timezone.now() - cutoff_date).days,
-                }
-            }
-        )
-        
-        # Update denormalized fields on Profile model
-        try:
-            user_profile = Profile.objects.get(user=user)
-            user_profile.overall_ability_score = float(overall_ability)
-            user_profile.last_ability_update = timezone.now()
-            user_profile.save(update_fields=['overall_ability_score', 'last_ability_update'])
-        except Profile.DoesNotExist:
-            pass
-    
+        now = timezone.now()
+        metadata = {
+            'last_computed': now.isoformat(),
+            'days_analyzed': (now - cutoff_date).days,
+        }
+        fields = list(next(iter(results.values())).keys())
+        user_ids = list(results)
+
+        for i in range(0, len(user_ids), WRITE_BATCH_SIZE):
+            batch_ids = user_ids[i:i + WRITE_BATCH_SIZE]
+            existing = {p.user_id: p for p in UserAbilityProfile.objects.filter(user_id__in=batch_ids)}
+            to_update, to_create = [], []
+            for uid in batch_ids:
+                values = dict(results[uid], metadata=metadata, last_computed_at=now)
+                profile = existing.get(uid)
+                if profile is None:
+                    to_create.append(UserAbilityProfile(user_id=uid, **values))
+                    continue
+                for field, value in values.items():
+                    setattr(profile, field, value)
+                to_update.append(profile)
+            if to_create:
+                UserAbilityProfile.objects.bulk_create(to_create, batch_size=WRITE_BATCH_SIZE)
+            if to_update:
+                UserAbilityProfile.objects.bulk_update(
+                    to_update, fields + ['metadata', 'last_computed_at'], batch_size=WRITE_BATCH_SIZE
+                )
+
+            user_profiles = list(Profile.objects.filter(user_id__in=batch_ids).only('id', 'user_id'))
+            for user_profile in user_profiles:
+                user_profile.overall_ability_score = float(results[user_profile.user_id]['overall_ability_score'])
+                user_profile.last_ability_update = now
+            Profile.objects.bulk_update(
+                user_profiles, ['overall_ability_score', 'last_ability_update'], batch_size=WRITE_BATCH_SIZE
+            )
+
     def compute_rankings(self):
-        """Compute global rankings and percentiles for all users."""
-        profiles = UserAbilityProfile.objects.all().order_by('-overall_ability_score')
-        total_users = profiles.count()
-        
+        """Compute global rankings and percentiles for all users in one sorted pass."""
+        total_users = refresh_rankings()
         if total_users == 0:
             return
-        
-        for rank, profile in enumerate(profiles, start=1):
-            percentile = ((total_users - rank) / total_users) * 100
-            
-            profile.global_rank = rank
-            profile.percentile = percentile
-            profile.save(update_fields=['global_rank', 'percentile'])
-            
-            # Update Profile model
-            try:
-                user_profile = Profile.objects.get(user=profile.user)
-                user_profile.ability_rank = rank
-                user_profile.save(update_fields=['ability_rank'])
-            except Profile.DoesNotExist:
-                pass
-        
+
         self.stdout.write(self.style.SUCCESS(f'✓ Computed rankings for {total_users} users'))
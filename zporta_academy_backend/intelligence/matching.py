@@ -0,0 +1,164 @@
+# intelligence/matching.py
+"""
+Vectorized user × quiz match scoring used by compute_match_scores.
+
+Applies the formulas of intelligence.utils (compute_zpd_score,
+compute_preference_alignment, compute_match_score) to a block of users at
+once: quiz features (difficulty, subject, languages, tags) are loaded into
+arrays once per run, and each block of users is scored with NumPy
+broadcasting plus two sparse products (tags, languages).
+"""
+import numpy as np
+from scipy import sparse
+
+from quizzes.models import Quiz
+
+ZPD_MIN_GAP, ZPD_MAX_GAP = -50, 50
+
+# Weights from compute_preference_alignment / compute_match_score
+SUBJECT_WEIGHT, TAG_WEIGHT, LANGUAGE_WEIGHT = 0.4, 0.3, 0.3
+ZPD_WEIGHT, PREF_WEIGHT, RECENCY_WEIGHT = 0.5, 0.3, 0.2
+
+
+def zpd_scores(gap):
+    """Vectorized compute_zpd_score() with the default optimal range."""
+    mid = (ZPD_MIN_GAP + ZPD_MAX_GAP) / 2
+    max_distance = (ZPD_MAX_GAP - ZPD_MIN_GAP) / 2
+    inside = 1.0 - (np.abs(gap - mid) / max_distance) * 0.2
+    too_easy = np.maximum(0.3, 0.8 - (ZPD_MIN_GAP - gap) / 100)
+    too_hard = np.maximum(0.1, 0.8 - (gap - ZPD_MAX_GAP) / 100)
+    return np.where(gap < ZPD_MIN_GAP, too_easy, np.where(gap > ZPD_MAX_GAP, too_hard, inside))
+
+
+def stored_zpd_scores(gap):
+    """The ZPD value persisted on MatchScore.zpd_score."""
+    abs_gap = np.abs(gap)
+    return np.where(abs_gap <= 50, 1.0 - abs_gap / 100, np.maximum(0.1, 0.5 - np.abs(gap - 50) / 200))
+
+
+def _vocab_matrix(rows, values_per_row, vocab):
+    """CSR matrix with a 1 for every (row, vocab[value]) pair; unknown values are dropped."""
+    indptr, indices = [0], []
+    for values in values_per_row:
+        indices.extend(sorted({vocab[v] for v in values if v in vocab}))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float32)
+    return sparse.csr_matrix((data, indices, indptr), shape=(rows, len(vocab)))
+
+
+class QuizFeatures:
+    """Feature arrays for every match candidate (published quiz with a difficulty score)."""
+
+    def __init__(self, ids, difficulty, subject_ids, languages, tag_ids):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.difficulty = np.asarray(difficulty, dtype=np.float32)
+        self.index = {quiz_id: i for i, quiz_id in enumerate(ids)}
+
+        self.subject_vocab = {s: i for i, s in enumerate(sorted({s for s in subject_ids if s}))}
+        # -1 = no subject; user subject matrices get an extra all-False column
+        # at the end so that index -1 always reads as "no match".
+        self.subject_col = np.array([self.subject_vocab.get(s, -1) for s in subject_ids], dtype=np.int64)
+        self.has_subject = self.subject_col >= 0
+
+        self.language_vocab = {l: i for i, l in enumerate(sorted({l for langs in languages for l in langs}))}
+        self.languages = _vocab_matrix(len(ids), languages, self.language_vocab)
+
+        self.tag_vocab = {t: i for i, t in enumerate(sorted({t for tags in tag_ids for t in tags}))}
+        self.tags = _vocab_matrix(len(ids), tag_ids, self.tag_vocab)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls):
+        rows = list(
+            Quiz.objects.filter(status='published', computed_difficulty_score__isnull=False)
+            .order_by('id')
+            .values_list('id', 'computed_difficulty_score', 'subject_id', 'languages')
+        )
+        tags = {}
+        for quiz_id, tag_id in Quiz.tags.through.objects.filter(
+            quiz__status='published', quiz__computed_difficulty_score__isnull=False,
+        ).values_list('quiz_id', 'tag_id').iterator():
+            tags.setdefault(quiz_id, []).append(tag_id)
+        return cls(
+            ids=[r[0] for r in rows],
+            difficulty=[r[1] for r in rows],
+            subject_ids=[r[2] for r in rows],
+            languages=[r[3] if isinstance(r[3], list) else [] for r in rows],
+            tag_ids=[tags.get(r[0], []) for r in rows],
+        )
+
+
+class UserBlock:
+    """Abilities and preferences for a block of users, in the quiz feature space."""
+
+    def __init__(self, features, user_ids, abilities, subjects, tags, languages):
+        self.user_ids = list(user_ids)
+        self.abilities = np.asarray(abilities, dtype=np.float32)
+        n = len(self.user_ids)
+
+        self.subjects = np.zeros((n, len(features.subject_vocab) + 1), dtype=bool)
+        self.has_interests = np.zeros(n, dtype=bool)
+        for row, uid in enumerate(self.user_ids):
+            user_subjects = subjects.get(uid, ())
+            self.has_interests[row] = bool(user_subjects)
+            for s in user_subjects:
+                if s in features.subject_vocab:
+                    self.subjects[row, features.subject_vocab[s]] = True
+
+        self.tags = _vocab_matrix(n, [tags.get(uid, ()) for uid in self.user_ids], features.tag_vocab)
+        # Overlap is relative to *all* the user's tags, including ones no quiz uses
+        self.tag_counts = np.array([len(set(tags.get(uid, ()))) for uid in self.user_ids], dtype=np.float32)
+        self.languages = _vocab_matrix(n, [languages.get(uid, ()) for uid in self.user_ids], features.language_vocab)
+
+
+def score_block(features, users, recent_pairs=(), top_n=100):
+    """
+    Score every (user, quiz) pair of the block and return the top N per user:
+    {user_id: [(quiz_id, match_score, difficulty_gap, preference_score), ...]}
+    best first.
+
+    recent_pairs: (user_id, quiz_id) attempted within the last 7 days; these
+    are excluded, so the recency penalty of every kept candidate is 0.
+    """
+    results = {uid: [] for uid in users.user_ids}
+    if not len(features) or not users.user_ids:
+        return results
+
+    gap = features.difficulty[None, :] - users.abilities[:, None]
+
+    subject_match = users.subjects[:, features.subject_col]
+    tag_overlap = np.asarray((users.tags @ features.tags.T).todense(), dtype=np.float32)
+    tag_overlap /= np.maximum(users.tag_counts, 1)[:, None]
+    language_match = np.asarray((users.languages @ features.languages.T).todense()) > 0
+    preference = np.minimum(
+        1.0,
+        SUBJECT_WEIGHT * subject_match + TAG_WEIGHT * tag_overlap + LANGUAGE_WEIGHT * language_match,
+    )
+
+    scores = (zpd_scores(gap) * ZPD_WEIGHT + preference * PREF_WEIGHT + RECENCY_WEIGHT) * 100
+
+    # Users with interested subjects only see those subjects (plus subject-less quizzes)
+    allowed = ~users.has_interests[:, None] | subject_match | ~features.has_subject[None, :]
+    scores = np.where(allowed, scores, -np.inf)
+
+    row_of = {uid: row for row, uid in enumerate(users.user_ids)}
+    for uid, quiz_id in recent_pairs:
+        row, col = row_of.get(uid), features.index.get(quiz_id)
+        if row is not None and col is not None:
+            scores[row, col] = -np.inf
+
+    k = min(top_n, len(features))
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+
+    for row, uid in enumerate(users.user_ids):
+        cols = top[row][np.isfinite(scores[row, top[row]])]
+        results[uid] = [
+            (int(features.ids[c]), float(scores[row, c]), float(gap[row, c]), float(preference[row, c]))
+            for c in cols
+        ]
+    return results
@@ -9,6 +9,8 @@ This module contains models for:
 - Cached recommendations for fast feed generation
 
 All heavy ML computations are done offline via management commands.
+Abilities and difficulties also get one online ELO step per answer
+(intelligence/online.py); the commands then act as periodic reconcile jobs.
 These models store precomputed results for fast API lookups.
 """
 
@@ -32,7 +34,8 @@ class UserAbilityProfile(models.Model):
     - 500-700: Advanced
     - 700-1000: Expert
     
-    Computed offline by management command: compute_user_abilities
+    Updated online on every answer (intelligence.online) and reconciled
+    offline by management command: compute_user_abilities
     """
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -144,7 +147,8 @@ class ContentDifficultyProfile(models.Model):
     - 500-700: Hard
     - 700-1000: Expert
     
-    Computed offline by management command: compute_content_difficulty
+    Updated online on every answer (intelligence.online) and reconciled
+    offline by management command: compute_content_difficulty
     """
     # Generic FK to Quiz or Question
     content_type = models.ForeignKey(
@@ -178,6 +182,17 @@ class ContentDifficultyProfile(models.Model):
         default=0,
         help_text="Total number of attempts (for confidence weighting)"
     )
+
+    # Running aggregates maintained per answer by intelligence.online
+    correct_count = models.IntegerField(
+        default=0,
+        help_text="Total number of correct attempts"
+    )
+    
+    total_time_spent_ms = models.BigIntegerField(
+        default=0,
+        help_text="Sum of time spent over all attempts (milliseconds)"
+    )
     
     # Segmented difficulty (how hard is it for different user groups)
     difficulty_by_user_segment = models.JSONField(
@@ -0,0 +1,216 @@
+# intelligence/online.py
+"""
+Online (per-answer) ability and difficulty updates.
+
+Every recorded answer applies one ELO step to the user's ability and, in the
+opposite direction, to the difficulty of the quiz and the question, and bumps
+the running aggregates (attempts, correct, time) on ContentDifficultyProfile.
+Abilities and difficulties stay fresh within seconds without scanning
+ActivityEvent history. Content rows are shared by every learner, so they move
+by F() deltas rather than under a row lock.
+
+Global rank / percentile are recomputed by refresh_rankings() on a schedule
+(intelligence.refresh_ability_rankings). compute_user_abilities /
+compute_content_difficulty remain as periodic reconcile jobs that recompute
+everything from scratch.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from quizzes.models import Quiz, Question
+from users.models import Profile
+from .models import UserAbilityProfile, ContentDifficultyProfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATING = 400.0
+DEFAULT_TIME_SPENT_MS = 15000
+USER_K_FACTOR = 32      # same as compute_user_ability_elo
+CONTENT_K_FACTOR = 16   # content moves slower: many users answer the same item
+RANK_BATCH_SIZE = 1000
+# ContentDifficultyProfile values copied onto Quiz / Question after a step
+CONTENT_COPY_FIELDS = (
+    'computed_difficulty_score', 'attempt_count', 'success_rate',
+    'avg_time_spent_seconds', 'total_time_spent_ms',
+)
+
+
+def online_updates_enabled():
+    return getattr(settings, 'INTELLIGENCE_ONLINE_UPDATES', True)
+
+
+def expected_score(rating, difficulty):
+    """Probability that a user with `rating` answers content of `difficulty` correctly."""
+    return 1 / (1 + 10 ** ((difficulty - rating) / 400))
+
+
+def _clamp(value):
+    return max(0.0, min(1000.0, value))
+
+
+def _content_profiles(model, object_id):
+    content_type = ContentType.objects.get_for_model(model)
+    return ContentDifficultyProfile.objects.filter(content_type=content_type, object_id=object_id)
+
+
+def _current_difficulty(model, object_id):
+    """The content's difficulty, creating its profile (seeded from the model) on first answer."""
+    difficulty = _content_profiles(model, object_id).values_list('computed_difficulty_score', flat=True).first()
+    if difficulty is not None:
+        return difficulty
+    seed = model.objects.filter(pk=object_id).values_list('computed_difficulty_score', flat=True).first()
+    try:
+        with transaction.atomic():
+            profile = ContentDifficultyProfile.objects.create(
+                content_type=ContentType.objects.get_for_model(model),
+                object_id=object_id,
+                computed_difficulty_score=float(seed or DEFAULT_RATING),
+                success_rate=0.0,
+                attempt_count=0,
+            )
+    except IntegrityError:
+        return _content_profiles(model, object_id).values_list('computed_difficulty_score', flat=True).first()
+    return profile.computed_difficulty_score
+
+
+def _step_content(model, object_id, difficulty, rating, is_correct, time_spent_ms):
+    """
+    Move the content difficulty opposite to the user's surprise and bump
+    counters, as F() deltas in one UPDATE; returns the profile values after it.
+
+    The row is not locked beforehand: `difficulty` was read without a lock,
+    so under concurrent answers a step may be based on a difficulty a few
+    answers old. The periodic compute_content_difficulty run recomputes it exactly.
+    """
+    correct = int(bool(is_correct))
+    step = CONTENT_K_FACTOR * (correct - expected_score(rating, difficulty))
+
+    attempts = F('attempt_count') + 1
+    _content_profiles(model, object_id).update(
+        computed_difficulty_score=Least(Greatest(F('computed_difficulty_score') - step, 0.0), 1000.0),
+        attempt_count=attempts,
+        correct_count=F('correct_count') + correct,
+        total_time_spent_ms=F('total_time_spent_ms') + time_spent_ms,
+        success_rate=ExpressionWrapper(
+            (F('correct_count') + correct) * 100.0 / attempts, output_field=FloatField()
+        ),
+        avg_time_spent_seconds=ExpressionWrapper(
+            (F('total_time_spent_ms') + time_spent_ms) / 1000.0 / attempts, output_field=FloatField()
+        ),
+        last_computed_at=timezone.now(),
+    )
+    return _content_profiles(model, object_id).values(*CONTENT_COPY_FIELDS).first()
+
+
+def refresh_rankings():
+    """
+    Global rank and percentile for every user in one sorted pass (also
+    mirrored to Profile.ability_rank). Answers do not move ranks: ranking one
+    user needs a count over everyone, so ranks follow on this periodic
+    reconcile (intelligence.refresh_ability_rankings, compute_user_abilities).
+    Returns the number of ranked users.
+    """
+    ranked = list(
+        UserAbilityProfile.objects.order_by('-overall_ability_score', 'id').values_list('id', 'user_id')
+    )
+    total_users = len(ranked)
+    if total_users == 0:
+        return 0
+
+    profile_ids = dict(Profile.objects.values_list('user_id', 'id'))
+    for i in range(0, total_users, RANK_BATCH_SIZE):
+        ability_updates = []
+        profile_updates = []
+        for rank, (ability_id, uid) in enumerate(ranked[i:i + RANK_BATCH_SIZE], start=i + 1):
+            percentile = ((total_users - rank) / total_users) * 100
+            ability_updates.append(UserAbilityProfile(id=ability_id, global_rank=rank, percentile=percentile))
+            if uid in profile_ids:
+                profile_updates.append(Profile(id=profile_ids[uid], ability_rank=rank))
+        UserAbilityProfile.objects.bulk_update(ability_updates, ['global_rank', 'percentile'])
+        Profile.objects.bulk_update(profile_updates, ['ability_rank'])
+    return total_users
+
+
+def apply_answer(user_id, quiz_id, question_id, is_correct, time_spent_ms=None, subject_id=None):
+    """
+    Apply one answer to the user's ability and to the quiz/question difficulty.
+
+    Subject abilities are only stepped once the batch job has seeded them.
+    Only the user's own ability row is locked. Quiz and question profiles are
+    shared by every learner: they move by single-statement F() updates after
+    the user's transaction (see _step_content), so no answer holds their row
+    lock for longer than one UPDATE. Rank and percentile are left to
+    refresh_rankings().
+    """
+    time_spent_ms = time_spent_ms if time_spent_ms is not None else DEFAULT_TIME_SPENT_MS
+    actual = 1.0 if is_correct else 0.0
+    quiz_difficulty = _current_difficulty(Quiz, quiz_id)
+    question_difficulty = _current_difficulty(Question, question_id)
+
+    with transaction.atomic():
+        ability = UserAbilityProfile.objects.select_for_update().filter(user_id=user_id).first()
+        if ability is None:
+            ability, _ = UserAbilityProfile.objects.get_or_create(user_id=user_id)
+        rating = ability.overall_ability_score
+
+        # The user is measured against the quiz difficulty, like the batch ELO
+        ability.overall_ability_score = _clamp(
+            rating + USER_K_FACTOR * (actual - expected_score(rating, quiz_difficulty))
+        )
+        subject_key = str(subject_id) if subject_id else None
+        if subject_key and subject_key in (ability.ability_by_subject or {}):
+            subject_rating = ability.ability_by_subject[subject_key]
+            ability.ability_by_subject[subject_key] = _clamp(
+                subject_rating + USER_K_FACTOR * (actual - expected_score(subject_rating, quiz_difficulty))
+            )
+        ability.total_quizzes_attempted += 1
+        ability.total_correct_answers += int(bool(is_correct))
+        ability.save(update_fields=[
+            'overall_ability_score', 'ability_by_subject', 'total_quizzes_attempted',
+            'total_correct_answers', 'last_computed_at',
+        ])
+
+        now = timezone.now()
+        Profile.objects.filter(user_id=user_id).update(
+            overall_ability_score=ability.overall_ability_score,
+            last_ability_update=now,
+        )
+
+    quiz_profile = _step_content(Quiz, quiz_id, quiz_difficulty, rating, is_correct, time_spent_ms)
+    question_profile = _step_content(Question, question_id, question_difficulty, rating, is_correct, time_spent_ms)
+    # Denormalized copies; .update() keeps the quiz payload cache untouched
+    Quiz.objects.filter(pk=quiz_id).update(
+        computed_difficulty_score=quiz_profile['computed_difficulty_score'],
+        attempt_count=quiz_profile['attempt_count'],
+        overall_success_rate=quiz_profile['success_rate'],
+        avg_completion_time_seconds=quiz_profile['avg_time_spent_seconds'],
+    )
+    Question.objects.filter(pk=question_id).update(
+        computed_difficulty_score=question_profile['computed_difficulty_score'],
+        success_rate=question_profile['success_rate'],
+        avg_time_spent_ms=int(question_profile['total_time_spent_ms'] / question_profile['attempt_count']),
+    )
+    return ability
+
+
+def record_answer(user_id, quiz_id, question_id, is_correct, time_spent_ms=None, subject_id=None):
+    """
+    Schedule apply_answer() after the answer's transaction commits.
+    Failures are logged; they must never break answering a quiz.
+    """
+    if not online_updates_enabled():
+        return
+
+    def _apply():
+        try:
+            apply_answer(user_id, quiz_id, question_id, is_correct, time_spent_ms, subject_id)
+        except Exception as e:
+            logger.error(f"Online ability update failed for user {user_id}, question {question_id}: {e}", exc_info=True)
+
+    transaction.on_commit(_apply)
@@ -0,0 +1,13 @@
+# intelligence/tasks.py
+from celery import shared_task
+
+from .online import refresh_rankings
+
+
+@shared_task(name="intelligence.refresh_ability_rankings")
+def refresh_ability_rankings():
+    """
+    Recompute global rank / percentile from the online ability scores.
+    Scheduled every 5 minutes via CELERY_BEAT_SCHEDULE.
+    """
+    return {'users_ranked': refresh_rankings()}
@@ -0,0 +1,170 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from analytics.models import ActivityEvent
+from intelligence.models import ContentDifficultyProfile, MatchScore, UserAbilityProfile
+from intelligence.online import apply_answer, record_answer
+from intelligence.tasks import refresh_ability_rankings
+from intelligence.utils import compute_match_score, compute_preference_alignment, compute_user_ability_elo
+from quizzes.models import Quiz, Question
+from subjects.models import Subject
+from tags.models import Tag
+from users.models import Profile, UserPreference
+
+
+class ComputeUserAbilitiesTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pw')
+        self.subject = Subject.objects.create(name='Geography', created_by=self.author)
+        self.easy = Quiz.objects.create(title='Easy', created_by=self.author, subject=self.subject,
+                                        computed_difficulty_score=300)
+        self.hard = Quiz.objects.create(title='Hard', created_by=self.author, computed_difficulty_score=650)
+        ContentDifficultyProfile.objects.create(
+            content_type=ContentType.objects.get_for_model(Quiz), object_id=self.hard.id,
+            computed_difficulty_score=700, success_rate=20.0, avg_time_spent_seconds=30.0, attempt_count=10,
+        )
+
+    def _answer(self, user, quiz, is_correct):
+        ActivityEvent.objects.create(
+            user=user, event_type='quiz_answer_submitted',
+            content_type=ContentType.objects.get_for_model(Quiz), object_id=quiz.id,
+            metadata={'quiz_id': quiz.id, 'is_correct': is_correct, 'time_spent_ms': 9000},
+        )
+
+    def test_abilities_and_ranks_are_computed_in_bulk(self):
+        strong = User.objects.create_user(username='strong', password='pw')
+        weak = User.objects.create_user(username='weak', password='pw')
+        casual = User.objects.create_user(username='casual', password='pw')
+        for _ in range(4):
+            self._answer(strong, self.easy, True)
+            self._answer(strong, self.hard, True)
+            self._answer(weak, self.easy, False)
+            self._answer(weak, self.hard, False)
+        self._answer(casual, self.easy, True)  # below --min-attempts
+
+        out = StringIO()
+        call_command('compute_user_abilities', stdout=out)
+
+        self.assertIn('Processed 2 users', out.getvalue())
+        self.assertIn('Timing:', out.getvalue())
+        self.assertFalse(UserAbilityProfile.objects.filter(user=casual).exists())
+
+        strong_profile = UserAbilityProfile.objects.get(user=strong)
+        expected = compute_user_ability_elo(
+            [{'is_correct': True, 'quiz_difficulty': d} for d in [300.0, 700.0] * 4]
+        )
+        self.assertAlmostEqual(strong_profile.overall_ability_score, expected)
+        self.assertEqual(strong_profile.total_quizzes_attempted, 8)
+        self.assertEqual(set(strong_profile.ability_by_subject), {str(self.subject.id)})
+        self.assertEqual(strong_profile.global_rank, 1)
+        self.assertEqual(UserAbilityProfile.objects.get(user=weak).global_rank, 2)
+
+        self.assertEqual(Profile.objects.get(user=strong).ability_rank, 1)
+        self.assertAlmostEqual(Profile.objects.get(user=weak).overall_ability_score,
+                               UserAbilityProfile.objects.get(user=weak).overall_ability_score)
+
+        # Re-running updates the existing rows instead of creating new ones
+        call_command('compute_user_abilities', stdout=StringIO())
+        self.assertEqual(UserAbilityProfile.objects.count(), 2)
+
+
+class ComputeMatchScoresTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pw')
+        self.user = User.objects.create_user(username='learner', password='pw')
+        self.math = Subject.objects.create(name='Math', created_by=self.author)
+        self.art = Subject.objects.create(name='Art', created_by=self.author)
+        self.tag = Tag.objects.create(name='algebra')
+        prefs, _ = UserPreference.objects.get_or_create(user=self.user)
+        prefs.languages_spoken = ['ja']
+        prefs.save()
+        prefs.interested_subjects.add(self.math)
+        prefs.interested_tags.add(self.tag)
+        UserAbilityProfile.objects.create(user=self.user, overall_ability_score=450.0)
+
+        self.quizzes = []
+        for i, (subject, difficulty, langs) in enumerate([
+            (self.math, 460, ['ja']), (self.math, 700, ['en']), (None, 300, ['ja']),
+            (self.art, 450, ['ja']), (self.math, 200, []),
+        ]):
+            quiz = Quiz.objects.create(title=f'Match {i}', created_by=self.author, subject=subject,
+                                       status='published', computed_difficulty_score=difficulty, languages=langs)
+            self.quizzes.append(quiz)
+        self.quizzes[0].tags.add(self.tag)
+
+    def test_matrix_scores_match_scalar_formulas(self):
+        out = StringIO()
+        call_command('compute_match_scores', '--top-n', '3', stdout=out)
+
+        rows = list(MatchScore.objects.filter(user=self.user).order_by('-match_score'))
+        self.assertEqual(len(rows), 3)
+        # The Art quiz is outside the user's interested subjects
+        self.assertNotIn(self.quizzes[3].id, [r.object_id for r in rows])
+
+        prefs = UserPreference.objects.get(user=self.user)
+        expected = {}
+        for quiz in Quiz.objects.filter(id__in=[q.id for q in self.quizzes]).exclude(subject=self.art):
+            expected[quiz.id] = compute_match_score(
+                user_ability=450.0, quiz_difficulty=quiz.computed_difficulty_score,
+                preference_score=compute_preference_alignment(quiz, prefs), recency_penalty=0.0,
+            )
+        top3 = sorted(expected, key=expected.get, reverse=True)[:3]
+        self.assertEqual([r.object_id for r in rows], top3)
+        for row in rows:
+            self.assertAlmostEqual(row.match_score, expected[row.object_id], places=3)
+
+        # Nothing moved: a second run rewrites no rows
+        out = StringIO()
+        call_command('compute_match_scores', '--top-n', '3', stdout=out)
+        self.assertIn('0 created, 0 updated, 0 deleted, 3 skipped', out.getvalue())
+
+
+class OnlineAbilityUpdateTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pw')
+        self.user = User.objects.create_user(username='learner', password='pw')
+        self.rival = User.objects.create_user(username='rival', password='pw')
+        UserAbilityProfile.objects.create(user=self.rival, overall_ability_score=410.0, global_rank=1)
+        self.quiz = Quiz.objects.create(title='Online', created_by=self.author, computed_difficulty_score=600)
+        self.question = Question.objects.create(quiz=self.quiz, question_text='2+2?', question_type='mcq',
+                                                option1='4', option2='5', correct_option=1)
+
+    def test_answer_steps_ability_difficulty_and_counters(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record_answer(self.user.id, self.quiz.id, self.question.id, True, 5000)
+
+        ability = UserAbilityProfile.objects.get(user=self.user)
+        self.assertGreater(ability.overall_ability_score, 400.0)
+        self.assertEqual((ability.total_quizzes_attempted, ability.total_correct_answers), (1, 1))
+        # Ranks are left to the periodic reconcile
+        self.assertIsNone(ability.global_rank)
+        self.assertEqual(refresh_ability_rankings.apply().get(), {'users_ranked': 2})
+        ability.refresh_from_db()
+        self.assertEqual((ability.global_rank, ability.percentile), (1, 50.0))
+        self.assertEqual(Profile.objects.get(user=self.user).ability_rank, 1)
+
+        quiz_ct = ContentType.objects.get_for_model(Quiz)
+        quiz_profile = ContentDifficultyProfile.objects.get(content_type=quiz_ct, object_id=self.quiz.id)
+        self.assertLess(quiz_profile.computed_difficulty_score, 600.0)
+        self.assertEqual((quiz_profile.attempt_count, quiz_profile.correct_count), (1, 1))
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.attempt_count, 1)
+        self.assertEqual(self.quiz.computed_difficulty_score, quiz_profile.computed_difficulty_score)
+
+        with CaptureQueriesContext(connection) as ctx:
+            apply_answer(self.user.id, self.quiz.id, self.question.id, False, None)
+        # No per-answer ranking counts
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+        quiz_profile.refresh_from_db()
+        self.assertEqual((quiz_profile.attempt_count, quiz_profile.correct_count), (2, 1))
+        self.assertEqual(quiz_profile.success_rate, 50.0)
+        self.assertEqual(quiz_profile.avg_time_spent_seconds, 10.0)
+        self.assertEqual(quiz_profile.total_time_spent_ms, 20000)
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.avg_time_spent_ms, 10000)
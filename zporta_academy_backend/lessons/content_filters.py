@@ -1,16 +1,227 @@
 # lessons/content_filters.py
-from bs4 import BeautifulSoup
-
-def mask_restricted_sections(html, request_user, bound_course=None):
+"""
+Inline gating of premium sections inside lesson HTML.
+
+Author can wrap any block with one of these attributes:
+  - data-required-course-permalink="<creator>/<date>/<subject>/<slug>"
+  - data-required-course-id="<course_id>"
+(and optionally data-gated-message="..." as the unlock link title).
+
+The HTML is parsed once, when the lesson is saved: compile_gating() splits it
+into segments and Lesson.content_segments stores them as JSON:
+  - []                  no gated sections: the content is served as-is
+  - "<p>...</p>"        public HTML, emitted verbatim
+  - {"course_id", "permalink", "message", "open", "close", "inner"}
+                        a gated element: its opening/closing tag and its
+                        children (segments again, for nested gates)
+Permalinks are resolved to course ids at compile time (a permalink that
+matched no course then is looked up again when rendering).
+
+At request time mask_restricted_sections() only joins strings. Course rows
+and the user's enrolled course ids come from a GatingContext, loaded once and
+shared by every lesson rendered in the request.
+"""
+import copy
+import re
+import uuid
+
+from bs4 import BeautifulSoup, Comment
+from django.db.models import Q
+from django.utils.html import escape
+
+GATE_ATTRS = ('data-required-course-permalink', 'data-required-course-id')
+GATE_MARKER = 'data-required-course-'  # common prefix: cheap "no gates" test
+
+BLUR_LINE = '<span aria-hidden="true" class="gc-blur-line"></span>'
+UNKNOWN_COURSE_PLACEHOLDER = (
+    f'<div class="gated-content gc-compact">{BLUR_LINE}<span class="gc-label">Premium section</span></div>'
+)
+
+
+# ── Compile (lesson save) ────────────────────────────────────────────────
+def _is_gate(tag):
+    return any(attr in tag.attrs for attr in GATE_ATTRS)
+
+
+def _outermost_gates(container):
+    """Gated elements under `container` that are not inside another gated element."""
+    gates = []
+    for node in container.find_all(_is_gate):
+        parent = node.parent
+        while parent is not container and not _is_gate(parent):
+            parent = parent.parent
+        if parent is container:
+            gates.append(node)
+    return gates
+
+
+class _CourseResolver:
+    def __init__(self):
+        self._by_permalink = {}
+
+    def course_id(self, node):
+        permalink = node.get('data-required-course-permalink')
+        if permalink:
+            if permalink not in self._by_permalink:
+                from courses.models import Course
+                self._by_permalink[permalink] = (
+                    Course.all_objects.filter(permalink=permalink).values_list('id', flat=True).first()
+                )
+            return self._by_permalink[permalink]
+        try:
+            return int(node.get('data-required-course-id'))
+        except (TypeError, ValueError):
+            return None
+
+
+def _split(container, token, resolver):
+    gates = []
+    for node in _outermost_gates(container):
+        inner = _split(node, token, resolver)
+        shell = copy.copy(node)
+        shell.clear()
+        tag_html = str(shell)
+        close = f"</{node.name}>"
+        if not tag_html.endswith(close):  # void element
+            close = ''
+        gates.append({
+            'course_id': resolver.course_id(node),
+            'permalink': node.get('data-required-course-permalink'),
+            'message': node.get('data-gated-message'),
+            'open': tag_html[:len(tag_html) - len(close)],
+            'close': close,
+            'inner': inner,
+        })
+        node.replace_with(Comment(f"{token}:{len(gates) - 1}"))
+
+    segments = []
+    parts = re.split(rf"<!--{token}:(\d+)-->", container.decode_contents())
+    for i, part in enumerate(parts):
+        if i % 2:
+            segments.append(gates[int(part)])
+        elif part:
+            segments.append(part)
+    return segments
+
+
+def compile_gating(html):
+    """Segments for Lesson.content_segments ([] when nothing is gated)."""
+    if not html or GATE_MARKER not in html:
+        return []
+    soup = BeautifulSoup(html, "html.parser")
+    if soup.find(_is_gate) is None:
+        return []
+    return _split(soup, uuid.uuid4().hex, _CourseResolver())
+
+
+def lesson_segments(lesson):
+    """The lesson's compiled segments; rows saved before compilation are compiled and stored now."""
+    if lesson.content_segments is None:
+        lesson.content_segments = compile_gating(lesson.content)
+        type(lesson).objects.filter(pk=lesson.pk).update(content_segments=lesson.content_segments)
+    return lesson.content_segments
+
+
+# ── Render (request time) ────────────────────────────────────────────────
+class GatingContext:
+    """Access data for one request: course rows and the user's enrolled course ids, each loaded once."""
+
+    def __init__(self, user):
+        self.user = user
+        self._courses = {}
+        self._by_permalink = {}
+        self._enrolled = None
+
+    def load(self, segments):
+        """Fetch, in one query, every course the segments refer to that is not loaded yet."""
+        ids, permalinks = set(), set()
+        _references(segments, ids, permalinks)
+        ids -= self._courses.keys()
+        permalinks -= self._by_permalink.keys()
+        if not ids and not permalinks:
+            return
+        from courses.models import Course
+        found = Course.all_objects.filter(
+            Q(id__in=ids) | Q(permalink__in=permalinks)
+        ).only('id', 'title', 'permalink', 'course_type', 'is_draft')
+        for course in found:
+            self._courses[course.id] = course
+            self._by_permalink[course.permalink] = course
+        for course_id in ids:
+            self._courses.setdefault(course_id, None)
+        for permalink in permalinks:
+            self._by_permalink.setdefault(permalink, None)
+
+    def course(self, segment):
+        if segment['course_id'] is not None:
+            return self._courses.get(segment['course_id'])
+        if segment['permalink']:
+            # Course created after the lesson was compiled
+            return self._by_permalink.get(segment['permalink'])
+        return None
+
+    def can_access(self, course_id):
+        """Staff, or enrolled in the course."""
+        if not getattr(self.user, 'is_authenticated', False):
+            return False
+        if getattr(self.user, 'is_staff', False):
+            return True
+        if self._enrolled is None:
+            from courses.models import Course
+            from django.contrib.contenttypes.models import ContentType
+            from enrollment.models import Enrollment
+            self._enrolled = set(Enrollment.objects.filter(
+                user=self.user,
+                content_type=ContentType.objects.get_for_model(Course),
+                enrollment_type="course",
+            ).values_list('object_id', flat=True))
+        return course_id in self._enrolled
+
+
+def _references(segments, ids, permalinks):
+    for segment in segments:
+        if isinstance(segment, dict):
+            if segment['course_id'] is not None:
+                ids.add(segment['course_id'])
+            elif segment['permalink']:
+                permalinks.add(segment['permalink'])
+            _references(segment['inner'], ids, permalinks)
+
+
+def _locked_placeholder(course, message):
+    title_attr = f' title="{escape(message)}"' if message else ''
+    if course.permalink:
+        unlock = (f'<a class="gc-link" href="/courses/{escape(course.permalink)}"{title_attr}>'
+                  f'Unlock with “{escape(course.title or "this course")}”</a>')
+    else:
+        unlock = f'<span class="gc-label"{title_attr}>Unlock to view</span>'
+    return f'<div class="gated-content gc-compact">{BLUR_LINE}{unlock}</div>'
+
+
+def _render(segments, gating, bound_course, out):
+    for segment in segments:
+        if isinstance(segment, str):
+            out.append(segment)
+            continue
+        out.append(segment['open'])
+        course = bound_course if bound_course is not None else gating.course(segment)
+        if course is None:
+            # Unknown course: compact placeholder without a course link
+            out.append(UNKNOWN_COURSE_PLACEHOLDER)
+        elif course.course_type != 'premium' or course.is_draft or gating.can_access(course.id):
+            # Gate only for premium published courses the user cannot access
+            _render(segment['inner'], gating, bound_course, out)
+        else:
+            out.append(_locked_placeholder(course, segment['message']))
+        out.append(segment['close'])
+
+
+def mask_restricted_sections(html, request_user, bound_course=None, segments=None, gating=None):
     """
-    Process lesson HTML and mask any inline-tagged premium sections.
-
-    Author can wrap any block with one of these attributes:
-      - data-required-course-permalink="<creator>/<date>/<subject>/<slug>"
-      - data-required-course-id="<course_id>"
+    Mask inline-tagged premium sections the user cannot view.
 
-    If the current user is not enrolled in that premium course, replace the inner
-    content with a placeholder that links to the course page.
+    If the current user is not enrolled in that premium course, the section's
+    inner content is replaced with a placeholder that links to the course page.
 
     Owners and staff can always view full content. Ownership checks for the lesson
     are handled by the caller; this function only evaluates user enrollment for
@@ -20,122 +231,23 @@ def mask_restricted_sections(html, request_user, bound_course=None):
     then any inline gating will be treated as referring to that bound course. This
     prevents cross-course gating from within a lesson that already belongs to a
     particular course.
+
+    segments: the lesson's compiled content_segments (see lesson_segments());
+    without them the HTML is compiled on the spot.
+    gating: a GatingContext to share across the lessons of one request.
     """
     if not html or not html.strip():
         return html
     try:
-        from courses.models import Course
-        from enrollment.models import Enrollment
-        from django.contrib.contenttypes.models import ContentType
-    except Exception:
-        # If imports fail, don't break rendering
-        return html
-
-    try:
-        soup = BeautifulSoup(html, "html.parser")
-
-        def user_can_access(course_obj):
-            """
-            Check if user can view gated content for a specific course.
-            Returns True if user is staff OR enrolled in the premium course.
-            """
-            # Staff sees everything
-            if getattr(request_user, 'is_authenticated', False) and getattr(request_user, 'is_staff', False):
-                return True
-            # Anonymous users cannot access premium content
-            if not getattr(request_user, 'is_authenticated', False):
-                return False
-            # Check enrollment
-            course_ct = ContentType.objects.get_for_model(Course)
-            return Enrollment.objects.filter(
-                user=request_user,
-                content_type=course_ct,
-                object_id=course_obj.id,
-                enrollment_type="course"
-            ).exists()
-
-        # Find all elements with gating attributes
-        candidates = soup.select('[data-required-course-permalink], [data-required-course-id]')
-        if not candidates:
-            return str(soup)
-
-        resolved_courses = {}
-        for node in candidates:
-            # Resolve which course this node refers to
-            # If a bound_course is provided (lesson attached to a course), force gating to that course
-            if bound_course is not None:
-                course = bound_course
-            else:
-                course = None
-                permalink = node.get('data-required-course-permalink')
-                course_id = node.get('data-required-course-id')
-
-                key = None
-                if permalink:
-                    key = f"p:{permalink}"
-                    if key in resolved_courses:
-                        course = resolved_courses[key]
-                    else:
-                        try:
-                            course = Course.all_objects.select_related('created_by', 'subject').only('id','title','permalink','course_type','is_draft').get(permalink=permalink)
-                        except Course.DoesNotExist:
-                            course = None
-                        resolved_courses[key] = course
-                elif course_id:
-                    key = f"i:{course_id}"
-                    if key in resolved_courses:
-                        course = resolved_courses[key]
-                    else:
-                        try:
-                            course = Course.all_objects.only('id','title','permalink','course_type','is_draft').get(id=int(course_id))
-                        except Exception:
-                            course = None
-                        resolved_courses[key] = course
-
-            if not course:
-                # Unknown course: render a compact placeholder without a course link
-                placeholder = soup.new_tag('div', **{'class': 'gated-content gc-compact'})
-                blur = soup.new_tag('span', **{'class': 'gc-blur-line', 'aria-hidden': 'true'})
-                label = soup.new_tag('span', **{'class': 'gc-label'})
-                label.string = 'Premium section'
-                placeholder.append(blur)
-                placeholder.append(label)
-                node.clear()
-                node.append(placeholder)
-                continue
-
-            # Gate only for premium published courses; skip free or draft
-            if course.course_type != 'premium' or course.is_draft:
-                continue
-
-            # Check if user has access (enrolled or staff)
-            if user_can_access(course):
-                continue
-
-            # User does not have access, mask this section
-            link = f"/courses/{course.permalink}" if course.permalink else None
-            placeholder = soup.new_tag('div', **{'class': 'gated-content gc-compact'})
-            title = course.title or 'this course'
-            # Optional custom message from author – use as link title if provided
-            custom_msg = node.get('data-gated-message')
-
-            blur = soup.new_tag('span', **{'class': 'gc-blur-line', 'aria-hidden': 'true'})
-            placeholder.append(blur)
-            if link:
-                a = soup.new_tag('a', href=link, **{'class': 'gc-link'})
-                a.string = f'Unlock with “{title}”'
-                if custom_msg:
-                    a['title'] = custom_msg
-                placeholder.append(a)
-            else:
-                label = soup.new_tag('span', **{'class': 'gc-label'})
-                label.string = 'Unlock to view'
-                if custom_msg:
-                    label['title'] = custom_msg
-                placeholder.append(label)
-            node.clear()
-            node.append(placeholder)
-
-        return str(soup)
+        if segments is None:
+            segments = compile_gating(html)
+        if not segments:
+            return html
+        gating = gating or GatingContext(request_user)
+        if bound_course is None:
+            gating.load(segments)
+        out = []
+        _render(segments, gating, bound_course, out)
+        return "".join(out)
     except Exception:
         return html
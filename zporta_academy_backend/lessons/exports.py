@@ -0,0 +1,156 @@
+# lessons/exports.py
+"""
+Lesson export pipeline (PDF and DOCX).
+
+Artifacts are named after a hash of everything the renderers read:
+lesson_exports/<format>/<lesson id>-<hash>.<format>, referenced from
+Lesson.export_pdf / Lesson.export_docx. An artifact is fresh while the lesson
+still hashes to the name it points at, so unchanged content never renders
+twice and no timestamp comparison is needed.
+
+Rendering runs in the `generate_lesson_exports` task:
+- publishing a lesson, or saving a published one, schedules it, debounced per
+  lesson (a burst of autosaves renders once)
+- the export views schedule it when the artifact is missing or stale and
+  answer 202 with a poll URL until it is ready, then stream the file
+
+Without a Celery broker (settings.LESSON_EXPORT_ASYNC, default: a broker is
+configured) the views render in the request instead.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from . import export_utils, pdf_utils
+
+logger = logging.getLogger(__name__)
+
+# format -> (Lesson file field, content type)
+FORMATS = {
+    'pdf': ('export_pdf', 'application/pdf'),
+    'docx': ('export_docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+}
+EXPORT_VERSION = 1  # bump when a renderer changes: every artifact goes stale
+# Renderers also print subject, course and author names; renaming those does
+# not invalidate artifacts (they refresh on the lesson's next edit).
+HASH_FIELDS = (
+    'title', 'content', 'accent_color', 'custom_css', 'video_url',
+    'subject_id', 'course_id', 'created_by_id', 'created_at',
+)
+
+SCHEDULED_KEY = "lessons:export_scheduled:{}"
+FAILED_KEY = "lessons:export_failed:{}:{}:{}"
+DEFAULT_DEBOUNCE = 30  # seconds between a lesson save and its render
+FAILURE_TTL = 600  # a failed render is not retried for the same content before this
+
+
+def async_enabled():
+    return getattr(
+        settings,
+        'LESSON_EXPORT_ASYNC',
+        bool(getattr(settings, 'CELERY_BROKER_URL', None)),
+    )
+
+
+def content_hash(lesson):
+    digest = hashlib.sha256(f"v{EXPORT_VERSION}".encode())
+    for field in HASH_FIELDS:
+        value = getattr(lesson, field)
+        digest.update(b"\0" + str("" if value is None else value).encode())
+    return digest.hexdigest()[:32]
+
+
+def artifact_name(lesson, fmt, digest):
+    return f"lesson_exports/{fmt}/{lesson.pk}-{digest}.{fmt}"
+
+
+def is_fresh(lesson, fmt, digest=None):
+    return getattr(lesson, FORMATS[fmt][0]).name == artifact_name(lesson, fmt, digest or content_hash(lesson))
+
+
+def failure(lesson, fmt):
+    """Error message of a failed render of the lesson's current content, if any."""
+    return cache.get(FAILED_KEY.format(lesson.pk, fmt, content_hash(lesson)))
+
+
+def render(lesson, fmt):
+    """Artifact bytes for one format; raises when the renderer fails."""
+    if fmt == 'pdf':
+        return pdf_utils.render_lesson_pdf_bytes(lesson)
+    data, error = export_utils.generate_lesson_docx(lesson)
+    if error:
+        raise RuntimeError(error)
+    return data
+
+
+def build_exports(lesson, formats=tuple(FORMATS), force=False):
+    """
+    Render the lesson's missing or stale artifacts. Returns {format: error}
+    for the formats that failed; the others are stored and referenced.
+    """
+    digest = content_hash(lesson)
+    updates, errors, replaced = {}, {}, []
+    for fmt in formats:
+        field = FORMATS[fmt][0]
+        path = artifact_name(lesson, fmt, digest)
+        current = getattr(lesson, field).name
+        try:
+            if force or not default_storage.exists(path):
+                data = render(lesson, fmt)
+                if default_storage.exists(path):
+                    default_storage.delete(path)
+                saved = default_storage.save(path, ContentFile(data))
+                if saved != path:  # another worker stored it first
+                    default_storage.delete(saved)
+            elif current == path:
+                continue
+        except Exception as e:
+            logger.error(f"Export {fmt} failed for lesson {lesson.pk}: {e}", exc_info=True)
+            cache.set(FAILED_KEY.format(lesson.pk, fmt, digest), str(e), FAILURE_TTL)
+            errors[fmt] = str(e)
+            continue
+        updates[field] = path
+        if current and current != path:
+            replaced.append(current)
+
+    if updates:
+        updates['export_generated_at'] = timezone.now()
+        # update() keeps updated_at and post_save out of it: storing an
+        # artifact is not an edit and must not schedule another render
+        type(lesson).objects.filter(pk=lesson.pk).update(**updates)
+        for name, value in updates.items():
+            setattr(lesson, name, value)
+    for name in replaced:
+        try:
+            default_storage.delete(name)
+        except Exception as e:
+            logger.warning(f"Could not delete old export {name}: {e}")
+    return errors
+
+
+def schedule_export(lesson_id, countdown=None):
+    """Queue one render of the lesson; calls until that render starts are absorbed."""
+    if countdown is None:
+        countdown = getattr(settings, 'LESSON_EXPORT_DEBOUNCE', DEFAULT_DEBOUNCE)
+    key = SCHEDULED_KEY.format(lesson_id)
+    if not cache.add(key, 1, timeout=countdown * 5 + 300):
+        return
+    try:
+        from .tasks import generate_lesson_exports
+        generate_lesson_exports.apply_async((lesson_id,), countdown=countdown)
+    except Exception as e:
+        logger.warning(f"Could not enqueue exports for lesson {lesson_id}: {e}")
+        cache.delete(key)
+
+
+def open_artifact(lesson, fmt):
+    """Open the stored artifact for reading, or None when the file is gone."""
+    try:
+        return getattr(lesson, FORMATS[fmt][0]).open('rb')
+    except (FileNotFoundError, OSError, ValueError):
+        return None
@@ -0,0 +1,72 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from lessons.exports import FORMATS, render
+from lessons.models import Lesson
+
+BLOCK = """
+<h2>Section {n}</h2>
+<p>Lesson paragraph with <strong>bold</strong> and <em>italic</em> text. これはテストの文章です。</p>
+<ul><li>First point</li><li>Second point</li></ul>
+<details class="zporta-acc-item"><summary class="zporta-acc-title">Show explanation</summary>
+<div class="zporta-acc-panel"><p>日本語の説明と English explanation side by side.</p></div></details>
+<table><tr><th>Word</th><th>Meaning</th></tr><tr><td>学校</td><td>school</td></tr></table>
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Time PDF and DOCX rendering of synthetic lesson HTML at several sizes and "
+        "report milliseconds per KB of HTML. Nothing is written to the database or storage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=str, default="4,16,64",
+            help="Comma-separated lesson HTML sizes in KB",
+        )
+        parser.add_argument(
+            "--formats", type=str, default=",".join(FORMATS),
+            help="Comma-separated formats to render: pdf,docx",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=3,
+            help="Renders per size and format; the fastest is reported",
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["sizes"].split(",") if s.strip()]
+        formats = [f.strip() for f in options["formats"].split(",") if f.strip() in FORMATS]
+        author = User(username="benchmark")
+
+        self.stdout.write(f"{'format':<6} {'KB':>6} {'ms':>10} {'ms/KB':>8}")
+        for size_kb in sizes:
+            lesson = Lesson(
+                title=f"Benchmark lesson ({size_kb} KB)",
+                content=self._html(size_kb),
+                created_by=author,
+                created_at=timezone.now(),
+            )
+            html_kb = len(lesson.content.encode()) / 1024
+            for fmt in formats:
+                best = None
+                try:
+                    for _ in range(options["repeat"]):
+                        started = time.perf_counter()
+                        render(lesson, fmt)
+                        elapsed = (time.perf_counter() - started) * 1000
+                        best = elapsed if best is None else min(best, elapsed)
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f"{fmt:<6} {html_kb:>6.1f}  failed: {e}"))
+                    continue
+                self.stdout.write(f"{fmt:<6} {html_kb:>6.1f} {best:>10.1f} {best / html_kb:>8.2f}")
+
+    def _html(self, size_kb):
+        blocks, n = [], 0
+        while sum(len(b.encode()) for b in blocks) < size_kb * 1024:
+            n += 1
+            blocks.append(BLOCK.format(n=n))
+        return "".join(blocks)
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from lessons.content_filters import compile_gating
+from lessons.models import Lesson
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompile inline gating (Lesson.content_segments) for lessons saved before "
+        "it existed. Lessons are also compiled on save and on first render."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Recompile every lesson, not only uncompiled ones (e.g. after courses were renamed)",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Lessons loaded per query",
+        )
+
+    def handle(self, *args, **options):
+        qs = Lesson.objects.order_by("pk")
+        if not options["all"]:
+            qs = qs.filter(content_segments__isnull=True)
+
+        compiled = gated = 0
+        batch = []
+        for lesson in qs.only("id", "content").iterator(chunk_size=options["batch_size"]):
+            lesson.content_segments = compile_gating(lesson.content)
+            gated += bool(lesson.content_segments)
+            batch.append(lesson)
+            if len(batch) >= options["batch_size"]:
+                Lesson.objects.bulk_update(batch, ["content_segments"])
+                compiled += len(batch)
+                batch = []
+        if batch:
+            Lesson.objects.bulk_update(batch, ["content_segments"])
+            compiled += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Compiled {compiled} lesson(s); {gated} with gated sections."
+        ))
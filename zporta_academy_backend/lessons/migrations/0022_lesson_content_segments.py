@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0021_lessoncompletion_started_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='content_segments',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -124,6 +124,9 @@ class Lesson(models.Model):
     export_pdf = models.FileField(upload_to="lesson_exports/pdf/", blank=True, null=True)
     export_docx = models.FileField(upload_to="lesson_exports/docx/", blank=True, null=True)
     export_generated_at = models.DateTimeField(blank=True, null=True)
+    # Inline gating compiled from `content` on save (see lessons/content_filters.py);
+    # NULL until compiled, [] when the content has no gated sections
+    content_segments = models.JSONField(null=True, blank=True, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
@@ -169,6 +172,14 @@ class Lesson(models.Model):
             self.og_description = text[:200]
         # --- End SEO logic ---
 
+        # --- Precompile inline gating so requests only join strings ---
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            from .content_filters import compile_gating
+            self.content_segments = compile_gating(self.content)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'content_segments'}
+
         super().save(*args, **kwargs) # Call the "real" save() method.
     
     def delete(self, *args, **kwargs):
@@ -358,10 +358,10 @@ def get_or_generate_lesson_pdf(lesson):
     """
     Get cached PDF or generate new one if needed.
     
-    Uses lesson.export_pdf and lesson.export_generated_at for caching.
+    Uses the content-hashed artifact in lesson.export_pdf (see lessons/exports.py).
     Regenerates if:
     - No cached PDF exists
-    - Lesson was updated after PDF was generated
+    - Lesson content changed since the PDF was generated
     
     Args:
         lesson: Lesson model instance
@@ -369,36 +369,17 @@ def get_or_generate_lesson_pdf(lesson):
     Returns:
         bytes: PDF file content
     """
-    from django.utils import timezone
-    from django.core.files.base import ContentFile
-    
-    # Check if we have a valid cached PDF
-    if lesson.export_pdf:
-        # Check if lesson was updated after PDF generation
-        if lesson.export_generated_at and lesson.export_generated_at >= lesson.updated_at:
-            # Use cached PDF
-            try:
-                with lesson.export_pdf.open('rb') as f:
-                    return f.read()
-            except Exception as e:
-                logger.warning(f"Failed to read cached PDF for lesson {lesson.id}: {e}")
-                # Fall through to regenerate
-    
-    # Generate new PDF
-    logger.info(f"Generating PDF for lesson {lesson.id}")
-    pdf_bytes = render_lesson_pdf_bytes(lesson)
+    from .exports import build_exports, open_artifact
     
-    # Save to cache
-    try:
-        filename = f"{lesson.permalink}.pdf".replace('/', '_')
-        lesson.export_pdf.save(filename, ContentFile(pdf_bytes), save=False)
-        lesson.export_generated_at = timezone.now()
-        lesson.save(update_fields=['export_pdf', 'export_generated_at'])
-    except Exception as e:
-        logger.error(f"Failed to cache PDF for lesson {lesson.id}: {e}")
-        # Continue anyway - return the generated PDF
+    errors = build_exports(lesson, ['pdf'])
+    if errors:
+        raise Exception(errors['pdf'])
     
-    return pdf_bytes
+    artifact = open_artifact(lesson, 'pdf')
+    if artifact is None:
+        raise Exception(f"PDF export for lesson {lesson.id} is missing from storage")
+    with artifact:
+        return artifact.read()
 
 
 def _render_lesson_pdf_reportlab(lesson):
@@ -1,9 +1,27 @@
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.core.cache import cache
 from .models import Lesson
+from . import exports
+
+EXPORT_FIELDS = {"export_pdf", "export_docx", "export_generated_at"}
 
 @receiver([post_save, post_delete], sender=Lesson)
 def invalidate_course_cache_on_lesson_change(sender, instance, **kwargs):
     if instance.course_id:
         cache.delete(f"course_lessons_quizzes_{instance.course_id}")
+
+
+@receiver(post_save, sender=Lesson)
+def schedule_lesson_exports(sender, instance, update_fields=None, **kwargs):
+    """Pre-render exports when a lesson is published or a published lesson changes."""
+    if instance.status != Lesson.PUBLISHED or not exports.async_enabled():
+        return
+    if update_fields and set(update_fields) <= EXPORT_FIELDS:
+        return
+    digest = exports.content_hash(instance)
+    if all(exports.is_fresh(instance, fmt, digest) for fmt in exports.FORMATS):
+        return
+    lesson_id = instance.pk
+    transaction.on_commit(lambda: exports.schedule_export(lesson_id))
@@ -0,0 +1,126 @@
+"""
+Tests for precompiled inline gating (lessons/content_filters.py).
+"""
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+
+from courses.models import Course
+from enrollment.models import Enrollment
+from lessons.content_filters import GatingContext, compile_gating, lesson_segments, mask_restricted_sections
+from lessons.models import Lesson
+
+
+class ContentGatingTestCase(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', password='pw')
+        self.student = User.objects.create_user(username='student', password='pw')
+        self.premium = Course.objects.create(
+            title='Grammar Pro', created_by=self.teacher, course_type='premium', is_draft=False,
+        )
+        self.free = Course.objects.create(
+            title='Free Basics', created_by=self.teacher, course_type='free', is_draft=False,
+        )
+        self.html = (
+            '<p>Intro</p>'
+            f'<div class="box" data-required-course-id="{self.premium.id}" data-gated-message="Members only">'
+            '<p>Secret</p></div>'
+            f'<section data-required-course-permalink="{self.free.permalink}"><p>Open</p></section>'
+            '<p>Outro</p>'
+        )
+
+    def _lesson(self, content):
+        return Lesson.objects.create(title='Lesson', content=content, created_by=self.teacher)
+
+    def test_save_compiles_segments(self):
+        plain = self._lesson('<p>No gates here</p>')
+        self.assertEqual(plain.content_segments, [])
+
+        lesson = self._lesson(self.html)
+        segments = Lesson.objects.get(pk=lesson.pk).content_segments
+        gates = [s for s in segments if isinstance(s, dict)]
+        self.assertEqual([g['course_id'] for g in gates], [self.premium.id, self.free.id])
+        self.assertEqual(gates[0]['message'], 'Members only')
+        self.assertEqual(gates[0]['inner'], ['<p>Secret</p>'])
+
+        lesson.content = '<p>Rewritten</p>'
+        lesson.save(update_fields=['content'])
+        self.assertEqual(Lesson.objects.get(pk=lesson.pk).content_segments, [])
+
+    def test_ungated_content_is_returned_without_queries(self):
+        html = '<p>Plain lesson</p>'
+        with self.assertNumQueries(0):
+            self.assertEqual(mask_restricted_sections(html, self.student, segments=[]), html)
+            self.assertEqual(mask_restricted_sections(html, self.student), html)
+
+    def test_masks_premium_section_until_enrolled(self):
+        segments = compile_gating(self.html)
+
+        masked = mask_restricted_sections(self.html, self.student, segments=segments)
+        self.assertNotIn('Secret', masked)
+        self.assertIn(f'href="/courses/{self.premium.permalink}"', masked)
+        self.assertIn('title="Members only"', masked)
+        self.assertIn('Unlock with “Grammar Pro”', masked)
+        self.assertIn('<p>Open</p>', masked)
+        self.assertTrue(masked.startswith('<p>Intro</p><div class="box"'))
+        self.assertTrue(masked.endswith('</div><section'
+                                        f' data-required-course-permalink="{self.free.permalink}">'
+                                        '<p>Open</p></section><p>Outro</p>'))
+        self.assertNotIn('Secret', mask_restricted_sections(self.html, AnonymousUser(), segments=segments))
+
+        Enrollment.objects.create(
+            user=self.student, content_type=ContentType.objects.get_for_model(Course),
+            object_id=self.premium.id, enrollment_type='course',
+        )
+        self.assertIn('<p>Secret</p>', mask_restricted_sections(self.html, self.student, segments=segments))
+
+    def test_bound_course_and_unknown_course(self):
+        html = '<div data-required-course-id="999999"><p>Hidden</p></div>'
+        masked = mask_restricted_sections(html, self.student)
+        self.assertNotIn('Hidden', masked)
+        self.assertIn('Premium section', masked)
+
+        # A lesson attached to a course gates against that course
+        opened = mask_restricted_sections(html, self.student, bound_course=self.free)
+        self.assertIn('<p>Hidden</p>', opened)
+
+    def test_nested_gate_inside_open_section(self):
+        html = (
+            f'<div data-required-course-id="{self.free.id}"><p>Free</p>'
+            f'<div data-required-course-id="{self.premium.id}"><p>Paid</p></div></div>'
+        )
+        masked = mask_restricted_sections(html, self.student)
+        self.assertIn('<p>Free</p>', masked)
+        self.assertNotIn('Paid', masked)
+
+    def test_one_gating_context_per_request(self):
+        lessons = [self._lesson(self.html) for _ in range(5)]
+        gating = GatingContext(self.student)
+        # Course rows and the enrolled course ids are each loaded once
+        with self.assertNumQueries(2):
+            for lesson in lessons:
+                mask_restricted_sections(
+                    lesson.content, self.student, segments=lesson.content_segments, gating=gating,
+                )
+
+    def test_uncompiled_lessons_are_compiled_on_first_use(self):
+        lesson = self._lesson(self.html)
+        Lesson.objects.filter(pk=lesson.pk).update(content_segments=None)
+        lesson.refresh_from_db()
+
+        self.assertTrue(lesson_segments(lesson))
+        self.assertIsNotNone(Lesson.objects.get(pk=lesson.pk).content_segments)
+
+    def test_permalink_of_course_created_after_compile(self):
+        html = '<div data-required-course-permalink="later/course"><p>Later</p></div>'
+        segments = compile_gating(html)
+        self.assertIsNone(segments[0]['course_id'])
+        self.assertIn('Premium section', mask_restricted_sections(html, self.student, segments=segments))
+
+        Course.objects.create(
+            title='Later', permalink='later/course', created_by=self.teacher,
+            course_type='premium', is_draft=False,
+        )
+        masked = mask_restricted_sections(html, self.student, segments=segments)
+        self.assertIn('Unlock with “Later”', masked)
@@ -0,0 +1,105 @@
+"""
+Tests for the asynchronous lesson export pipeline (lessons/exports.py).
+"""
+
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from lessons import exports
+from lessons.models import Lesson
+from lessons.tasks import generate_lesson_exports
+
+
+class ExportPipelineTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        cache.clear()
+
+        self.user = User.objects.create_user(username='author', password='pw')
+        self.lesson = Lesson.objects.create(
+            title='Export me', content='<p>Body</p>', created_by=self.user, status=Lesson.PUBLISHED,
+        )
+        pdf = patch('lessons.pdf_utils.render_lesson_pdf_bytes', return_value=b'%PDF-1.4 lesson')
+        docx = patch('lessons.export_utils.generate_lesson_docx', return_value=(b'PK docx', None))
+        self.render_pdf = pdf.start()
+        self.render_docx = docx.start()
+        self.addCleanup(pdf.stop)
+        self.addCleanup(docx.stop)
+
+    def test_artifacts_are_keyed_by_content_hash(self):
+        self.assertEqual(exports.build_exports(self.lesson), {})
+        first = self.lesson.export_pdf.name
+        self.assertIn(exports.content_hash(self.lesson), first)
+        self.assertTrue(exports.is_fresh(self.lesson, 'pdf'))
+        self.assertTrue(exports.is_fresh(self.lesson, 'docx'))
+
+        # Unchanged content renders nothing
+        exports.build_exports(self.lesson)
+        self.assertEqual(self.render_pdf.call_count, 1)
+        self.assertEqual(self.render_docx.call_count, 1)
+
+        self.lesson.content = '<p>Edited</p>'
+        self.lesson.save()
+        self.assertFalse(exports.is_fresh(self.lesson, 'pdf'))
+        exports.build_exports(self.lesson)
+        self.assertEqual(self.render_pdf.call_count, 2)
+        self.assertNotEqual(self.lesson.export_pdf.name, first)
+        self.assertFalse(default_storage.exists(first))
+
+    @override_settings(LESSON_EXPORT_ASYNC=True, LESSON_EXPORT_DEBOUNCE=30)
+    def test_saves_of_published_lesson_schedule_one_render(self):
+        with patch.object(generate_lesson_exports, 'apply_async') as enqueue:
+            with self.captureOnCommitCallbacks(execute=True):
+                for n in range(3):
+                    self.lesson.content = f'<p>Autosave {n}</p>'
+                    self.lesson.save()
+            enqueue.assert_called_once_with((self.lesson.pk,), countdown=30)
+
+            # The render clears the debounce; drafts never schedule
+            generate_lesson_exports.apply(args=(self.lesson.pk,))
+            self.lesson.refresh_from_db()
+            draft = Lesson.objects.create(title='Draft', content='<p>x</p>', created_by=self.user)
+            with self.captureOnCommitCallbacks(execute=True):
+                draft.save()
+                self.lesson.save()
+            self.assertEqual(enqueue.call_count, 1)  # artifacts already fresh
+
+            self.lesson.title = 'Renamed'
+            with self.captureOnCommitCallbacks(execute=True):
+                self.lesson.save()
+            self.assertEqual(enqueue.call_count, 2)
+
+    @override_settings(LESSON_EXPORT_ASYNC=True)
+    def test_view_returns_202_until_the_artifact_is_built(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('lesson-export-pdf', kwargs={'pk': self.lesson.pk})
+
+        with patch.object(generate_lesson_exports, 'apply_async') as enqueue:
+            response = client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(response.data['poll_url'].endswith(url))
+        enqueue.assert_called_once_with((self.lesson.pk,), countdown=0)
+        self.render_pdf.assert_not_called()
+
+        generate_lesson_exports.apply(args=(self.lesson.pk,))
+        response = client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 lesson')
+
+        response = client.get(reverse('lesson-export-docx', kwargs={'pk': self.lesson.pk}))
+        self.assertEqual(b''.join(response.streaming_content), b'PK docx')
@@ -262,7 +262,7 @@ class LessonExportPDFViewTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response['Content-Type'], 'application/pdf')
         self.assertIn('attachment', response['Content-Disposition'])
-        self.assertTrue(response.content.startswith(b'%PDF'))
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
     
     def test_export_requires_authentication(self):
         """Test that PDF export requires authentication."""
@@ -18,6 +18,7 @@ from .views import (
     AttachCourseToLessonView,
     DetachCourseFromLessonView,
     LessonExportPDFView,
+    LessonExportDOCXView,
     LessonExportAudioView,
 )
 
@@ -39,6 +40,9 @@ urlpatterns = [
     path('<int:pk>/export-pdf/',
          LessonExportPDFView.as_view(),
          name='lesson-export-pdf'),
+    path('<int:pk>/export-docx/',
+         LessonExportDOCXView.as_view(),
+         name='lesson-export-docx'),
     path('<int:pk>/export-audio/',
          LessonExportAudioView.as_view(),
          name='lesson-export-audio'),
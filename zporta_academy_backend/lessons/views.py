@@ -26,7 +26,7 @@ from django.views.decorators.cache import never_cache
 from django.utils.decorators import method_decorator
 from django.core.cache import cache
 import hashlib
-from .content_filters import mask_restricted_sections as _mask_restricted_sections
+from .content_filters import lesson_segments, mask_restricted_sections as _mask_restricted_sections
 import zipfile
 import io
 from django.http import FileResponse
@@ -407,6 +407,7 @@ class DynamicLessonView(APIView):
                     response_data["lesson"]["content"],
                     request.user,
                     bound_course=lesson.course if getattr(lesson, 'course', None) else None,
+                    segments=lesson_segments(lesson),
                 )
                 response_data["lesson"]["content"] = filtered
         except Exception:
@@ -682,17 +683,16 @@ class LessonExportPDFView(APIView):
     Export lesson content as PDF (text-first, no media).
     GET /api/lessons/<lesson_id>/export-pdf/
     
-    Returns PDF file for download. Caches generated PDFs.
+    Streams the prebuilt file when it matches the current lesson content.
+    Otherwise queues rendering (lessons/exports.py) and returns 202 with a
+    poll URL; poll the same URL until it answers 200.
     """
     permission_classes = [IsAuthenticated]
     throttle_scope = 'lesson_export'
+    export_format = 'pdf'
     
     def get(self, request, pk):
-        from django.http import HttpResponse
-        from .pdf_utils import get_or_generate_lesson_pdf
-        import logging
-        
-        logger = logging.getLogger(__name__)
+        from . import exports
         
         # Get lesson
         lesson = get_object_or_404(Lesson, pk=pk)
@@ -733,29 +733,55 @@ class LessonExportPDFView(APIView):
                     status=status.HTTP_404_NOT_FOUND
                 )
         
-        # Generate or retrieve cached PDF
-        try:
-            pdf_bytes = get_or_generate_lesson_pdf(lesson)
-            
-            # Return PDF response
-            filename = f"lesson-{lesson.id}.pdf"
-            response = HttpResponse(pdf_bytes, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            response['Content-Length'] = len(pdf_bytes)
-            
+        fmt = self.export_format
+        response = self._serve_artifact(lesson, fmt)
+        if response is not None:
             return response
-            
-        except Exception as e:
-            logger.error(
-                f"PDF generation failed for lesson {lesson.id} "
-                f"(user: {request.user.id}): {str(e)}",
-                exc_info=True
-            )
+
+        if exports.failure(lesson, fmt) is None and not exports.async_enabled():
+            # No worker to hand it to: render in the request
+            exports.build_exports(lesson, [fmt])
+            response = self._serve_artifact(lesson, fmt)
+            if response is not None:
+                return response
+
+        if exports.failure(lesson, fmt) is not None:
             return Response(
-                {"detail": "PDF generation failed."},
+                {"detail": f"{fmt.upper()} generation failed."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        exports.schedule_export(lesson.id, countdown=0)
+        return Response(
+            {"status": "pending", "poll_url": request.build_absolute_uri()},
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Retry-After": "5"},
+        )
+
+    def _serve_artifact(self, lesson, fmt):
+        """Stream the stored artifact if it matches the current content."""
+        from . import exports
+
+        if not exports.is_fresh(lesson, fmt):
+            return None
+        artifact = exports.open_artifact(lesson, fmt)
+        if artifact is None:
+            return None
+        return FileResponse(
+            artifact,
+            as_attachment=True,
+            filename=f"lesson-{lesson.id}.{fmt}",
+            content_type=exports.FORMATS[fmt][1],
+        )
+
+
+class LessonExportDOCXView(LessonExportPDFView):
+    """
+    Export lesson content as DOCX.
+    GET /api/lessons/<lesson_id>/export-docx/
+    """
+    export_format = 'docx'
+
 
 class LessonExportAudioView(APIView):
     """
@@ -0,0 +1,166 @@
+# quizzes/cache.py
+"""
+Shared per-quiz payload cache.
+
+Feeds, explorer pages and the next-quiz endpoint all render the same quizzes
+over and over. Instead of running the serializer for every request, the
+rendered payload of each quiz is stored once in the cache and shared by all
+users.
+
+Keys are versioned: every quiz has a small version key that is replaced
+whenever the quiz, one of its questions, its tags or its author's user or
+profile change (see quizzes/signals.py). Payloads stored under an old version
+are never read again and simply expire.
+
+Payloads are rendered without a request, so they hold media paths
+("/media/..."); get_quiz_payloads(..., request=request) turns them into
+absolute URLs per request, as a serializer with the request in its context
+would.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+QUIZ_PAYLOAD_TIMEOUT = 60 * 60  # 1 hour; versions make explicit deletes unnecessary
+
+
+def _version_key(quiz_id):
+    return f"quiz_payload_version_{quiz_id}"
+
+
+def _payload_key(quiz_id, version, kind):
+    return f"quiz_payload_{kind}_{quiz_id}_v{version}"
+
+
+def bump_quiz_payload_version(quiz_id):
+    """Invalidate every cached rendering of a quiz."""
+    if not quiz_id:
+        return
+    # A fresh timestamp (instead of incr) keeps versions unique even if the
+    # version key was evicted in between.
+    cache.set(_version_key(quiz_id), time.time_ns(), timeout=None)
+
+
+def bump_author_payload_versions(user_id):
+    """Invalidate the cached renderings of every quiz `user_id` created."""
+    from .models import Quiz
+
+    quiz_ids = list(Quiz.objects.filter(created_by_id=user_id).values_list('id', flat=True))
+    if quiz_ids:
+        version = time.time_ns()
+        cache.set_many({_version_key(qid): version for qid in quiz_ids}, timeout=None)
+
+
+def _get_versions(quiz_ids):
+    keys = {qid: _version_key(qid) for qid in quiz_ids}
+    found = cache.get_many(list(keys.values()))
+    versions = {}
+    missing = {}
+    for qid, key in keys.items():
+        if key in found:
+            versions[qid] = found[key]
+        else:
+            versions[qid] = missing[key] = time.time_ns()
+    if missing:
+        cache.set_many(missing, timeout=None)
+    return versions
+
+
+def _render_full(quiz_ids):
+    from .models import Quiz
+    from .serializers import QuizSerializer
+
+    quizzes = (
+        Quiz.objects.filter(id__in=quiz_ids)
+        .select_related('subject', 'course', 'lesson', 'created_by__profile')
+        .prefetch_related(
+            'tags',
+            'questions__fill_blank__words',
+            'questions__fill_blank__solutions',
+        )
+    )
+    return {quiz.id: dict(QuizSerializer(quiz).data) for quiz in quizzes}
+
+
+def _render_card(quiz_ids):
+    from django.db.models import Count
+    from .models import Quiz
+    from .serializers import QuizCardSerializer
+
+    quizzes = (
+        Quiz.objects.filter(id__in=quiz_ids)
+        .select_related('subject', 'created_by')
+        .prefetch_related('tags')
+        .annotate(question_count=Count('questions'))
+    )
+    return {quiz.id: dict(QuizCardSerializer(quiz).data) for quiz in quizzes}
+
+
+RENDERERS = {
+    'full': _render_full,   # QuizSerializer: nested questions + difficulty explanation
+    'card': _render_card,   # QuizCardSerializer: compact card for listings
+}
+
+CARD_VIEW = 'card'
+
+
+def payload_kind(request):
+    """`?view=card` selects the compact card payload; the default stays full."""
+    return CARD_VIEW if request.query_params.get('view') == CARD_VIEW else 'full'
+
+
+def _absolute_media_urls(value, request, media_url):
+    if isinstance(value, str):
+        return request.build_absolute_uri(value) if value.startswith(media_url) else value
+    if isinstance(value, dict):
+        return {key: _absolute_media_urls(item, request, media_url) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_absolute_media_urls(item, request, media_url) for item in value]
+    return value
+
+
+def get_quiz_payloads(quiz_ids, kind='full', request=None):
+    """
+    Return {quiz_id: payload} for the given ids, rendering only cache misses.
+
+    With `request`, media paths in the payloads are returned as absolute URLs.
+    Missing (deleted) quizzes are simply absent from the result.
+    """
+    quiz_ids = [qid for qid in dict.fromkeys(quiz_ids) if qid]
+    if not quiz_ids:
+        return {}
+
+    renderer = RENDERERS[kind]
+    versions = _get_versions(quiz_ids)
+    keys = {qid: _payload_key(qid, versions[qid], kind) for qid in quiz_ids}
+    found = cache.get_many(list(keys.values()))
+
+    payloads = {}
+    misses = []
+    for qid, key in keys.items():
+        if key in found:
+            payloads[qid] = found[key]
+        else:
+            misses.append(qid)
+
+    if misses:
+        try:
+            rendered = renderer(misses)
+        except Exception as e:
+            logger.error(f"Failed to render quiz payloads ({kind}) for {misses[:10]}...: {e}", exc_info=True)
+            rendered = {}
+        if rendered:
+            cache.set_many(
+                {keys[qid]: data for qid, data in rendered.items()},
+                timeout=QUIZ_PAYLOAD_TIMEOUT,
+            )
+            payloads.update(rendered)
+
+    media_url = settings.MEDIA_URL or ''
+    if request is not None and media_url.startswith('/'):
+        payloads = {qid: _absolute_media_urls(data, request, media_url) for qid, data in payloads.items()}
+    return payloads
@@ -616,6 +616,40 @@ class QuizSerializer(serializers.ModelSerializer):
         instance.refresh_from_db()
         return instance
 
+# --- Compact Quiz Card Serializer ---
+# Read-only card representation for feed / explorer / listing endpoints.
+# No nested questions and no difficulty explanation, so it needs no per-quiz
+# queries when the queryset is prepared like quizzes.cache._render_card does.
+class QuizCardSerializer(serializers.ModelSerializer):
+    subject = serializers.CharField(source='subject.name', read_only=True, allow_null=True)
+    subject_id = serializers.IntegerField(read_only=True, allow_null=True)
+    created_by = serializers.CharField(source='created_by.username', read_only=True)
+    tags = serializers.SerializerMethodField()
+    difficulty_level = serializers.SerializerMethodField()
+    question_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Quiz
+        fields = [
+            'id', 'title', 'permalink', 'quiz_type', 'status',
+            'subject', 'subject_id', 'created_by', 'created_at',
+            'tags', 'languages', 'detected_location',
+            'computed_difficulty_score', 'difficulty_level',
+            'question_count', 'attempt_count',
+        ]
+        read_only_fields = fields
+
+    def get_tags(self, obj):
+        return [tag.name for tag in obj.tags.all()]
+
+    def get_difficulty_level(self, obj):
+        return QuizSerializer.get_difficulty_level(self, obj)
+
+    def get_question_count(self, obj):
+        count = getattr(obj, 'question_count', None)
+        return count if count is not None else obj.questions.count()
+
+
 class QuizReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuizReport
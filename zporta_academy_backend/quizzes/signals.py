@@ -2,10 +2,13 @@ import os
 import re
 from bs4 import BeautifulSoup
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.contrib.auth.models import User
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 
+from users.models import Profile
 from .models import Quiz, Tag
+from .cache import bump_author_payload_versions, bump_quiz_payload_version
 from django.core.cache import cache
 
 from langdetect import detect_langs, LangDetectException
@@ -113,6 +116,47 @@ def invalidate_quiz_course_cache_on_save(sender, instance, **kwargs):
     if getattr(instance, 'course_id', None):
         cache.delete(f"course_lessons_quizzes_{instance.course_id}")
 
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def invalidate_quiz_payload_cache(sender, instance, **kwargs):
+    bump_quiz_payload_version(instance.pk)
+
+@receiver(m2m_changed, sender=Quiz.tags.through)
+def invalidate_quiz_payload_cache_on_tags(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Quiz):
+        bump_quiz_payload_version(instance.pk)
+
+# Full payloads embed the author's public profile (PublicProfileSerializer)
+# and cards the username. User saves cascade into Profile saves (e.g. on
+# every login), so only a change to a stored value re-renders the quizzes.
+AUTHOR_USER_FIELDS = ('username', 'email', 'first_name', 'last_name')
+
+
+def _author_snapshot(instance):
+    # instance.__dict__ so deferred fields are never loaded here
+    if isinstance(instance, Profile):
+        names = [f.attname for f in Profile._meta.concrete_fields if not getattr(f, 'auto_now', False)]
+    else:
+        names = AUTHOR_USER_FIELDS
+    return tuple(instance.__dict__.get(name) for name in names)
+
+
+@receiver(post_init, sender=User)
+@receiver(post_init, sender=Profile)
+def remember_author_fields(sender, instance, **kwargs):
+    instance._author_snapshot = _author_snapshot(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Profile)
+def invalidate_quiz_payload_cache_on_author(sender, instance, created, **kwargs):
+    current = _author_snapshot(instance)
+    changed = current != getattr(instance, '_author_snapshot', None)
+    instance._author_snapshot = current
+    if created or not changed or kwargs.get('raw', False):
+        return
+    bump_author_payload_versions(instance.pk if sender is User else instance.user_id)
+
 @receiver(post_save, sender=Tag)
 def invalidate_quiz_course_cache_on_tag_change(sender, instance, **kwargs):
     # Tag changes don't directly map to a single course; skip heavy invalidation.
@@ -201,6 +245,14 @@ def generate_question_permalink(sender, instance, created, **kwargs):
                 delattr(instance, '_generating_permalink')
 
 
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_quiz_payload_cache_on_question(sender, instance, **kwargs):
+    # Registered after generate_question_permalink so the new permalink is
+    # already stored when the quiz payload is re-rendered.
+    bump_quiz_payload_version(instance.quiz_id)
+
+
 @receiver(post_migrate)
 def populate_missing_permalinks(sender, **kwargs):
     """
@@ -1,3 +1,287 @@
-from django.test import TestCase
+import logging
+import threading
+import time
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User, update_last_login
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from analytics import utils
+from analytics.models import ActivityEvent, MemoryStat, QuizAnswerFact, QuizSessionProgress
+from quizzes.cache import get_quiz_payloads
+from quizzes.models import Quiz, Question
+from users.models import Profile
+
+logger = logging.getLogger(__name__)
+
+# SQL statements per answer submission: (inside the request, including the
+# on-commit work). SAVEPOINT/RELEASE are not counted: under TestCase every
+# atomic() is a savepoint, in production the outer ones are BEGIN/COMMIT.
+#
+# Inside the request, every answer pays: question lookup, locked open-session
+# lookup, memory stat upsert (3), attempt index count, answer event + fact +
+# QuizAttempt, session counters, question rollup upsert (2), quiz rollup (1).
+# The first answer also opens the session (question count, insert,
+# quiz_started event), raises the growth score, checks for a first attempt on
+# the quiz, inserts the quiz rollup row and may look up two ContentTypes on a
+# cold cache. The completing answer also closes the session.
+#
+# On commit, the event bus runs synchronously in tests (no broker; in
+# production the request only pays an RPUSH): preference tagging (4), user
+# activity (4-6), gamification (~6 per award: the learner's correct answer,
+# plus the author's first-attempt reward on a first answer) and the online
+# ability/difficulty update (~14, ~5 more while the profiles are created).
+# Completing a session adds quiz_completed, the finisher rollup and the
+# quiz-level review (SM-2 memory stat, 5).
+FIRST_ANSWER_BUDGET = (21, 69)
+NEXT_ANSWER_BUDGET = (13, 37)
+COMPLETING_ANSWER_BUDGET = (14, 48)
+
+
+def _statements(queries):
+    return sum(not q['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')) for q in queries)
+
+
+def _make_quiz(author, questions=3):
+    quiz = Quiz.objects.create(title='Answers', created_by=author, status='published')
+    return quiz, [
+        Question.objects.create(quiz=quiz, question_text=f'Q{i}', question_type='mcq',
+                                option1='a', option2='b', correct_option=1)
+        for i in range(questions)
+    ]
+
+
+class RecordQuizAnswerTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pw')
+        self.user = User.objects.create_user(username='learner', password='pw')
+        self.quiz, self.questions = _make_quiz(self.author)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _answer(self, question, option=1):
+        """Post one answer; returns (statements in the request, statements including on-commit work)."""
+        with CaptureQueriesContext(connection) as ctx:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    f'/api/quizzes/{self.quiz.id}/record-answer/',
+                    {'question_id': question.id, 'selected_option': option, 'time_spent_ms': 3000},
+                    format='json',
+                )
+                in_request = _statements(ctx.captured_queries)
+        self.assertEqual(response.status_code, 200)
+        return in_request, _statements(ctx.captured_queries)
+
+    def _assert_budget(self, counts, budget):
+        in_request, total = counts
+        self.assertLessEqual(in_request, budget[0])
+        self.assertLessEqual(total, budget[1])
+
+    def test_session_counters_and_query_budget(self):
+        self._assert_budget(self._answer(self.questions[0]), FIRST_ANSWER_BUDGET)
+        progress = QuizSessionProgress.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual((progress.total_questions, progress.answered_count), (3, 1))
+
+        self._assert_budget(self._answer(self.questions[1], option=2), NEXT_ANSWER_BUDGET)
+        self._assert_budget(self._answer(self.questions[1]), NEXT_ANSWER_BUDGET)
+        progress.refresh_from_db()
+        # Re-answering a question does not move the session counters
+        self.assertEqual((progress.answered_count, progress.correct_count), (2, 1))
+        self.assertEqual(progress.status, QuizSessionProgress.IN_PROGRESS)
+
+        self._assert_budget(self._answer(self.questions[2]), COMPLETING_ANSWER_BUDGET)
+        progress.refresh_from_db()
+        self.assertEqual(progress.status, QuizSessionProgress.COMPLETED)
+        quiz_ct = ContentType.objects.get_for_model(Quiz)
+        events = ActivityEvent.objects.filter(user=self.user, content_type=quiz_ct, object_id=self.quiz.id)
+        self.assertEqual(events.filter(event_type='quiz_started', session_id=progress.session_id).count(), 1)
+        self.assertEqual(events.filter(event_type='quiz_completed', session_id=progress.session_id).count(), 1)
+        self.assertTrue(MemoryStat.objects.filter(user=self.user, content_type=quiz_ct, object_id=self.quiz.id).exists())
+
+        # The next answer opens a new session
+        self._answer(self.questions[0])
+        self.assertEqual(QuizSessionProgress.objects.filter(user=self.user, quiz=self.quiz).count(), 2)
+
+    def test_fact_table_is_not_read_while_disabled(self):
+        # Facts not written (e.g. before the backfill): attempt indexes and the
+        # session review must come from the answer events
+        with mock.patch('analytics.utils.record_answer_fact'):
+            for question in self.questions:
+                self._answer(question)
+            self._answer(self.questions[0])
+        self.assertFalse(QuizAnswerFact.objects.exists())
+
+        attempts = ActivityEvent.objects.filter(
+            user=self.user, event_type='quiz_answer_submitted', object_id=self.questions[0].id,
+        ).order_by('id').values_list('metadata__attempt_index', flat=True)
+        self.assertEqual(list(attempts), [1, 2])
+        quiz_ct = ContentType.objects.get_for_model(Quiz)
+        self.assertTrue(MemoryStat.objects.filter(user=self.user, content_type=quiz_ct, object_id=self.quiz.id).exists())
+
+    def test_open_session_key_is_unique_on_every_database(self):
+        self._answer(self.questions[0])
+        opened = QuizSessionProgress.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual(opened.open_key, f'{self.user.id}:{self.quiz.id}')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            QuizSessionProgress.objects.create(user=self.user, quiz=self.quiz, total_questions=3,
+                                               started_at=opened.started_at)
+
+        for question in self.questions[1:]:
+            self._answer(question)
+        opened.refresh_from_db()
+        self.assertIsNone(opened.open_key)
+        self._answer(self.questions[0])  # a second session can open once the first is closed
+        self.assertEqual(QuizSessionProgress.objects.filter(user=self.user, quiz=self.quiz).count(), 2)
+
+    def test_session_opened_by_a_concurrent_answer_is_reused(self):
+        self._answer(self.questions[0])
+        opened = QuizSessionProgress.objects.get(user=self.user, quiz=self.quiz)
+        lookup = utils._open_quiz_session
+        calls = []
+
+        def missed_first(user, quiz):
+            # The first lookup ran before the other request's insert
+            calls.append(quiz.id)
+            return None if len(calls) == 1 else lookup(user, quiz)
+
+        with mock.patch('analytics.utils._open_quiz_session', side_effect=missed_first):
+            self._answer(self.questions[1])
+
+        self.assertEqual(len(calls), 2)
+        opened.refresh_from_db()
+        self.assertEqual(QuizSessionProgress.objects.filter(user=self.user, quiz=self.quiz).count(), 1)
+        self.assertEqual(opened.answered_count, 2)
+        self.assertEqual(ActivityEvent.objects.filter(user=self.user, event_type='quiz_started').count(), 1)
+
+
+class QuizPayloadCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pw')
+        self.quiz = Quiz.objects.create(title='Capitals', created_by=self.author, status='published')
+        self.question = Question.objects.create(
+            quiz=self.quiz, question_text='Capital of France?', question_type='mcq',
+            option1='Paris', option2='Rome', correct_option=1,
+        )
+        # update() skips Profile.save's image handling; the quiz is re-rendered below anyway
+        Profile.objects.filter(user=self.author).update(profile_image='user_author/avatar.png')
+        Question.objects.filter(pk=self.question.pk).update(question_image='quizzes/map.png')
+        cache.clear()
+
+    def test_explorer_search_returns_absolute_media_urls(self):
+        for _ in range(2):  # cold, then from the shared cache
+            response = self.client.get('/api/explorer/search/', {'q': 'Capitals'})
+            quiz = response.json()['quizzes'][0]
+            self.assertEqual(quiz['created_by']['profile_image_url'], 'http://testserver/media/user_author/avatar.png')
+            self.assertEqual(quiz['questions'][0]['question_image'], 'http://testserver/media/quizzes/map.png')
+
+        # The cached payload itself stays request-independent
+        self.assertEqual(
+            get_quiz_payloads([self.quiz.id])[self.quiz.id]['created_by']['profile_image_url'],
+            '/media/user_author/avatar.png',
+        )
+
+    def test_author_changes_invalidate_payloads(self):
+        self.assertEqual(get_quiz_payloads([self.quiz.id], kind='card')[self.quiz.id]['created_by'], 'author')
+        self.author.username = 'renamed'
+        self.author.save()
+        self.assertEqual(get_quiz_payloads([self.quiz.id], kind='card')[self.quiz.id]['created_by'], 'renamed')
+
+        profile = Profile.objects.get(user=self.author)
+        profile.bio = 'Geography teacher'
+        profile.save()
+        self.assertEqual(get_quiz_payloads([self.quiz.id])[self.quiz.id]['created_by']['bio'], 'Geography teacher')
+
+    def test_login_does_not_invalidate_payloads(self):
+        get_quiz_payloads([self.quiz.id])
+        with mock.patch('quizzes.signals.bump_author_payload_versions') as bump:
+            self.client.force_login(self.author)
+            update_last_login(None, self.author)
+        bump.assert_not_called()
+
+
+@skipUnless(connection.features.has_select_for_update, 'needs row locks (MySQL)')
+class OpenQuizSessionRaceTests(TransactionTestCase):
+    """Two first answers from the same learner at once share one session."""
+
+    def test_same_learner_racing_answers(self):
+        author = User.objects.create_user(username='author', password='pw')
+        learner = User.objects.create_user(username='learner', password='pw')
+        quiz, questions = _make_quiz(author, questions=4)
+        barrier = threading.Barrier(2)
+        statuses = []
+
+        def answer(question):
+            client = APIClient()
+            client.force_authenticate(learner)
+            try:
+                barrier.wait()
+                response = client.post(
+                    f'/api/quizzes/{quiz.id}/record-answer/',
+                    {'question_id': question.id, 'selected_option': 1, 'time_spent_ms': 2000},
+                    format='json',
+                )
+                statuses.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=answer, args=(question,)) for question in questions[:2]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses, [200, 200])
+        session = QuizSessionProgress.objects.get(user=learner, quiz=quiz)
+        self.assertEqual(session.answered_count, 2)
+        self.assertEqual(ActivityEvent.objects.filter(user=learner, event_type='quiz_started').count(), 1)
+
+
+@skipUnless(connection.features.has_select_for_update, 'needs row locks (MySQL)')
+class RecordQuizAnswerConcurrencyBenchmark(TransactionTestCase):
+    """Many learners answering at once: no lost counter updates, and a throughput figure."""
+    learners = 8
+    questions = 10
+
+    def test_concurrent_answers(self):
+        author = User.objects.create_user(username='author', password='pw')
+        quiz, questions = _make_quiz(author, questions=self.questions)
+        users = [User.objects.create_user(username=f'learner{i}', password='pw') for i in range(self.learners)]
+        errors = []
+
+        def answer_all(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                for question in questions:
+                    response = client.post(
+                        f'/api/quizzes/{quiz.id}/record-answer/',
+                        {'question_id': question.id, 'selected_option': 1, 'time_spent_ms': 2000},
+                        format='json',
+                    )
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=answer_all, args=(user,)) for user in users]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(errors, [])
+        sessions = QuizSessionProgress.objects.filter(quiz=quiz)
+        self.assertEqual(sessions.count(), self.learners)
+        self.assertTrue(all(s.answered_count == self.questions and s.status == QuizSessionProgress.COMPLETED
+                            for s in sessions))
+        total = self.learners * self.questions
+        logger.info(f'{total} answers from {self.learners} learners in {elapsed:.2f}s '
+                    f'({total / elapsed:.0f} answers/s)')
@@ -10,7 +10,7 @@ from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
 from django.db import transaction
-from django.db.models import Count, Q, OuterRef, Subquery, IntegerField
+from django.db.models import Avg, Count, Q, OuterRef, Subquery, IntegerField
 from django.db.models.functions import Coalesce
 from django.contrib.contenttypes.models import ContentType
 from django.urls import reverse
@@ -23,10 +23,14 @@ from notifications.utils import send_push_to_user_devices
 from .models import Quiz, Question, QuizReport, QuizShare
 from .serializers import QuizSerializer, QuestionSerializer, QuizReportSerializer, QuizShareSerializer
 from .difficulty_explanation import get_difficulty_explanation
+from .cache import CARD_VIEW, get_quiz_payloads, payload_kind
 from analytics.utils import update_memory_stat_item, log_event
-from analytics.models import ActivityEvent
+from analytics.models import ActivityEvent, QuizAnswerFact, QuizSessionProgress
+from analytics.rollups import record_answer_stats
+from analytics.answer_facts import answer_facts_enabled
 from rest_framework.decorators import api_view, permission_classes
-from analytics.utils import get_or_create_quiz_session_id
+from analytics.utils import get_or_create_quiz_session_id, start_or_resume_quiz_session, record_quiz_session_answer
+from intelligence.online import record_answer
 
 
 logger = logging.getLogger(__name__)
@@ -88,33 +92,30 @@ class RecordQuizAnswerView(APIView):
         except (ValueError, TypeError):
             return Response({"error": "time_spent_ms must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
 
-        question = get_object_or_404(Question, pk=question_id, quiz_id=quiz_id)
+        question = get_object_or_404(Question.objects.select_related('quiz'), pk=question_id, quiz_id=quiz_id)
         quiz = question.quiz
         if quiz.status != 'published' and request.user != quiz.created_by and not request.user.is_staff:
             return Response(status=status.HTTP_403_FORBIDDEN)
 
-        quiz_ct = ContentType.objects.get_for_model(Quiz)
-        if not ActivityEvent.objects.filter(
-            user=user, content_type=quiz_ct, object_id=quiz.id, event_type='quiz_started'
-        ).exists():
-            log_event(
-                user=user,
-                event_type='quiz_started',
-                instance=quiz,
-                metadata={
-                   'quiz_id': quiz.id,
-                   'started_at': timezone.now().isoformat()
-                }
-            )
+        # The open QuizSessionProgress row is the session: locked here, counters kept on it
+        progress, new_session = start_or_resume_quiz_session(user, quiz)
 
         is_correct, correct_val, processed_answer = self.check_answer(question, request.data)
         qor = self.calculate_qor(is_correct, time_spent_ms)
 
         stat = update_memory_stat_item(user=user, learnable_item=question, quality_of_recall=qor, time_spent_ms=time_spent_ms)
 
-        self.log_answer(request, quiz, question, processed_answer, correct_val, is_correct, time_spent_ms, qor, stat)
+        attempt_index = self.log_answer(request, quiz, question, processed_answer, correct_val, is_correct,
+                                        time_spent_ms, qor, stat, session_id=progress.session_id)
+        completed = record_quiz_session_answer(progress, question.id, is_correct)
+        new_quiz_user = new_session and not QuizSessionProgress.objects.filter(
+            user=user, quiz=quiz).exclude(pk=progress.pk).exists()
+        record_answer_stats(quiz.id, question.id, is_correct,
+                            new_quiz_user=new_quiz_user, new_question_user=attempt_index == 1)
+        record_answer(user.id, quiz.id, question.id, is_correct, time_spent_ms, subject_id=quiz.subject_id)
 
-        transaction.on_commit(lambda: self.check_completion_after_commit(user.id, quiz.id))
+        if completed:
+            transaction.on_commit(lambda: self.complete_session_after_commit(user, quiz, progress))
 
         return Response({
             "message": "Answer recorded.",
@@ -199,18 +200,22 @@ class RecordQuizAnswerView(APIView):
         return 5
 
     @staticmethod
-    def log_answer(request, quiz, question, ans, corr, is_corr, time_spent, qor, stat):
+    def log_answer(request, quiz, question, ans, corr, is_corr, time_spent, qor, stat, session_id=None):
         # request payload (fix: avoid NameError: data)
         data = request.data
-        session_id = get_or_create_quiz_session_id(request.user, quiz.id)
+        if session_id is None:
+            session_id = get_or_create_quiz_session_id(request.user, quiz.id)
         
         question_ct = ContentType.objects.get_for_model(Question)
-        prev_attempts = ActivityEvent.objects.filter(
-            user=request.user,
-            event_type='quiz_answer_submitted',
-            content_type=question_ct,
-            object_id=question.id
-        ).count()
+        if answer_facts_enabled():
+            prev_attempts = QuizAnswerFact.objects.filter(user=request.user, question_id=question.id).count()
+        else:
+            prev_attempts = ActivityEvent.objects.filter(
+                user=request.user,
+                event_type='quiz_answer_submitted',
+                content_type=question_ct,
+                object_id=question.id
+            ).count()
 
         # Canonical fields from payload
         selected_answer_text = data.get("selected_answer_text")
@@ -241,21 +246,6 @@ class RecordQuizAnswerView(APIView):
             "hints_used": hints_used,                          # which hints were revealed
         }
 
-        first_count = ActivityEvent.objects.filter(
-            user=request.user,
-            event_type='quiz_answer_submitted',
-            metadata__quiz_id=quiz.id
-        ).count()
-
-        if first_count == 0:
-            log_event(
-                user=request.user,
-                event_type='quiz_started',
-                instance=quiz,
-                metadata={'quiz_id': quiz.id, 'started_at': timezone.now().isoformat()},
-                session_id=session_id,
-            )
-
         log_event(
             user=request.user,
             event_type='quiz_answer_submitted',
@@ -264,63 +254,38 @@ class RecordQuizAnswerView(APIView):
             related_object=quiz,
             session_id=session_id,
         )
-    @staticmethod
-    def check_completion_after_commit(user_id, quiz_id):
-        try:
-            user = User.objects.get(id=user_id)
-            quiz = Quiz.objects.get(id=quiz_id)
-        except (User.DoesNotExist, Quiz.DoesNotExist):
-            return
-
-        total_questions = quiz.questions.count()
-        if total_questions == 0:
-            return
+        return metadata["attempt_index"]
 
-        q_ct = ContentType.objects.get_for_model(Question)
-        
-        answered_count = ActivityEvent.objects.filter(
-            user=user, content_type=q_ct, event_type='quiz_answer_submitted', metadata__quiz_id=quiz.id
-        ).values('object_id').distinct().count()
-
-        if answered_count >= total_questions:
-            quiz_ct = ContentType.objects.get_for_model(Quiz)
-            if not ActivityEvent.objects.filter(
-                user=user,
-                content_type=quiz_ct,
-                object_id=quiz.id,
-                event_type='quiz_completed'
-            ).exists():
-                attendance_ms = None
-                start_ev = ActivityEvent.objects.filter(
-                    user=user,
-                    content_type=quiz_ct,
-                    object_id=quiz.id,
-                    event_type='quiz_started'
-                ).order_by('timestamp').first()
-                if start_ev:
-                    delta = timezone.now() - start_ev.timestamp
-                    attendance_ms = int(delta.total_seconds() * 1000)
-
-                completion_session = get_or_create_quiz_session_id(user, quiz.id)
-                log_event(
-                    user=user,
-                    event_type='quiz_completed',
-                    instance=quiz,
-                    metadata={
-                        'quiz_id': quiz.id,
-                        'auto_triggered': True,
-                        'attendance_time_ms': attendance_ms
-                    },
-                    session_id=completion_session,
-                )
-                qos_list = ActivityEvent.objects.filter(
-                    user=user, content_type=q_ct, event_type='quiz_answer_submitted', metadata__quiz_id=quiz.id
+    @staticmethod
+    def complete_session_after_commit(user, quiz, progress):
+        """Log 'quiz_completed' for a finished session and review the quiz as a whole (SM-2)."""
+        attendance_ms = int((progress.completed_at - progress.started_at).total_seconds() * 1000)
+        log_event(
+            user=user,
+            event_type='quiz_completed',
+            instance=quiz,
+            metadata={
+                'quiz_id': quiz.id,
+                'auto_triggered': True,
+                'attendance_time_ms': attendance_ms
+            },
+            session_id=progress.session_id,
+        )
+        if answer_facts_enabled():
+            avg_qor = QuizAnswerFact.objects.filter(
+                user=user, quiz_id=quiz.id, session_id=progress.session_id, quality_of_recall__isnull=False
+            ).aggregate(avg=Avg('quality_of_recall'))['avg']
+        else:
+            qos_list = [
+                q for q in ActivityEvent.objects.filter(
+                    user=user, event_type='quiz_answer_submitted', session_id=progress.session_id,
+                    metadata__quiz_id=quiz.id,
                 ).values_list('metadata__quality_of_recall_used', flat=True)
-                
-                valid_qos = [q for q in qos_list if q is not None]
-                if valid_qos:
-                    avg = int(np.round(np.mean(valid_qos)))
-                    update_memory_stat_item(user=user, learnable_item=quiz, quality_of_recall=avg)
+                if q is not None
+            ]
+            avg_qor = np.mean(qos_list) if qos_list else None
+        if avg_qor is not None:
+            update_memory_stat_item(user=user, learnable_item=quiz, quality_of_recall=int(np.round(avg_qor)))
 
 
 class QuizListCreateView(generics.ListCreateAPIView):
@@ -507,6 +472,14 @@ class QuizListByCourseView(generics.ListAPIView):
             return Quiz.objects.none()
         return Quiz.objects.filter(course_id=course_id, status='published')
 
+    def list(self, request, *args, **kwargs):
+        # `?view=card` returns compact cached quiz cards instead of full quizzes
+        if payload_kind(request) != CARD_VIEW:
+            return super().list(request, *args, **kwargs)
+        quiz_ids = list(self.get_queryset().values_list('id', flat=True))
+        payloads = get_quiz_payloads(quiz_ids, kind=CARD_VIEW)
+        return Response([payloads[qid] for qid in quiz_ids if qid in payloads])
+
 class MyQuizzesView(generics.ListAPIView):
     serializer_class = QuizSerializer
     permission_classes = [IsAuthenticated]
@@ -0,0 +1,103 @@
+# seo/cache.py
+"""
+Process-local lookup cache for SEOMiddleware.
+
+The middleware needs the Redirect and SEOSetting for the current path on every
+request. Both tables change only through the admin, so lookups are remembered
+in process memory per path, misses included (negative cache), and the map is
+bounded by SEO_LOOKUP_MAX_PATHS entries.
+
+Coherence between workers: a single version key in the shared cache is
+replaced whenever a Redirect or SEOSetting is saved or deleted (see
+seo/signals.py). Each worker compares its local version with the shared one at
+most every SEO_LOOKUP_VERSION_CHECK_SECONDS and drops its map when it changed,
+so other workers pick up admin edits lazily within that window.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = "seo_lookup_version"
+
+_lock = threading.Lock()
+_state = {'version': None, 'checked_at': 0.0, 'redirects': {}, 'settings': {}}
+
+
+def bump_lookup_version():
+    """Invalidate every worker's lookup map (called on admin save/delete)."""
+    # A fresh timestamp (instead of incr) keeps versions unique even if the
+    # version key was evicted in between.
+    version = time.time_ns()
+    cache.set(VERSION_KEY, version, timeout=None)
+    with _lock:
+        _reset(version)
+
+
+def _reset(version):
+    _state['version'] = version
+    _state['checked_at'] = time.monotonic()
+    _state['redirects'] = {}
+    _state['settings'] = {}
+
+
+def _shared_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(VERSION_KEY, version, timeout=None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def _refresh_if_stale():
+    interval = getattr(settings, 'SEO_LOOKUP_VERSION_CHECK_SECONDS', 5)
+    if _state['version'] is not None and time.monotonic() - _state['checked_at'] < interval:
+        return
+    version = _shared_version()
+    with _lock:
+        if version != _state['version']:
+            _reset(version)
+        else:
+            _state['checked_at'] = time.monotonic()
+
+
+def _lookup(kind, path, load):
+    _refresh_if_stale()
+    entries = _state[kind]
+    if path in entries:
+        return entries[path]
+    value = load(path)
+    with _lock:
+        if _state[kind] is entries:  # not reset while we were loading
+            if len(entries) >= getattr(settings, 'SEO_LOOKUP_MAX_PATHS', 10000):
+                entries.clear()
+            entries[path] = value
+    return value
+
+
+def _load_redirect(path):
+    from .models import Redirect
+    return Redirect.objects.filter(old_path=path).values_list('new_path', 'permanent').first()
+
+
+def _load_setting(path):
+    from .models import SEOSetting
+    row = SEOSetting.objects.filter(path=path).values('title', 'description', 'canonical_url').first()
+    return tuple(row.values()) if row else None
+
+
+def get_redirect(path):
+    """(new_path, permanent) for `path`, or None."""
+    return _lookup('redirects', path, _load_redirect)
+
+
+def get_seo_setting(path):
+    """(title, description, canonical_url) for `path`, or None."""
+    return _lookup('settings', path, _load_setting)
+
+
+def is_skipped_path(path):
+    """Paths the SEO middleware never looks up (API calls, static and media files)."""
+    return path.startswith(tuple(getattr(settings, 'SEO_MIDDLEWARE_SKIP_PREFIXES', ())))
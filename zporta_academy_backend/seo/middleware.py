@@ -2,27 +2,33 @@ from django.shortcuts import redirect
 
 from seo.utils import canonical_url
 
-from .models import SEOSetting, Redirect
+from .cache import get_redirect, get_seo_setting, is_skipped_path
 
 class SEOMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        # Check for a redirect
-        redirect_obj = Redirect.objects.filter(old_path=request.path).first()
+        path = request.path
+        if is_skipped_path(path):
+            return self.get_response(request)
+
+        # Check for a redirect (cached per path, see seo/cache.py)
+        redirect_obj = get_redirect(path)
         if redirect_obj:
-            return redirect(redirect_obj.new_path, permanent=redirect_obj.permanent)
+            new_path, permanent = redirect_obj
+            return redirect(new_path, permanent=permanent)
 
         # Get the response from the view
         response = self.get_response(request)
 
         # Apply SEO settings if they exist
-        seo_settings = SEOSetting.objects.filter(path=request.path).first()
+        seo_settings = get_seo_setting(path)
         if seo_settings:
-            response['X-SEO-Title'] = seo_settings.title
-            response['X-SEO-Description'] = seo_settings.description
-            if seo_settings.canonical_url:
-                response['Link'] = f'<{canonical_url(seo_settings.canonical_url)}>; rel="canonical"'
+            title, description, canonical = seo_settings
+            response['X-SEO-Title'] = title
+            response['X-SEO-Description'] = description
+            if canonical:
+                response['Link'] = f'<{canonical_url(canonical)}>; rel="canonical"'
 
         return response
@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_lookup_version
+from .models import Redirect, SEOSetting
+
+
+@receiver([post_save, post_delete], sender=Redirect)
+@receiver([post_save, post_delete], sender=SEOSetting)
+def invalidate_seo_lookups(sender, **kwargs):
+    # After commit, so no worker reloads the lookups before the change is visible
+    transaction.on_commit(bump_lookup_version)
@@ -1,6 +1,8 @@
 import re
+from unittest import mock
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
 
 from users.models import Profile
@@ -9,6 +11,8 @@ from lessons.models import Lesson
 from quizzes.models import Quiz
 from subjects.models import Subject
 from tags.models import Tag
+from seo import cache as seo_cache
+from seo.models import Redirect, SEOSetting
 from seo.utils import canonical_url, canonical_path, is_public_indexable_path
 from seo.sitemaps import (
     TeacherSitemap, CourseSitemap, LessonSitemap, QuizSitemap
@@ -255,3 +259,41 @@ class SitemapCleanlinessTests(TestCase):
         resp = self.client.get("/sitemap-tags.xml")
         self.assertEqual(resp.status_code, 200)
         self._assert_clean(resp.content.decode())
+
+
+@override_settings(SEO_LOOKUP_VERSION_CHECK_SECONDS=60)
+class SEOMiddlewareCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        seo_cache.bump_lookup_version()
+
+    def test_lookups_are_cached_and_invalidated_on_save(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Redirect.objects.create(old_path='/old-page/', new_path='/new-page/', permanent=False)
+        response = self.client.get('/old-page/')
+        self.assertEqual((response.status_code, response['Location']), (302, '/new-page/'))
+        self.assertIsNone(seo_cache.get_seo_setting('/nowhere/'))
+        with self.assertNumQueries(0):
+            self.client.get('/old-page/')
+            self.assertIsNone(seo_cache.get_seo_setting('/nowhere/'))  # negative cache
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            SEOSetting.objects.create(path='/nowhere/', title='Somewhere')
+            # Not bumped until the transaction commits
+            self.assertIsNone(seo_cache.get_seo_setting('/nowhere/'))
+        self.assertEqual(callbacks, [seo_cache.bump_lookup_version])
+        self.assertEqual(seo_cache.get_seo_setting('/nowhere/')[0], 'Somewhere')
+
+    def test_other_workers_reload_when_shared_version_changes(self):
+        self.assertIsNone(seo_cache.get_redirect('/moved/'))
+        # Saved through another worker: only the shared version key moves
+        with mock.patch('seo.signals.bump_lookup_version'):
+            Redirect.objects.create(old_path='/moved/', new_path='/here/')
+        cache.set(seo_cache.VERSION_KEY, 1, timeout=None)
+        self.assertIsNone(seo_cache.get_redirect('/moved/'))  # within the check interval
+        with override_settings(SEO_LOOKUP_VERSION_CHECK_SECONDS=0):
+            self.assertEqual(seo_cache.get_redirect('/moved/'), ('/here/', True))
+
+    def test_api_paths_skip_lookups(self):
+        Redirect.objects.create(old_path='/api/quizzes/', new_path='/elsewhere/')
+        self.assertEqual(self.client.get('/api/quizzes/').status_code, 200)
@@ -1,7 +1,11 @@
 # users/activity_signals.py
 """
 Signals to automatically create UserActivity records for various events.
+
+Quiz answers arrive in per-user batches from the post-commit event bus
+(analytics/events.py) rather than ActivityEvent post_save.
 """
+from django.contrib.auth import get_user_model
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
@@ -9,9 +13,11 @@ from django.contrib.contenttypes.models import ContentType
 from .activity_models import UserActivity
 from lessons.models import LessonCompletion
 from enrollment.models import CourseCompletion, Enrollment
-from analytics.models import ActivityEvent
+from analytics.events import ANSWER_SUBMITTED, subscribe
 from courses.models import Course
 
+User = get_user_model()
+
 
 @receiver(post_save, sender=LessonCompletion)
 def track_lesson_completion(sender, instance, created, **kwargs):
@@ -84,133 +90,119 @@ def track_course_completion(sender, instance, created, **kwargs):
     )
 
 
-@receiver(post_save, sender=ActivityEvent)
-def track_quiz_answer(sender, instance, created, **kwargs):
+def _answered_quizzes(events):
+    """{quiz_id: Quiz} for the quizzes referenced by a batch of answer events."""
+    from quizzes.models import Quiz
+    quiz_ids = {event['metadata']['quiz_id'] for event in events if event['metadata'].get('quiz_id')}
+    return Quiz.objects.in_bulk(quiz_ids) if quiz_ids else {}
+
+
+@subscribe(ANSWER_SUBMITTED)
+def track_quiz_answers(user_id, events):
     """
-    Award +1 point for each correct answer (tracks from ActivityEvent).
+    Award +1 point for each correct answer (tracks from answer events).
     """
-    # Only track quiz_answer_submitted events
-    if instance.event_type != 'quiz_answer_submitted':
+    # Only correct answers earn points
+    correct = [event for event in events if event['metadata'].get('is_correct', False)]
+    quizzes = _answered_quizzes(correct)
+    if not quizzes:
         return
-    
-    # Only track on creation
-    if not created:
-        return
-    
-    # Check if answer is correct
-    metadata = instance.metadata or {}
-    is_correct = metadata.get('is_correct', False)
-    
-    if not is_correct:
-        return  # No points for incorrect answers
-    
-    user = instance.user
-    if not user:
-        return
-    
-    # Get quiz from metadata
-    quiz_id = metadata.get('quiz_id')
-    if not quiz_id:
-        return
-    
-    try:
-        from quizzes.models import Quiz
-        quiz = Quiz.objects.get(id=quiz_id)
-    except Quiz.DoesNotExist:
-        return
-    
-    # Check if already tracked this question (regardless of attempt)
-    question_id = metadata.get('question_id')
-    attempt_index = metadata.get('attempt_index')
-    
-    existing = UserActivity.objects.filter(
-        user=user,
-        role='student',
-        activity_type='CORRECT_ANSWER',
-        metadata__question_id=question_id
-    ).exists()
-    
-    if existing:
-        return  # Already tracked this question
-    
-    # Award +1 point for this correct answer
-    UserActivity.objects.create(
-        user=user,
-        role='student',
-        activity_type='CORRECT_ANSWER',
-        points=1,  # +1 per correct answer
-        content_type=ContentType.objects.get_for_model(quiz),
-        object_id=quiz.id,
-        metadata={
-            'quiz_id': quiz.id,
-            'quiz_title': quiz.title,
-            'quiz_permalink': getattr(quiz, 'permalink', None),
-            'question_id': question_id,
-            'attempt_index': attempt_index,
-            'event_id': instance.id,
-        }
-    )
 
+    # Already tracked questions (regardless of attempt); rows point at the quiz, so
+    # the (content_type, object_id) lookup replaces a scan of the JSON metadata
+    quiz_type = ContentType.objects.get_for_model(next(iter(quizzes.values())))
+    tracked = {
+        metadata.get('question_id')
+        for metadata in UserActivity.objects.filter(
+            user_id=user_id,
+            role='student',
+            activity_type='CORRECT_ANSWER',
+            content_type=quiz_type,
+            object_id__in=quizzes.keys(),
+        ).values_list('metadata', flat=True)
+    }
 
-@receiver(post_save, sender=ActivityEvent)
-def track_quiz_teacher_engagement(sender, instance, created, **kwargs):
+    activities = []
+    for event in correct:
+        metadata = event['metadata']
+        quiz = quizzes.get(metadata.get('quiz_id'))
+        question_id = metadata.get('question_id')
+        if quiz is None or question_id in tracked:
+            continue
+        tracked.add(question_id)
+        # Award +1 point for this correct answer
+        activities.append(UserActivity(
+            user_id=user_id,
+            role='student',
+            activity_type='CORRECT_ANSWER',
+            points=1,  # +1 per correct answer
+            content_type=quiz_type,
+            object_id=quiz.id,
+            metadata={
+                'quiz_id': quiz.id,
+                'quiz_title': quiz.title,
+                'quiz_permalink': getattr(quiz, 'permalink', None),
+                'question_id': question_id,
+                'attempt_index': metadata.get('attempt_index'),
+                'event_id': event['event_id'],
+            }
+        ))
+    UserActivity.objects.bulk_create(activities)
+
+
+@subscribe(ANSWER_SUBMITTED)
+def track_quiz_teacher_engagement(user_id, events):
     """
     Award teacher +1 point for first quiz attempt by each student.
     """
-    # Only track quiz_answer_submitted events
-    if instance.event_type != 'quiz_answer_submitted':
-        return
-    
-    # Only track on creation
-    if not created:
-        return
-    
-    user = instance.user
-    if not user:
-        return
-    
-    # Get quiz from metadata
-    metadata = instance.metadata or {}
-    quiz_id = metadata.get('quiz_id')
-    if not quiz_id:
-        return
-    
-    try:
-        from quizzes.models import Quiz
-        quiz = Quiz.objects.get(id=quiz_id)
-    except Quiz.DoesNotExist:
-        return
-    
     # Only award if quiz has a different creator
-    if not quiz.created_by or quiz.created_by == user:
+    quizzes = {
+        quiz_id: quiz for quiz_id, quiz in _answered_quizzes(events).items()
+        if quiz.created_by_id and quiz.created_by_id != user_id
+    }
+    if not quizzes:
         return
-    
-    # Check if this is the FIRST answer by this student on this quiz
-    teacher_first_attempt_exists = UserActivity.objects.filter(
-        user=quiz.created_by,
-        role='teacher',
-        activity_type='QUIZ_FIRST_ATTEMPT',
-        metadata__quiz_id=quiz.id,
-        metadata__student_id=user.id
-    ).exists()
-    
-    if not teacher_first_attempt_exists:
-        UserActivity.objects.create(
-            user=quiz.created_by,
+
+    # Check if this is the FIRST answer by this student on these quizzes
+    quiz_type = ContentType.objects.get_for_model(next(iter(quizzes.values())))
+    already_awarded = set(
+        UserActivity.objects.filter(
+            user_id__in={quiz.created_by_id for quiz in quizzes.values()},
+            role='teacher',
+            activity_type='QUIZ_FIRST_ATTEMPT',
+            content_type=quiz_type,
+            object_id__in=quizzes.keys(),
+            metadata__student_id=user_id,
+        ).values_list('object_id', flat=True)
+    )
+    quizzes = {quiz_id: quiz for quiz_id, quiz in quizzes.items() if quiz_id not in already_awarded}
+    if not quizzes:
+        return
+
+    first_event = {}
+    for event in events:
+        first_event.setdefault(event['metadata'].get('quiz_id'), event)
+    student_username = User.objects.filter(pk=user_id).values_list('username', flat=True).first()
+
+    UserActivity.objects.bulk_create([
+        UserActivity(
+            user_id=quiz.created_by_id,
             role='teacher',
             activity_type='QUIZ_FIRST_ATTEMPT',
             points=1,
-            content_type=ContentType.objects.get_for_model(quiz),
+            content_type=quiz_type,
             object_id=quiz.id,
             metadata={
                 'quiz_id': quiz.id,
                 'quiz_title': quiz.title,
                 'quiz_permalink': getattr(quiz, 'permalink', None),
-                'student_id': user.id,
-                'student_username': user.username,
-                'event_id': instance.id,
+                'student_id': user_id,
+                'student_username': student_username,
+                'event_id': first_event[quiz.id]['event_id'],
             }
         )
+        for quiz in quizzes.values()
+    ])
 
 
 @receiver(post_save, sender=Enrollment)
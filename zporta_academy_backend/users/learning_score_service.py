@@ -7,7 +7,8 @@ Learning Score Service - Calculates user learning scores based on:
 """
 from django.db.models import Q
 from django.contrib.contenttypes.models import ContentType
-from analytics.models import ActivityEvent
+from analytics.answer_facts import answer_facts_enabled
+from analytics.models import ActivityEvent, QuizAnswerFact
 from lessons.models import LessonCompletion
 from enrollment.models import Enrollment
 from courses.models import Course
@@ -20,6 +21,48 @@ except ImportError:
     QUIZ_MODELS_AVAILABLE = False
 
 
+def _quiz_items_from_facts(user):
+    """
+    Quiz items from QuizAnswerFact: one indexed query for the correct answers,
+    then quizzes and questions in bulk. Event metadata is only read for
+    answers whose quiz or question has since been deleted.
+    """
+    facts = QuizAnswerFact.objects.filter(
+        user=user, is_correct=True, question__isnull=False
+    ).order_by('-timestamp').values('event_id', 'quiz_id', 'question_id', 'timestamp')
+
+    latest = {}
+    for fact in facts:
+        latest.setdefault(fact['question_id'], fact)
+    if not latest:
+        return []
+
+    quizzes, questions = {}, {}
+    if QUIZ_MODELS_AVAILABLE:
+        quizzes = Quiz.objects.select_related('subject').in_bulk({f['quiz_id'] for f in latest.values()})
+        questions = dict(Question.objects.filter(id__in=list(latest)).values_list('id', 'question_text'))
+    missing = [f['event_id'] for f in latest.values()
+               if f['quiz_id'] not in quizzes or f['question_id'] not in questions]
+    metadata = dict(ActivityEvent.objects.filter(id__in=missing).values_list('id', 'metadata')) if missing else {}
+
+    items = []
+    for question_id, fact in latest.items():
+        meta = metadata.get(fact['event_id']) or {}
+        quiz = quizzes.get(fact['quiz_id'])
+        question_text = questions.get(question_id)
+        items.append({
+            'quiz_id': fact['quiz_id'],
+            'quiz_title': quiz.title if quiz else (meta.get('quiz_title') or meta.get('related_object_title', 'Quiz')),
+            'quiz_permalink': quiz.permalink if quiz else meta.get('quiz_permalink'),
+            'question_id': question_id,
+            'question_text': question_text[:200] if question_text else meta.get('question_text', 'Question'),
+            'subject': quiz.subject.name if quiz and quiz.subject else None,
+            'answered_at': fact['timestamp'].isoformat() if fact['timestamp'] else None,
+            'points': 1
+        })
+    return items
+
+
 def compute_learning_score(user):
     """
     Compute learning score breakdown for a user.
@@ -39,14 +82,19 @@ def compute_learning_score(user):
     quiz_items = []
     quiz_score = 0
     
-    # Get all correct answers (MySQL-compatible approach - deduplicate in Python)
-    # Order by newest first (-timestamp)
-    correct_answers = ActivityEvent.objects.filter(
-        user=user,
-        event_type='quiz_answer_submitted',
-        metadata__is_correct=True,
-        metadata__has_key='question_id'
-    ).order_by('-timestamp')
+    if answer_facts_enabled():
+        quiz_items = _quiz_items_from_facts(user)
+        quiz_score = len(quiz_items)
+        correct_answers = ActivityEvent.objects.none()
+    else:
+        # Get all correct answers (MySQL-compatible approach - deduplicate in Python)
+        # Order by newest first (-timestamp)
+        correct_answers = ActivityEvent.objects.filter(
+            user=user,
+            event_type='quiz_answer_submitted',
+            metadata__is_correct=True,
+            metadata__has_key='question_id'
+        ).order_by('-timestamp')
     
     # Track unique questions to avoid double-counting
     seen_questions = set()
@@ -13,7 +13,7 @@ from posts.models import Post
 from courses.models import Course
 from lessons.models import Lesson
 from quizzes.models import Quiz
-from analytics.models import ActivityEvent
+from analytics.events import ANSWER_SUBMITTED, subscribe
 
 
 def update_profile_to_both(user):
@@ -64,34 +64,24 @@ for Model in (Post, Course, Lesson, Quiz):
             update_profile_to_both(instance.created_by)
 
 
-@receiver(post_save, sender=ActivityEvent)
-def update_user_preferences_from_event(sender, instance, **kwargs):
+@subscribe(ANSWER_SUBMITTED)
+def update_user_preferences_from_events(user_id, events):
     """
-    On each quiz‐answer event, tag the user's UserPreference
-    with the quiz’s subject + tags.
+    On quiz‐answer events, tag the user's UserPreference
+    with the quizzes' subjects + tags.
     """
-    user = getattr(instance, 'user', None)
-    if not user or not instance.event_type == 'quiz_answer_submitted':
+    quiz_ids = {event['metadata']['quiz_id'] for event in events if event['metadata'].get('quiz_id')}
+    quizzes = list(Quiz.objects.filter(pk__in=quiz_ids).prefetch_related('tags'))
+    if not quizzes:
         return
 
-    pref, _ = UserPreference.objects.get_or_create(user=user)
-
-    # “instance.content_type” / object_id point at a Question → get its quiz
-    model_cls = instance.content_type.model_class()
-    try:
-        question = model_cls.objects.get(pk=instance.object_id)
-    except model_cls.DoesNotExist:
-        return
-
-    # If that Question has a .quiz, add subject + tags
-    quiz = getattr(question, 'quiz', None)
-    if isinstance(quiz, Quiz):
-        if quiz.subject:
-            pref.interested_subjects.add(quiz.subject)
-        for tag in quiz.tags.all():
-            pref.interested_tags.add(tag)
-
-    pref.save()
+    pref, _ = UserPreference.objects.get_or_create(user_id=user_id)
+    subjects = {quiz.subject_id for quiz in quizzes if quiz.subject_id}
+    tags = {tag.pk for quiz in quizzes for tag in quiz.tags.all()}
+    if subjects:
+        pref.interested_subjects.add(*subjects)
+    if tags:
+        pref.interested_tags.add(*tags)
 
 
 # ────────────────────────────────────────────────────────────────
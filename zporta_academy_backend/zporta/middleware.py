@@ -1,33 +1,105 @@
 import time
 import logging
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 
+from zporta import profiling
+
 logger = logging.getLogger(__name__)
 
+
 class SlowRequestLoggingMiddleware(MiddlewareMixin):
-    """Log requests that exceed a latency threshold.
+    """Profile every request and log the slow or query-heavy ones.
 
     Lightweight middleware to surface backend bottlenecks without enabling full profiling.
-    Adjust SLOW_THRESHOLD_SECONDS as needed. Writes to standard logging; ensure console/file
-    handler is configured in production settings.
+    For each request it collects query count, SQL time, repeated statements (N+1
+    fingerprints), cache hits/misses and DRF serializer time (see zporta.profiling),
+    returns them in a Server-Timing header (staff users, or DEBUG) and writes one structured log line for
+    requests over SLOW_THRESHOLD_SECONDS, over REQUEST_PROFILING_QUERY_THRESHOLD
+    queries, or with repeated statements. A sample of profiles feeds the staff
+    "Request profiles" admin page. Disable with REQUEST_PROFILING = False.
+    Writes to standard logging; ensure console/file handler is configured in
+    production settings.
     """
 
     SLOW_THRESHOLD_SECONDS = 1.2  # seconds
 
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.profiling = getattr(settings, 'REQUEST_PROFILING', True)
+        if self.profiling:
+            profiling.install()
+
     def process_request(self, request):
         request._start_time = time.monotonic()
+        if self.profiling:
+            request._profile = profiling.start_profile()
 
     def process_response(self, request, response):
         start = getattr(request, '_start_time', None)
-        if start is not None:
-            duration = time.monotonic() - start
+        if start is None:
+            return response
+        duration = time.monotonic() - start
+        profile = getattr(request, '_profile', None)
+        if profile is None:
             if duration >= self.SLOW_THRESHOLD_SECONDS:
-                logger.warning(
-                    "SLOW_REQUEST path=%s method=%s status=%s duration=%.3fs user=%s", 
-                    request.path,
-                    request.method,
-                    getattr(response, 'status_code', 'NA'),
-                    duration,
-                    getattr(getattr(request, 'user', None), 'id', None)
-                )
+                self._log(logging.WARNING, 'SLOW_REQUEST', request, response, duration)
+            return response
+
+        profiling.stop_profile()
+        if settings.DEBUG or getattr(getattr(request, 'user', None), 'is_staff', False):
+            # Timings reveal backend internals: not for anonymous or regular users
+            response['Server-Timing'] = profile.server_timing(duration)
+        duplicates = profile.duplicates()
+        sample = {
+            'endpoint': self._endpoint(request),
+            'path': request.path,
+            'status': getattr(response, 'status_code', None),
+            'at': time.time(),
+            'duration_ms': round(duration * 1000, 1),
+            'queries': profile.queries,
+            'sql_ms': round(profile.sql_time * 1000, 1),
+            'cache_hits': profile.cache_hits,
+            'cache_misses': profile.cache_misses,
+            'serializer_ms': round(profile.serializer_time * 1000, 1),
+            'duplicates': [(sql[:500], count) for sql, count in duplicates[:3]],
+        }
+
+        is_slow = duration >= self.SLOW_THRESHOLD_SECONDS
+        if is_slow:
+            self._log(logging.WARNING, 'SLOW_REQUEST', request, response, duration, sample)
+        elif duplicates or profile.queries >= profiling.setting('REQUEST_PROFILING_QUERY_THRESHOLD', 50):
+            self._log(logging.INFO, 'REQUEST_PROFILE', request, response, duration, sample)
+        for sql, count in sample['duplicates']:
+            logger.warning("N_PLUS_ONE path=%s count=%s sql=%s", request.path, count, sql[:300])
+
+        if profiling.should_sample(sample, is_slow):
+            profiling.record_sample(sample)
         return response
+
+    @staticmethod
+    def _endpoint(request):
+        match = getattr(request, 'resolver_match', None)
+        route = (match.route or match.view_name) if match else None
+        return f"{request.method} /{route}" if route else f"{request.method} {request.path}"
+
+    @staticmethod
+    def _log(level, tag, request, response, duration, sample=None):
+        extra = ''
+        if sample is not None:
+            extra = (
+                f" queries={sample['queries']} sql={sample['sql_ms']}ms dup_statements={len(sample['duplicates'])}"
+                f" cache_hits={sample['cache_hits']} cache_misses={sample['cache_misses']}"
+                f" serializer={sample['serializer_ms']}ms"
+            )
+        logger.log(
+            level,
+            "%s path=%s method=%s status=%s duration=%.3fs user=%s%s",
+            tag,
+            request.path,
+            request.method,
+            getattr(response, 'status_code', 'NA'),
+            duration,
+            getattr(getattr(request, 'user', None), 'id', None),
+            extra,
+        )
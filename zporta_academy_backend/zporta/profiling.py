@@ -0,0 +1,281 @@
+"""Per-request DB / cache / serializer profiling.
+
+Used by zporta.middleware.SlowRequestLoggingMiddleware. Each request gets a
+RequestProfile in a context variable; three cheap hooks write into it while
+it is active:
+
+* a database execute wrapper (query count, SQL time, repeated statements),
+* wrapped get/get_many on the configured cache backends (hits / misses),
+* a timed ``BaseSerializer.data`` (DRF serialization time, outermost call only).
+
+Outside a profiled request the hooks fall straight through to the original
+code. A sample of profiles is kept in a small ring buffer for the staff
+"Request profiles" admin page: a Redis list (LPUSH + LTRIM, shared by all
+workers) when the default cache is django-redis, otherwise the default cache.
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from zporta.redis_client import get_redis
+
+_current = ContextVar('zporta_request_profile', default=None)
+_MISSING = object()
+_install_lock = threading.Lock()
+_buffer_lock = threading.Lock()
+_installed = False
+
+RING_BUFFER_KEY = 'zporta:request_profiles'
+RING_BUFFER_TIMEOUT = 60 * 60 * 24
+
+_IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+def fingerprint(sql):
+    """Statement shape: Django SQL is already parametrised, only IN-lists vary in length."""
+    if 'IN (' in sql:
+        sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return sql
+
+
+class RequestProfile:
+    __slots__ = (
+        'queries', 'sql_time', 'statements', 'cache_hits', 'cache_misses',
+        'cache_time', 'serializer_time', '_serializer_depth',
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time = 0.0
+        self.serializer_time = 0.0
+        self._serializer_depth = 0
+
+    def duplicates(self, threshold=None):
+        """[(fingerprint, count)] for statements run at least `threshold` times, most repeated first."""
+        if threshold is None:
+            threshold = setting('REQUEST_PROFILING_DUPLICATE_THRESHOLD', 5)
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+    def server_timing(self, duration):
+        """Value for the Server-Timing response header."""
+        parts = [
+            f'app;dur={duration * 1000:.1f}',
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries"',
+            f'cache;dur={self.cache_time * 1000:.1f};desc="{self.cache_hits} hits {self.cache_misses} misses"',
+            f'ser;dur={self.serializer_time * 1000:.1f}',
+        ]
+        duplicates = self.duplicates()
+        if duplicates:
+            parts.append(f'dup;desc="{len(duplicates)} repeated statements (max {duplicates[0][1]}x)"')
+        return ', '.join(parts)
+
+
+def current_profile():
+    return _current.get()
+
+
+def start_profile():
+    profile = RequestProfile()
+    _current.set(profile)
+    return profile
+
+
+def stop_profile():
+    # Not ContextVar.reset(): under ASGI the request and response hooks may
+    # run in different copies of the context.
+    _current.set(None)
+
+
+# ── Database ──────────────────────────────────────────────────────────────
+def execute_wrapper(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.sql_time += time.perf_counter() - start
+        profile.queries += 1
+        profile.statements[fingerprint(sql)] += 1
+
+
+def _attach_execute_wrapper(sender, connection, **kwargs):
+    # execute_wrappers lives on the (per-thread) connection wrapper and survives reconnects
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def _instrument_connections():
+    connection_created.connect(_attach_execute_wrapper, dispatch_uid='zporta_request_profiling')
+    for connection in connections.all(initialized_only=True):
+        _attach_execute_wrapper(None, connection)
+
+
+# ── Cache ─────────────────────────────────────────────────────────────────
+def _profiled_get(original):
+    def get(self, key, default=None, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return original(self, key, default, *args, **kwargs)
+        start = time.perf_counter()
+        value = original(self, key, _MISSING, *args, **kwargs)
+        profile.cache_time += time.perf_counter() - start
+        if value is _MISSING:
+            profile.cache_misses += 1
+            return default
+        profile.cache_hits += 1
+        return value
+    get._zporta_profiled = True
+    return get
+
+
+def _profiled_get_many(original):
+    def get_many(self, keys, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return original(self, keys, *args, **kwargs)
+        keys = list(keys)
+        start = time.perf_counter()
+        found = original(self, keys, *args, **kwargs)
+        profile.cache_time += time.perf_counter() - start
+        profile.cache_hits += len(found)
+        profile.cache_misses += len(keys) - len(found)
+        return found
+    get_many._zporta_profiled = True
+    return get_many
+
+
+def _instrument_cache_backends():
+    for alias in settings.CACHES:
+        backend_class = type(caches[alias])
+        if not getattr(backend_class.get, '_zporta_profiled', False):
+            backend_class.get = _profiled_get(backend_class.get)
+        if not getattr(backend_class.get_many, '_zporta_profiled', False):
+            backend_class.get_many = _profiled_get_many(backend_class.get_many)
+
+
+# ── DRF serializers ───────────────────────────────────────────────────────
+def _instrument_serializers():
+    try:
+        from rest_framework.serializers import BaseSerializer
+    except ImportError:
+        return
+    original = BaseSerializer.data
+    if getattr(original.fget, '_zporta_profiled', False):
+        return
+
+    def data(self):
+        profile = _current.get()
+        if profile is None or profile._serializer_depth:
+            return original.fget(self)
+        profile._serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            profile.serializer_time += time.perf_counter() - start
+            profile._serializer_depth -= 1
+    data._zporta_profiled = True
+    BaseSerializer.data = property(data)
+
+
+def install():
+    """Install the database, cache and serializer hooks once per process."""
+    global _installed
+    with _install_lock:
+        if not _installed:
+            _instrument_connections()
+            _instrument_cache_backends()
+            _instrument_serializers()
+            _installed = True
+
+
+# ── Ring buffer of sampled profiles ───────────────────────────────────────
+def should_sample(sample, is_slow):
+    if is_slow:
+        return True
+    if sample['queries'] >= setting('REQUEST_PROFILING_QUERY_THRESHOLD', 50) or sample['duplicates']:
+        return True
+    return random.random() < setting('REQUEST_PROFILING_SAMPLE_RATE', 0.02)
+
+
+def record_sample(sample):
+    """Push one profile onto the ring buffer, newest first (diagnostics only: never raises)."""
+    size = setting('REQUEST_PROFILING_BUFFER_SIZE', 300)
+    try:
+        client = get_redis()
+        if client is not None:
+            key = cache.make_key(RING_BUFFER_KEY)
+            pipe = client.pipeline(transaction=True)
+            pipe.lpush(key, json.dumps(sample))
+            pipe.ltrim(key, 0, size - 1)
+            pipe.expire(key, RING_BUFFER_TIMEOUT)
+            pipe.execute()
+            return
+        with _buffer_lock:
+            buffer = cache.get(RING_BUFFER_KEY) or []
+            buffer.insert(0, sample)
+            cache.set(RING_BUFFER_KEY, buffer[:size], RING_BUFFER_TIMEOUT)
+    except Exception:
+        pass
+
+
+def recent_samples():
+    """Buffered profiles, newest first."""
+    client = get_redis()
+    if client is not None:
+        return [json.loads(item) for item in client.lrange(cache.make_key(RING_BUFFER_KEY), 0, -1)]
+    return cache.get(RING_BUFFER_KEY) or []
+
+
+def clear_samples():
+    client = get_redis()
+    if client is not None:
+        client.delete(cache.make_key(RING_BUFFER_KEY))
+    cache.delete(RING_BUFFER_KEY)
+
+
+def worst_endpoints(limit=50):
+    """Samples grouped by endpoint, slowest (max duration) first."""
+    endpoints = {}
+    for sample in recent_samples():
+        row = endpoints.setdefault(sample['endpoint'], {
+            'endpoint': sample['endpoint'], 'samples': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'max_queries': 0, 'max_sql_ms': 0.0, 'max_serializer_ms': 0.0,
+            'cache_hits': 0, 'cache_misses': 0, 'worst': None, 'duplicate': None,
+        })
+        row['samples'] += 1
+        row['total_ms'] += sample['duration_ms']
+        row['max_queries'] = max(row['max_queries'], sample['queries'])
+        row['max_sql_ms'] = max(row['max_sql_ms'], sample['sql_ms'])
+        row['max_serializer_ms'] = max(row['max_serializer_ms'], sample['serializer_ms'])
+        row['cache_hits'] += sample['cache_hits']
+        row['cache_misses'] += sample['cache_misses']
+        if sample['duration_ms'] >= row['max_ms']:
+            row['max_ms'] = sample['duration_ms']
+            row['worst'] = sample
+        for sql, count in sample['duplicates'][:1]:
+            if row['duplicate'] is None or count > row['duplicate'][1]:
+                row['duplicate'] = (sql, count)
+    rows = sorted(endpoints.values(), key=lambda r: r['max_ms'], reverse=True)[:limit]
+    for row in rows:
+        row['avg_ms'] = row['total_ms'] / row['samples']
+    return rows
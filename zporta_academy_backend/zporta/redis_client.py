@@ -0,0 +1,33 @@
+# zporta/redis_client.py
+"""
+Raw Redis access behind the default cache, for commands the Django cache API
+does not have: atomic counters (dailycast.counters), the AI front-cache LRU
+index (ai_core.cache) and list buffers drained by Celery (ai_core.usage,
+analytics.events).
+
+get_redis() returns None unless the default cache is django-redis (locmem in
+tests and local development); every caller keeps its own fallback.
+"""
+import json
+
+
+def get_redis():
+    """Raw Redis client behind the default cache, or None for other backends."""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except (ImportError, NotImplementedError):
+        return None
+
+
+def take(client, key, limit):
+    """
+    Remove and return up to `limit` JSON items from the head of the list at
+    `key`. LRANGE and LTRIM run in one MULTI, so concurrent drains never get
+    the same item.
+    """
+    pipe = client.pipeline(transaction=True)
+    pipe.lrange(key, 0, limit - 1)
+    pipe.ltrim(key, limit, -1)
+    raw, _ = pipe.execute()
+    return [json.loads(item) for item in raw]
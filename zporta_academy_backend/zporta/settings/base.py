@@ -111,6 +111,8 @@ CHANNEL_LAYERS = {
  }
 
 MIDDLEWARE = [
+    # Performance / observability middleware: first, so it sees every query of the request
+    'zporta.middleware.SlowRequestLoggingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -121,10 +123,23 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'seo.middleware.SEOMiddleware',
     'media_manager.middleware.UpdateDomainMiddleware',
-    # Performance / observability middleware (added for slow request logging)
-    'zporta.middleware.SlowRequestLoggingMiddleware',
 ]
 
+# SEOMiddleware lookups (seo/cache.py): per-path Redirect / SEOSetting map kept in
+# process memory; workers re-check the shared version key every few seconds.
+SEO_MIDDLEWARE_SKIP_PREFIXES = ('/api/', '/media/', '/django-static/', '/static/')
+SEO_LOOKUP_VERSION_CHECK_SECONDS = 5
+SEO_LOOKUP_MAX_PATHS = 10000
+
+# Request profiling (zporta/middleware.py, zporta/profiling.py): Server-Timing
+# headers, structured logs for slow / query-heavy / N+1 requests, and a sampled
+# ring buffer shown on /admin/analytics/request-profiles/.
+REQUEST_PROFILING = True
+REQUEST_PROFILING_SAMPLE_RATE = 0.02         # share of ordinary requests kept in the buffer
+REQUEST_PROFILING_QUERY_THRESHOLD = 50       # always log + sample above this many queries
+REQUEST_PROFILING_DUPLICATE_THRESHOLD = 5    # same statement this often = N+1 suspect
+REQUEST_PROFILING_BUFFER_SIZE = 300
+
 ROOT_URLCONF = 'zporta.urls'
 
 TEMPLATES = [
@@ -230,6 +245,44 @@ AWS_SECRET_ACCESS_KEY = config('AWS_SECRET_ACCESS_KEY', default=None)
 AWS_REGION = config('AWS_REGION', default='us-east-1')
 DAILYCAST_TEST_USER_ID = config('DAILYCAST_TEST_USER_ID', cast=int, default=1)
 DAILYCAST_DEFAULT_LANGUAGE = config('DAILYCAST_DEFAULT_LANGUAGE', default='en')
+# dailycast.rate_limiter: "daily" (per UTC day) or "sliding" (last N seconds)
+DAILYCAST_RATE_LIMIT_MODE = config('DAILYCAST_RATE_LIMIT_MODE', default='daily')
+DAILYCAST_RATE_LIMIT_WINDOW_SECONDS = config('DAILYCAST_RATE_LIMIT_WINDOW_SECONDS', cast=int, default=86400)
+# dailycast.batch: concurrent LLM calls per provider and TTS pool size, per worker process
+DAILYCAST_BATCH_LLM_CONCURRENCY = {'openai': 8, 'gemini': 4, 'fake': 16, 'default': 4}
+DAILYCAST_BATCH_TTS_WORKERS = 4
+DAILYCAST_BATCH_CHUNK_SIZE = 50
+# dailycast.learning_data: CachedUserAnalytics lifetime (also invalidated by learning activity)
+DAILYCAST_ANALYTICS_CACHE_HOURS = 24
+# dailycast.cache_manager: CachedAIInsight lifetime; stale hits are regenerated in the background
+DAILYCAST_AI_INSIGHT_CACHE_HOURS = 24
+DAILYCAST_INSIGHT_REFRESH_BATCH = 20
+DAILYCAST_INSIGHT_REFRESH_WORKERS = 4
+DAILYCAST_INSIGHT_REFRESH_LEASE_SECONDS = 15 * 60
+DAILYCAST_INSIGHT_REFRESH_DAILY_TOKENS = {'default': 500_000}  # per engine
+# dailycast.tts_cache: sentence chunks cached in default_storage, synthesized in parallel
+DAILYCAST_TTS_CACHE_DIR = 'tts_cache'
+DAILYCAST_TTS_MAX_CHUNK_CHARS = 1500
+DAILYCAST_TTS_CHUNK_WORKERS = 4
+DAILYCAST_TTS_MAX_CONCURRENCY = 8
+DAILYCAST_TTS_RATE = config('DAILYCAST_TTS_RATE', default='')  # Polly SSML prosody rate, e.g. "95%"
+
+# --- AI core response cache (ai_core/cache.py) ---
+AI_RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+AI_RESPONSE_CACHE_MAX_ENTRIES = 10000
+AI_CACHE_REUSE_UNRATED = config('AI_CACHE_REUSE_UNRATED', cast=bool, default=False)
+AI_CACHE_MIN_RATING = 4.0
+AI_INFLIGHT_LOCK_SECONDS = 60  # longest expected provider call
+AI_INFLIGHT_WAIT_SECONDS = 30
+# AiUsageLog rows are buffered and written in bulk by ai_core.flush_usage_logs (ai_core/usage.py)
+AI_USAGE_LOG_ASYNC = True
+AI_USAGE_BUFFER_MAX = 1000  # per-process buffer size without Redis
+AI_USAGE_FLUSH_BATCH = 5000
+
+# --- Lesson PDF/DOCX exports (lessons/exports.py) ---
+# Rendered by Celery when a broker is configured (LESSON_EXPORT_ASYNC overrides),
+# this many seconds after the last save of a published lesson
+LESSON_EXPORT_DEBOUNCE = 30
 
 # --- Logging Configuration (debugging) ---
 LOGGING = {
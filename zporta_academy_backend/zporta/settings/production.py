@@ -274,3 +274,37 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    # Daily CacheStatistics totals are counted in Redis and written here
+    'dailycast-flush-cache-statistics': {
+        'task': 'dailycast.flush_cache_statistics',
+        'schedule': 60.0,
+    },
+    # Safety net for the post-commit event bus (analytics/events.py)
+    'analytics-drain-domain-events': {
+        'task': 'analytics.drain_domain_events',
+        'schedule': 60.0,
+    },
+    # UserScore counters move by F() deltas; this repairs any drift
+    'gamification-reconcile-user-scores': {
+        'task': 'gamification.reconcile_user_scores',
+        'schedule': 60.0 * 60 * 24,
+    },
+    # Answers move ability scores online; ranks/percentiles follow here
+    'intelligence-refresh-ability-rankings': {
+        'task': 'intelligence.refresh_ability_rankings',
+        'schedule': 300.0,
+    },
+    # CachedAIInsight rows served stale are regenerated in the background
+    'dailycast-refresh-stale-ai-insights': {
+        'task': 'dailycast.refresh_stale_ai_insights',
+        'schedule': 300.0,
+    },
+}
+# Buffered AiUsageLog rows and their hourly/daily rollups (ai_core.usage).
+# ai_core is optional: without it the task is never registered.
+if any(app == 'ai_core' or app.startswith('ai_core.') for app in INSTALLED_APPS):
+    CELERY_BEAT_SCHEDULE['ai-core-flush-usage-logs'] = {
+        'task': 'ai_core.flush_usage_logs',
+        'schedule': 60.0,
+    }
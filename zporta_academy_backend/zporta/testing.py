@@ -0,0 +1,137 @@
+# zporta/testing.py
+"""
+Test helpers.
+
+FakeRedis stands in for the client returned by zporta.redis_client.get_redis()
+so the Redis branches of counters and buffers run without a server. It covers
+the commands this project uses, with redis-py's return types (bytes values).
+Patch it where it is looked up:
+
+    with mock.patch('analytics.events.get_redis', return_value=FakeRedis()):
+        ...
+"""
+import threading
+
+
+def _bytes(value):
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode()
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+
+    def __getattr__(self, name):
+        command = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((command, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        with self._client.lock:
+            calls, self._calls = self._calls, []
+            return [command(*args, **kwargs) for command, args, kwargs in calls]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.ttl = {}
+        self.lock = threading.RLock()
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    # keys
+    def get(self, key):
+        value = self.data.get(key)
+        return _bytes(value) if value is not None else None
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def expire(self, key, seconds):
+        self.ttl[key] = seconds
+        return key in self.data
+
+    # counters
+    def incrby(self, key, amount=1):
+        with self.lock:
+            self.data[key] = int(self.data.get(key, 0)) + amount
+            return self.data[key]
+
+    def hincrby(self, key, field, amount=1):
+        with self.lock:
+            hash_ = self.data.setdefault(key, {})
+            hash_[field] = int(hash_.get(field, 0)) + amount
+            return hash_[field]
+
+    def hgetall(self, key):
+        return {_bytes(field): _bytes(value) for field, value in self.data.get(key, {}).items()}
+
+    # lists
+    def rpush(self, key, *values):
+        with self.lock:
+            items = self.data.setdefault(key, [])
+            items.extend(_bytes(v) for v in values)
+            return len(items)
+
+    def lpush(self, key, *values):
+        with self.lock:
+            items = self.data.setdefault(key, [])
+            for value in values:
+                items.insert(0, _bytes(value))
+            return len(items)
+
+    def llen(self, key):
+        return len(self.data.get(key, []))
+
+    def lrange(self, key, start, end):
+        items = self.data.get(key, [])
+        return list(items[start:None if end == -1 else end + 1])
+
+    def ltrim(self, key, start, end):
+        with self.lock:
+            items = self.data.get(key, [])
+            self.data[key] = items[start:None if end == -1 else end + 1]
+            return True
+
+    # sorted sets
+    def zadd(self, key, mapping):
+        with self.lock:
+            zset = self.data.setdefault(key, {})
+            added = sum(_bytes(member) not in zset for member in mapping)
+            zset.update({_bytes(member): float(score) for member, score in mapping.items()})
+            return added
+
+    def zcard(self, key):
+        return len(self.data.get(key, {}))
+
+    def zcount(self, key, low, high):
+        low, high = (float('-inf') if low == '-inf' else float(low)), (float('inf') if high == '+inf' else float(high))
+        return sum(low <= score <= high for score in self.data.get(key, {}).values())
+
+    def zrem(self, key, *members):
+        zset = self.data.get(key, {})
+        return sum(zset.pop(_bytes(member), None) is not None for member in members)
+
+    def zremrangebyscore(self, key, low, high):
+        zset = self.data.get(key, {})
+        low, high = (float('-inf') if low == '-inf' else float(low)), (float('inf') if high == '+inf' else float(high))
+        doomed = [member for member, score in zset.items() if low <= score <= high]
+        for member in doomed:
+            del zset[member]
+        return len(doomed)
+
+    def zpopmin(self, key, count=1):
+        with self.lock:
+            zset = self.data.get(key, {})
+            popped = sorted(zset.items(), key=lambda item: (item[1], item[0]))[:count]
+            for member, _ in popped:
+                del zset[member]
+            return popped
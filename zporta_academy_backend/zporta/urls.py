@@ -6,6 +6,7 @@ from posts.views import DynamicPostView
 from courses.views import DynamicCourseView
 from lessons.views import DynamicLessonView
 from quizzes.views import DynamicQuizView
+from analytics.dashboard_views import request_profiles_dashboard
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.static import serve
@@ -55,6 +56,7 @@ urlpatterns = [
     path('api/',            include('mailmagazine.urls')),
     path('api/admin/ajax/', include('dailycast.ajax_urls')),  # AJAX endpoints for admin forms
     path('admin/dailycast/dashboard/', include('dailycast.dashboard_urls')),  # AI performance dashboard
+    path('admin/analytics/request-profiles/', request_profiles_dashboard, name='request-profiles'),  # Sampled request profiles (staff)
     path('api/bulk-import/', include('bulk_import.urls')),  # Bulk import courses/lessons/quizzes
     path('api/assets/', include('assets.urls')),  # Asset library for images, audio
     path('', include('seo.urls')),